@@ -0,0 +1,117 @@
+# -----------------------------------------------------------------------------
+# 会社名: 湘南技術センター株式会社
+# 名前: 塩見 和則
+# 作成日: 2026/10/18
+# -----------------------------------------------------------------------------
+
+"""
+時間別テーブルの集計処理のベンチマーク
+
+従来の列ごとの mean 呼び出し（baseline）と、aggregate_ops による NumPy での一括集計、
+HourlyStreamAggregator による逐次集計（5分ごとの行を1行ずつ追加する場合と、1ファイルずつ追加する場合）を比較する。
+rollup_ops による統計テーブルの集計（最小値・ピーク値・電力量など）の処理時間も出力する。
+tmp/24071610.CSV を元に値を変えたCSVファイルを作成し、1ファイルあたりと1000ファイルあたりの処理時間を出力する。
+
+使用方法:
+    python bench/bench_aggregate.py
+    python bench/bench_aggregate.py --files 5000 --repeat 5
+"""
+
+# 標準ライブラリ
+import os
+import io
+import sys
+import time
+import random
+import argparse
+
+# 外部ライブラリ
+import pandas as pd
+
+sys.path.insert(0,os.path.join(os.path.dirname(os.path.abspath(__file__)),"..","bin"))
+import aggregate_ops
+import rollup_ops
+
+# 元にするCSVファイル
+SAMPLE_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)),"..","tmp","24071610.CSV")
+
+def baseline_insert_list(df,date):
+    # 変更前の file_util.getInsertDataListForDailyTable と同じ集計（列ごとに mean を呼び出す）
+    temp_list = [df.loc[0,1],str(int(df.loc[0,2]) // 100)]
+    for no in range(1,8):
+        temp_list.append(round(df.iloc[:,3 * no].mean(),4))
+        temp_list.append(round(df.iloc[:,3 * no + 1].mean(),4))
+        temp_list.append(round(df.iloc[:,3 * no + 2].mean() / 1000,4))
+    temp_list.append(round(df.iloc[:,27].mean(),4))
+    temp_list.append(round(df.iloc[:,28].mean(),4))
+    temp_list.append(df[30][df.shape[0]-1] - df[30][0])
+    temp_list.append(df[30][df.shape[0]-1])
+    temp_list.append("'" + date + "'")
+    return temp_list
+
+def make_frames(file_count,seed=0):
+    # 元にするCSVファイルの値を乱数で変えた DataFrame を作成する
+    lines = open(SAMPLE_CSV,encoding='utf-8').read().splitlines()
+    rng = random.Random(seed)
+    frames = []
+    for k in range(file_count):
+        out = []
+        for i,line in enumerate(lines):
+            values = line.split(',')
+            for column in range(3,29):
+                values[column] = f"{rng.uniform(0,5000):.2f}"
+            values[30] = str(2915643 + k * 100 + i)
+            out.append(','.join(values))
+        frames.append((pd.read_csv(io.StringIO('\n'.join(out)),header=None),'2024-07-16 10:00'))
+    return frames
+
+def stream_rows(frames):
+    # 5分ごとの行を1行ずつ追加し、行を追加するたびに時間別テーブルの行を作成する（書き込み中のファイルの取り込みを想定）
+    aggregator = aggregate_ops.HourlyStreamAggregator()
+    records = []
+    for df,date in frames:
+        for row in df.to_numpy(dtype='float64'):
+            aggregator.add_row(row)
+            records += aggregator.pop_changed_records()
+    return records
+
+def stream_files(frames):
+    # 1ファイルずつ追加し、最後にまとめて時間別テーブルの行を作成する
+    aggregator = aggregate_ops.HourlyStreamAggregator()
+    for df,date in frames:
+        aggregator.add_rows(df)
+    return aggregator.get_records()
+
+def measure(func,repeat):
+    # repeat 回実行して最短の処理時間（秒）を返す
+    best = None
+    for i in range(repeat):
+        start_time = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start_time
+        best = elapsed if best is None else min(best,elapsed)
+    return best
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="hourly aggregation benchmark")
+    parser.add_argument("--files",type=int,default=1000,help="number of hourly files")
+    parser.add_argument("--repeat",type=int,default=3,help="repetitions (best time is reported)")
+    args = parser.parse_args(argv)
+
+    frames = make_frames(args.files)
+
+    results = {
+        "baseline (per-column mean)": measure(lambda: [baseline_insert_list(df,date) for df,date in frames],args.repeat),
+        "aggregate_hour (per file)": measure(lambda: [aggregate_ops.aggregate_hour(df,date) for df,date in frames],args.repeat),
+        "aggregate_hours (batched)": measure(lambda: aggregate_ops.aggregate_hours(frames),args.repeat),
+        "stream (row + record each)": measure(lambda: stream_rows(frames),args.repeat),
+        "stream (file at a time)": measure(lambda: stream_files(frames),args.repeat),
+        "rollup_rows (stats, batched)": measure(lambda: rollup_ops.rollup_rows([df for df,date in frames]),args.repeat),
+    }
+
+    print(f"{'method':<30}{'per file [us]':>16}{'per 1000 files [ms]':>22}")
+    for name,elapsed in results.items():
+        print(f"{name:<30}{elapsed / args.files * 1e6:>16.1f}{elapsed / args.files * 1000 * 1e3:>22.1f}")
+
+if __name__ == '__main__':
+    main()
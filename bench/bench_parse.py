@@ -0,0 +1,106 @@
+# -----------------------------------------------------------------------------
+# 会社名: 湘南技術センター株式会社
+# 名前: 塩見 和則
+# 作成日: 2026/10/18
+# -----------------------------------------------------------------------------
+
+"""
+CSVファイルの読み込み処理のベンチマーク
+
+従来の型を推定する pandas.read_csv（baseline）と、csvparse_ops による列定義の型を指定した読み込みを比較する。
+tmp/24071610.CSV を元に値を変えたCSVファイルの内容（bytes）を作成し、1ファイルあたりと1000ファイルあたりの処理時間を出力する。
+--hours を指定すると、複数時間分を1つにつなげた大きいファイルでも比較する（pandas.read_csv の読み込みエンジンの比較用）。
+
+使用方法:
+    python bench/bench_parse.py
+    python bench/bench_parse.py --files 2000 --repeat 5 --hours 24
+"""
+
+# 標準ライブラリ
+import os
+import io
+import sys
+import time
+import random
+import argparse
+
+# 外部ライブラリ
+import pandas as pd
+
+sys.path.insert(0,os.path.join(os.path.dirname(os.path.abspath(__file__)),"..","bin"))
+import aggregate_ops
+import csvparse_ops
+
+# 元にするCSVファイル
+SAMPLE_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)),"..","tmp","24071610.CSV")
+
+def baseline_read(data):
+    # 変更前の main.py と同じ読み込み（型を推定する）
+    return pd.read_csv(io.BytesIO(data),header=None)
+
+def schema_read(data,engine,usecols=None):
+    # 列定義の型を指定して pandas.read_csv で読み込む（NumPy での読み込みを使わない場合）
+    dtype = csvparse_ops.LOGGER_CSV_DTYPES if usecols is None else {column: csvparse_ops.LOGGER_CSV_DTYPES[column] for column in usecols}
+    return pd.read_csv(io.BytesIO(data),header=None,dtype=dtype,usecols=usecols,engine=engine)
+
+def make_files(file_count,hours=1,seed=0):
+    # 元にするCSVファイルの値を乱数で変えたCSVファイルの内容を作成する（hours 時間分を1つのファイルにつなげる）
+    lines = open(SAMPLE_CSV,encoding='utf-8').read().splitlines()
+    rng = random.Random(seed)
+    files = []
+    for k in range(file_count):
+        out = []
+        for h in range(hours):
+            for i,line in enumerate(lines):
+                values = line.split(',')
+                for column in range(3,29):
+                    values[column] = f"{rng.uniform(0,5000):.2f}"
+                values[30] = str(2915643 + (k * hours + h) * 100 + i)
+                out.append(','.join(values))
+        files.append(('\n'.join(out) + '\n').encode('utf-8'))
+    return files
+
+def measure(func,repeat):
+    # repeat 回実行して最短の処理時間（秒）を返す
+    best = None
+    for i in range(repeat):
+        start_time = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start_time
+        best = elapsed if best is None else min(best,elapsed)
+    return best
+
+def get_methods():
+    # 比較する読み込み方法（名前と、CSVファイルの内容を受け取る関数）
+    methods = {
+        "baseline (inferred types)": baseline_read,
+        "read_csv schema (c)": lambda data: schema_read(data,"c"),
+        "read_csv schema usecols (c)": lambda data: schema_read(data,"c",aggregate_ops.AGGREGATE_COLUMNS),
+    }
+    if csvparse_ops.CSV_ENGINE == "pyarrow":
+        methods["read_csv schema (pyarrow)"] = lambda data: schema_read(data,"pyarrow")
+    methods["read_logger_csv"] = csvparse_ops.read_logger_csv
+    methods["read_logger_csv_numpy"] = csvparse_ops.read_logger_csv_numpy
+    return methods
+
+def run(files,repeat,label):
+    print(f"{label}: {len(files)} files, {len(files[0])} bytes each")
+    print(f"{'method':<32}{'per file [us]':>16}{'per 1000 files [ms]':>22}")
+    for name,func in get_methods().items():
+        elapsed = measure(lambda: [func(data) for data in files],repeat)
+        print(f"{name:<32}{elapsed / len(files) * 1e6:>16.1f}{elapsed / len(files) * 1000 * 1e3:>22.1f}")
+    print()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="CSV parse benchmark")
+    parser.add_argument("--files",type=int,default=1000,help="number of hourly files")
+    parser.add_argument("--repeat",type=int,default=3,help="repetitions (best time is reported)")
+    parser.add_argument("--hours",type=int,default=0,help="also compare files of this many hours joined together")
+    args = parser.parse_args(argv)
+
+    run(make_files(args.files),args.repeat,"hourly files")
+    if args.hours > 0:
+        run(make_files(max(args.files // args.hours,1),args.hours),args.repeat,f"{args.hours}-hour files")
+
+if __name__ == '__main__':
+    main()
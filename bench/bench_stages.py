@@ -0,0 +1,282 @@
+# -----------------------------------------------------------------------------
+# 会社名: 湘南技術センター株式会社
+# 名前: 塩見 和則
+# 作成日: 2026/10/18
+# -----------------------------------------------------------------------------
+
+"""
+取り込みの処理ごとのベンチマーク
+
+synth_csv で生成したCSVファイルと、standins のFTPサーバー（LocalFtpServer）・DB（SQLiteファイル）を使用して、
+以下の処理の時間を計測する。
+
+- ftp_fetch: FTPサーバーからのCSVファイルの取得（csvfile_ops.fetch_csv_file、接続は使い回す）
+- parse: CSVファイルの読み込み（csvparse_ops.read_logger_csv）
+- insert_list: 時間別テーブルの行の作成（file_util.getInsertDataListForDailyTable）
+- origin_upsert / hourly_upsert / daily_upsert / monthly_upsert: 元データ・時間別・日別・月別テーブルへの登録（1つのDBセッション）
+- origin_upsert_rows: 元データテーブルへの1行ずつの登録（mysql_ops.db_UpdateInsertOriginTable、origin_upsert との比較用）
+  どちらも (INSERTした行数, UPDATEした行数) を返す。SQLiteの origin_upsert は、登録の前に既存のキーを数える時間を含む。
+- backfill: 期間全体のバックフィル（backfill_ops.backfill、FTPからの取得から集計まで）
+
+各処理を --repeat 回実行した最短の時間を、1件あたりの時間・1秒あたりの件数とともに出力する。
+--output を指定すると結果をJSONで保存し、--compare で以前の結果と比較する（--threshold 倍より遅い処理があれば終了コード 1）。
+作業用のファイル（CSVファイル、SQLiteファイル、ログ、取り込み済みファイルの情報）は --work-dir（省略時は一時ディレクトリ）に作成する。
+
+使用方法:
+    python bench/bench_stages.py --days 31 --output bench_v1.json
+    python bench/bench_stages.py --days 31 --compare bench_v1.json --threshold 1.2
+    python bench/bench_stages.py --days 7 --stages parse insert_list --ftp-latency-ms 20
+"""
+
+# 標準ライブラリ
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import subprocess
+import datetime as dt
+
+BENCH_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0,os.path.join(BENCH_DIRECTORY,"..","bin"))
+sys.path.insert(0,BENCH_DIRECTORY)
+import synth_csv
+import standins
+import file_util
+import csvfile_ops
+import csvparse_ops
+import aggregate_ops
+import mysql_ops
+import backfill_ops
+
+# 計測する処理（実行順）
+BENCH_STAGES = ["ftp_fetch","parse","insert_list","origin_upsert_rows","origin_upsert","hourly_upsert","daily_upsert","monthly_upsert","backfill"]
+
+def measure(func,repeat):
+    # repeat 回実行して最短の処理時間（秒）を返す
+    best = None
+    for i in range(repeat):
+        start_time = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start_time
+        best = elapsed if best is None else min(best,elapsed)
+    return best
+
+def get_result(elapsed,items,unit,repeat):
+    # 1件あたりの時間と1秒あたりの件数を求める
+    return {
+        "items": items,
+        "unit": unit,
+        "repeat": repeat,
+        "best_sec": round(elapsed,6),
+        "per_item_ms": round(elapsed / items * 1000,4) if items > 0 else None,
+        "items_per_sec": round(items / elapsed,1) if elapsed > 0 else None,
+    }
+
+def get_commit():
+    # 計測したソースのコミット（git が使えない場合は None）
+    try:
+        return subprocess.run(["git","rev-parse","--short","HEAD"],cwd=BENCH_DIRECTORY,capture_output=True,text=True,check=True).stdout.strip()
+    except (OSError,subprocess.CalledProcessError):
+        return None
+
+class StageBench:
+
+    """
+    StageBench クラス
+
+    概要:
+        作業用ディレクトリにCSVファイルとSQLiteファイルを用意し、処理ごとの時間を計測する。
+        bin のモジュールは ../log、../manifest などの相対パスを使用するため、作業用ディレクトリの bin に移動して実行する。
+
+    属性:
+        work_dir (str): 作業用ディレクトリ
+        files (list): (現場コード, 観測日時, CSVファイルの内容) のリスト（先頭の現場のファイルをFTPサーバーで公開する）
+        repeat (int): 繰り返し回数
+    """
+
+    def __init__(self,work_dir,sites,start_date,days,seed,repeat,ftp_latency):
+        self.work_dir = os.path.abspath(work_dir)
+        self.start_hour = start_date
+        self.hours = days * 24
+        self.repeat = repeat
+        self.db_path = os.path.join(self.work_dir,"db","bench.sqlite3")
+
+        # bin と同じ階層の相対パス（../log など）が作業用ディレクトリを指すようにする
+        os.makedirs(os.path.join(self.work_dir,"bin"),exist_ok=True)
+        os.chdir(os.path.join(self.work_dir,"bin"))
+        file_util.create_log_directory()
+
+        # CSVファイルを生成し、先頭の現場のファイルをFTPサーバーで公開する
+        ftp_root = os.path.join(self.work_dir,"ftp")
+        shutil.rmtree(ftp_root,ignore_errors=True)
+        synth_csv.write_files(ftp_root,sites,start_date,self.hours,seed)
+        self.files = list(synth_csv.generate_files(sites,start_date,self.hours,seed))
+        self.site_files = [item for item in self.files if item[0] == synth_csv.get_sites(1)[0]]
+        self.server = standins.LocalFtpServer(os.path.join(ftp_root,synth_csv.get_sites(1)[0]),latency=ftp_latency).start()
+        standins.use_local_ftp(self.server)
+        standins.use_sqlite_database(self.db_path)
+
+        self.frames = None
+
+    def close(self):
+        csvfile_ops.close_ftp_session_pool()
+        self.server.close()
+
+    def get_frames(self):
+        # 読み込んだ DataFrame と観測日時のリスト（1回だけ作成する）
+        if self.frames is None:
+            self.frames = [(csvparse_ops.read_logger_csv(data),hour) for genba_cd,hour,data in self.site_files]
+        return self.frames
+
+    def bench_ftp_fetch(self):
+        def fetch_all():
+            for genba_cd,hour,data in self.site_files:
+                csvfile_ops.fetch_csv_file(f"/LOG/{hour.strftime('%Y')}",hour.strftime('%y%m%d%H') + ".CSV")
+        return get_result(measure(fetch_all,self.repeat),len(self.site_files),"files",self.repeat)
+
+    def bench_parse(self):
+        def parse_all():
+            for genba_cd,hour,data in self.files:
+                csvparse_ops.read_logger_csv(data)
+        return get_result(measure(parse_all,self.repeat),len(self.files),"files",self.repeat)
+
+    def bench_insert_list(self):
+        frames = self.get_frames()
+        def build_all():
+            for df,hour in frames:
+                file_util.getInsertDataListForDailyTable(df,hour.strftime('%Y-%m-%d %H:%M'))
+        return get_result(measure(build_all,self.repeat),len(frames),"files",self.repeat)
+
+    def bench_origin_upsert(self):
+        frames = self.get_frames()
+        def upsert_all():
+            # 登録した行数（INSERTした行数とUPDATEした行数の合計）がファイルの行数と一致することを確認する
+            row_count = 0
+            with mysql_ops.DbSession() as session:
+                for df,hour in frames:
+                    row_count += sum(mysql_ops.db_UpdateInsertOriginTableBatch(df,hour.strftime('%y%m%d%H'),session))
+            assert row_count == sum(len(df) for df,hour in frames)
+        return get_result(measure(upsert_all,self.repeat),sum(len(df) for df,hour in frames),"rows",self.repeat)
+
+    def bench_origin_upsert_rows(self):
+        # 1行ごとに件数を確認して接続・COMMITする従来の登録方法（セッションを使わない）
+        frames = self.get_frames()
+        def upsert_all():
+            for df,hour in frames:
+                mysql_ops.db_UpdateInsertOriginTable(df,hour.strftime('%y%m%d%H'))
+        return get_result(measure(upsert_all,self.repeat),sum(len(df) for df,hour in frames),"rows",self.repeat)
+
+    def bench_hourly_upsert(self):
+        records = aggregate_ops.aggregate_hours([(df,hour.strftime('%Y-%m-%d %H:%M')) for df,hour in self.get_frames()])
+        def upsert_all():
+            with mysql_ops.DbSession() as session:
+                mysql_ops.db_UpdateInsertHourlyTableBatch(records,session)
+        return get_result(measure(upsert_all,self.repeat),len(records),"hours",self.repeat)
+
+    def bench_daily_upsert(self):
+        # 時間別テーブルから集計するため、hourly_upsert の後に実行する
+        day_list = sorted(set(int(hour.strftime('%Y%m%d')) for genba_cd,hour,data in self.site_files))
+        def upsert_all():
+            with mysql_ops.DbSession() as session:
+                mysql_ops.db_UpdateInsertDailyTableBatch(day_list,session)
+        return get_result(measure(upsert_all,self.repeat),len(day_list),"days",self.repeat)
+
+    def bench_monthly_upsert(self):
+        # 日別テーブルから集計するため、daily_upsert の後に実行する
+        month_list = sorted(set(int(hour.strftime('%Y%m')) for genba_cd,hour,data in self.site_files))
+        def upsert_all():
+            with mysql_ops.DbSession() as session:
+                mysql_ops.db_UpdateInsertMonthlyTableBatch(month_list,session)
+        return get_result(measure(upsert_all,self.repeat),len(month_list),"months",self.repeat)
+
+    def bench_backfill(self):
+        # 毎回空のDBから、期間全体をFTPサーバーから取り込む
+        end_hour = self.start_hour + dt.timedelta(hours=self.hours - 1)
+        def run_backfill():
+            standins.use_sqlite_database(self.db_path)
+            summary = backfill_ops.backfill(self.start_hour,end_hour,"/LOG",force=True)
+            if summary.get("committed") == False:
+                raise RuntimeError(f"backfill failed: {summary}")
+        return get_result(measure(run_backfill,self.repeat),len(self.site_files),"files",self.repeat)
+
+    def run(self,stages):
+        results = {}
+        for stage in stages:
+            results[stage] = getattr(self,f"bench_{stage}")()
+            print(f"{stage:<20}{results[stage]['best_sec']:>12.4f} s{results[stage]['per_item_ms']:>14.4f} ms/{results[stage]['unit']}"
+                  f"{results[stage]['items_per_sec']:>14.1f} {results[stage]['unit']}/s")
+        return results
+
+def compare(results,baseline_path,threshold):
+    # 以前の結果と比較し、threshold 倍より遅くなった処理のリストを返す
+    with open(baseline_path,encoding='utf-8') as baseline_file:
+        baseline = json.load(baseline_file)
+    regressions = []
+    print(f"\ncompared with {baseline_path} (commit {baseline.get('commit')})")
+    for stage,result in results.items():
+        old = baseline.get("results",{}).get(stage)
+        if old is None or not old.get("per_item_ms") or result["per_item_ms"] is None:
+            continue
+        ratio = result["per_item_ms"] / old["per_item_ms"]
+        mark = "REGRESSION" if ratio > threshold else ""
+        print(f"{stage:<20}{old['per_item_ms']:>14.4f} -> {result['per_item_ms']:>10.4f} ms/{result['unit']}  x{ratio:.2f} {mark}")
+        if ratio > threshold:
+            regressions.append(stage)
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="per-stage ingest benchmark with local FTP and SQLite stand-ins")
+    parser.add_argument("--sites",type=int,default=1,help="number of sites (parse uses every site, the other stages the first site)")
+    parser.add_argument("--start",default="20240101",help="first day (YYYYMMDD)")
+    parser.add_argument("--days",type=int,default=31,help="number of days")
+    parser.add_argument("--seed",type=int,default=0,help="random seed of the generated CSV files")
+    parser.add_argument("--repeat",type=int,default=3,help="repetitions (best time is reported)")
+    parser.add_argument("--stages",nargs="+",choices=BENCH_STAGES,default=BENCH_STAGES,help="stages to run")
+    parser.add_argument("--ftp-latency-ms",type=float,default=0.0,help="delay added to every FTP command by the local server")
+    parser.add_argument("--work-dir",help="working directory (default: a temporary directory removed afterwards)")
+    parser.add_argument("--output",help="write the results as JSON to this file")
+    parser.add_argument("--compare",metavar="JSON",help="compare with a previous --output file")
+    parser.add_argument("--threshold",type=float,default=1.25,help="with --compare, exit with 1 if a stage is slower than this ratio")
+    args = parser.parse_args(argv)
+
+    # ログはエラーのみ出力する
+    file_util.set_log_level("error")
+
+    output_path = os.path.abspath(args.output) if args.output else None
+    compare_path = os.path.abspath(args.compare) if args.compare else None
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="izumi_bench_")
+    start_date = dt.datetime.strptime(args.start,'%Y%m%d')
+    stages = [stage for stage in BENCH_STAGES if stage in args.stages]
+
+    bench = StageBench(work_dir,args.sites,start_date,args.days,args.seed,args.repeat,args.ftp_latency_ms / 1000)
+    try:
+        print(f"{len(bench.files)} files ({args.sites} sites x {bench.hours} hours), work dir {work_dir}")
+        results = bench.run(stages)
+    finally:
+        bench.close()
+        if args.work_dir is None:
+            shutil.rmtree(work_dir,ignore_errors=True)
+
+    report = {
+        "benchmark": "stages",
+        "created": dt.datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        "commit": get_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": {"sites": args.sites,"start": args.start,"days": args.days,"seed": args.seed,"repeat": args.repeat,
+                   "ftp_latency_ms": args.ftp_latency_ms,"db_backend": "sqlite"},
+        "results": results,
+    }
+    if output_path is not None:
+        with open(output_path,'w',encoding='utf-8') as output_file:
+            json.dump(report,output_file,ensure_ascii=False,indent=2)
+
+    if compare_path is not None and len(compare(results,compare_path,args.threshold)) > 0:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
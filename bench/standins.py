@@ -0,0 +1,264 @@
+# -----------------------------------------------------------------------------
+# 会社名: 湘南技術センター株式会社
+# 名前: 塩見 和則
+# 作成日: 2026/10/18
+# -----------------------------------------------------------------------------
+
+"""
+ベンチマーク用のFTPサーバーとDBの代わり
+
+- LocalFtpServer: ローカルのディレクトリを公開する最小限のFTPサーバー（標準ライブラリのみ）。
+  csvfile_ops.FtpSession が使用するコマンド（USER/PASS、CWD、PASV/EPSV、REST、RETR、SIZE、MDTM、MLSD、NLST、NOOP）に応答する。
+  latency を指定すると、コマンドごとに応答を遅らせて、実際のFTPサーバーとの往復時間を模擬する。
+- use_local_ftp: csvfile_ops の接続先を LocalFtpServer に切り替える。
+- use_sqlite_database: DBの代わりに storage_ops.SqliteBackend のSQLiteファイルを使用し、テーブルを作成する。
+
+使用方法:
+    server = standins.LocalFtpServer("../synth/0001").start()
+    standins.use_local_ftp(server)
+    standins.use_sqlite_database("/tmp/bench.sqlite3")
+    ...
+    server.close()
+"""
+
+# 標準ライブラリ
+import os
+import sys
+import time
+import socket
+import ftplib
+import threading
+import socketserver
+import datetime as dt
+
+sys.path.insert(0,os.path.join(os.path.dirname(os.path.abspath(__file__)),"..","bin"))
+import csvfile_ops
+import mysql_ops
+import schema_ops
+
+# LocalFtpServer のユーザー名・パスワード
+LOCAL_FTP_USER = "bench"
+LOCAL_FTP_PASSWORD = "bench"
+
+class LocalFtpHandler(socketserver.StreamRequestHandler):
+
+    """
+    LocalFtpHandler クラス
+
+    概要:
+        FTPの1接続分のコマンドを処理する。データ接続はパッシブモードのみ対応する。
+    """
+
+    def setup(self):
+        # 短い応答を続けて送るため、Nagle アルゴリズムで応答が遅れないようにする
+        self.request.setsockopt(socket.IPPROTO_TCP,socket.TCP_NODELAY,1)
+        super().setup()
+        self.cwd = "/"
+        self.rest = 0
+        self.data_listener = None
+
+    def reply(self,text):
+        self.wfile.write((text + "\r\n").encode('utf-8'))
+
+    def handle(self):
+        self.reply("220 local ftp stand-in")
+        for raw_line in self.rfile:
+            line = raw_line.decode('utf-8').rstrip("\r\n")
+            command,_,argument = line.partition(" ")
+            if self.server.latency > 0:
+                time.sleep(self.server.latency)
+            handler = getattr(self,f"ftp_{command.lower()}",None)
+            if handler is None:
+                self.reply(f"502 {command} not implemented")
+            elif handler(argument) == False:
+                break
+        self.close_data_listener()
+
+    def get_path(self,name):
+        # FTPのパスを公開するディレクトリ内のパスに変換する（公開するディレクトリの外は参照できない）
+        ftp_path = os.path.normpath(os.path.join(self.cwd,name)).replace("\\","/")
+        if not ftp_path.startswith("/"):
+            ftp_path = "/" + ftp_path
+        return ftp_path,os.path.join(self.server.root,ftp_path.lstrip("/"))
+
+    def get_modify(self,path):
+        return dt.datetime.fromtimestamp(os.path.getmtime(path),dt.timezone.utc).strftime('%Y%m%d%H%M%S')
+
+    def open_data_connection(self):
+        # PASV / EPSV で待ち受けたデータ接続を受け付ける
+        if self.data_listener is None:
+            return None
+        conn,address = self.data_listener.accept()
+        self.close_data_listener()
+        return conn
+
+    def close_data_listener(self):
+        if self.data_listener is not None:
+            self.data_listener.close()
+            self.data_listener = None
+
+    def send_data(self,data):
+        conn = self.open_data_connection()
+        if conn is None:
+            self.reply("425 use PASV first")
+            return
+        self.reply("150 opening data connection")
+        try:
+            conn.sendall(data)
+        finally:
+            conn.close()
+        self.reply("226 transfer complete")
+
+    def ftp_user(self,argument):
+        self.reply("331 password required")
+
+    def ftp_pass(self,argument):
+        self.reply("230 logged in")
+
+    def ftp_syst(self,argument):
+        self.reply("215 UNIX Type: L8")
+
+    def ftp_feat(self,argument):
+        self.wfile.write(b"211-Features:\r\n MDTM\r\n MLST type*;size*;modify*;\r\n REST STREAM\r\n SIZE\r\n")
+        self.reply("211 End")
+
+    def ftp_opts(self,argument):
+        self.reply("200 OK")
+
+    def ftp_type(self,argument):
+        self.reply("200 type set")
+
+    def ftp_noop(self,argument):
+        self.reply("200 NOOP ok")
+
+    def ftp_pwd(self,argument):
+        self.reply(f'257 "{self.cwd}"')
+
+    def ftp_cwd(self,argument):
+        ftp_path,path = self.get_path(argument)
+        if os.path.isdir(path):
+            self.cwd = ftp_path
+            self.reply("250 directory changed")
+        else:
+            self.reply(f"550 {argument}: no such directory")
+
+    def ftp_pasv(self,argument):
+        self.close_data_listener()
+        self.data_listener = socket.create_server((self.server.host,0))
+        port = self.data_listener.getsockname()[1]
+        self.reply(f"227 Entering Passive Mode ({self.server.host.replace('.',',')},{port >> 8},{port & 0xff})")
+
+    def ftp_epsv(self,argument):
+        self.close_data_listener()
+        self.data_listener = socket.create_server((self.server.host,0))
+        self.reply(f"229 Entering Extended Passive Mode (|||{self.data_listener.getsockname()[1]}|)")
+
+    def ftp_rest(self,argument):
+        self.rest = int(argument)
+        self.reply(f"350 restarting at {self.rest}")
+
+    def ftp_retr(self,argument):
+        ftp_path,path = self.get_path(argument)
+        rest,self.rest = self.rest,0
+        if not os.path.isfile(path):
+            self.close_data_listener()
+            self.reply(f"550 {argument}: no such file")
+            return
+        with open(path,'rb') as csv_file:
+            csv_file.seek(rest)
+            data = csv_file.read()
+        self.send_data(data)
+
+    def ftp_size(self,argument):
+        ftp_path,path = self.get_path(argument)
+        if os.path.isfile(path):
+            self.reply(f"213 {os.path.getsize(path)}")
+        else:
+            self.reply(f"550 {argument}: no such file")
+
+    def ftp_mdtm(self,argument):
+        ftp_path,path = self.get_path(argument)
+        if os.path.isfile(path):
+            self.reply(f"213 {self.get_modify(path)}")
+        else:
+            self.reply(f"550 {argument}: no such file")
+
+    def ftp_mlsd(self,argument):
+        ftp_path,path = self.get_path(argument)
+        if not os.path.isdir(path):
+            self.close_data_listener()
+            self.reply(f"550 {argument}: no such directory")
+            return
+        lines = []
+        for name in sorted(os.listdir(path)):
+            entry_path = os.path.join(path,name)
+            if os.path.isdir(entry_path):
+                lines.append(f"type=dir;modify={self.get_modify(entry_path)}; {name}")
+            else:
+                lines.append(f"type=file;size={os.path.getsize(entry_path)};modify={self.get_modify(entry_path)}; {name}")
+        self.send_data("".join(line + "\r\n" for line in lines).encode('utf-8'))
+
+    def ftp_nlst(self,argument):
+        ftp_path,path = self.get_path(argument)
+        names = sorted(os.listdir(path)) if os.path.isdir(path) else []
+        self.send_data("".join(name + "\r\n" for name in names).encode('utf-8'))
+
+    def ftp_quit(self,argument):
+        self.reply("221 goodbye")
+        return False
+
+class LocalFtpServer(socketserver.ThreadingTCPServer):
+
+    """
+    LocalFtpServer クラス
+
+    概要:
+        ローカルのディレクトリを公開するFTPサーバー。接続ごとにスレッドで処理する。
+
+    属性:
+        root (str): 公開するディレクトリ
+        host (str): 待ち受けるアドレス
+        port (int): 待ち受けるポート（0 を指定した場合は空いているポート）
+        latency (float): コマンドごとに応答を遅らせる秒数
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self,root,host="127.0.0.1",port=0,latency=0.0):
+        self.root = os.path.abspath(root)
+        self.host = host
+        self.latency = latency
+        super().__init__((host,port),LocalFtpHandler)
+        self.port = self.server_address[1]
+        self.thread = None
+
+    def start(self):
+        # 別スレッドで接続の受け付けを開始する
+        self.thread = threading.Thread(target=self.serve_forever,name="local-ftp",daemon=True)
+        self.thread.start()
+        return self
+
+    def close(self):
+        # 接続の受け付けを停止する
+        self.shutdown()
+        self.server_close()
+
+def use_local_ftp(server):
+    # csvfile_ops の接続先を LocalFtpServer に切り替える（共有のFTPセッションプールは作り直す）
+    csvfile_ops.close_ftp_session_pool()
+    csvfile_ops.ftp_server = server.host
+    csvfile_ops.username = LOCAL_FTP_USER
+    csvfile_ops.password = LOCAL_FTP_PASSWORD
+    ftplib.FTP.port = server.port
+
+def use_sqlite_database(path):
+    # DBの代わりにSQLiteファイルを使用し、テーブルを作成する（既存のファイルは削除する）
+    for suffix in ("","-wal","-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    mysql_ops.set_backend("sqlite",path)
+    schema_ops.migrate()
+    problems = schema_ops.check_schema()
+    if len(problems) > 0:
+        raise RuntimeError(f"failed to create the tables in {path}: {problems}")
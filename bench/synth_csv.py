@@ -0,0 +1,203 @@
+# -----------------------------------------------------------------------------
+# 会社名: 湘南技術センター株式会社
+# 名前: 塩見 和則
+# 作成日: 2026/10/18
+# -----------------------------------------------------------------------------
+
+"""
+ロガーのCSVファイルの生成
+
+tmp/24071610.CSV と同じ31列（現場コード、観測日、観測時刻、8系統の電流・電圧・発電量、日射量、温度、エラーコード、累積売電量）の
+1時間ごとのCSVファイルを、任意の現場数・期間で生成する。
+
+- 日射量は日の出から日の入りまでの正弦波（日の長さと最大値は季節で変わる）に、日ごとの雲の量と5分ごとのゆらぎを掛けたもの
+- 発電量は系統ごとの容量・日射量・温度から求め、電流は発電量と電圧から求める
+- エラーコードは error_rate の確率で 1（1系統の停止）、2（通信エラー）、3（系統連系の停止）のいずれかにし、該当する発電量を0にする
+- 累積売電量は発電量の90%を積算した整数で、時間の順に生成する限り減少しない
+
+同じ seed からは同じ内容のファイルを生成する。
+
+使用方法:
+    python bench/synth_csv.py ../synth --sites 3 --years 2
+    python bench/synth_csv.py ../synth --start 20240701 --days 31 --error-rate 0.01
+
+    生成したファイルは <出力先>/<現場コード>/LOG/YYYY/YYMMDDHH.CSV（FTPサーバーと同じ構成）に保存する。
+"""
+
+# 標準ライブラリ
+import os
+import math
+import random
+import argparse
+import datetime as dt
+
+# 1時間あたりの行数（5分ごと）
+ROWS_PER_HOUR = 12
+
+# CSVファイルの系統数
+STRING_COUNT = 8
+
+# エラーコード（0: 正常）
+ERROR_STRING_STOP = 1
+ERROR_COMMUNICATION = 2
+ERROR_GRID_STOP = 3
+
+# 売電量の割合（発電量のうち売電する割合）
+SELL_RATIO = 0.9
+
+class SiteSimulator:
+
+    """
+    SiteSimulator クラス
+
+    概要:
+        1つの現場のロガーを模擬し、1時間ごとのCSVファイルの内容を生成する。
+        累積売電量を引き継ぐため、make_hour は時間の順に呼び出す。
+
+    属性:
+        genba_cd (str): 現場コード（4桁）
+        capacities (list): 系統ごとの容量[kW]
+        voltages (list): 系統ごとの動作電圧[V]
+        baiden (float): 累積売電量[kWH]
+        error_rate (float): 1行あたりのエラーの発生確率
+
+    使用方法:
+        site = SiteSimulator("0001",seed=0)
+        data = site.make_hour(dt.datetime(2024,7,16,10))
+    """
+
+    def __init__(self,genba_cd,seed=0,error_rate=0.002):
+        self.genba_cd = genba_cd
+        self.rng = random.Random(f"{seed}-{genba_cd}")
+        self.capacities = [self.rng.uniform(4.0,6.0) for no in range(STRING_COUNT)]
+        self.voltages = [self.rng.uniform(260.0,340.0) for no in range(STRING_COUNT)]
+        self.baiden = float(self.rng.randint(1000000,3000000))
+        self.error_rate = error_rate
+        self.clouds = {}
+
+    def get_cloud(self,date):
+        # 日ごとの雲の量（1.0: 快晴）
+        if date not in self.clouds:
+            self.clouds = {date: self.rng.choice([self.rng.uniform(0.85,1.0),self.rng.uniform(0.4,0.85),self.rng.uniform(0.05,0.4)])}
+        return self.clouds[date]
+
+    def get_weather(self,kansoku):
+        # 観測日時の日射量[W/m2]と温度[℃]
+        day_of_year = kansoku.timetuple().tm_yday
+        season = math.sin(2 * math.pi * (day_of_year - 80) / 365)
+        day_length = 12.0 + 2.5 * season
+        sunrise = 11.75 - day_length / 2
+        hour = kansoku.hour + kansoku.minute / 60
+        nissya = 0.0
+        if sunrise < hour < sunrise + day_length:
+            peak = 850.0 + 150.0 * season
+            nissya = peak * math.sin(math.pi * (hour - sunrise) / day_length) * self.get_cloud(kansoku.date()) * self.rng.uniform(0.9,1.1)
+        temp = 16.0 + 11.0 * season + 4.0 * math.sin(2 * math.pi * (hour - 8) / 24) + self.rng.gauss(0,0.3)
+        return max(nissya,0.0),temp
+
+    def make_row(self,kansoku):
+        # 1行（5分）の値を生成する
+        nissya,temp = self.get_weather(kansoku)
+        error_cd = 0
+        if self.rng.random() < self.error_rate:
+            error_cd = self.rng.choice([ERROR_STRING_STOP,ERROR_COMMUNICATION,ERROR_GRID_STOP])
+        stopped = self.rng.randrange(STRING_COUNT) if error_cd == ERROR_STRING_STOP else None
+
+        values = []
+        total_w = 0.0
+        for no in range(STRING_COUNT):
+            hatsuden = self.capacities[no] * 1000 * nissya / 1000 * (1 - 0.004 * (temp - 25)) * self.rng.uniform(0.97,1.03)
+            if hatsuden < 1.0 or no == stopped or error_cd in (ERROR_COMMUNICATION,ERROR_GRID_STOP):
+                hatsuden = 0.0
+            denatsu = self.voltages[no] * self.rng.uniform(0.98,1.02) if hatsuden > 0 else 0.0
+            denryu = hatsuden / denatsu if denatsu > 0 else 0.0
+            values += [denryu,denatsu,hatsuden]
+            total_w += hatsuden
+
+        # 5分間の発電量のうち売電した分を累積する（整数部分を出力する）
+        self.baiden += total_w * (5 / 60) / 1000 * SELL_RATIO
+        if error_cd == ERROR_COMMUNICATION:
+            nissya,temp = 0.0,0.0
+
+        fields = [self.genba_cd,kansoku.strftime('%Y%m%d'),kansoku.strftime('%H%M')]
+        fields += [f"{value:.2f}" for value in values]
+        fields += [f"{nissya:.2f}",f"{temp:.2f}",str(error_cd),str(int(self.baiden))]
+        return ",".join(fields)
+
+    def make_hour(self,hour):
+        # 1時間分（ROWS_PER_HOUR 行）のCSVファイルの内容を生成する
+        lines = [self.make_row(hour + dt.timedelta(minutes=5 * i)) for i in range(ROWS_PER_HOUR)]
+        return ("\n".join(lines) + "\n").encode('utf-8')
+
+def get_sites(site_count):
+    # 現場コードのリスト（0001 から）
+    return [f"{no:04d}" for no in range(1,site_count + 1)]
+
+def generate_files(site_count,start_hour,hours,seed=0,error_rate=0.002):
+
+    """
+    generate_files 関数
+
+    概要:
+        現場ごと・1時間ごとのCSVファイルの内容を、時間の順に生成するジェネレーター。
+
+    引数:
+        site_count: int - 現場数
+        start_hour: datetime.datetime - 開始日時（時単位）
+        hours: int - 時間数
+        seed: int - 乱数のシード
+        error_rate: float - 1行あたりのエラーの発生確率
+
+    戻り値:
+        (現場コード, 観測日時, CSVファイルの内容 bytes) を順に返す
+
+    例外処理:
+        なし
+    """
+
+    sites = [SiteSimulator(genba_cd,seed,error_rate) for genba_cd in get_sites(site_count)]
+    for k in range(hours):
+        hour = start_hour + dt.timedelta(hours=k)
+        for site in sites:
+            yield site.genba_cd,hour,site.make_hour(hour)
+
+def get_file_path(output_directory,genba_cd,hour):
+    # <出力先>/<現場コード>/LOG/YYYY/YYMMDDHH.CSV
+    return os.path.join(output_directory,genba_cd,"LOG",hour.strftime('%Y'),hour.strftime('%y%m%d%H') + ".CSV")
+
+def write_files(output_directory,site_count,start_hour,hours,seed=0,error_rate=0.002):
+    # CSVファイルを生成して保存し、保存したファイル数と合計バイト数を返す
+    file_count = 0
+    byte_count = 0
+    for genba_cd,hour,data in generate_files(site_count,start_hour,hours,seed,error_rate):
+        path = get_file_path(output_directory,genba_cd,hour)
+        os.makedirs(os.path.dirname(path),exist_ok=True)
+        with open(path,'wb') as csv_file:
+            csv_file.write(data)
+        file_count += 1
+        byte_count += len(data)
+    return file_count,byte_count
+
+def get_hours(start_date,years=0,days=0):
+    # 開始日から years 年（+ days 日）分の時間数
+    end_date = start_date.replace(year=start_date.year + years) + dt.timedelta(days=days)
+    return int((end_date - start_date).total_seconds() // 3600)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="synthetic logger CSV generator")
+    parser.add_argument("output",help="output directory (<output>/<site>/LOG/YYYY/YYMMDDHH.CSV)")
+    parser.add_argument("--sites",type=int,default=1,help="number of sites")
+    parser.add_argument("--start",default="20240101",help="first day (YYYYMMDD)")
+    parser.add_argument("--years",type=int,default=0,help="number of years")
+    parser.add_argument("--days",type=int,default=0,help="number of days (added to --years, default 1 day if both are 0)")
+    parser.add_argument("--seed",type=int,default=0,help="random seed")
+    parser.add_argument("--error-rate",type=float,default=0.002,help="probability of a non-zero error code per row")
+    args = parser.parse_args(argv)
+
+    start_date = dt.datetime.strptime(args.start,'%Y%m%d')
+    hours = get_hours(start_date,args.years,args.days if args.years > 0 or args.days > 0 else 1)
+    file_count,byte_count = write_files(args.output,args.sites,start_date,hours,args.seed,args.error_rate)
+    print(f"{file_count} files, {byte_count} bytes -> {args.output}")
+
+if __name__ == '__main__':
+    main()
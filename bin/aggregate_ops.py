@@ -0,0 +1,439 @@
+# -----------------------------------------------------------------------------
+# 会社名: 湘南技術センター株式会社
+# 名前: 塩見 和則
+# 作成日: 2026/10/18
+# -----------------------------------------------------------------------------
+
+# 標準ライブラリ
+import datetime as dt
+from typing import NamedTuple
+
+# 外部ライブラリ
+import numpy as np
+
+# CSVファイルの列番号
+CSV_DATE_COLUMN = 1
+CSV_TIME_COLUMN = 2
+CSV_BAIDEN_COLUMN = 30
+
+# 時間別テーブルで平均値を求める列の定義: (フィールド名, CSVファイルの列番号, 除数)
+# 発電量はW単位のため1000で割ってkW単位にする
+HOURLY_MEAN_SPEC = []
+for _no in range(1,8):
+    HOURLY_MEAN_SPEC += [
+        (f"denryu_{_no:02d}", 3 * _no, 1),
+        (f"denatsu_{_no:02d}", 3 * _no + 1, 1),
+        (f"hatsuden_{_no:02d}_kwh", 3 * _no + 2, 1000),
+    ]
+HOURLY_MEAN_SPEC += [
+    ("nissya_avg", 27, 1),
+    ("temp_avg", 28, 1),
+]
+
+# 平均値を求める列番号と除数（HOURLY_MEAN_SPEC から作成する）
+HOURLY_MEAN_COLUMNS = [column for name,column,divisor in HOURLY_MEAN_SPEC]
+HOURLY_MEAN_DIVISORS = np.array([divisor for name,column,divisor in HOURLY_MEAN_SPEC],dtype=np.float64)
+
+# 集計に使用する列番号（観測日・観測時・平均値を求める列・累積売電量の順）
+AGGREGATE_COLUMNS = [CSV_DATE_COLUMN,CSV_TIME_COLUMN] + HOURLY_MEAN_COLUMNS + [CSV_BAIDEN_COLUMN]
+
+# 平均値の小数点以下の桁数（従来の pandas の平均値の round と同じく numpy.round で丸める。
+# Pythonの round は2進数の値で丸めるため、0.71275 のような値が1桁ずれる）
+HOURLY_ROUND_DIGITS = 4
+
+# 時間別テーブルの1行分のフィールド（mysql_ops.HOURLY_COLUMNS と同じ順番）
+_HourlyRecordBase = NamedTuple("_HourlyRecordBase",
+    [("kansoku_date_int",int),("kansoku_time_int",int)]
+    + [(name,float) for name,column,divisor in HOURLY_MEAN_SPEC]
+    + [("baiden_hourly",int),("baiden",int),("kansoku_datetime",str),("update_datetime",str)])
+
+class HourlyRecord(_HourlyRecordBase):
+
+    """
+    HourlyRecord クラス
+
+    概要:
+        時間別テーブル（izumi_sola_hourly）の1行分の集計結果。
+        フィールドの並びは mysql_ops.HOURLY_COLUMNS と同じため、そのままSQLのパラメータとして使用できる。
+
+    属性:
+        kansoku_date_int (int): 観測日（YYYYMMdd）
+        kansoku_time_int (int): 観測時（hh）
+        denryu_01〜07, denatsu_01〜07, hatsuden_01_kwh〜07_kwh (float): 系統ごとの電流・電圧・発電量[kW]の平均値
+        nissya_avg (float): 日射量の平均値
+        temp_avg (float): 温度の平均値
+        baiden_hourly (int): 1時間あたりの売電量[kWH]（最後の行と最初の行の累積売電量の差）
+        baiden (int): 累積売電量[kWH]（最後の行）
+        kansoku_datetime (str): 観測日時（YYYY-MM-DD HH:MM）
+        update_datetime (str): 更新日時（YYYY-MM-DD HH:MM）
+    """
+
+    __slots__ = ()
+
+    def to_insert_list(self):
+        # 従来の file_util.getInsertDataListForDailyTable と同じ形式のリストに変換する
+        # （観測時は文字列、観測日時と更新日時はSQL文字列用に引用符で囲む）
+        values = list(self)
+        values[1] = str(self.kansoku_time_int)
+        values[-2] = "'" + self.kansoku_datetime + "'"
+        values[-1] = "'" + self.update_datetime + "'"
+        return values
+
+def get_aggregate_block(df):
+
+    """
+    get_aggregate_block 関数
+
+    概要:
+        CSVファイルを読み込んだ DataFrame から、集計に使用する列（AGGREGATE_COLUMNS）を
+        float64 の2次元配列として取り出す関数。
+
+    引数:
+        df: pandas.DataFrame または numpy.ndarray - CSVファイルを読み込んだ DataFrame
+            （必要な列だけを読み込んだ DataFrame、または csvparse_ops.LoggerArrays.values でもよい）
+
+    戻り値:
+        numpy.ndarray - 行数 × len(AGGREGATE_COLUMNS) の配列
+
+    例外処理:
+        なし
+    """
+
+    if isinstance(df,np.ndarray):
+        return df[:,AGGREGATE_COLUMNS].astype(np.float64,copy=False)
+
+    # 全ての列がある場合は、全ての列を一度に配列に変換してから列を選ぶ方が、列を選んでから変換するより速い
+    if df.shape[1] > max(AGGREGATE_COLUMNS):
+        return df.to_numpy(dtype=np.float64)[:,AGGREGATE_COLUMNS]
+    return df[AGGREGATE_COLUMNS].to_numpy(dtype=np.float64)
+
+def _sum_columns(columns,start,end):
+    # 列ごと（columns は列 × 行の配列）に start〜end-1 行目の合計を求める。
+    # 各列を連続したメモリ上で合計すると、pandas の Series.mean と同じペアワイズ加算の順序になる
+    # （行 × 列の配列を axis=0 で合計すると先頭の行から順に加算するため、丸めた平均値が1桁ずれることがある）
+    return columns[:,start:end].sum(axis=1)
+
+def _to_int(value):
+    # 整数に変換する（欠損値の場合は None）
+    return int(value) if np.isfinite(value) else None
+
+def aggregate_hours(frames):
+
+    """
+    aggregate_hours 関数
+
+    概要:
+        複数の時間（ファイル）分の DataFrame を、時間別テーブルの行にまとめて集計する関数。
+        全ファイルの平均値を求める列を1つの2次元配列にまとめ、NumPy で一度に集計する。
+
+    処理内容:
+        1. 全ファイルの集計に使用する列を1つの2次元配列に連結する。
+        2. ファイルの区切り位置ごとに件数（欠損値を除く）を np.add.reduceat で一度に求め、
+           合計を列ごとに連続した配列（_sum_columns）で求めて、平均値を計算する。
+        3. 累積売電量の最初と最後の行から1時間あたりの売電量を求める。
+        4. ファイルごとに HourlyRecord を作成する。
+
+    引数:
+        frames: list - (DataFrame または numpy.ndarray, 観測日時の文字列 YYYY-MM-DD HH:MM) のタプルのリスト
+
+    戻り値:
+        list - HourlyRecord のリスト（行の無い DataFrame は除く）
+
+    例外処理:
+        なし（呼び出し元でエラーログを出力する）
+    """
+
+    frames = [(df,date) for df,date in frames if len(df) > 0]
+    if len(frames) == 0:
+        return []
+
+    # 全ファイルを1つの配列に連結し、ファイルの区切り位置を求める
+    block = np.concatenate([get_aggregate_block(df) for df,date in frames])
+    lengths = np.array([len(df) for df,date in frames])
+    starts = np.concatenate(([0],np.cumsum(lengths)[:-1]))
+    ends = starts + lengths - 1
+
+    # 平均値を求める列をファイルごとに一度に集計する（欠損値は平均から除く）
+    mean_block = block[:,2:-1]
+    valid = ~np.isnan(mean_block)
+    columns = np.ascontiguousarray(np.where(valid,mean_block,0.0).T)
+    sums = np.stack([_sum_columns(columns,start,start + length) for start,length in zip(starts,lengths)])
+    counts = np.add.reduceat(valid,starts,axis=0)
+    with np.errstate(invalid="ignore",divide="ignore"):
+        means = sums / counts / HOURLY_MEAN_DIVISORS
+
+    # 観測日・観測時・累積売電量は各ファイルの最初と最後の行から取得する
+    dates = block[starts,0]
+    times = block[starts,1]
+    baiden_first = block[starts,-1]
+    baiden_last = block[ends,-1]
+
+    update_datetime = str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))
+    records = []
+    for i,(df,date) in enumerate(frames):
+        records.append(HourlyRecord(
+            int(dates[i]),
+            int(times[i]) // 100,
+            *np.round(means[i],HOURLY_ROUND_DIGITS).tolist(),
+            _to_int(baiden_last[i] - baiden_first[i]),
+            _to_int(baiden_last[i]),
+            date,
+            update_datetime,
+        ))
+
+    return records
+
+def aggregate_hour(df,date):
+
+    """
+    aggregate_hour 関数
+
+    概要:
+        1時間（1ファイル）分の DataFrame を、時間別テーブルの1行に集計する関数。
+
+    引数:
+        df: pandas.DataFrame - CSVファイルを読み込んだ DataFrame
+        date: str - 観測日時の文字列 (YYYY-MM-DD HH:MM)
+
+    戻り値:
+        HourlyRecord - 時間別テーブルの1行分の集計結果
+
+    例外処理:
+        DataFrame に行が無い場合は ValueError を送出する。
+    """
+
+    records = aggregate_hours([(df,date)])
+    if len(records) == 0:
+        raise ValueError("no rows to aggregate")
+    return records[0]
+
+def get_hour_datetime(kansoku_date_int,kansoku_time_int):
+    # 観測日（YYYYMMdd）と観測時（hh）から観測日時の文字列（YYYY-MM-DD HH:MM）を作成する
+    return f"{kansoku_date_int // 10000:04d}-{kansoku_date_int // 100 % 100:02d}-{kansoku_date_int % 100:02d} {kansoku_time_int:02d}:00"
+
+class HourlyAccumulator:
+
+    """
+    HourlyAccumulator クラス
+
+    概要:
+        1時間分の集計の途中経過。行を追加するたびに列ごとの件数・合計・最小値・最大値と、
+        最初と最後の行の累積売電量だけを更新するため、状態の大きさは行数によらず一定。
+
+    属性:
+        kansoku_date_int (int): 観測日（YYYYMMdd）
+        kansoku_time_int (int): 観測時（hh）
+        rows (int): 追加した行数
+        counts (numpy.ndarray): 平均値を求める列ごとの件数（欠損値を除く）
+        sums (numpy.ndarray): 平均値を求める列ごとの合計
+        mins (numpy.ndarray): 平均値を求める列ごとの最小値（値が無い列は NaN）
+        maxs (numpy.ndarray): 平均値を求める列ごとの最大値（値が無い列は NaN）
+        first_time (float): 最初の行の観測時刻（hhmm）
+        baiden_first (float): 最初の行の累積売電量
+        last_time (float): 最後の行の観測時刻（hhmm）
+        baiden_last (float): 最後の行の累積売電量
+    """
+
+    __slots__ = ("kansoku_date_int","kansoku_time_int","rows","counts","sums","mins","maxs",
+                 "first_time","baiden_first","last_time","baiden_last")
+
+    def __init__(self,kansoku_date_int,kansoku_time_int):
+        column_count = len(HOURLY_MEAN_COLUMNS)
+        self.kansoku_date_int = kansoku_date_int
+        self.kansoku_time_int = kansoku_time_int
+        self.rows = 0
+        self.counts = np.zeros(column_count,dtype=np.int64)
+        self.sums = np.zeros(column_count,dtype=np.float64)
+        self.mins = np.full(column_count,np.nan)
+        self.maxs = np.full(column_count,np.nan)
+        self.first_time = None
+        self.baiden_first = np.nan
+        self.last_time = None
+        self.baiden_last = np.nan
+
+    def add_block(self,block):
+
+        """
+        add_block メソッド
+
+        概要:
+            この時間の行を追加し、途中経過を更新する。処理時間は追加した行数に比例する。
+
+        引数:
+            block (numpy.ndarray): 行数 × len(AGGREGATE_COLUMNS) の配列（get_aggregate_block で取り出したもの）
+
+        戻り値:
+            なし
+        """
+
+        if len(block) == 0:
+            return
+
+        # 平均値を求める列の件数・合計・最小値・最大値を更新する（欠損値は除く。np.fmin / np.fmax は NaN を無視する）
+        mean_block = block[:,2:-1]
+        valid = ~np.isnan(mean_block)
+        self.rows += len(block)
+        self.counts += valid.sum(axis=0)
+        self.sums += _sum_columns(np.ascontiguousarray(np.where(valid,mean_block,0.0).T),0,len(block))
+        np.fmin(self.mins,np.fmin.reduce(mean_block,axis=0),out=self.mins)
+        np.fmax(self.maxs,np.fmax.reduce(mean_block,axis=0),out=self.maxs)
+
+        # 最初と最後の行は観測時刻で判定する（同じ時刻の場合は後から追加した行を最後とする）
+        times = block[:,1]
+        first = int(np.argmin(times))
+        last = len(times) - 1 - int(np.argmax(times[::-1]))
+        if self.first_time is None or times[first] < self.first_time:
+            self.first_time = times[first]
+            self.baiden_first = block[first,-1]
+        if self.last_time is None or times[last] >= self.last_time:
+            self.last_time = times[last]
+            self.baiden_last = block[last,-1]
+
+    def get_means(self):
+        # 列ごとの平均値を求める（発電量は kW 単位。値が無い列は NaN）
+        with np.errstate(invalid="ignore",divide="ignore"):
+            return self.sums / self.counts / HOURLY_MEAN_DIVISORS
+
+    def get_mins(self):
+        # 列ごとの最小値を求める（平均値と同じく発電量は kW 単位。値が無い列は NaN）
+        return self.mins / HOURLY_MEAN_DIVISORS
+
+    def get_maxs(self):
+        # 列ごとの最大値を求める（平均値と同じく発電量は kW 単位。値が無い列は NaN）
+        return self.maxs / HOURLY_MEAN_DIVISORS
+
+    def get_record(self,date=None,update_datetime=None):
+
+        """
+        get_record メソッド
+
+        概要:
+            ここまでに追加した行から、時間別テーブルの1行分の集計結果を作成する。
+            処理時間は行数によらず一定。
+
+        引数:
+            date (str): 観測日時の文字列 (YYYY-MM-DD HH:MM)。None の場合は観測日と観測時から作成する
+            update_datetime (str): 更新日時の文字列。None の場合は現在日時
+
+        戻り値:
+            HourlyRecord - 時間別テーブルの1行分の集計結果
+        """
+
+        if date is None:
+            date = get_hour_datetime(self.kansoku_date_int,self.kansoku_time_int)
+        if update_datetime is None:
+            update_datetime = str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))
+        return HourlyRecord(
+            self.kansoku_date_int,
+            self.kansoku_time_int,
+            *np.round(self.get_means(),HOURLY_ROUND_DIGITS).tolist(),
+            _to_int(self.baiden_last - self.baiden_first),
+            _to_int(self.baiden_last),
+            date,
+            update_datetime,
+        )
+
+    def copy(self):
+        # 途中経過の複製を作成する（DBへの登録に失敗した場合に元の状態に戻せるようにする）
+        accumulator = HourlyAccumulator.__new__(HourlyAccumulator)
+        for name in HourlyAccumulator.__slots__:
+            value = getattr(self,name)
+            setattr(accumulator,name,value.copy() if isinstance(value,np.ndarray) else value)
+        return accumulator
+
+class HourlyStreamAggregator:
+
+    """
+    HourlyStreamAggregator クラス
+
+    概要:
+        5分ごとの行を1行ずつ、または複数行ずつ受け取り、時間ごとの集計の途中経過（HourlyAccumulator）を更新する。
+        時間の全ての行を保持せずに、いつでも時間別テーブルの行を作成できるため、
+        書き込み中のファイルの追記分や複数日分のファイルも、追加した行数に比例する時間で集計できる。
+
+    属性:
+        hours (dict): (観測日, 観測時) をキーとした HourlyAccumulator の辞書
+        changed (set): 前回 pop_changed_records を呼び出してから行を追加した (観測日, 観測時) の集合
+
+    使用方法:
+        aggregator = HourlyStreamAggregator()
+        aggregator.add_rows(csv_df)
+        records = aggregator.pop_changed_records()
+    """
+
+    def __init__(self):
+        self.hours = {}
+        self.changed = set()
+
+    def add_rows(self,rows):
+
+        """
+        add_rows メソッド
+
+        概要:
+            CSVファイルの行を追加する。行の観測日と観測時刻から時間を判定するため、
+            複数の時間や日にまたがる行をまとめて渡してもよい。
+
+        引数:
+            rows (pandas.DataFrame または numpy.ndarray): CSVファイルを読み込んだ DataFrame、または行の配列
+
+        戻り値:
+            int - 追加した行数（観測日・観測時刻が欠損している行は除く）
+        """
+
+        block = get_aggregate_block(rows)
+        if len(block) == 0:
+            return 0
+
+        # 観測日・観測時刻が欠損している行は時間を判定できないため除く
+        keys = block[:,0] * 100 + block[:,1] // 100
+        finite = np.isfinite(keys)
+        if not finite.all():
+            block = block[finite]
+            keys = keys[finite]
+
+        # 1時間分のファイルでは全ての行が同じ時間になるため、分割せずに追加する
+        if len(keys) > 0 and (keys == keys[0]).all():
+            self.get_accumulator(int(keys[0]) // 100,int(keys[0]) % 100).add_block(block)
+        else:
+            for key in np.unique(keys):
+                self.get_accumulator(int(key) // 100,int(key) % 100).add_block(block[keys == key])
+
+        return len(block)
+
+    def add_row(self,row):
+        # CSVファイルの1行（31列）を追加する
+        return self.add_rows(np.asarray(row,dtype=np.float64).reshape(1,-1))
+
+    def get_accumulator(self,kansoku_date_int,kansoku_time_int):
+        # 時間の途中経過を取得する（無い場合は作成する）し、行を追加した時間として記録する
+        key = (kansoku_date_int,kansoku_time_int)
+        if key not in self.hours:
+            self.hours[key] = HourlyAccumulator(kansoku_date_int,kansoku_time_int)
+        self.changed.add(key)
+        return self.hours[key]
+
+    def get_records(self,keys=None):
+        # 指定した時間（None の場合は全ての時間）の集計結果を時間順に取得する
+        update_datetime = str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))
+        if keys is None:
+            keys = self.hours.keys()
+        return [self.hours[key].get_record(update_datetime=update_datetime) for key in sorted(keys) if key in self.hours]
+
+    def pop_changed_records(self):
+        # 前回呼び出してから行を追加した時間の集計結果を取得し、記録を消去する
+        records = self.get_records(self.changed)
+        self.changed = set()
+        return records
+
+    def discard(self,kansoku_date_int,kansoku_time_int):
+        # 集計の終わった時間の途中経過を破棄する（長時間の取り込みでメモリを増やさないようにする）
+        self.hours.pop((kansoku_date_int,kansoku_time_int),None)
+        self.changed.discard((kansoku_date_int,kansoku_time_int))
+
+    def copy(self):
+        # 途中経過の複製を作成する
+        aggregator = HourlyStreamAggregator()
+        aggregator.hours = {key: accumulator.copy() for key,accumulator in self.hours.items()}
+        aggregator.changed = set(self.changed)
+        return aggregator
@@ -0,0 +1,506 @@
+# -----------------------------------------------------------------------------
+# 会社名: 湘南技術センター株式会社
+# 名前: 塩見 和則
+# 作成日: 2026/10/18
+# -----------------------------------------------------------------------------
+
+# 標準ライブラリ
+import time
+import ftplib
+import threading
+import concurrent.futures
+import datetime as dt
+
+# 外部ライブラリ
+import mysql_ops as mysql
+import csvfile_ops as csv
+import file_util
+import pipeline_ops
+import csvparse_ops
+import dirty_ops
+
+# 並列処理の設定
+# CSVファイルの読み込みと行ごとのハッシュ値の計算は pandas の処理で GIL を保持したままになるため、
+# BACKFILL_PARSE_WORKERS が2以上の場合は子プロセスで並列に処理する（1の場合は読み込みステージのスレッドで処理する）
+BACKFILL_FTP_CONNECTIONS = 3
+BACKFILL_PARSE_WORKERS = 2
+
+# COMMITする間隔（ファイル数。おおむね1日分）
+# 途中で失敗した場合もCOMMIT済みのファイルは取り込み済みとして記録されるため、再実行するとその続きから取り込む
+BACKFILL_COMMIT_FILES = 24
+
+def getBackfillHourList(start_hour,end_hour):
+
+    """
+    getBackfillHourList 関数
+
+    概要:
+        開始日時から終了日時までの1時間ごとの日時リストを作成する関数。
+
+    引数:
+        start_hour: datetime.datetime - 開始日時（この時間を含む）
+        end_hour: datetime.datetime - 終了日時（この時間を含む）
+
+    戻り値:
+        hour_list: list - 時単位に切り捨てた日時のリスト
+
+    例外処理:
+        なし
+    """
+
+    # 時単位に切り捨てる
+    current_hour = start_hour.replace(minute=0,second=0,microsecond=0)
+    end_hour = end_hour.replace(minute=0,second=0,microsecond=0)
+
+    hour_list = []
+    while current_hour <= end_hour:
+        hour_list.append(current_hour)
+        current_hour += dt.timedelta(hours=1)
+
+    return hour_list
+
+def parse_csv_file(csv_file):
+
+    """
+    parse_csv_file 関数
+
+    概要:
+        CSVファイルを列定義の型で読み込む関数（csvparse_ops.read_logger_csv）。
+        バックフィルの読み込みステージから呼び出される。
+
+    引数:
+        csv_file: bytes、str または file-like - CSVファイルの内容、CSVファイルのパス、またはファイルオブジェクト
+
+    戻り値:
+        csv_df: pandas.DataFrame - CSVファイルを読み込んだ DataFrame
+
+    例外処理:
+        なし（呼び出し元でエラーログを出力する）
+    """
+
+    # CSVファイルを列定義の型で読み込む
+    csv_df = csvparse_ops.read_logger_csv(csv_file)
+
+    return csv_df
+
+def parse_csv_data(csv_data):
+    # CSVファイルの内容を読み込み、行ごとのハッシュ値を求める（読み込みステージの子プロセスで実行する）
+    csv_df = parse_csv_file(csv_data)
+    return csv_df,csv.get_row_hashes(csv_df)
+
+def create_parse_executor(parse_workers):
+
+    """
+    create_parse_executor 関数
+
+    概要:
+        読み込みステージで使用する子プロセスのプールを作成する関数。
+        fork で子プロセスを作成する場合に、他のスレッドが保持しているロックを子プロセスに引き継がないように、
+        パイプラインのスレッドを起動する前に全ての子プロセスを起動しておく。
+
+    引数:
+        parse_workers: int - 子プロセスの数
+
+    戻り値:
+        concurrent.futures.ProcessPoolExecutor - 子プロセスのプール（parse_workers が1以下の場合は None）
+
+    例外処理:
+        なし
+    """
+
+    if parse_workers <= 1:
+        return None
+    parse_executor = concurrent.futures.ProcessPoolExecutor(max_workers=parse_workers)
+    parse_executor.submit(int).result()
+    return parse_executor
+
+class BackfillJob:
+
+    """
+    BackfillJob クラス
+
+    概要:
+        バックフィルのパイプラインの各ステージ（ダウンロード → 読み込み・集計 → DB登録）の処理と、
+        ステージ間で共有する状態（FTPセッションプール、取り込み済みファイルの情報、DBセッション、集計結果）を保持する。
+        DB登録ステージは commit_files 件ごとに集計し直してCOMMITし、COMMITしたファイルを取り込み済みとして記録する。
+
+    属性:
+        ftp_pool (csvfile_ops.FtpSessionPool): ダウンロードに使用するFTPセッションプール
+        manifest (csvfile_ops.FtpManifest): 変更の無いファイル・行の判定に使用する取り込み済みファイルの情報（None の場合はスキップしない）
+        saved_manifest (csvfile_ops.FtpManifest): COMMIT後に取り込んだファイルを記録する取り込み済みファイルの情報
+        save_directory (str): 調査用にCSVファイルを保存する場合の保存先ディレクトリ（None の場合は保存しない）
+        session (mysql_ops.DbSession): DB登録に使用するセッション
+        summary (dict): 処理件数の集計結果
+        commit_files (int): COMMITする間隔（ファイル数）
+        pipeline (pipeline_ops.Pipeline): DB登録に失敗した場合に中止するパイプライン
+        parse_executor (concurrent.futures.ProcessPoolExecutor): 読み込みに使用する子プロセスのプール（None の場合はスレッドで読み込む）
+        dirty (dirty_ops.DirtySet): 前回のCOMMIT以降に元データテーブルに登録した行の時間（集計し直す時間・日・月）
+        write_error (Exception): DB登録ステージで発生した例外（発生しなかった場合は None）
+        manifest_updates (list): 次のCOMMIT後に取り込み済みファイルの情報に記録する内容
+        pending_files (int): 前回のCOMMIT以降にDB登録ステージで処理したファイル数
+    """
+
+    def __init__(self,ftp_pool,manifest,saved_manifest,save_directory,session,summary,commit_files=BACKFILL_COMMIT_FILES,pipeline=None,parse_executor=None):
+        self.ftp_pool = ftp_pool
+        self.manifest = manifest
+        self.saved_manifest = saved_manifest
+        self.save_directory = save_directory
+        self.session = session
+        self.summary = summary
+        self.commit_files = max(1,commit_files)
+        self.pipeline = pipeline
+        self.parse_executor = parse_executor
+        self.dirty = dirty_ops.DirtySet()
+        self.write_error = None
+        self.manifest_updates = []
+        self.pending_files = 0
+        self.lock = threading.Lock()
+
+    def download(self,target):
+
+        """
+        download メソッド（ダウンロードステージ）
+
+        概要:
+            FTPセッションプールから借りたセッション（接続を使い回す）で、CSVファイルを1件メモリ上に取得する。
+
+        引数:
+            target (dict): ダウンロード対象の情報
+
+        戻り値:
+            dict - 取得したファイルの内容を追加した target（失敗した場合、内容が前回と同じ場合は None）
+        """
+
+        # CSVファイルをメモリ上に取得する
+        with self.ftp_pool.session() as ftp_session:
+            target["csv_data"] = csv.fetch_csv_file(target["directory"],target["filename"],ftp_session)
+        if target["csv_data"] is None:
+            return None
+
+        # 内容が前回取り込んだときと同じ場合は登録しない（更新日時だけ記録し直す）
+        target["content_hash"] = csv.get_content_hash(target["csv_data"])
+        if self.manifest is not None and self.manifest.is_same_content(target["directory"],target["filename"],target["content_hash"]):
+            self.record(target,self.manifest.get(target["directory"],target["filename"]).get("rows",{}))
+            with self.lock:
+                self.summary["unchanged"] += 1
+            return None
+
+        # 調査用に指定された場合のみCSVファイルをローカルに保存する
+        if self.save_directory is not None:
+            csv.save_csv_data(target["csv_data"],self.save_directory,target["filename"])
+
+        with self.lock:
+            self.summary["downloaded"] += 1
+        return target
+
+    def parse(self,target):
+
+        """
+        parse メソッド（読み込み・集計ステージ）
+
+        概要:
+            メモリ上に取得したCSVファイルの内容を読み込む（子プロセスのプールがある場合は子プロセスで読み込む）。
+            前回取り込んだファイルの場合は、内容が変わった行だけを元データテーブルの登録対象にする。
+
+        引数:
+            target (dict): 取得済みの対象の情報
+
+        戻り値:
+            dict - 読み込んだ DataFrame（csv_df: 登録対象の行）を追加した target
+        """
+
+        # CSVファイルを読み込み、行ごとのハッシュ値を求める
+        if self.parse_executor is not None:
+            target["csv_df"],target["row_hashes"] = self.parse_executor.submit(parse_csv_data,target["csv_data"]).result()
+        else:
+            target["csv_df"],target["row_hashes"] = parse_csv_data(target["csv_data"])
+
+        # 読み込み後はファイルの内容は不要になるため解放する
+        target["csv_data"] = None
+
+        # 前回取り込んだときから変わった行だけを元データテーブルに登録する
+        row_count = len(target["csv_df"])
+        if self.manifest is not None:
+            target["csv_df"] = self.manifest.get_changed_rows(target["directory"],target["filename"],target["csv_df"],target["row_hashes"])
+
+        with self.lock:
+            self.summary["parsed"] += 1
+            self.summary["rows_skipped"] += row_count - len(target["csv_df"])
+        return target
+
+    def write(self,target):
+
+        """
+        write メソッド（DB登録ステージ）
+
+        概要:
+            元データテーブルにファイル1件分を一括でUPDATE-INSERTし、登録した行の時間を記録する。
+            commit_files 件ごとに、登録した行の時間別・日別・月別テーブルを集計し直してCOMMITする（commit）。
+            変更のあった行が無い場合は登録せず、取り込み済みファイルの情報だけを記録する。
+
+        引数:
+            target (dict): 読み込み済みの対象の情報
+
+        戻り値:
+            dict - target
+
+        例外処理:
+            DB登録でエラーが発生した場合は例外を記録し、パイプラインを中止する（以降のファイルはダウンロード・読み込みもしない）。
+            前回のCOMMIT以降の登録は呼び出し元でロールバックする。
+        """
+
+        # 先に登録に失敗している場合は登録しない
+        if self.write_error is not None:
+            return None
+
+        try:
+            if len(target["csv_df"]) == 0:
+                # 変更のあった行が無い場合は登録しない
+                with self.lock:
+                    self.summary["unchanged"] += 1
+            else:
+                inserted_count,updated_count = mysql.db_UpdateInsertOriginTableBatch(target["csv_df"],target["oha_yymmddhh"],self.session)
+                self.summary["origin_rows"] += inserted_count + updated_count
+                self.dirty.mark_rows(target["csv_df"])
+            self.record(target,target["row_hashes"])
+
+            # commit_files 件ごとにCOMMITする
+            self.pending_files += 1
+            if self.pending_files >= self.commit_files:
+                self.commit()
+
+        except Exception as e:
+            # 以降のファイルはダウンロード・読み込みもしない
+            self.write_error = e
+            if self.pipeline is not None:
+                self.pipeline.cancel()
+            raise
+
+        # DataFrame は登録後に不要になるため解放する
+        target["csv_df"] = None
+        return target
+
+    def commit(self):
+
+        """
+        commit メソッド
+
+        概要:
+            前回のCOMMIT以降に登録した行の時間・日・月だけを、それぞれ1回ずつ集計し直してCOMMITし（dirty_ops.recompute_dirty）、
+            COMMITしたファイルを取り込み済みとして記録する。
+
+        戻り値:
+            なし
+
+        例外処理:
+            集計・COMMITに失敗した場合は例外を送出する（取り込み済みとしては記録しない）。
+        """
+
+        # 登録した行の時間・日・月だけを、それぞれ1回ずつ集計し直してCOMMITする
+        recompute = dirty_ops.recompute_dirty(self.dirty,self.session)
+        self.session.commit()
+
+        with self.lock:
+            manifest_updates,self.manifest_updates = self.manifest_updates,[]
+            self.summary["hourly_rows"] += recompute["hours"]
+            self.summary["days"] += recompute["days"]
+            self.summary["months"] += recompute["months"]
+            for name,row_count in recompute["rollup"].items():
+                self.summary["rollup"][name] = self.summary["rollup"].get(name,0) + row_count
+            self.summary["commits"] += 1
+            self.summary["committed_files"] += self.pending_files
+        self.dirty = dirty_ops.DirtySet()
+        self.pending_files = 0
+
+        # COMMITしたファイルの情報を保存する（再実行時はこれらのファイルをスキップする）
+        for manifest_update in manifest_updates:
+            self.saved_manifest.update(*manifest_update)
+        self.saved_manifest.save()
+
+    def record(self,target,row_hashes):
+        # COMMIT後に取り込み済みファイルの情報に記録する内容を追加する
+        with self.lock:
+            self.manifest_updates.append((target["directory"],target["filename"],target["size"],target["modify"],target["content_hash"],row_hashes))
+
+def filter_available_targets(ftp_pool,targets,summary,manifest=None):
+
+    """
+    filter_available_targets 関数
+
+    概要:
+        FTPサーバー上に存在し、前回取り込んだときから変更のあったファイルだけを残す関数。
+        ディレクトリ一覧はディレクトリ（年）ごとに1回だけ取得し、FTPセッションプール内でキャッシュする。
+        変更が無ければ、期間内の再取り込みはディレクトリ一覧の取得だけで終わる。
+
+    引数:
+        ftp_pool: csvfile_ops.FtpSessionPool - FTPセッションプール
+        targets: list - ダウンロード対象のリスト
+        summary: dict - 処理件数の集計結果（存在しなかったファイル数を missing、変更の無かったファイル数を unchanged に設定する）
+        manifest: csvfile_ops.FtpManifest - 取り込み済みファイルの情報（None の場合は変更の無いファイルもスキップしない）
+
+    戻り値:
+        list - ダウンロード対象のリスト（サーバー上のサイズと更新日時を size, modify に設定する）
+
+    例外処理:
+        ディレクトリ一覧の取得に失敗した場合は、エラーログを出力し、そのディレクトリの対象を全て残す
+        （存在しないファイルはダウンロードステージでスキップされる）。
+    """
+
+    # ディレクトリごとのファイル名の一覧（取得に失敗した場合は None）
+    listings = {}
+    with ftp_pool.session() as ftp_session:
+        for directory in sorted(set(target["directory"] for target in targets)):
+            try:
+                listings[directory] = ftp_session.list_directory(directory)
+            except ftplib.all_errors as e:
+                error_message = f"{str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))} FTP error: list {directory} {str(e)}"
+                file_util.write_log(error_message,"error")
+                listings[directory] = None
+
+    available_targets = []
+    missing_files = []
+    for target in targets:
+        entries = listings[target["directory"]]
+        facts = entries.get(target["filename"]) if entries is not None else {}
+        if facts is None:
+            missing_files.append(target["filename"])
+            continue
+
+        # サイズと更新日時が前回取り込んだときと同じファイルはダウンロードしない
+        target["size"] = facts.get("size")
+        target["modify"] = facts.get("modify")
+        if manifest is not None and manifest.is_unchanged(target["directory"],target["filename"],target["size"],target["modify"]):
+            summary["unchanged"] += 1
+            continue
+        available_targets.append(target)
+
+    # 存在しなかったファイルをログに出力する
+    summary["missing"] = len(missing_files)
+    if len(missing_files) > 0:
+        message = f"{str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))} Not found on FTP server: {missing_files}"
+        file_util.write_log(message)
+
+    return available_targets
+
+def backfill(start_hour,end_hour,ftp_directory,ftp_connections=BACKFILL_FTP_CONNECTIONS,parse_workers=BACKFILL_PARSE_WORKERS,report_interval=pipeline_ops.PIPELINE_REPORT_INTERVAL,save_directory=None,force=False,commit_files=BACKFILL_COMMIT_FILES):
+
+    """
+    backfill 関数
+
+    概要:
+        指定された期間のCSVファイルをまとめてダウンロードし、DBに登録する関数。
+        FTPサーバーやDBの障害で取り込めなかった時間帯を再取り込みするために使用する。
+
+    処理内容:
+        1. FTPサーバーのディレクトリ一覧（年ごとに1回）で、存在しないファイルと、
+           前回取り込んだときからサイズ・更新日時の変わっていないファイルを対象から除く。
+        2. 期間内の1時間ごとのファイルを、以下のパイプラインで並行に処理する:
+            - ダウンロード: 少数のFTPセッションを使い回して並列にメモリ上に取得する。
+            - 読み込み・集計: メモリ上のCSVファイルを子プロセスで並列に読み込み、前回から内容の変わった行を求める。
+            - DB登録: 元データテーブルにファイルごとに、内容の変わった行だけを一括でUPDATE-INSERTする。
+           N時間目をDBに登録している間に、N+1時間目のダウンロードと読み込みを行う。
+        3. 登録した行の時間（遅れて届いたファイルや修正されたファイルでは、変わった行の時間だけ）を記録し、
+           commit_files 件ごとに、その時間の時間別・統計テーブル、その時間を含む日の日別テーブル、
+           その日を含む月の月別テーブルをそれぞれ1回だけ集計し直して（dirty_ops.recompute_dirty）COMMITする。
+        4. COMMITに成功したファイルの情報を保存する（途中で失敗した場合も、再実行するとCOMMIT済みのファイルはスキップする）。
+
+    引数:
+        start_hour: datetime.datetime - 開始日時（この時間を含む）
+        end_hour: datetime.datetime - 終了日時（この時間を含む）
+        ftp_directory: str - FTPサーバー上のCSVファイルの保存先ディレクトリ
+        ftp_connections: int - FTPサーバーへの同時接続数（ダウンロードステージのワーカー数）
+        parse_workers: int - 読み込み・集計ステージのワーカー数（2以上の場合は子プロセスの数）
+        report_interval: int - パイプラインの統計情報をログに出力する間隔（秒、0の場合は終了時のみ）
+        save_directory: str - 調査用にCSVファイルを保存する場合の保存先ディレクトリ（None の場合は保存しない）
+        force: bool - 前回取り込んだときから変更の無いファイル・行も登録し直すかどうか
+        commit_files: int - COMMITする間隔（ファイル数）
+
+    戻り値:
+        summary: dict - 処理件数、COMMITした回数・ファイル数、全てCOMMITしたかどうか、処理時間、パイプラインの統計情報
+
+    例外処理:
+        ファイルのダウンロードや読み込みに失敗した場合は、エラーログを出力してそのファイルをスキップする。
+        DBへの登録処理が失敗した場合は、エラーログを出力し、パイプラインを中止して前回のCOMMIT以降の登録をロールバックする。
+    """
+
+    start_time = time.perf_counter()
+    summary = {
+        "hours": 0,
+        "missing": 0,
+        "unchanged": 0,
+        "downloaded": 0,
+        "parsed": 0,
+        "rows_skipped": 0,
+        "origin_rows": 0,
+        "hourly_rows": 0,
+        "days": 0,
+        "months": 0,
+        "rollup": {},
+        "commits": 0,
+        "committed_files": 0,
+        "committed": False,
+    }
+
+    # 期間内の1時間ごとのダウンロード対象を作成
+    targets = []
+    for hour in getBackfillHourList(start_hour,end_hour):
+        oha_date,oha_yymmddhh,oha_yyyymmdd,oha_yyyymm,oha_year,oha_month = file_util.getHourDate(hour)
+        targets.append({
+            "oha_date": oha_date,
+            "oha_yymmddhh": oha_yymmddhh,
+            "oha_yyyymmdd": oha_yyyymmdd,
+            "oha_yyyymm": oha_yyyymm,
+            "directory": f"{ftp_directory}/{oha_year}",
+            "filename": f"{oha_yymmddhh}.CSV",
+        })
+    summary["hours"] = len(targets)
+
+    pipeline = pipeline_ops.Pipeline(report_interval=report_interval)
+    parse_executor = create_parse_executor(parse_workers)
+    ftp_pool = csv.FtpSessionPool(ftp_connections)
+    manifest = csv.FtpManifest()
+    session = None
+    try:
+        # FTPサーバー上に存在し、前回から変更のあったファイルだけを対象にする
+        targets = filter_available_targets(ftp_pool,targets,summary,None if force else manifest)
+
+        # 1つのセッションで全テーブルを登録し、commit_files 件ごとにCOMMITする
+        session = mysql.DbSession()
+        job = BackfillJob(ftp_pool,None if force else manifest,manifest,save_directory,session,summary,commit_files,pipeline,parse_executor)
+
+        # ダウンロード → 読み込み・集計 → DB登録 のパイプラインを実行する
+        pipeline.add_stage("download",job.download,ftp_connections)
+        pipeline.add_stage("parse",job.parse,parse_workers)
+        pipeline.add_stage("write",job.write,1)
+        pipeline.run(targets)
+
+        # DB登録ステージで失敗した場合は、前回のCOMMIT以降の登録をロールバックする
+        if job.write_error is not None:
+            raise job.write_error
+
+        # 最後のCOMMIT以降に登録したファイルをCOMMITする
+        job.commit()
+        summary["committed"] = True
+
+    except Exception as e:
+        # 前回のCOMMIT以降の登録をロールバックし、エラーログを出力する
+        if session is not None:
+            session.rollback()
+        error_message = f"{str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))} Failed to backfill, committed {summary['committed_files']} files, rolled back the rest: {str(e)}"
+        file_util.write_log(error_message,"error")
+
+    finally:
+        # DB・FTPセッションの接続を全て閉じ、子プロセスを終了する
+        if session is not None:
+            session.close()
+        ftp_pool.close()
+        if parse_executor is not None:
+            parse_executor.shutdown()
+
+    # ログを出力する
+    summary["elapsed_sec"] = round(time.perf_counter() - start_time,3)
+    summary["pipeline"] = pipeline.get_stats()
+    message = f"{str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))} Backfill {start_hour.strftime('%Y%m%d%H')}-{end_hour.strftime('%Y%m%d%H')} : {summary}"
+    file_util.write_log(message)
+
+    return summary
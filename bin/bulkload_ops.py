@@ -0,0 +1,306 @@
+# -----------------------------------------------------------------------------
+# 会社名: 湘南技術センター株式会社
+# 名前: 塩見 和則
+# 作成日: 2026/10/18
+# -----------------------------------------------------------------------------
+
+# 標準ライブラリ
+import os
+import re
+import time
+import tempfile
+import datetime as dt
+
+# 外部ライブラリ
+import numpy as np
+import pandas as pd
+import mysql_ops as mysql
+import file_util
+import csvparse_ops
+
+# ステージングテーブルに1回で読み込むファイル数（メモリ上に保持する行数の上限の目安）
+BULKLOAD_CHUNK_FILES = 500
+
+# LOAD DATA LOCAL INFILE を使用できない場合に、1回の REPLACE で登録する行数
+BULKLOAD_BATCH_ROWS = 5000
+
+# 取り込み対象のCSVファイル名（YYMMddhh.CSV）
+BULKLOAD_FILE_PATTERN = re.compile(r"^(\d{8})\.csv$",re.IGNORECASE)
+
+def get_bulkload_files(directory,start_hour=None,end_hour=None):
+
+    """
+    get_bulkload_files 関数
+
+    概要:
+        ディレクトリ（サブディレクトリを含む）から YYMMddhh.CSV 形式のCSVファイルを探し、観測日時の順に並べる関数。
+
+    引数:
+        directory: str - CSVファイルのディレクトリ（FTPサーバーと同じ年ごとのディレクトリでもよい）
+        start_hour: datetime.datetime - 開始日時（この時間を含む。None の場合は制限しない）
+        end_hour: datetime.datetime - 終了日時（この時間を含む。None の場合は制限しない）
+
+    戻り値:
+        file_list: list - (CSVファイルのパス, YYMMddhh形式の観測日時) のリスト（観測日時の順）
+
+    例外処理:
+        なし
+    """
+
+    start_key = start_hour.strftime('%y%m%d%H') if start_hour is not None else None
+    end_key = end_hour.strftime('%y%m%d%H') if end_hour is not None else None
+
+    file_list = []
+    for dirpath,dirnames,filenames in os.walk(directory):
+        for filename in filenames:
+            match = BULKLOAD_FILE_PATTERN.match(filename)
+            if match is None:
+                continue
+            oha_yymmddhh = match.group(1)
+            if start_key is not None and oha_yymmddhh < start_key:
+                continue
+            if end_key is not None and oha_yymmddhh > end_key:
+                continue
+            file_list.append((os.path.join(dirpath,filename),oha_yymmddhh))
+
+    # 同じキーの行は後の時間のファイルで置き換えるため、観測日時の順に並べる
+    file_list.sort(key=lambda item: item[1])
+    return file_list
+
+def get_kansoku_datetimes(oha_yymmddhh,kansoku_time_values):
+
+    """
+    get_kansoku_datetimes 関数
+
+    概要:
+        mysql_ops.get_kansoku_datetime を配列で行う関数。
+        ファイルの観測日時と各行の観測時間の分から、観測日時の文字列の配列を行ごとのループ無しで作成する。
+
+    引数:
+        oha_yymmddhh: str - YYMMddhh形式の観測日時（ファイル名）
+        kansoku_time_values: numpy.ndarray - hhmm形式の観測時間の配列
+
+    戻り値:
+        numpy.ndarray - 観測日時の文字列 (YYYY-MM-DD HH:MM) の配列
+
+    例外処理:
+        なし
+    """
+
+    prefix = f"20{oha_yymmddhh[:2]}-{oha_yymmddhh[2:4]}-{oha_yymmddhh[4:6]} {oha_yymmddhh[6:8]}:"
+    minutes = (kansoku_time_values.astype(np.int64) % 100).astype(str)
+    return np.char.add(prefix,np.char.zfill(minutes,2))
+
+def get_origin_frame(arrays_list,update_datetime):
+
+    """
+    get_origin_frame 関数
+
+    概要:
+        複数のCSVファイルを読み込んだ配列を、元データテーブルの列順（mysql_ops.ORIGIN_COLUMNS）の1つの DataFrame に変換する関数。
+        ファイルごとに DataFrame を作成せず、数値の配列をつなげてから1回で作成する。
+
+    引数:
+        arrays_list: list - (csvparse_ops.LoggerArrays, YYMMddhh形式の観測日時) のリスト
+        update_datetime: str - 更新日時の文字列 (YYYY-MM-DD HH:MM)
+
+    戻り値:
+        origin_df: pandas.DataFrame - 元データテーブルの列順の DataFrame
+
+    例外処理:
+        なし
+    """
+
+    values = np.vstack([arrays.values for arrays,oha_yymmddhh in arrays_list])
+    origin_df = pd.DataFrame(values,columns=mysql.ORIGIN_COLUMNS[:len(csvparse_ops.LOGGER_CSV_SCHEMA)])
+
+    # 現場コードと整数の列は整数にする（現場コードはテーブルでは INT のため、先頭の0は不要）
+    for column in [0] + csvparse_ops.LOGGER_CSV_INT_COLUMNS:
+        origin_df[mysql.ORIGIN_COLUMNS[column]] = values[:,column].astype(np.int64)
+
+    # 観測日時はファイルごとに列単位で作成する
+    origin_df["KANSOKU_DATETIME"] = np.concatenate([get_kansoku_datetimes(oha_yymmddhh,arrays.values[:,2]) for arrays,oha_yymmddhh in arrays_list])
+    origin_df["UPDATE_DATETIME"] = update_datetime
+    return origin_df
+
+def read_origin_chunk(file_chunk,update_datetime,summary):
+
+    """
+    read_origin_chunk 関数
+
+    概要:
+        複数のCSVファイルを NumPy の配列に読み込み、元データテーブルの列順の1つの DataFrame にまとめる関数。
+
+    引数:
+        file_chunk: list - get_bulkload_files で取得した (CSVファイルのパス, 観測日時) のリスト
+        update_datetime: str - 更新日時の文字列 (YYYY-MM-DD HH:MM)
+        summary: dict - 処理件数の集計結果（読み込んだファイル数を files、失敗したファイル数を failed に加算する）
+
+    戻り値:
+        origin_df: pandas.DataFrame - 元データテーブルの列順の DataFrame（読み込めた行が無い場合は None）
+
+    例外処理:
+        CSVファイルの読み込みに失敗した場合（列定義と異なる場合を含む）は、エラーログを出力してそのファイルをスキップする。
+    """
+
+    arrays_list = []
+    for csv_path,oha_yymmddhh in file_chunk:
+        try:
+            with open(csv_path,'rb') as csv_file:
+                arrays = csvparse_ops.read_logger_csv_numpy(csv_file.read())
+            summary["files"] += 1
+            if len(arrays.values) > 0:
+                arrays_list.append((arrays,oha_yymmddhh))
+        except Exception as e:
+            # エラーログを出力する
+            error_message = f"{str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))} Error in read_origin_chunk: {csv_path} {str(e)}"
+            file_util.write_log(error_message,"error")
+            summary["failed"] += 1
+
+    if len(arrays_list) == 0:
+        return None
+    return get_origin_frame(arrays_list,update_datetime)
+
+def load_origin_chunk(origin_df,session,summary):
+
+    """
+    load_origin_chunk 関数
+
+    概要:
+        元データテーブルの列順の DataFrame をステージングテーブルに読み込む関数。
+        一時ファイルに書き出して LOAD DATA LOCAL INFILE で読み込み、使用できない場合は以降を複数行の REPLACE に切り替える。
+
+    引数:
+        origin_df: pandas.DataFrame - 元データテーブルの列順の DataFrame
+        session: mysql_ops.DbSession - DbSession(local_infile=True) で作成したセッション
+        summary: dict - 処理件数の集計結果（読み込み方法を load_method に設定する）
+
+    戻り値:
+        なし
+
+    例外処理:
+        複数行の REPLACE での登録に失敗した場合は、例外をそのまま送出する。
+    """
+
+    if summary["load_method"] == "load_data":
+        csv_path = None
+        try:
+            # 一時ファイルに元データテーブルの列順で書き出す（NULL は \N）
+            with tempfile.NamedTemporaryFile(mode='w',suffix='.csv',delete=False,encoding='utf-8',newline='') as csv_file:
+                csv_path = csv_file.name
+                origin_df.to_csv(csv_file,header=False,index=False,na_rep='\\N',lineterminator='\n')
+            mysql.db_LoadOriginStaging(csv_path,session)
+            return
+        except Exception as e:
+            # 以降は複数行の REPLACE で登録する
+            error_message = f"{str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))} LOAD DATA LOCAL INFILE failed, falling back to multi-row inserts: {str(e)}"
+            file_util.write_log(error_message,"error")
+            summary["load_method"] = "insert"
+        finally:
+            if csv_path is not None and os.path.exists(csv_path):
+                os.remove(csv_path)
+
+    # NaN は NULL として登録する
+    values = origin_df.astype(object).where(origin_df.notna(),None)
+    rows = list(values.itertuples(index=False,name=None))
+    mysql.db_InsertOriginStaging(rows,BULKLOAD_BATCH_ROWS,session)
+
+def get_rate(row_count,elapsed):
+    # 1秒あたりの行数を求める
+    return round(row_count / elapsed,1) if elapsed > 0 else 0.0
+
+def bulk_load(directory,start_hour=None,end_hour=None,chunk_files=BULKLOAD_CHUNK_FILES):
+
+    """
+    bulk_load 関数
+
+    概要:
+        ディレクトリ内の大量のCSVファイル（新しい現場の過去データや、データ消失後の再構築用）を元データテーブルに一括で取り込む関数。
+        ファイルごとにUPDATE-INSERTせず、ステージングテーブルに読み込んでから1回のSQLでマージする。
+
+    処理内容:
+        1. ディレクトリから YYMMddhh.CSV 形式のファイルを探し、期間で絞り込んで観測日時の順に並べる。
+        2. ステージングテーブルを空にする。
+        3. chunk_files ファイルずつ、以下を繰り返す:
+            - CSVファイルを列定義の型で読み込み、元データテーブルの列順に変換する（観測日時は列単位で作成する）。
+            - LOAD DATA LOCAL INFILE（使用できない場合は複数行の REPLACE）でステージングテーブルに読み込む。
+        4. INSERT ... SELECT ... ON DUPLICATE KEY UPDATE の1回のSQLで元データテーブルにマージし、COMMITする。
+        5. ステージングテーブルを空にする。
+        6. 各段階の処理時間と1秒あたりの行数をログに出力する。
+        時間別・日別・月別テーブルと統計テーブルは更新しない（取り込み後に集計し直す）。
+
+    引数:
+        directory: str - CSVファイルのディレクトリ
+        start_hour: datetime.datetime - 開始日時（この時間を含む。None の場合は制限しない）
+        end_hour: datetime.datetime - 終了日時（この時間を含む。None の場合は制限しない）
+        chunk_files: int - ステージングテーブルに1回で読み込むファイル数
+
+    戻り値:
+        summary: dict - 処理件数、段階ごとの処理時間と1秒あたりの行数
+
+    例外処理:
+        CSVファイルの読み込みに失敗した場合は、エラーログを出力してそのファイルをスキップする。
+        DBへの登録処理が失敗した場合は、エラーログを出力し、元データテーブルへのマージをロールバックする。
+    """
+
+    start_time = time.perf_counter()
+    summary = {
+        "files": 0,
+        "failed": 0,
+        "rows": 0,
+        "load_method": "load_data" if mysql.get_backend().supports_load_data else "insert",
+        "merged_affected": 0,
+        "parse_sec": 0.0,
+        "load_sec": 0.0,
+        "merge_sec": 0.0,
+        "committed": False,
+    }
+
+    file_list = get_bulkload_files(directory,start_hour,end_hour)
+    update_datetime = str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))
+
+    try:
+        with mysql.DbSession(local_infile=True) as session:
+            mysql.db_ClearOriginStaging(session)
+
+            for start in range(0,len(file_list),chunk_files):
+                # CSVファイルを読み込み、元データテーブルの列順に変換する
+                stage_time = time.perf_counter()
+                origin_df = read_origin_chunk(file_list[start:start + chunk_files],update_datetime,summary)
+                summary["parse_sec"] += time.perf_counter() - stage_time
+                if origin_df is None:
+                    continue
+
+                # ステージングテーブルに読み込む
+                stage_time = time.perf_counter()
+                load_origin_chunk(origin_df,session,summary)
+                summary["load_sec"] += time.perf_counter() - stage_time
+                summary["rows"] += len(origin_df)
+
+            # 元データテーブルに1回でマージする
+            stage_time = time.perf_counter()
+            summary["merged_affected"] = mysql.db_MergeOriginStaging(session)
+            summary["merge_sec"] = time.perf_counter() - stage_time
+
+        summary["committed"] = True
+
+        # 読み込んだ行を削除する（COMMIT後に別の接続で実行する）
+        mysql.db_ClearOriginStaging()
+
+    except Exception as e:
+        # エラーログを出力する（元データテーブルへのマージはロールバック済み）
+        error_message = f"{str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))} Failed to bulk load, rolled back: {str(e)}"
+        file_util.write_log(error_message,"error")
+
+    # 段階ごとの1秒あたりの行数を求める
+    summary["elapsed_sec"] = round(time.perf_counter() - start_time,3)
+    for stage in ("parse","load","merge"):
+        summary[f"{stage}_rows_per_sec"] = get_rate(summary["rows"],summary[f"{stage}_sec"])
+        summary[f"{stage}_sec"] = round(summary[f"{stage}_sec"],3)
+    summary["rows_per_sec"] = get_rate(summary["rows"],summary["elapsed_sec"])
+
+    # ログを出力する
+    message = f"{str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))} Bulk load {directory} : {summary}"
+    file_util.write_log(message)
+
+    return summary
@@ -6,18 +6,44 @@
 
 # 標準ライブラリ
 import ftplib
+import io
 import os
+import json
+import hashlib
+import time
+import queue
+import atexit
+import threading
+import contextlib
 import datetime as dt
+from concurrent.futures import ThreadPoolExecutor
 
 # 外部ライブラリ
+import pandas as pd
 import file_util
+import metrics_ops
 
 # FTPサーバーの情報
 ftp_server = "XXX.XXX.XXX.XXX"
 username = "XXX"
 password = "XXX"
 
-def download_csv_file(directory,filename,local_directory):
+# 複数ファイルをダウンロードする場合の同時接続数
+FTP_MAX_CONNECTIONS = 3
+
+# FTP接続のタイムアウト（秒）
+FTP_TIMEOUT = 60
+
+# 接続を使い回す場合に、この秒数以上使っていなければNOOPを送って接続を確認する
+FTP_KEEPALIVE_INTERVAL = 30
+
+# ディレクトリ一覧のキャッシュの有効期間（秒）
+FTP_LISTING_CACHE_SEC = 300
+
+# 取り込み済みファイルの情報（サイズ、更新日時、ハッシュ値）を保存するディレクトリ
+FTP_MANIFEST_DIR = "../manifest"
+
+def download_csv_file(directory,filename,local_directory,ftp_session=None):
 
     """
     download_csv_file 関数
@@ -27,15 +53,15 @@ def download_csv_file(directory,filename,local_directory):
 
     処理内容:
         1. ローカルに保存するディレクトリを作成する（存在しない場合）。
-        2. FTPサーバーに接続し、指定されたディレクトリに移動する。
-        3. 指定されたCSVファイルをダウンロードして、ローカルに保存する。
+        2. FTPセッションを使って、指定されたCSVファイルの内容を取得する。
+        3. 取得した内容をローカルに保存する。
         4. ダウンロードが成功した場合、ダウンロードしたファイルのパスをログに出力する。
-        5. FTPサーバーとの接続を閉じる。
 
     引数:
         directory: str - ダウンロードするファイルのディレクトリパス
         filename: str - ダウンロードするファイル名
         local_directory: str - ローカルに保存するディレクトリパス
+        ftp_session: FtpSession - 使用するFTPセッション（None の場合は共有のセッションプールから借りる）
 
     戻り値:
         bool - ダウンロードの成功/失敗を示す真偽値
@@ -48,33 +74,31 @@ def download_csv_file(directory,filename,local_directory):
         # ローカルに保存するディレクトリ
         os.makedirs(local_directory, exist_ok=True)
 
-        # FTPサーバーに接続
-        ftp = ftplib.FTP(ftp_server)
-        ftp.login(user=username, passwd=password)
-        ftp.cwd(directory)
+        # 特定のCSVファイルの内容を取得
+        if ftp_session is None:
+            with get_ftp_session_pool().session() as pooled_session:
+                data = pooled_session.fetch(directory,filename)
+        else:
+            data = ftp_session.fetch(directory,filename)
 
-        # 特定のCSVファイルをダウンロード
+        # ローカルに保存する
         local_file_path = os.path.join(local_directory, filename)
         with open(local_file_path, 'wb') as local_file:
-            ftp.retrbinary(f"RETR {filename}", local_file.write)
-        print(f"Downloaded: {filename}")
+            local_file.write(data)
+
+        # ログを出力する（ファイルごとの詳細のため debug レベル）
+        message = f"{str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))} Downloaded: {local_file_path}"
+        file_util.write_log(message,"debug")
 
-        # 接続を閉じる
-        ftp.quit()
-        
-        # ログを出力する
-        message = f"{str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))} Downloaded: {local_directory+"/"+filename}"
-        file_util.write_log(message)
-    
         return True
-    
+
     except ftplib.all_errors as e:
         # エラーログを出力する
-        error_message = f"{str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))} FTP error: {str(e)}"
-        file_util.write_log(error_message)
-    
+        error_message = f"{str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))} FTP error: {filename} {str(e)}"
+        file_util.write_log(error_message,"error")
+
         return False
-    
+
 def delete_csv_file(file_path):
 
     """
@@ -113,4 +137,769 @@ def delete_csv_file(file_path):
     except Exception as e:
         # エラーログを出力する
         error_message = f"{str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))} Error in delete_csv_file: {str(e)}"
-        file_util.write_log(error_message)
+        file_util.write_log(error_message,"error")
+
+def download_csv_files(file_list,local_directory,max_connections=FTP_MAX_CONNECTIONS):
+
+    """
+    download_csv_files 関数
+
+    概要:
+        FTPサーバーから複数のCSVファイルを、少数のFTPセッションで並列にダウンロードする関数。
+
+    処理内容:
+        1. 同時接続数分のFTPセッションプールを作成する。
+        2. ファイルごとにプールからセッションを借りてダウンロードする（接続は使い回す）。
+        3. FTPセッションプールを閉じる。
+
+    引数:
+        file_list: list - (ディレクトリパス, ファイル名) のタプルのリスト
+        local_directory: str - ローカルに保存するディレクトリパス
+        max_connections: int - FTPサーバーへの同時接続数
+
+    戻り値:
+        dict - ファイル名をキー、ダウンロードの成功/失敗を示す真偽値を値とする辞書
+
+    例外処理:
+        ファイルごとのエラーは download_csv_file 内でログに出力し、失敗として扱う。
+    """
+
+    results = {}
+    ftp_pool = FtpSessionPool(max_connections)
+    try:
+        with ThreadPoolExecutor(max_workers=max(1,max_connections)) as executor:
+            futures = [executor.submit(_download_csv_file_pooled,ftp_pool,directory,filename,local_directory) for directory,filename in file_list]
+            for (directory,filename),future in zip(file_list,futures):
+                results[filename] = future.result()
+    finally:
+        ftp_pool.close()
+
+    return results
+
+def _download_csv_file_pooled(ftp_pool,directory,filename,local_directory):
+    # プールからFTPセッションを借りてダウンロードする
+    with ftp_pool.session() as ftp_session:
+        return download_csv_file(directory,filename,local_directory,ftp_session)
+
+def fetch_csv_file(directory,filename,ftp_session=None,offset=0):
+
+    """
+    fetch_csv_file 関数
+
+    概要:
+        FTPサーバーからCSVファイルを1件、ローカルに保存せずメモリ上に取得する関数。
+
+    処理内容:
+        1. FTPセッションを使って、指定されたディレクトリに移動する（接続済みで同じディレクトリの場合は移動しない）。
+        2. retrbinary のコールバックでメモリ上のバッファにファイルの内容を書き込む。
+           offset を指定した場合は REST コマンドでその位置以降だけを取得する。
+
+    引数:
+        directory: str - 取得するファイルのディレクトリパス
+        filename: str - 取得するファイル名
+        ftp_session: FtpSession - 使用するFTPセッション（None の場合は共有のセッションプールから借りる）
+        offset: int - 取得を開始する位置（バイト）
+
+    戻り値:
+        bytes - ファイルの内容（offset 以降、取得に失敗した場合は None）
+
+    例外処理:
+        FTP接続やファイルの取得中にエラーが発生した場合、エラーログを出力し、None を返す。
+    """
+
+    try:
+        # CSVファイルをメモリ上のバッファに取得
+        if ftp_session is None:
+            with get_ftp_session_pool().session() as pooled_session:
+                data = pooled_session.fetch(directory,filename,offset)
+        else:
+            data = ftp_session.fetch(directory,filename,offset)
+
+        # ログを出力する
+        message = f"{str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))} Fetched: {directory}/{filename} ({len(data)} bytes from {offset})"
+        file_util.write_log(message,"debug")
+
+        return data
+
+    except ftplib.all_errors as e:
+        # エラーログを出力する
+        error_message = f"{str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))} FTP error: {filename} {str(e)}"
+        file_util.write_log(error_message,"error")
+
+        return None
+
+def stat_csv_file(directory,filename,ftp_session=None,refresh=False):
+
+    """
+    stat_csv_file 関数
+
+    概要:
+        FTPサーバー上のCSVファイルのサイズと更新日時を取得する関数。
+        取り込み済みファイルの情報と比較し、変更の無いファイルのダウンロードを省くために使用する。
+
+    引数:
+        directory: str - ファイルのディレクトリパス
+        filename: str - ファイル名
+        ftp_session: FtpSession - 使用するFTPセッション（None の場合は共有のセッションプールから借りる）
+        refresh: bool - ディレクトリ一覧のキャッシュを使わずにサーバーに問い合わせるかどうか（書き込み中のファイル向け）
+
+    戻り値:
+        tuple - (サイズ, 更新日時 YYYYMMDDHHMMSS)。取得できない項目は None
+
+    例外処理:
+        FTP接続中にエラーが発生した場合、エラーログを出力し、(None, None) を返す。
+    """
+
+    try:
+        if ftp_session is None:
+            with get_ftp_session_pool().session() as pooled_session:
+                return pooled_session.stat(directory,filename,refresh)
+        return ftp_session.stat(directory,filename,refresh)
+
+    except ftplib.all_errors as e:
+        # エラーログを出力する
+        error_message = f"{str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))} FTP error: stat {filename} {str(e)}"
+        file_util.write_log(error_message,"error")
+
+        return None,None
+
+def save_csv_data(data,local_directory,filename):
+
+    """
+    save_csv_data 関数
+
+    概要:
+        メモリ上に取得したCSVファイルの内容をローカルに保存する関数。
+        調査用に取得したファイルを残したい場合にのみ使用する。
+
+    引数:
+        data: bytes - ファイルの内容
+        local_directory: str - ローカルに保存するディレクトリパス
+        filename: str - 保存するファイル名
+
+    戻り値:
+        なし
+
+    例外処理:
+        保存中にエラーが発生した場合、エラーログを出力する。
+    """
+
+    try:
+        os.makedirs(local_directory, exist_ok=True)
+        local_file_path = os.path.join(local_directory, filename)
+        with open(local_file_path, 'wb') as local_file:
+            local_file.write(data)
+
+        # ログを出力する
+        message = f"{str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))} Saved: {local_file_path}"
+        file_util.write_log(message)
+    except Exception as e:
+        # エラーログを出力する
+        error_message = f"{str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))} Error in save_csv_data: {str(e)}"
+        file_util.write_log(error_message,"error")
+
+class FtpListingCache:
+
+    """
+    FtpListingCache クラス
+
+    概要:
+        FTPサーバーのディレクトリ一覧（/LOG/<年> ごとのファイル名とサイズ・更新日時）を一定時間キャッシュする。
+        同じプールのFTPセッション間で共有する。
+    """
+
+    def __init__(self,max_age=FTP_LISTING_CACHE_SEC):
+        self.max_age = max_age
+        self.lock = threading.Lock()
+        self.entries = {}
+
+    def get(self,directory):
+        # 有効期間内のディレクトリ一覧を返す（無い場合は None）
+        with self.lock:
+            entry = self.entries.get(directory)
+        if entry is None or time.monotonic() - entry[0] > self.max_age:
+            return None
+        return entry[1]
+
+    def set(self,directory,entries):
+        # ディレクトリ一覧を保存する
+        with self.lock:
+            self.entries[directory] = (time.monotonic(),entries)
+
+    def invalidate(self,directory=None):
+        # ディレクトリ一覧のキャッシュを破棄する（None の場合は全て）
+        with self.lock:
+            if directory is None:
+                self.entries.clear()
+            else:
+                self.entries.pop(directory,None)
+
+class FtpSession:
+
+    """
+    FtpSession クラス
+
+    概要:
+        ログイン済みのFTP接続を保持し、複数ファイルの取得で使い回すセッション。
+
+    処理内容:
+        - 最初の操作時に接続・ログインし、以降は同じ接続を使い回す。
+        - 同じディレクトリへの cwd は省略する。
+        - 一定時間使っていない接続は、使う前にNOOPを送って生きているか確認する。
+        - タイムアウトや切断で失敗した場合は、再接続して1回だけ再実行する。
+        - ディレクトリ一覧はキャッシュする。
+
+    例外処理:
+        ファイルが存在しないなどの応答エラー（ftplib.error_perm）は再実行せずにそのまま送出する。
+        再接続しても失敗した場合は、ftplib.all_errors の例外を送出する。
+    """
+
+    def __init__(self,listing_cache=None):
+        self.ftp = None
+        self.directory = None
+        self.last_used = 0.0
+        self.reconnect_count = 0
+        self.listing_cache = listing_cache if listing_cache is not None else FtpListingCache()
+
+    def connect(self):
+        # FTPサーバーに接続してログインする
+        self.close()
+        ftp = ftplib.FTP(ftp_server,timeout=FTP_TIMEOUT)
+        ftp.login(user=username, passwd=password)
+        self.ftp = ftp
+        self.directory = None
+        self.last_used = time.monotonic()
+
+    def close(self):
+        # 接続を閉じる（切断時のエラーは無視する）
+        if self.ftp is not None:
+            try:
+                self.ftp.quit()
+            except ftplib.all_errors:
+                self.ftp.close()
+        self._drop()
+
+    def keepalive(self):
+        # 一定時間使っていない場合はNOOPを送り、応答が無ければ切断済みとして扱う
+        if self.ftp is None or time.monotonic() - self.last_used < FTP_KEEPALIVE_INTERVAL:
+            return
+        try:
+            self.ftp.voidcmd("NOOP")
+            self.last_used = time.monotonic()
+        except ftplib.all_errors:
+            self._drop()
+
+    def fetch(self,directory,filename,offset=0):
+
+        """
+        fetch メソッド
+
+        概要:
+            ファイルの内容をメモリ上に取得する。
+
+        引数:
+            directory (str): 取得するファイルのディレクトリパス
+            filename (str): 取得するファイル名
+            offset (int): 取得を開始する位置（バイト、0より大きい場合は REST で指定する）
+
+        戻り値:
+            bytes - ファイルの内容（offset 以降）
+        """
+
+        return self._call(self._retrieve,directory,filename,offset)
+
+    def list_directory(self,directory,refresh=False):
+
+        """
+        list_directory メソッド
+
+        概要:
+            ディレクトリ内のファイルの一覧を取得する。有効期間内はキャッシュを返す。
+            MLSD に対応したサーバーでは、1回の一覧取得で各ファイルのサイズと更新日時も取得する。
+
+        引数:
+            directory (str): ディレクトリパス
+            refresh (bool): キャッシュを使わずに取得し直すかどうか
+
+        戻り値:
+            dict - ファイル名をキー、{"size": int, "modify": str} を値とする辞書
+                   （MLSD に対応していないサーバーでは値は空の辞書）
+        """
+
+        entries = None if refresh else self.listing_cache.get(directory)
+        if entries is None:
+            entries = self._call(self._list_entries,directory)
+            self.listing_cache.set(directory,entries)
+        return entries
+
+    def stat(self,directory,filename,refresh=False):
+
+        """
+        stat メソッド
+
+        概要:
+            ファイルのサイズと更新日時（MDTM、YYYYMMDDHHMMSS）を取得する。
+            ディレクトリ一覧のキャッシュにあればそれを使い、無ければ SIZE / MDTM コマンドで取得する。
+
+        引数:
+            directory (str): ファイルのディレクトリパス
+            filename (str): ファイル名
+            refresh (bool): キャッシュを使わずに SIZE / MDTM コマンドで取得するかどうか
+
+        戻り値:
+            tuple - (サイズ, 更新日時)。サーバーが対応していない項目は None
+        """
+
+        facts = {} if refresh else (self.listing_cache.get(directory) or {}).get(filename) or {}
+        if facts.get("size") is not None and facts.get("modify") is not None:
+            return facts["size"],facts["modify"]
+        return self._call(self._stat,directory,filename)
+
+    def _call(self,func,*args):
+        # 接続を確認して処理を実行し、タイムアウトや切断の場合は再接続して1回だけ再実行する
+        for attempt in range(2):
+            try:
+                self.keepalive()
+                if self.ftp is None:
+                    self.connect()
+                # FTPの処理ごとの処理時間とFTPサーバーとの往復回数を記録する（例: ftp_retrieve）
+                with metrics_ops.stage(f"ftp{func.__name__}"):
+                    result = func(*args)
+                metrics_ops.count("ftp_requests")
+                self.last_used = time.monotonic()
+                return result
+            except ftplib.error_perm:
+                raise
+            except ftplib.all_errors:
+                self._drop()
+                if attempt == 1:
+                    raise
+                self.reconnect_count += 1
+                metrics_ops.count("ftp_reconnects")
+
+    def _cwd(self,directory):
+        # ディレクトリが変わった場合のみ移動する
+        if self.directory != directory:
+            self.ftp.cwd(directory)
+            self.directory = directory
+
+    def _retrieve(self,directory,filename,offset):
+        # ファイルの内容をメモリ上のバッファに取得する（再実行時も同じ位置から取得し直す）
+        self._cwd(directory)
+        buffer = io.BytesIO()
+        self.ftp.retrbinary(f"RETR {filename}", buffer.write, rest=offset if offset > 0 else None)
+        metrics_ops.count("ftp_bytes",buffer.tell())
+        return buffer.getvalue()
+
+    def _list_entries(self,directory):
+        # ディレクトリ内のファイルの一覧を取得する（MLSD に対応していない場合は NLST で取得する）
+        self._cwd(directory)
+        try:
+            entries = {}
+            for name,facts in self.ftp.mlsd(facts=["type","size","modify"]):
+                if facts.get("type","file") != "file":
+                    continue
+                entries[name] = {
+                    "size": int(facts["size"]) if "size" in facts else None,
+                    "modify": facts.get("modify","")[:14] or None,
+                }
+            return entries
+        except ftplib.error_perm as e:
+            # 500/502: MLSD 未対応
+            if str(e)[:3] not in ("500","502"):
+                raise
+
+        # 空のディレクトリでエラーを返すサーバーにも対応する
+        try:
+            return {os.path.basename(name): {} for name in self.ftp.nlst()}
+        except ftplib.error_perm as e:
+            if str(e).startswith("550"):
+                return {}
+            raise
+
+    def _stat(self,directory,filename):
+        # SIZE / MDTM コマンドでファイルのサイズと更新日時を取得する（未対応の項目は None）
+        self._cwd(directory)
+        size = None
+        modify = None
+        try:
+            self.ftp.voidcmd("TYPE I")
+            size = self.ftp.size(filename)
+        except ftplib.error_perm as e:
+            if str(e).startswith("550"):
+                raise
+        try:
+            response = self.ftp.sendcmd(f"MDTM {filename}")
+            modify = response[4:].strip()[:14] or None
+        except ftplib.error_perm as e:
+            if str(e).startswith("550"):
+                raise
+        return size,modify
+
+    def _drop(self):
+        # 接続を破棄する（次の操作で再接続する）
+        if self.ftp is not None:
+            try:
+                self.ftp.close()
+            except Exception:
+                pass
+        self.ftp = None
+        self.directory = None
+
+class FtpSessionPool:
+
+    """
+    FtpSessionPool クラス
+
+    概要:
+        少数のFTPセッションを保持し、複数のスレッドで貸し出して使い回すプール。
+        ディレクトリ一覧のキャッシュはプール内のセッションで共有する。
+
+    使用方法:
+        ftp_pool = FtpSessionPool(3)
+        with ftp_pool.session() as ftp_session:
+            data = ftp_session.fetch("/LOG/2024","24071610.CSV")
+        ftp_pool.close()
+    """
+
+    def __init__(self,size=FTP_MAX_CONNECTIONS):
+        self.size = max(1,size)
+        self.listing_cache = FtpListingCache()
+        self.idle_sessions = queue.LifoQueue()
+        self.sessions = []
+        self.lock = threading.Lock()
+        self.keepalive_stop = None
+
+    def acquire(self):
+        # 空いているセッションを借りる（上限まで新規作成し、上限に達している場合は空くまで待つ）
+        try:
+            return self.idle_sessions.get_nowait()
+        except queue.Empty:
+            pass
+        with self.lock:
+            if len(self.sessions) < self.size:
+                ftp_session = FtpSession(self.listing_cache)
+                self.sessions.append(ftp_session)
+                return ftp_session
+        return self.idle_sessions.get()
+
+    def release(self,ftp_session):
+        # セッションを返却する
+        self.idle_sessions.put(ftp_session)
+
+    @contextlib.contextmanager
+    def session(self):
+        # with 文でセッションを借りて、終了時に返却する
+        ftp_session = self.acquire()
+        try:
+            yield ftp_session
+        finally:
+            self.release(ftp_session)
+
+    def keepalive(self):
+        # 空いているセッションにNOOPを送り、切れている接続を検出する
+        idle = []
+        while True:
+            try:
+                idle.append(self.idle_sessions.get_nowait())
+            except queue.Empty:
+                break
+        for ftp_session in idle:
+            ftp_session.keepalive()
+            self.idle_sessions.put(ftp_session)
+
+    def start_keepalive_thread(self,interval=FTP_KEEPALIVE_INTERVAL):
+        # 一定間隔で keepalive を実行するスレッドを起動する（常駐実行向け）
+        if self.keepalive_stop is not None:
+            return
+        self.keepalive_stop = threading.Event()
+        thread = threading.Thread(target=self._keepalive_loop,args=(self.keepalive_stop,interval),daemon=True)
+        thread.start()
+
+    def close(self):
+        # 全てのセッションの接続を閉じる
+        if self.keepalive_stop is not None:
+            self.keepalive_stop.set()
+            self.keepalive_stop = None
+        with self.lock:
+            for ftp_session in self.sessions:
+                ftp_session.close()
+
+    def _keepalive_loop(self,stop_event,interval):
+        while not stop_event.wait(interval):
+            self.keepalive()
+
+# 共有のFTPセッションプールと取り込み済みファイルの情報（初回使用時に作成する）
+_ftp_session_pool = None
+_ftp_session_pool_lock = threading.Lock()
+_ftp_manifest = None
+
+def get_ftp_session_pool():
+
+    """
+    get_ftp_session_pool 関数
+
+    概要:
+        プロセス内で共有するFTPセッションプールを取得する。
+        プールはプロセス内で1つだけ作成し、プロセス終了時に接続を閉じる。
+
+    引数:
+        なし
+
+    戻り値:
+        FtpSessionPool - 共有のFTPセッションプール
+
+    例外処理:
+        なし
+    """
+
+    global _ftp_session_pool
+
+    with _ftp_session_pool_lock:
+        if _ftp_session_pool is None:
+            _ftp_session_pool = FtpSessionPool(FTP_MAX_CONNECTIONS)
+            atexit.register(close_ftp_session_pool)
+
+    return _ftp_session_pool
+
+def close_ftp_session_pool():
+
+    """
+    close_ftp_session_pool 関数
+
+    概要:
+        共有のFTPセッションプールの接続を全て閉じる。
+
+    引数:
+        なし
+
+    戻り値:
+        なし
+
+    例外処理:
+        なし
+    """
+
+    global _ftp_session_pool
+
+    with _ftp_session_pool_lock:
+        if _ftp_session_pool is not None:
+            _ftp_session_pool.close()
+            _ftp_session_pool = None
+
+def get_content_hash(data):
+
+    """
+    get_content_hash 関数
+
+    概要:
+        ファイルの内容のハッシュ値（SHA-256）を取得する関数。
+
+    引数:
+        data: bytes - ファイルの内容
+
+    戻り値:
+        str - ハッシュ値（16進数の文字列）
+
+    例外処理:
+        なし
+    """
+
+    return hashlib.sha256(data).hexdigest()
+
+def get_row_hashes(csv_df):
+
+    """
+    get_row_hashes 関数
+
+    概要:
+        CSVファイルの各行のハッシュ値を取得する関数。
+        キーは観測日と観測時刻（YYYYMMdd + hhmm）とする。
+
+    引数:
+        csv_df: pandas.DataFrame - CSVファイルを読み込んだ DataFrame
+
+    戻り値:
+        dict - 観測日時をキー、行のハッシュ値（文字列）を値とする辞書
+
+    例外処理:
+        なし
+    """
+
+    keys = csv_df.iloc[:,1].astype(str) + csv_df.iloc[:,2].astype(str).str.zfill(4)
+    hashes = pd.util.hash_pandas_object(csv_df,index=False)
+    return dict(zip(keys,hashes.astype(str)))
+
+class FtpManifest:
+
+    """
+    FtpManifest クラス
+
+    概要:
+        取り込み済みのFTPサーバー上のファイルの情報（サイズ、更新日時、内容のハッシュ値、行ごとのハッシュ値）を
+        ローカルに保存し、再取り込み時に変更の無いファイル・行を判定する。
+        FTPサーバーのディレクトリ（/LOG/<年>）ごとに FTP_MANIFEST_DIR にJSONファイルとして保存する。
+
+    処理内容:
+        - サイズと更新日時が前回と同じファイルは、ダウンロードせずにスキップできる。
+        - 更新日時が変わっていても内容のハッシュ値が同じファイルは、DBに登録せずにスキップできる。
+        - 内容が変わったファイルは、ハッシュ値が変わった行だけを元データテーブルに登録できる。
+        - 取り込みの情報は update で記録し、DBへのCOMMIT後に save で保存する
+          （ロールバックした場合は保存しないため、次回は再取り込みされる）。
+
+    使用方法:
+        manifest = FtpManifest()
+        if manifest.is_unchanged(directory,filename,size,modify):
+            ...
+        manifest.update(directory,filename,size,modify,content_hash,row_hashes)
+        manifest.save()
+    """
+
+    def __init__(self,manifest_dir=FTP_MANIFEST_DIR):
+        self.manifest_dir = manifest_dir
+        self.lock = threading.Lock()
+        self.directories = {}
+        self.pending = {}
+
+    def get(self,directory,filename):
+        # 前回取り込んだときのファイルの情報を取得する（無い場合は None）
+        return self._load(directory).get(filename)
+
+    def is_unchanged(self,directory,filename,size,modify):
+        # サイズと更新日時が前回取り込んだときと同じかどうか（取得できない項目がある場合は False）
+        entry = self.get(directory,filename)
+        if entry is None or size is None or modify is None:
+            return False
+        return entry.get("size") == size and entry.get("modify") == modify
+
+    def is_same_content(self,directory,filename,content_hash):
+        # 内容のハッシュ値が前回取り込んだときと同じかどうか
+        entry = self.get(directory,filename)
+        return entry is not None and entry.get("sha256") == content_hash
+
+    def get_changed_rows(self,directory,filename,csv_df,row_hashes):
+
+        """
+        get_changed_rows メソッド
+
+        概要:
+            前回取り込んだときからハッシュ値が変わった行（新しい行を含む）だけを取り出す。
+
+        引数:
+            directory (str): ファイルのディレクトリパス
+            filename (str): ファイル名
+            csv_df (pandas.DataFrame): CSVファイルを読み込んだ DataFrame
+            row_hashes (dict): get_row_hashes で取得した行ごとのハッシュ値
+
+        戻り値:
+            pandas.DataFrame - 変更のあった行の DataFrame
+        """
+
+        entry = self.get(directory,filename)
+        if entry is None:
+            return csv_df
+        previous_hashes = entry.get("rows",{})
+        changed = [previous_hashes.get(key) != row_hash for key,row_hash in row_hashes.items()]
+        if len(changed) != len(csv_df):
+            # 同じ観測日時の行が重複している場合は全ての行を対象にする
+            return csv_df
+        return csv_df[changed]
+
+    def update(self,directory,filename,size,modify,content_hash,row_hashes):
+        # 取り込んだファイルの情報を記録する（save を呼ぶまでは保存しない）
+        with self.lock:
+            self.pending.setdefault(directory,{})[filename] = {
+                "size": size,
+                "modify": modify,
+                "sha256": content_hash,
+                "rows": row_hashes,
+                "ingested": dt.datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            }
+
+    def save(self):
+
+        """
+        save メソッド
+
+        概要:
+            記録した取り込みの情報をJSONファイルに保存する。
+            他のプロセスが同時に保存した内容を消さないよう、保存直前にファイルを読み直してから反映する。
+
+        例外処理:
+            保存中にエラーが発生した場合、エラーログを出力する（次回は再取り込みされる）。
+        """
+
+        with self.lock:
+            pending = self.pending
+            self.pending = {}
+
+        try:
+            os.makedirs(self.manifest_dir,exist_ok=True)
+            for directory,files in pending.items():
+                entries = self._read(directory)
+                entries.update(files)
+
+                # 書き込み途中のファイルを読まれないよう、一時ファイルに書いてから置き換える
+                path = self._path(directory)
+                tmp_path = f"{path}.{os.getpid()}.tmp"
+                with open(tmp_path,'w',encoding='utf-8') as manifest_file:
+                    json.dump(entries,manifest_file,separators=(",",":"))
+                os.replace(tmp_path,path)
+
+                with self.lock:
+                    self.directories[directory] = entries
+        except Exception as e:
+            # エラーログを出力する
+            error_message = f"{str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))} Error in FtpManifest.save: {str(e)}"
+            file_util.write_log(error_message,"error")
+
+    def _load(self,directory):
+        # ディレクトリの取り込みの情報を読み込む（初回のみファイルから読み込む）
+        with self.lock:
+            entries = self.directories.get(directory)
+        if entries is None:
+            entries = self._read(directory)
+            with self.lock:
+                self.directories[directory] = entries
+        return entries
+
+    def _read(self,directory):
+        # JSONファイルを読み込む（無い場合や壊れている場合は空とする）
+        try:
+            with open(self._path(directory),encoding='utf-8') as manifest_file:
+                return json.load(manifest_file)
+        except (OSError,ValueError):
+            return {}
+
+    def _path(self,directory):
+        # /LOG/2024 → ../manifest/LOG_2024.json
+        name = directory.strip("/").replace("/","_") or "root"
+        return os.path.join(self.manifest_dir,f"{name}.json")
+
+def get_ftp_manifest():
+
+    """
+    get_ftp_manifest 関数
+
+    概要:
+        プロセス内で共有する取り込み済みファイルの情報を取得する。
+        常駐実行では読み込んだ情報を実行のたびに読み直さずに使い回す
+        （保存時には読み直して反映するため、他のプロセスの保存内容は失われない）。
+
+    引数:
+        なし
+
+    戻り値:
+        FtpManifest - 共有の取り込み済みファイルの情報
+
+    例外処理:
+        なし
+    """
+
+    global _ftp_manifest
+
+    with _ftp_session_pool_lock:
+        if _ftp_manifest is None:
+            _ftp_manifest = FtpManifest()
+
+    return _ftp_manifest
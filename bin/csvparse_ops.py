@@ -0,0 +1,188 @@
+# -----------------------------------------------------------------------------
+# 会社名: 湘南技術センター株式会社
+# 名前: 塩見 和則
+# 作成日: 2026/10/18
+# -----------------------------------------------------------------------------
+
+# 標準ライブラリ
+import io
+import datetime as dt
+from typing import NamedTuple
+
+# 外部ライブラリ
+import numpy as np
+import pandas as pd
+import file_util
+
+# pyarrow がインストールされている場合は pyarrow の読み込みエンジンを使用する
+try:
+    import pyarrow
+    CSV_ENGINE = "pyarrow"
+except ImportError:
+    CSV_ENGINE = "c"
+
+# ロガーのCSVファイルの列定義: (列名, 型)
+# 列番号は従来どおり 0〜30 の整数で参照するため、列名は説明用
+LOGGER_CSV_SCHEMA = [
+    ("genba_cd", "str"),          # 0: 現場コード（先頭の0を残すため文字列）
+    ("kansoku_date", "int64"),    # 1: 観測日（YYYYMMdd）
+    ("kansoku_time", "int64"),    # 2: 観測時刻（hhmm）
+]
+for _no in range(1,9):
+    LOGGER_CSV_SCHEMA += [
+        (f"denryu_{_no:02d}", "float64"),     # 電流
+        (f"denatsu_{_no:02d}", "float64"),    # 電圧
+        (f"hatsuden_{_no:02d}", "float64"),   # 発電量[W]
+    ]
+LOGGER_CSV_SCHEMA += [
+    ("nissya", "float64"),        # 27: 日射量
+    ("temp", "float64"),          # 28: 温度
+    ("error_cd", "int64"),        # 29: エラーコード
+    ("baiden", "int64"),          # 30: 累積売電量[kWH]
+]
+
+# 列番号をキーとした型の辞書（pandas.read_csv の dtype に指定する）
+LOGGER_CSV_DTYPES = {index: dtype for index,(name,dtype) in enumerate(LOGGER_CSV_SCHEMA)}
+
+# 整数の列番号
+LOGGER_CSV_INT_COLUMNS = [index for index,(name,dtype) in enumerate(LOGGER_CSV_SCHEMA) if dtype == "int64"]
+
+class LoggerArrays(NamedTuple):
+
+    """
+    LoggerArrays クラス
+
+    概要:
+        pandas を使わずに読み込んだロガーのCSVファイルの内容。
+
+    属性:
+        genba_cd (numpy.ndarray): 現場コード（文字列、先頭の0を含む）
+        values (numpy.ndarray): 行数 × 31 の float64 の配列。列番号はCSVファイルと同じ（列0は現場コードの数値）
+    """
+
+    genba_cd: np.ndarray
+    values: np.ndarray
+
+def read_logger_csv(csv_file,usecols=None):
+
+    """
+    read_logger_csv 関数
+
+    概要:
+        ロガーのCSVファイルを、列定義（LOGGER_CSV_SCHEMA）の型で読み込む関数。
+        型の推定を行わず、現場コードの先頭の0を残し、累積売電量を整数のまま読み込む。
+
+    処理内容:
+        1. メモリ上のファイルの内容（bytes）は、read_logger_csv_numpy で NumPy の配列に読み込み、
+           列定義の型の DataFrame に変換する（pandas.read_csv は列ごとの型を指定すると遅くなるため）。
+        2. ファイルのパスやファイルオブジェクトは、列ごとの型を指定し、pyarrow（インストールされている場合）
+           またはCエンジンの pandas.read_csv で読み込む。
+        3. 列定義に合わない行があり読み込めなかった場合は、エラーログを出力し、型を推定する従来の方法で読み込み直す。
+
+    引数:
+        csv_file: bytes、str または file-like - CSVファイルの内容、CSVファイルのパス、またはファイルオブジェクト
+        usecols: list - 読み込む列番号（None の場合は全ての列。時間別の集計だけを行う場合は
+                        aggregate_ops.AGGREGATE_COLUMNS を指定すると不要な列を読み飛ばす）
+
+    戻り値:
+        pandas.DataFrame - CSVファイルを読み込んだ DataFrame（列名は列番号）
+
+    例外処理:
+        列定義に合わない場合は従来の方法で読み込み直す。それでも読み込めない場合は例外を送出する。
+    """
+
+    if usecols is None:
+        dtype = LOGGER_CSV_DTYPES
+    else:
+        usecols = sorted(usecols)
+        dtype = {column: LOGGER_CSV_DTYPES[column] for column in usecols}
+
+    # メモリ上のファイルの内容は NumPy で読み込む
+    if isinstance(csv_file,(bytes,bytearray)):
+        try:
+            df = logger_arrays_to_frame(read_logger_csv_numpy(bytes(csv_file)))
+            return df if usecols is None else df[usecols]
+        except ValueError as e:
+            # エラーログを出力する
+            error_message = f"{str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))} CSV does not match the logger schema, falling back to type inference: {str(e)}"
+            file_util.write_log(error_message,"error")
+        return pd.read_csv(io.BytesIO(csv_file),header=None,usecols=usecols)
+
+    # 読み込み直す場合に備えて先頭の位置を記録する
+    position = csv_file.tell() if hasattr(csv_file,"tell") else None
+
+    try:
+        return pd.read_csv(csv_file,header=None,dtype=dtype,usecols=usecols,engine=CSV_ENGINE)
+    except (ValueError,TypeError) as e:
+        # エラーログを出力する
+        error_message = f"{str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))} CSV does not match the logger schema, falling back to type inference: {str(e)}"
+        file_util.write_log(error_message,"error")
+
+    if position is not None:
+        csv_file.seek(position)
+    return pd.read_csv(csv_file,header=None,usecols=usecols)
+
+def read_logger_csv_numpy(data):
+
+    """
+    read_logger_csv_numpy 関数
+
+    概要:
+        ロガーのCSVファイルの内容を、pandas を使わずに NumPy の配列に読み込む関数。
+        数値は numpy.loadtxt（Cで実装された読み込み処理）で一度に読み込み、現場コードだけを文字列として取り出す。
+
+    引数:
+        data: bytes - CSVファイルの内容
+
+    戻り値:
+        LoggerArrays - 現場コードと、数値の2次元配列
+
+    例外処理:
+        数値に変換できない値がある場合は ValueError を送出する。
+    """
+
+    lines = [line for line in data.splitlines() if line.strip()]
+    if len(lines) == 0:
+        return LoggerArrays(np.array([],dtype=str),np.empty((0,len(LOGGER_CSV_SCHEMA)),dtype=np.float64))
+
+    values = np.loadtxt(lines,delimiter=",",dtype=np.float64,ndmin=2,encoding=None)
+    if values.shape[1] != len(LOGGER_CSV_SCHEMA):
+        raise ValueError(f"expected {len(LOGGER_CSV_SCHEMA)} columns, got {values.shape[1]}")
+
+    # 現場コードは先頭の0を残すため、数値とは別に文字列として取り出す
+    genba_cd = np.array([line.split(b",",1)[0].strip().decode() for line in lines])
+    return LoggerArrays(genba_cd,values)
+
+def logger_arrays_to_frame(arrays):
+
+    """
+    logger_arrays_to_frame 関数
+
+    概要:
+        read_logger_csv_numpy で読み込んだ配列を、列定義の型（現場コードは文字列、整数の列は int64）の
+        DataFrame に変換する関数。
+
+    引数:
+        arrays: LoggerArrays - read_logger_csv_numpy で読み込んだ配列
+
+    戻り値:
+        pandas.DataFrame - 列名が列番号の DataFrame
+
+    例外処理:
+        整数の列に小数・欠損値がある場合は ValueError を送出する（int64 に変換すると値が切り捨てられるため。
+        呼び出し元では、ファイルのパスやファイルオブジェクトを読み込んだ場合と同じく、型を推定する従来の方法で読み込み直す）。
+    """
+
+    # 整数の列の値が全て整数か確認する
+    int_values = arrays.values[:,LOGGER_CSV_INT_COLUMNS]
+    integral = np.isfinite(int_values) & (int_values == np.trunc(int_values))
+    if not integral.all():
+        row,column = np.argwhere(~integral)[0]
+        raise ValueError(f"non-integer value {int_values[row,column]} in integer column {LOGGER_CSV_INT_COLUMNS[column]} (line {row + 1})")
+
+    # 数値の配列から1つのブロックで作成し、型の異なる列だけを置き換える
+    df = pd.DataFrame(arrays.values)
+    df[0] = arrays.genba_cd
+    for column in LOGGER_CSV_INT_COLUMNS:
+        df[column] = int_values[:,LOGGER_CSV_INT_COLUMNS.index(column)].astype(np.int64)
+    return df
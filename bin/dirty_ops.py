@@ -0,0 +1,173 @@
+# -----------------------------------------------------------------------------
+# 会社名: 湘南技術センター株式会社
+# 名前: 塩見 和則
+# 作成日: 2026/10/18
+# -----------------------------------------------------------------------------
+
+# 標準ライブラリ
+import datetime as dt
+
+# 外部ライブラリ
+import numpy as np
+import pandas as pd
+import mysql_ops as mysql
+import file_util
+import aggregate_ops
+import rollup_ops
+import metrics_ops
+
+# 元データテーブルから1回に取得する行数
+DIRTY_FETCH_ROWS = 10000
+
+class DirtySet:
+
+    """
+    DirtySet クラス
+
+    概要:
+        元データテーブルに登録した行の時間（YYYYMMddhh）を記録し、集計し直す時間・日・月を求める。
+        複数のファイルで同じ時間・日・月に登録しても1回だけ集計し直すように、実行単位（1ファイル、バックフィル全体など）で重複を除く。
+
+    属性:
+        hour_keys (set): 登録した行の時間（YYYYMMddhh）の集合
+
+    使用方法:
+        dirty = DirtySet()
+        dirty.mark_rows(csv_df)
+        recompute_dirty(dirty,session)
+    """
+
+    def __init__(self):
+        self.hour_keys = set()
+
+    def __len__(self):
+        return len(self.hour_keys)
+
+    def mark_hours(self,hour_keys):
+        # 時間（YYYYMMddhh）を記録する
+        self.hour_keys.update(int(key) for key in hour_keys)
+
+    def mark_rows(self,rows):
+        # CSVファイルの行の観測日と観測時刻から時間を求めて記録する（観測日・観測時刻が欠損している行は除く）
+        if len(rows) == 0:
+            return
+        columns = [aggregate_ops.CSV_DATE_COLUMN,aggregate_ops.CSV_TIME_COLUMN]
+        if isinstance(rows,np.ndarray):
+            block = rows[:,columns].astype(np.float64)
+        else:
+            block = rows.iloc[:,columns].apply(pd.to_numeric,errors="coerce").to_numpy(dtype=np.float64)
+        keys = block[:,0] * 100 + block[:,1] // 100
+        self.mark_hours(np.unique(keys[np.isfinite(keys)]).astype(np.int64).tolist())
+
+    def update(self,other):
+        # 他の DirtySet の時間を記録する
+        self.hour_keys.update(other.hour_keys)
+
+    def get_hour_keys(self):
+        # 時間（YYYYMMddhh）の配列を時間順に取得する
+        return np.array(sorted(self.hour_keys),dtype=np.int64)
+
+    def get_days(self):
+        # 時間を含む日（YYYYMMdd）のリストを取得する
+        return sorted(set(key // 100 for key in self.hour_keys))
+
+    def get_months(self):
+        # 時間を含む月（YYYYMM）のリストを取得する
+        return sorted(set(key // 10000 for key in self.hour_keys))
+
+def aggregate_origin(oha_yyyymmdd_list,session,hour_keys=None,fetch_rows=DIRTY_FETCH_ROWS):
+
+    """
+    aggregate_origin 関数
+
+    概要:
+        元データテーブルの指定した日の行をサーバー側のカーソルで fetch_rows 行ずつ読み込み、
+        時間別テーブルの行と、時間ごとの統計の状態の列に集計する関数。取り込み時と同じ集計処理を使用する。
+
+    引数:
+        oha_yyyymmdd_list: list - 観測日（YYYYMMdd）のリスト
+        session: mysql_ops.DbSession - 実行単位のセッション
+        hour_keys: numpy.ndarray - 集計する時間（YYYYMMddhh）の配列（None の場合は指定した日の全ての時間）
+        fetch_rows: int - 元データテーブルから1回に取得する行数
+
+    戻り値:
+        records: list - 時間別テーブルに登録する aggregate_ops.HourlyRecord のリスト
+        rollup: tuple - (時間のキーの配列, 状態の列)
+        row_count: int - 集計した行数
+
+    例外処理:
+        なし（呼び出し元でエラーログを出力する）
+    """
+
+    aggregator = aggregate_ops.HourlyStreamAggregator()
+    rollup_results = []
+    row_count = 0
+    for block in mysql.db_StreamOriginRows(oha_yyyymmdd_list,fetch_rows,session):
+        # 指定した時間の行だけを集計する
+        if hour_keys is not None:
+            keys = block[:,aggregate_ops.CSV_DATE_COLUMN] * 100 + block[:,aggregate_ops.CSV_TIME_COLUMN] // 100
+            block = block[np.isin(keys,hour_keys)]
+        aggregator.add_rows(block)
+        rollup_results.append(rollup_ops.rollup_rows([block]))
+        row_count += len(block)
+
+    return aggregator.get_records(),rollup_ops.combine_states(rollup_results),row_count
+
+def recompute_dirty(dirty,session,hourly=True,fetch_rows=DIRTY_FETCH_ROWS):
+
+    """
+    recompute_dirty 関数
+
+    概要:
+        DirtySet に記録した時間の集計を、時間 → 日 → 月の順に集計し直す関数（集計し直しのステージ）。
+        時間・日・月はそれぞれ1回ずつ、全ての時間・日・月をまとめたSQLで処理する
+        （300ファイルの再取り込みでも、日別テーブルの集計は対象の日数分だけになる）。
+
+    処理内容:
+        1. hourly が True の場合、元データテーブルから記録した時間の行を読み込んで集計し直し、
+           時間別テーブルと時間別・日別・月別の統計テーブルにUPDATE-INSERTする。
+        2. 記録した時間を含む日の日別テーブルを時間別テーブルから集計し直す。
+        3. それらの日を含む月の月別テーブルを日別テーブルから集計し直す。
+
+    引数:
+        dirty: DirtySet - 登録した行の時間
+        session: mysql_ops.DbSession - 実行単位のセッション（COMMITはセッション側で行う）
+        hourly: bool - 時間別テーブルと統計テーブルも集計し直すかどうか
+                       （呼び出し元で集計の途中経過から登録する場合は False にする）
+        fetch_rows: int - 元データテーブルから1回に取得する行数
+
+    戻り値:
+        summary: dict - 集計し直した時間数・日数・月数と、統計テーブルに登録した行数
+
+    例外処理:
+        データベース操作中にエラーが発生した場合は、例外を送出する（各登録処理でエラーログを出力済み）。
+    """
+
+    summary = {"hours": 0,"days": 0,"months": 0,"rollup": {}}
+    if len(dirty) == 0:
+        return summary
+
+    day_list = dirty.get_days()
+    month_list = dirty.get_months()
+
+    # 時間別テーブルと統計テーブルを集計し直す
+    if hourly == True:
+        with metrics_ops.stage("aggregate_origin"):
+            records,rollup,row_count = aggregate_origin(day_list,session,dirty.get_hour_keys(),fetch_rows)
+        with metrics_ops.stage("db_hourly"):
+            summary["hours"] = mysql.db_UpdateInsertHourlyTableBatch(records,session)
+        with metrics_ops.stage("db_rollup"):
+            summary["rollup"] = mysql.db_UpdateRollupTables(*rollup,session)
+
+    # 日別テーブル・月別テーブルを、対象の日・月ごとに1回だけ集計し直す
+    with metrics_ops.stage("db_daily"):
+        summary["days"] = mysql.db_UpdateInsertDailyTableBatch(day_list,session)
+    with metrics_ops.stage("db_monthly"):
+        mysql.db_UpdateInsertMonthlyTableBatch(month_list,session)
+    summary["months"] = len(month_list)
+
+    # ログを出力する
+    message = f"{str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))} Recompute {len(dirty)} hours : {summary}"
+    file_util.write_log(message)
+
+    return summary
@@ -6,10 +6,15 @@
 
 # 標準ライブラリ
 import os
+import sys
+import time
+import atexit
+import threading
 import datetime as dt
 
 # 外部ライブラリ
 import file_util
+import aggregate_ops
 
 # ログディレクトリ
 LOG_DIR = "../log"
@@ -17,6 +22,14 @@ LOG_DIR = "../log"
 # 最大ログファイル数
 MAX_LOG_FILES = 366  
 
+# ログレベル（LOG_LEVEL より低いレベルのログは出力しない。本番環境では "info" にし、ファイルごと・SQLごとの詳細を出力しない）
+LOG_LEVELS = {"debug": 10,"info": 20,"error": 40}
+LOG_LEVEL = "info"
+
+# バッファに溜めるログの行数と秒数（どちらかを超えた時点でまとめてファイルに書き込む。エラーログはすぐに書き込む）
+LOG_FLUSH_LINES = 100
+LOG_FLUSH_INTERVAL = 5
+
 def getOneHourAgoDate():
 
     """
@@ -52,6 +65,43 @@ def getOneHourAgoDate():
         # 現在から1時間前の日時を計算
         oha = current_datetime - dt.timedelta(hours=1)
 
+        # 1時間前の日時を各フォーマットに変換
+        oha_date,oha_yymmddhh,oha_yyyymmdd,oha_yyyymm,oha_year,oha_month = getHourDate(oha)
+    except Exception as e:
+        # エラーログを出力する
+        error_message = f"{str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))} Error in getOneHourAgoDate: {str(e)}"
+        file_util.write_log(error_message,"error")
+
+    return oha_date,oha_yymmddhh,oha_yyyymmdd,oha_yyyymm,oha_year,oha_month
+
+def getHourDate(oha):
+
+    """
+    getHourDate 関数
+
+    概要:
+        指定された日時の日時情報を、getOneHourAgoDate と同じ複数のフォーマットで返す関数。
+
+    処理内容:
+        1. 指定された日時を複数のフォーマットに変換する。
+        2. 時単位に切り捨てた日時の文字列を作成する。
+
+    引数:
+        oha: datetime.datetime - 対象の日時
+
+    戻り値:
+        oha_date: str - 日時の文字列 (YYYY-MM-DD HH:MM)
+        oha_yymmddhh: str - YYMMddhh 形式の日時文字列
+        oha_yyyymmdd: str - YYYYMMdd 形式の日付文字列
+        oha_yyyymm: str - YYYYMM 形式の年月文字列
+        oha_year: str - YYYY 形式の年文字列
+        oha_month: str - MM 形式の月文字列
+
+    例外処理:
+        エラーが発生した場合、エラーログを出力する。
+    """
+
+    try:
         # 取得した年月日時分のフォーマットを変換
         oha_yymmddhh = oha.strftime('%y%m%d%H') # YYMMddhh形式に変換
         oha_yyyymmdd= oha.strftime('%Y%m%d') # YYYYMMdd形式に変換
@@ -68,8 +118,8 @@ def getOneHourAgoDate():
         oha_date = oha_date_time.strftime('%Y-%m-%d %H:%M') # 日時型で出力
     except Exception as e:
         # エラーログを出力する
-        error_message = f"{str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))} Error in getOneHourAgoDate: {str(e)}"
-        file_util.write_log(error_message)
+        error_message = f"{str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))} Error in getHourDate: {str(e)}"
+        file_util.write_log(error_message,"error")
 
     return oha_date,oha_yymmddhh,oha_yyyymmdd,oha_yyyymm,oha_year,oha_month
 
@@ -82,10 +132,8 @@ def getInsertDataListForDailyTable(df,date):
         pandas の DataFrame を元に、izumi_sola_daily テーブルへの INSERT 用リストを作成する関数。
 
     処理内容:
-        1. izumi_sola_daily テーブルに INSERT するためのリストを初期化する。
-        2. DataFrame の特定の列を取得し、リストに追加する。
-        3. 数値列の平均値を計算し、リストに追加する。
-        4. 日時情報をリストに追加する。
+        1. aggregate_ops.aggregate_hour で、数値列の平均値などを NumPy で一度に集計する。
+        2. 集計結果を従来どおりの INSERT 用リストに変換する。
 
     引数:
         df: pandas.DataFrame - CSV ファイルを読み込んだ DataFrame
@@ -98,42 +146,14 @@ def getInsertDataListForDailyTable(df,date):
         エラーが発生した場合、エラーログを出力する。
     """
 
+    temp_list = []
     try:
         # izumi_sola_dailyテーブルにINSERTするリストを作成
-        temp_list = []
-        temp_list.append(df.loc[0,1]) #列1(日付)
-        temp_list.append(str(df.loc[0,2])[:-2]) #列2(時間) 頭2桁を抜き出す
-        temp_list.append(round(df.iloc[:,3].mean(),4)) #列3(01-電流の平均値)
-        temp_list.append(round(df.iloc[:,4].mean(),4)) #列4(01-電圧の平均値)
-        temp_list.append(round(df.iloc[:,5].mean()/1000,4))#列5(01-発電量[kWH]の平均値)
-        temp_list.append(round(df.iloc[:,6].mean(),4)) #列6(02-電流の平均値)
-        temp_list.append(round(df.iloc[:,7].mean(),4)) #列7(02-電圧の平均値)
-        temp_list.append(round(df.iloc[:,8].mean()/1000,4)) #列8(02-発電量[kWH]の平均値)
-        temp_list.append(round(df.iloc[:,9].mean(),4)) #列9(03-電流の平均値)
-        temp_list.append(round(df.iloc[:,10].mean(),4)) #列10(03-電圧の平均値)
-        temp_list.append(round(df.iloc[:,11].mean()/1000,4)) #列11(03-発電量[kWH]の平均値)
-        temp_list.append(round(df.iloc[:,12].mean(),4)) #列12(04-電流の平均値)
-        temp_list.append(round(df.iloc[:,13].mean(),4)) #列13(04-電圧の平均値)
-        temp_list.append(round(df.iloc[:,14].mean()/1000,4)) #列14(04-発電量[kWH]の平均値)
-        temp_list.append(round(df.iloc[:,15].mean(),4)) #列15(05-電流の平均値)
-        temp_list.append(round(df.iloc[:,16].mean(),4)) #列16(05-電圧の平均値)
-        temp_list.append(round(df.iloc[:,17].mean()/1000,4)) #列17(05-発電量[kWH]の平均値)
-        temp_list.append(round(df.iloc[:,18].mean(),4)) #列18(06-電流の平均値)
-        temp_list.append(round(df.iloc[:,19].mean(),4)) #列19(06-電圧の平均値)
-        temp_list.append(round(df.iloc[:,20].mean()/1000,4)) #列20(06-発電量[kWH]の平均値)
-        temp_list.append(round(df.iloc[:,21].mean(),4)) #列21(07-電流の平均値)
-        temp_list.append(round(df.iloc[:,22].mean(),4)) #列22(07-電圧の平均値)
-        temp_list.append(round(df.iloc[:,23].mean()/1000,4)) #列23(07-発電量[kWH]の平均値)
-        temp_list.append(round(df.iloc[:,27].mean(),4)) #列24(日射量の平均値)
-        temp_list.append(round(df.iloc[:,28].mean(),4)) #列25(温度の平均値)
-        temp_list.append(df[30][df.shape[0]-1] - df[30][0]) #列26(1時間あたりの売電量[kWH])
-        temp_list.append(df[30][df.shape[0]-1]) #列27(売電量[kWH])
-        temp_list.append("'" + date + "'") #列28(観測日時)
-        temp_list.append("'" + str(dt.datetime.now().strftime('%Y-%m-%d %H:%M')) + "'") #列29(更新日時)
+        temp_list = aggregate_ops.aggregate_hour(df,date).to_insert_list()
     except Exception as e:
         # エラーログを出力する
         error_message = f"{str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))} Error in getInsertDataListForDailyTable: {str(e)}"
-        file_util.write_log(error_message)
+        file_util.write_log(error_message,"error")
 
     return temp_list
 
@@ -164,9 +184,130 @@ def create_log_directory():
     except Exception as e:
         # エラーログを出力する
         error_message = f"{str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))} Error in create_log_directory: {str(e)}"
-        file_util.write_log(error_message)
+        file_util.write_log(error_message,"error")
+
+class BufferedLogWriter:
+
+    """
+    BufferedLogWriter クラス
+
+    概要:
+        ログをメモリ上のバッファに溜め、まとめてログファイルに書き込む。
+        日ごとのログファイルは1回だけ開いて使い回し、日付が変わった場合のみ開き直す。
+        古いログファイルの削除（manage_log_files）は、ログファイルを開いたとき（実行ごと・日付が変わるごと）に1回だけ行う。
 
-def write_log(log_content):
+    処理内容:
+        1. write で、ログの行と書き込み先のファイル名をバッファに追加する。
+        2. バッファの行数が LOG_FLUSH_LINES 以上の場合、前回の書き込みから LOG_FLUSH_INTERVAL 秒以上経過した場合、
+           エラーログの場合は、その場でまとめて書き込む。
+        3. 常駐実行では start_flush_thread で、バッファに残ったログを LOG_FLUSH_INTERVAL 秒ごとに書き込む。
+        4. プロセスの終了時に close でバッファに残ったログを書き込み、ファイルを閉じる。
+
+    属性:
+        buffer (list): 書き込み前の (ログファイル名, ログの行) のリスト
+        log_filename (str): 開いているログファイル名
+        log_file (file): 開いているログファイル
+        last_flush (float): 前回書き込んだ時刻（time.monotonic）
+
+    使用方法:
+        file_util.write_log(message)            # info
+        file_util.write_log(message,"debug")    # LOG_LEVEL が "debug" の場合のみ出力する
+        file_util.write_log(error_message,"error")
+    """
+
+    def __init__(self):
+        self.buffer = []
+        self.log_filename = None
+        self.log_file = None
+        self.last_flush = time.monotonic()
+        self.lock = threading.RLock()
+        self.flush_thread = None
+        self.stop_event = threading.Event()
+
+    def write(self,log_content,flush=False):
+        # ログの行をバッファに追加し、必要な場合はまとめて書き込む
+        log_filename = dt.datetime.now().strftime("%Y%m%d.log")
+        with self.lock:
+            self.buffer.append((log_filename,log_content))
+            if flush or len(self.buffer) >= LOG_FLUSH_LINES or time.monotonic() - self.last_flush >= LOG_FLUSH_INTERVAL:
+                self._flush()
+
+    def flush(self):
+        # バッファに溜まったログを全て書き込む
+        with self.lock:
+            self._flush()
+
+    def _flush(self):
+        # バッファに溜まったログを書き込む（ロックを取得して呼び出す）
+        buffer,self.buffer = self.buffer,[]
+        self.last_flush = time.monotonic()
+        if len(buffer) == 0:
+            return
+        try:
+            for log_filename,log_content in buffer:
+                # 日付が変わった場合はログファイルを開き直す
+                if log_filename != self.log_filename:
+                    self._open(log_filename)
+                self.log_file.write(log_content + "\n")
+            self.log_file.flush()
+        except Exception as e:
+            # ログファイルに書き込めないため、標準エラー出力に出力する
+            print(f"{str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))} write_log: {str(e)}",file=sys.stderr)
+            self._close()
+
+    def _open(self,log_filename):
+        # ログファイルを開き、古いログファイルを削除する
+        self._close()
+        self.log_file = open(os.path.join(LOG_DIR,log_filename),"a")
+        self.log_filename = log_filename
+        manage_log_files()
+
+    def _close(self):
+        # 開いているログファイルを閉じる
+        if self.log_file is not None:
+            try:
+                self.log_file.close()
+            finally:
+                self.log_file = None
+                self.log_filename = None
+
+    def start_flush_thread(self,interval=LOG_FLUSH_INTERVAL):
+        # バッファに残ったログを interval 秒ごとに書き込むスレッドを開始する（常駐実行で使用する）
+        if self.flush_thread is not None:
+            return
+        def run():
+            while not self.stop_event.wait(interval):
+                self.flush()
+        self.flush_thread = threading.Thread(target=run,name="log-flush",daemon=True)
+        self.flush_thread.start()
+
+    def close(self):
+        # バッファに残ったログを書き込み、ログファイルを閉じる
+        self.stop_event.set()
+        with self.lock:
+            self._flush()
+            self._close()
+
+# プロセス内で共有するログの書き込み（終了時にバッファに残ったログを書き込む）
+_log_writer = BufferedLogWriter()
+atexit.register(_log_writer.close)
+
+def set_log_level(level):
+    # 出力するログレベルを設定する
+    global LOG_LEVEL
+    if level not in LOG_LEVELS:
+        raise ValueError(f"Unknown log level: {level}")
+    LOG_LEVEL = level
+
+def flush_log():
+    # バッファに溜まったログを全て書き込む
+    _log_writer.flush()
+
+def start_log_flush_thread(interval=LOG_FLUSH_INTERVAL):
+    # バッファに残ったログを定期的に書き込むスレッドを開始する
+    _log_writer.start_flush_thread(interval)
+
+def write_log(log_content,level="info"):
 
     """
     write_log 関数
@@ -175,29 +316,25 @@ def write_log(log_content):
         ログファイルにログを書き込む関数。
 
     処理内容:
-        1. 現在の日付を基にログファイルのパスを生成し、ログを追記する。
-        2. ログファイルの管理を行う。
+        1. ログレベルが LOG_LEVEL より低い場合は出力しない。
+        2. 現在の日付を基にしたログファイルに書き込むログとして、バッファに追加する。
+        3. バッファが一杯になった場合、一定時間が経過した場合、エラーログの場合は、まとめてログファイルに追記する
+           （ログファイルの管理は、ログファイルを開いたときのみ行う）。
 
     引数:
         log_content: str - 書き込むログの内容
+        level: str - ログレベル（"debug", "info", "error"）
 
     戻り値:
         なし
 
     例外処理:
-        エラーが発生した場合、エラーログを出力する。
+        ログファイルに書き込めない場合は、標準エラー出力にエラーを出力する。
     """
 
-    try:
-        log_filename = dt.datetime.now().strftime("%Y%m%d.log")
-        log_path = os.path.join(LOG_DIR, log_filename)
-        with open(log_path, "a") as log_file:
-            log_file.write(log_content + "\n")
-        manage_log_files()
-    except Exception as e:
-        # エラーログを出力する
-        error_message = f"{str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))} write_log: {str(e)}"
-        file_util.write_log(error_message)
+    if LOG_LEVELS.get(level,LOG_LEVELS["info"]) < LOG_LEVELS[LOG_LEVEL]:
+        return
+    _log_writer.write(log_content,level == "error")
 
 def manage_log_files():
 
@@ -233,4 +370,4 @@ def manage_log_files():
     except Exception as e:
         # エラーログを出力する
         error_message = f"{str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))} manage_log_files: {str(e)}"
-        file_util.write_log(error_message)
+        file_util.write_log(error_message,"error")
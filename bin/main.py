@@ -7,36 +7,70 @@
 # 標準ライブラリ
 import pandas as pd
 import datetime as dt
+import argparse
+import sys
 
 # 外部ライブラリ
 import mysql_ops as mysql
 import csvfile_ops as csv
 import file_util
+import backfill_ops
+import pipeline_ops
+import tail_ops
+import scheduler_ops
+import csvparse_ops
+import schema_ops
+import bulkload_ops
+import rebuild_ops
+import spool_ops
+import metrics_ops
+import profile_ops
 
 # CSVディレクトリパスの定義
 LOCAL_CSV_DIRECTORY = "../tmp"
 FTP_CSV_DIRECTORY = "/LOG"
 
-def main():
+# 常駐実行で前の時間のCSVファイルを取り込む時刻（毎時0分からの秒数）
+DAEMON_HOURLY_OFFSET = 300
+
+@metrics_ops.instrument_run("hourly")
+def main(save_csv=False,force=False,hour=None,replay=True):
 
     """
     main 関数
 
     概要:
-        FTP サーバーからCSVファイルをダウンロードし、それをDBに登録する処理を行う。
+        FTP サーバーからCSVファイルを取得し、それをDBに登録する処理を行う。
 
     処理内容:
         1. ログディレクトリを作成する。
-        2. FTPサーバーから直近1時間前のCSVファイルをダウンロードする。
-        3. CSVファイルのダウンロードが成功した場合は、以下の処理を実行する:
-            - CSVファイルをpandasで読み込む。
-            - 元データテーブルにデータをUPDATE-INSERTする。
-            - 時間別テーブルにINSERTするデータを取得する。
-            - 時間別テーブルにデータをUPDATE-INSERTする。
-            - 日別テーブルにデータを集計しUPDATE-INSERTする。
-            - 月別テーブルにデータを集計しUPDATE-INSERTする。
-            - ダウンロードしたCSVファイルを削除する。
-        4. CSVファイルのダウンロードが失敗した場合は、エラーログを出力する。
+        2. FTPサーバーから直近1時間前（hour を指定した場合はその時間）のCSVファイルをメモリ上に取得する（ローカルには保存しない）。
+           前回取り込んだときからサイズ・更新日時が変わっていない場合は取得しない。
+        3. CSVファイルの取得が成功した場合は、以下の処理を実行する:
+            - 調査用の保存が指定されている場合は、CSVファイルをローカルに保存する。
+            - 取得したCSVファイルの内容をpandasで読み込む。
+            - 前回取り込んだときから内容の変わった行が無い場合は登録しない。
+            - 内容の変わった行をスプール（spool_ops）に追記する。
+            - スプールに溜まった全ての行（DBに接続できなかった間の行を含む）を、書き込んだ順に以下のように登録し、
+              spool_ops.SPOOL_REPLAY_COMMIT_BATCHES 件（CSVファイルの件数）ごとにCOMMITする:
+                - 元データテーブルに行をUPDATE-INSERTする。
+                - 行の時間の時間別テーブルと時間別・日別・月別の統計テーブルを、元データテーブルから集計し直す。
+                - その時間を含む日の日別テーブル、その日を含む月の月別テーブルを集計し直す。
+            - COMMITに成功した場合は、取り込んだファイルの情報を保存する。
+              DBに登録できなかった場合は、COMMITしていない行をスプールに残し、次回の登録時にまとめて登録する
+              （残っている間は、残っているバッチ数と最も古いバッチの日時を実行ごとにエラーログに出力する）。
+        4. CSVファイルの取得が失敗した場合は、エラーログを出力する。
+        5. 各処理・SQL・FTPの処理時間と件数を metrics_ops で計測し、実行ごとに metrics_ops.METRICS_DIRECTORY に書き出す。
+
+    引数:
+        save_csv: bool - 取得したCSVファイルを調査用に LOCAL_CSV_DIRECTORY に保存するかどうか
+        force: bool - 前回取り込んだときから変更の無いファイル・行も登録し直すかどうか
+        hour: datetime.datetime - 取り込む時間（None の場合は1時間前。常駐実行で失敗した時間を再実行する場合に指定する）
+        replay: bool - 起動時のテーブルの確認に成功したかどうか（False の場合は、登録の前にテーブルを確認し直し、
+                       失敗した場合はスプールに書き込むだけにする）
+
+    戻り値:
+        bool - 取り込みの成功/失敗を示す真偽値（変更が無くスキップした場合、スプールに書き込んだ場合も成功とする）
 
     利用するライブラリ:
         - pandas: CSVファイルの読み込みに使用。
@@ -44,11 +78,13 @@ def main():
 
     依存するモジュール:
         - mysql_ops: MySQLデータベース操作用のモジュール。
-        - csvfile_ops: CSVファイルのダウンロードと削除用のモジュール。
+        - csvfile_ops: CSVファイルの取得用のモジュール。
         - file_util: ログディレクトリ作成、ログ出力、日時操作用のユーティリティモジュール。
+        - spool_ops: DBに登録する前の行を書き込むスプール用のモジュール。
+        - metrics_ops: 処理時間と件数の計測用のモジュール。
 
     定数:
-        - LOCAL_CSV_DIRECTORY: ローカルにダウンロードするCSVファイルの保存先ディレクトリ。
+        - LOCAL_CSV_DIRECTORY: 調査用にCSVファイルを保存する場合の保存先ディレクトリ。
         - FTP_CSV_DIRECTORY: FTPサーバー上のCSVファイルの保存先ディレクトリ。
 
     使用方法:
@@ -56,6 +92,7 @@ def main():
 
     例外処理:
         - CSVファイルのダウンロードやDBへの登録処理でエラーが発生した場合は、詳細なエラーメッセージをログに出力する。
+        - DBへの登録処理のいずれかが失敗した場合は、前回のCOMMIT以降の全テーブルの登録をロールバックし、行をスプールに残す。
     """
 
     # ログディレクトリを作成
@@ -63,46 +100,303 @@ def main():
 
     # 1時間前の日時型データ、YYYYMMddhh形式データ、YYYYMMdd形式データ、
     # YYYYMM形式データ、YYYY形式データ、hh形式データを取得
-    oha_date,oha_yymmddhh,oha_yyyymmdd,oha_yyyymm,oha_year,oha_month = file_util.getOneHourAgoDate()
+    if hour is None:
+        oha_date,oha_yymmddhh,oha_yyyymmdd,oha_yyyymm,oha_year,oha_month = file_util.getOneHourAgoDate()
+    else:
+        oha_date,oha_yymmddhh,oha_yyyymmdd,oha_yyyymm,oha_year,oha_month = file_util.getHourDate(hour)
 
     # FTPサーバーのディレクトリ情報を取得
     directory = f"{FTP_CSV_DIRECTORY}/{oha_year}"
     filename = f"{oha_yymmddhh}.CSV"
 
-    # FTPサーバーからCSVファイルをダウンロードする
-    csv_download_successful = csv.download_csv_file(directory,filename,LOCAL_CSV_DIRECTORY)
-
-    # CSVファイルのダウンロードに成功した場合はDBに登録する
-    if csv_download_successful == True:
+    # 前回取り込んだときからサイズ・更新日時が変わっていない場合は取得しない
+    manifest = csv.get_ftp_manifest()
+    size,modify = csv.stat_csv_file(directory,filename)
+    if force == False and manifest.is_unchanged(directory,filename,size,modify):
+        message = f"{str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))} Unchanged, skipped: {directory}/{filename}"
+        file_util.write_log(message)
+        return True
 
-        # ダウンロードしたCSVファイルのパスを取得
-        csv_file = LOCAL_CSV_DIRECTORY + "/" + filename
+    # FTPサーバーからCSVファイルをメモリ上に取得する
+    csv_data = csv.fetch_csv_file(directory,filename)
 
-        # CSVファイルをpandasで読み込む
-        csv_df = pd.read_csv(csv_file,header=None)
+    # CSVファイルの取得に成功した場合はDBに登録する
+    if csv_data is not None:
 
-        # 元データテーブルにINSERTする
-        mysql.db_UpdateInsertOriginTable(csv_df,oha_yymmddhh)
+        # 調査用に指定された場合のみCSVファイルをローカルに保存する
+        if save_csv == True:
+            csv.save_csv_data(csv_data,LOCAL_CSV_DIRECTORY,filename)
 
-        # 時間別テーブルにINSERTするリストを取得
-        insert_data_list = file_util.getInsertDataListForDailyTable(csv_df,oha_date)
+        # 取得したCSVファイルの内容をpandasで読み込む
+        with metrics_ops.stage("parse"):
+            csv_df = csvparse_ops.read_logger_csv(csv_data)
+        metrics_ops.count("csv_rows",len(csv_df))
 
-        # 作成したリストを時間別テーブルにUPDATE-INSERTする
-        mysql.db_UpdateInsertHourlyTable(insert_data_list)
+        # 前回取り込んだときから内容の変わった行だけを元データテーブルに登録する
+        with metrics_ops.stage("diff"):
+            content_hash = csv.get_content_hash(csv_data)
+            row_hashes = csv.get_row_hashes(csv_df)
+            if force == False:
+                csv_df = manifest.get_changed_rows(directory,filename,csv_df,row_hashes)
+        metrics_ops.count("changed_rows",len(csv_df))
+        if len(csv_df) == 0:
+            manifest.update(directory,filename,size,modify,content_hash,row_hashes)
+            manifest.save()
+            message = f"{str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))} Unchanged, skipped: {directory}/{filename}"
+            file_util.write_log(message)
+            return True
 
-        # 時間別テーブルのデータを集計し日別テーブルにUPDATE-INSERTする
-        mysql.db_UpdateInsertDailyTable(oha_yyyymmdd)
+        try:
+            # 内容の変わった行をスプールに書き込む（DBに接続できなくても、この時点で行は失われない）
+            with metrics_ops.stage("spool_append"):
+                spool_ops.append_batch(oha_yymmddhh,csv_df,(directory,filename,size,modify,content_hash,row_hashes))
+        except Exception:
+            # エラーログは append_batch で出力済み（取り込み済みとして記録しないため、再実行で取り込み直す）
+            return False
 
-        # 日別テーブルのデータを集計し月別データにUPDATE-INSERTする
-        mysql.db_UpdateInsertMonthlyTable(oha_yyyymm)
+        # スプールに溜まった行（DBに接続できなかった間の行を含む）をまとめてDBに登録する
+        with metrics_ops.stage("replay"):
+            if replay == False:
+                # 起動時にテーブルが定義どおりでなかった場合（DBに接続できなかった場合を含む）は、登録の前に確認し直す
+                replay = schema_ops.ensure_schema()
+            summary = spool_ops.replay() if replay == True else {"committed": False}
+        if summary["committed"] == False:
+            # DBに登録できなかった行はスプールに残り、次回の登録時にまとめて登録する（ダウンロードし直さない）。
+            # 登録できない状態が続いていることに気付けるよう、残っている間は実行ごとにエラーログを出力する
+            batch_count,oldest_spooled = spool_ops.get_pending_status()
+            reason = "schema is not ready" if replay == False else "replay did not commit"
+            error_message = f"{str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))} Spooled {filename}, {batch_count} batches are waiting for the database since {oldest_spooled} ({reason})"
+            file_util.write_log(error_message,"error")
 
-        # ダウンロードしたCSVファイルを削除
-        csv.delete_csv_file(csv_file)
+        return True
 
     else:
         # エラーログを出力する
         error_message = f"{str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))} Failed to CSV Download"
-        file_util.write_log(error_message)
+        file_util.write_log(error_message,"error")
+
+        return False
+
+def run_daemon(save_csv=False,tail=False,tail_interval=tail_ops.TAIL_POLL_INTERVAL):
+
+    """
+    run_daemon 関数
+
+    概要:
+        常駐して、毎時 DAEMON_HOURLY_OFFSET 秒に前の時間のCSVファイルを取り込む関数。
+        cronで1時間ごとに起動する場合と異なり、ライブラリの読み込み、DB・FTPの接続プール、
+        取り込み済みファイルの情報を実行のたびに作り直さない。
+
+    処理内容:
+        1. ログディレクトリを作成し、バッファのログを定期的に書き込むスレッドと、FTP接続を切らさないようにNOOPを送るスレッドを起動する。
+        2. 毎時の取り込みジョブを登録する。失敗した時間は待ち時間を倍にしながら再実行する。
+        3. スプールに溜まった行を SPOOL_REPLAY_INTERVAL 秒ごとに登録するジョブを登録する。
+        4. tail が指定された場合は、書き込み中のCSVファイルの追記分を取り込むジョブも登録する。
+        5. 停止（SIGTERM または Ctrl+C）するまでジョブを実行する。
+           各ジョブの直近の実行時間と結果は scheduler_ops.SCHEDULER_STATUS_FILE に書き出す。
+
+    引数:
+        save_csv: bool - 取得したCSVファイルを調査用に LOCAL_CSV_DIRECTORY に保存するかどうか
+        tail: bool - 書き込み中のCSVファイルの追記分を取り込むジョブも実行するかどうか
+        tail_interval: int - 追記分を取り込む間隔（秒）
+
+    戻り値:
+        なし
+
+    例外処理:
+        ジョブのエラーは scheduler_ops.ScheduledJob 内でログに出力し、常駐を継続する。
+        起動時にテーブルを確認できなかった場合（DBの障害中など）も常駐し、毎時の取り込みは行をスプールに書き込み、
+        スプールの登録・追記分の取り込みの前にテーブルを確認し直す（schema_ops.ensure_schema）。
+    """
+
+    file_util.create_log_directory()
+    file_util.start_log_flush_thread()
+    csv.get_ftp_session_pool().start_keepalive_thread()
+
+    scheduler = scheduler_ops.Scheduler()
+
+    # 毎時の取り込みジョブ（実行時刻の1時間前のCSVファイルを取り込む。再実行時も同じ時間を取り込む）
+    # テーブルを確認できていない間（DBの障害中など）は行をスプールに書き込み、登録の前にテーブルを確認し直す
+    def hourly_job(scheduled):
+        return main(save_csv,False,scheduled - dt.timedelta(hours=1),schema_ops.is_schema_ready())
+    scheduler.add_job("hourly",hourly_job,3600,DAEMON_HOURLY_OFFSET)
+
+    # スプールの登録ジョブ（DBに接続できなかった間に溜まった行を、接続が戻り次第まとめて登録する）
+    @metrics_ops.instrument_run("spool")
+    def spool_job(scheduled):
+        if schema_ops.ensure_schema() == False:
+            return False
+        summary = spool_ops.replay()
+        return summary["committed"] or summary["files"] == 0
+    scheduler.add_job("spool",spool_job,spool_ops.SPOOL_REPLAY_INTERVAL,0,retry=False)
+
+    # 追記分の取り込みジョブ（失敗した分は次回の確認で取り込み直すため再実行しない）
+    if tail == True:
+        ingestor = tail_ops.TailIngestor(FTP_CSV_DIRECTORY)
+        def tail_job(scheduled):
+            if schema_ops.ensure_schema() == False:
+                return False
+            ingestor.poll(scheduled)
+            return True
+        scheduler.add_job("tail",tail_job,tail_interval,0,retry=False)
+
+    scheduler.run_forever()
+
+def parse_hour(value):
+
+    """
+    parse_hour 関数
+
+    概要:
+        コマンドライン引数の YYYYMMDDHH 形式の文字列を日時に変換する関数。
+
+    引数:
+        value: str - YYYYMMDDHH 形式の文字列
+
+    戻り値:
+        datetime.datetime - 変換した日時
+
+    例外処理:
+        形式が正しくない場合は argparse.ArgumentTypeError を送出する。
+    """
+
+    try:
+        return dt.datetime.strptime(value,'%Y%m%d%H')
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid hour (expected YYYYMMDDHH): {value}")
+
+def parse_date(value):
+
+    """
+    parse_date 関数
+
+    概要:
+        コマンドライン引数の YYYYMMDD 形式の文字列を日付に変換する関数。
+
+    引数:
+        value: str - YYYYMMDD 形式の文字列
+
+    戻り値:
+        datetime.date - 変換した日付
+
+    例外処理:
+        形式が正しくない場合は argparse.ArgumentTypeError を送出する。
+    """
+
+    try:
+        return dt.datetime.strptime(value,'%Y%m%d').date()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid date (expected YYYYMMDD): {value}")
+
+def parse_args(argv=None):
+
+    """
+    parse_args 関数
+
+    概要:
+        コマンドライン引数を解析する関数。
+        引数を指定しない場合は、従来どおり1時間前のCSVファイルを1件取り込む。
+
+    引数:
+        argv: list - コマンドライン引数（None の場合は sys.argv を使用する）
+
+    戻り値:
+        argparse.Namespace - 解析したコマンドライン引数
+
+    例外処理:
+        引数が正しくない場合は argparse がエラーメッセージを出力して終了する。
+    """
+
+    parser = argparse.ArgumentParser(description="izumi solar power CSV ingest")
+    parser.add_argument("--backfill",nargs=2,metavar=("START","END"),type=parse_hour,
+                        help="ingest every hour from START to END (YYYYMMDDHH, inclusive)")
+    parser.add_argument("--bulk-load",metavar="DIRECTORY",
+                        help="bulk load every YYMMDDHH.CSV file under DIRECTORY into the origin table through a staging table")
+    parser.add_argument("--bulk-range",nargs=2,metavar=("START","END"),type=parse_hour,
+                        help="with --bulk-load, only load files from START to END (YYYYMMDDHH, inclusive)")
+    parser.add_argument("--rebuild-rollups",nargs=2,metavar=("START","END"),type=parse_date,
+                        help="recompute the hourly/daily/monthly and statistics tables from the origin table for START to END (YYYYMMDD, inclusive)")
+    parser.add_argument("--rebuild-workers",type=int,default=rebuild_ops.REBUILD_WORKERS,
+                        help="number of months recomputed in parallel by --rebuild-rollups")
+    parser.add_argument("--daemon",action="store_true",
+                        help="stay resident and ingest the previous hour every hour (with --tail, also poll the current hour)")
+    parser.add_argument("--tail",action="store_true",
+                        help="keep polling the current hour's CSV file and ingest appended rows")
+    parser.add_argument("--tail-interval",type=int,default=tail_ops.TAIL_POLL_INTERVAL,
+                        help="seconds between polls in --tail mode")
+    parser.add_argument("--ftp-connections",type=int,default=backfill_ops.BACKFILL_FTP_CONNECTIONS,
+                        help="number of FTP connections used by --backfill")
+    parser.add_argument("--parse-workers",type=int,default=backfill_ops.BACKFILL_PARSE_WORKERS,
+                        help="number of parse worker processes used by --backfill (1: parse in a thread of the pipeline)")
+    parser.add_argument("--save-csv",action="store_true",
+                        help=f"also save fetched CSV files to {LOCAL_CSV_DIRECTORY} for debugging")
+    parser.add_argument("--force",action="store_true",
+                        help="re-ingest files and rows even if they are unchanged since the last run")
+    parser.add_argument("--replay-spool",action="store_true",
+                        help="register the rows left in the local spool while the database was unreachable and exit")
+    parser.add_argument("--migrate",action="store_true",
+                        help="apply pending schema migrations, check the tables and exit (other runs only migrate when the recorded schema version is behind)")
+    parser.add_argument("--db-backend",choices=["mysql","sqlite"],default=mysql.DB_BACKEND,
+                        help="storage backend (sqlite: local file for testing and benchmarking without a MySQL server)")
+    parser.add_argument("--sqlite-path",default=mysql.SQLITE_PATH,
+                        help="SQLite database file used with --db-backend sqlite")
+    parser.add_argument("--profile",action="store_true",
+                        help=f"profile each stage (FTP, parse, aggregation, every SQL) with cProfile and write the results under {profile_ops.PROFILE_DIRECTORY}")
+    parser.add_argument("--profile-memory",action="store_true",
+                        help="with --profile, also record the peak memory of each stage with tracemalloc (slower)")
+    parser.add_argument("--log-level",choices=list(file_util.LOG_LEVELS),default=file_util.LOG_LEVEL,
+                        help="lowest log level written to the log file (debug: also per-file and per-statement details)")
+    parser.add_argument("--report-interval",type=int,default=pipeline_ops.PIPELINE_REPORT_INTERVAL,
+                        help="log per-stage queue depth and latency every N seconds during --backfill (0: only at the end)")
+    return parser.parse_args(argv)
 
 if __name__ == '__main__':
-    main()
+    args = parse_args()
+
+    # 出力するログレベルと使用するストレージを設定する
+    file_util.set_log_level(args.log_level)
+    mysql.set_backend(args.db_backend,args.sqlite_path)
+
+    # 指定された場合は、毎時の取り込みをステージごとにプロファイルする
+    if args.profile == True:
+        metrics_ops.enable_profiling(args.profile_memory)
+
+    # 適用済みのバージョンが古い場合（--migrate の場合は常に）は、未適用のマイグレーションを適用し、テーブルが定義どおりか確認する
+    file_util.create_log_directory()
+    schema_ready = schema_ops.prepare_schema(args.migrate)
+
+    if args.migrate == True:
+        # マイグレーションと確認のみ行う
+        sys.exit(0 if schema_ready else 1)
+
+    # スプールの登録・バックフィル・一括取り込み・集計し直しは、テーブルが定義どおりでない場合（DBに接続できない場合を含む）は
+    # 登録せずに終了する。通常実行・常駐実行・追記分の取り込みは、DBの障害中も起動して行をスプールに書き込み、
+    # 登録の前にテーブルを確認し直して、DBに登録できるようになってから登録する
+    batch_run = (args.replay_spool or args.backfill is not None or args.bulk_load is not None
+                 or args.rebuild_rollups is not None)
+    if schema_ready == False and batch_run == True:
+        sys.exit(1)
+
+    if args.replay_spool == True:
+        # スプールに溜まった行をまとめて登録する
+        spool_ops.replay()
+    elif args.backfill is not None:
+        # 指定された期間のCSVファイルをまとめて取り込む
+        save_directory = LOCAL_CSV_DIRECTORY if args.save_csv else None
+        backfill_ops.backfill(args.backfill[0],args.backfill[1],FTP_CSV_DIRECTORY,
+                              args.ftp_connections,args.parse_workers,args.report_interval,save_directory,args.force)
+    elif args.bulk_load is not None:
+        # ディレクトリ内のCSVファイルを元データテーブルに一括で取り込む
+        start_hour,end_hour = args.bulk_range if args.bulk_range is not None else (None,None)
+        bulkload_ops.bulk_load(args.bulk_load,start_hour,end_hour)
+    elif args.rebuild_rollups is not None:
+        # 元データテーブルから指定期間の集計テーブルを集計し直す
+        rebuild_ops.rebuild_rollups(args.rebuild_rollups[0],args.rebuild_rollups[1],args.rebuild_workers)
+    elif args.daemon == True:
+        # 常駐して毎時の取り込み（と追記分の取り込み）を実行する
+        run_daemon(args.save_csv,args.tail,args.tail_interval)
+    elif args.tail == True:
+        # 書き込み中の現在時刻のCSVファイルの追記分を取り込み続ける
+        tail_ops.run_tail(FTP_CSV_DIRECTORY,args.tail_interval)
+    else:
+        main(args.save_csv,args.force,replay=schema_ready)
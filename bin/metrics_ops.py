@@ -0,0 +1,290 @@
+# -----------------------------------------------------------------------------
+# 会社名: 湘南技術センター株式会社
+# 名前: 塩見 和則
+# 作成日: 2026/10/18
+# -----------------------------------------------------------------------------
+
+# 標準ライブラリ
+import os
+import re
+import json
+import time
+import functools
+import threading
+import contextlib
+import datetime as dt
+
+# 外部ライブラリ
+import file_util
+import profile_ops
+
+# 実行ごとの計測結果を書き出すディレクトリ
+# （YYYYMMDD.jsonl に1実行1行のJSONを追記し、izumi_sola_<実行名>.prom を node_exporter の textfile collector 用に置き換える）
+METRICS_DIRECTORY = "../log/metrics"
+
+# Prometheus のメトリクス名の接頭辞
+METRICS_PREFIX = "izumi_sola"
+
+# 最大JSONファイル数（日ごと）
+MAX_METRICS_FILES = 366
+
+class RunMetrics:
+
+    """
+    RunMetrics クラス
+
+    概要:
+        1回の実行（毎時の取り込み、スプールの登録など）の、ステージごとの処理時間と件数（行数・バイト数・DBの往復回数）を集計する。
+        処理時間は perf_counter の差を合計するだけにし、常に計測したままでも処理時間に影響しないようにする。
+        バックフィルなどのスレッドから同時に記録できるように、記録はロックを取得して行う。
+
+    属性:
+        run_name (str): 実行名（"hourly", "spool" など）
+        started (str): 開始日時
+        stages (dict): ステージ名 -> [回数, 合計秒数, 最大秒数]
+        counters (dict): 件数名 -> 件数
+        profiler (profile_ops.RunProfiler): ステージごとのプロファイル（プロファイルしない場合は None）
+
+    使用方法:
+        with metrics_ops.stage("ftp_fetch"):
+            csv_data = csv.fetch_csv_file(directory,filename)
+        metrics_ops.count("ftp_bytes",len(csv_data))
+    """
+
+    def __init__(self,run_name):
+        self.run_name = run_name
+        self.started = dt.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        self.start_time = time.perf_counter()
+        self.stages = {}
+        self.counters = {}
+        self.profiler = None
+        self.lock = threading.Lock()
+
+    def add_stage(self,name,elapsed):
+        # ステージの処理時間を記録する
+        with self.lock:
+            stage_stats = self.stages.get(name)
+            if stage_stats is None:
+                self.stages[name] = [1,elapsed,elapsed]
+            else:
+                stage_stats[0] += 1
+                stage_stats[1] += elapsed
+                if elapsed > stage_stats[2]:
+                    stage_stats[2] = elapsed
+
+    def add_count(self,name,value=1):
+        # 件数を加算する
+        with self.lock:
+            self.counters[name] = self.counters.get(name,0) + value
+
+    def get_stats(self):
+        # 計測結果を取得する
+        with self.lock:
+            return {
+                "run": self.run_name,
+                "started": self.started,
+                "elapsed_sec": round(time.perf_counter() - self.start_time,4),
+                "stages": {name: {"calls": calls,"total_sec": round(total_sec,4),"max_sec": round(max_sec,4)}
+                           for name,(calls,total_sec,max_sec) in self.stages.items()},
+                "counters": dict(self.counters),
+            }
+
+# 記録先の実行（start_run で切り替える。実行の外の記録は次の start_run で破棄する）
+_current_run = RunMetrics("idle")
+
+# プロファイルの設定（None の場合はプロファイルしない。{"memory": tracemalloc でメモリ使用量も記録するかどうか}）
+_profile_options = None
+
+def enable_profiling(memory=False):
+    # 以降の実行をステージごとにプロファイルする
+    global _profile_options
+    _profile_options = {"memory": memory}
+
+def start_run(run_name):
+    # 新しい実行の計測を開始する
+    global _current_run
+    run = RunMetrics(run_name)
+    if _profile_options is not None:
+        run.profiler = profile_ops.RunProfiler(run_name,_profile_options["memory"])
+    _current_run = run
+    return run
+
+@contextlib.contextmanager
+def stage(name):
+    # with ブロックの処理時間をステージの処理時間として記録する（例外の場合も記録する）
+    # （プロファイルしない場合は、profiler の確認以外の処理を追加しない）
+    run = _current_run
+    profiling = run.profiler is not None and run.profiler.enter(name)
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start_time
+        if profiling:
+            run.profiler.exit()
+        run.add_stage(name,elapsed)
+
+def count(name,value=1):
+    # 件数を加算する
+    _current_run.add_count(name,value)
+
+@functools.lru_cache(maxsize=256)
+def get_sql_stage(sql):
+    # SQLの種類と対象のテーブルからステージ名を作成する（例: sql_insert_izumi_sola_origin）
+    verb = sql.split(None,1)[0].lower() if sql.strip() != "" else "unknown"
+    match = re.search(r"\b(?:INTO|FROM|UPDATE|TABLE|ON)\s+(?:IF NOT EXISTS\s+)?(\w+)",sql,re.IGNORECASE)
+    return f"sql_{verb}_{match.group(1)}" if match else f"sql_{verb}"
+
+class MetricsCursor:
+
+    """
+    MetricsCursor クラス
+
+    概要:
+        DBのカーソルを包み、SQLの実行（execute / executemany）と行の取得（fetchmany）ごとに、
+        SQLの種類・テーブルごとの処理時間とDBとの往復回数を記録する。それ以外の属性は元のカーソルのものを使用する。
+
+    属性:
+        cursor: 元のカーソル
+    """
+
+    def __init__(self,cursor):
+        self.cursor = cursor
+
+    def __getattr__(self,name):
+        return getattr(self.cursor,name)
+
+    def __iter__(self):
+        return iter(self.cursor)
+
+    def execute(self,sql,*args,**kwargs):
+        with stage(get_sql_stage(sql)):
+            result = self.cursor.execute(sql,*args,**kwargs)
+        count("db_round_trips")
+        return result
+
+    def executemany(self,sql,*args,**kwargs):
+        # 複数行の INSERT は1つのSQLにまとめて送信されるため、1回の往復として数える
+        with stage(get_sql_stage(sql)):
+            result = self.cursor.executemany(sql,*args,**kwargs)
+        count("db_round_trips")
+        return result
+
+    def fetchmany(self,*args,**kwargs):
+        # サーバー側のカーソルは取得ごとにDBと往復する
+        with stage("sql_fetch"):
+            rows = self.cursor.fetchmany(*args,**kwargs)
+        count("db_round_trips")
+        count("db_fetched_rows",len(rows))
+        return rows
+
+def write_json(stats,metrics_directory=METRICS_DIRECTORY):
+    # 計測結果を日ごとのJSONファイルに1行で追記する（日付が変わって新しいファイルを作る場合のみ古いファイルを削除する）
+    json_path = os.path.join(metrics_directory,dt.datetime.now().strftime("%Y%m%d.jsonl"))
+    new_file = not os.path.exists(json_path)
+    with open(json_path,'a',encoding='utf-8') as json_file:
+        json_file.write(json.dumps(stats,ensure_ascii=False) + "\n")
+    if new_file:
+        json_files = sorted(f for f in os.listdir(metrics_directory) if f.endswith('.jsonl'))
+        for json_name in json_files[:max(0,len(json_files) - MAX_METRICS_FILES)]:
+            os.remove(os.path.join(metrics_directory,json_name))
+
+def get_prometheus_text(stats):
+    # 計測結果を Prometheus のテキスト形式に変換する
+    run_label = f'run="{stats["run"]}"'
+    metrics = [
+        ("run_success","gauge","Whether the last run succeeded (1) or failed (0).",[(run_label,1 if stats["success"] else 0)]),
+        ("run_duration_seconds","gauge","Wall time of the last run.",[(run_label,stats["elapsed_sec"])]),
+        ("run_last_timestamp_seconds","gauge","Unix time when the last run finished.",[(run_label,round(time.time(),3))]),
+        ("stage_seconds","gauge","Total seconds spent in each stage during the last run.",
+         [(f'{run_label},stage="{name}"',values["total_sec"]) for name,values in stats["stages"].items()]),
+        ("stage_max_seconds","gauge","Longest single call of each stage during the last run.",
+         [(f'{run_label},stage="{name}"',values["max_sec"]) for name,values in stats["stages"].items()]),
+        ("stage_calls","gauge","Number of calls of each stage during the last run.",
+         [(f'{run_label},stage="{name}"',values["calls"]) for name,values in stats["stages"].items()]),
+        ("count","gauge","Rows, bytes and round trips counted during the last run.",
+         [(f'{run_label},name="{name}"',value) for name,value in stats["counters"].items()]),
+    ]
+    lines = []
+    for metric_name,metric_type,help_text,samples in metrics:
+        lines.append(f"# HELP {METRICS_PREFIX}_{metric_name} {help_text}")
+        lines.append(f"# TYPE {METRICS_PREFIX}_{metric_name} {metric_type}")
+        lines += [f"{METRICS_PREFIX}_{metric_name}{{{labels}}} {value}" for labels,value in samples]
+    return "\n".join(lines) + "\n"
+
+def write_prometheus(stats,metrics_directory=METRICS_DIRECTORY):
+    # textfile collector が書き込み途中のファイルを読まないように、一時ファイルに書き込んでから置き換える
+    prom_path = os.path.join(metrics_directory,f"{METRICS_PREFIX}_{stats['run']}.prom")
+    tmp_path = f"{prom_path}.tmp"
+    with open(tmp_path,'w',encoding='utf-8') as prom_file:
+        prom_file.write(get_prometheus_text(stats))
+    os.replace(tmp_path,prom_path)
+
+def finish_run(success,metrics_directory=METRICS_DIRECTORY):
+
+    """
+    finish_run 関数
+
+    概要:
+        実行の計測を終了し、計測結果をJSONファイルと Prometheus の textfile collector 用のファイルに書き出す関数。
+        プロファイルしている場合は、ステージごとのプロファイルも書き出す（profile_ops.RunProfiler.finish）。
+
+    引数:
+        success: bool - 実行が成功したかどうか
+        metrics_directory: str - 計測結果を書き出すディレクトリ
+
+    戻り値:
+        stats: dict - 計測結果（実行名、開始日時、処理時間、ステージごとの回数・合計秒数・最大秒数、件数、成功したかどうか、
+                      プロファイルした場合はプロファイルを書き出したディレクトリ）
+
+    例外処理:
+        書き出しに失敗した場合は、エラーログを出力する（取り込みの結果には影響させない）。
+    """
+
+    stats = _current_run.get_stats()
+    stats["success"] = bool(success)
+    if _current_run.profiler is not None:
+        stats["profile"] = _current_run.profiler.finish()
+    try:
+        os.makedirs(metrics_directory,exist_ok=True)
+        write_json(stats,metrics_directory)
+        write_prometheus(stats,metrics_directory)
+    except Exception as e:
+        # エラーログを出力する
+        error_message = f"{str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))} Error in finish_run: {str(e)}"
+        file_util.write_log(error_message,"error")
+
+    return stats
+
+def instrument_run(run_name):
+
+    """
+    instrument_run 関数
+
+    概要:
+        関数の実行ごとに計測を開始し、終了時に計測結果を書き出すデコレーター。
+        関数の戻り値が真の場合を成功とし、例外の場合は失敗として書き出してから例外を送出する。
+
+    引数:
+        run_name: str - 実行名
+
+    戻り値:
+        デコレーター
+
+    使用方法:
+        @metrics_ops.instrument_run("hourly")
+        def main(...):
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args,**kwargs):
+            start_run(run_name)
+            result = False
+            try:
+                result = func(*args,**kwargs)
+                return result
+            finally:
+                finish_run(result)
+        return wrapper
+    return decorator
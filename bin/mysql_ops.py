@@ -8,8 +8,12 @@
 import datetime as dt
 
 # 外部ライブラリ
-import mysql.connector
+import numpy as np
 import file_util
+import storage_ops
+import metrics_ops
+import aggregate_ops
+import rollup_ops
 
 # DB接続情報
 DB_HOST = "XXX.XXX.XXX.XXX"
@@ -17,19 +21,117 @@ DB_USER = "XXX"
 DB_PASSWORD = "XXX"
 DB_DATABASE = "XXX"
 
+# コネクションプールの設定
+DB_POOL_NAME = "izumi_sola_pool"
+DB_POOL_SIZE = 5
+
+# 使用するストレージ（"mysql": MySQL、"sqlite": ローカルのSQLiteファイル。動作確認・ベンチマーク用）
+DB_BACKEND = "mysql"
+SQLITE_PATH = "../db/izumi_sola.sqlite3"
+
 # テーブル名
 ORIGIN_TABLE_NAME = "izumi_sola_origin"
 HOURLY_TABLE_NAME = "izumi_sola_hourly"
 DAILY_TABLE_NAME = "izumi_sola_daily"
 MONTHLY_TABLE_NAME = "izumi_sola_monthly"
 
+# 一括取り込み（bulkload_ops）で元データテーブルにマージする前に読み込むステージングテーブル
+ORIGIN_STAGING_TABLE_NAME = "izumi_sola_origin_staging"
+
+# 元データテーブルの列名（CSVファイルの列順 + 観測日時 + 更新日時）
+ORIGIN_KEY_COLUMNS = ["GENBA_CD", "KANSOKU_DATE_INT", "KANSOKU_TIME_INT"]
+ORIGIN_VALUE_COLUMNS = [
+    "DENRYU_01", "DENATSU_01", "HATSUDEN_01_kWH",
+    "DENRYU_02", "DENATSU_02", "HATSUDEN_02_kWH",
+    "DENRYU_03", "DENATSU_03", "HATSUDEN_03_kWH",
+    "DENRYU_04", "DENATSU_04", "HATSUDEN_04_kWH",
+    "DENRYU_05", "DENATSU_05", "HATSUDEN_05_kWH",
+    "DENRYU_06", "DENATSU_06", "HATSUDEN_06_kWH",
+    "DENRYU_07", "DENATSU_07", "HATSUDEN_07_kWH",
+    "DENRYU_08", "DENATSU_08", "HATSUDEN_08_kWH",
+    "NISSYA", "TEMP", "ERROR_CD", "BAIDEN",
+    "KANSOKU_DATETIME", "UPDATE_DATETIME"
+]
+ORIGIN_COLUMNS = ORIGIN_KEY_COLUMNS + ORIGIN_VALUE_COLUMNS
+
+# 時間別テーブルの列名（file_util.getInsertDataListForDailyTable のリストの順）
+HOURLY_KEY_COLUMNS = ["KANSOKU_DATE_INT", "KANSOKU_TIME_INT"]
+HOURLY_VALUE_COLUMNS = [
+    "DENRYU_01", "DENATSU_01", "HATSUDEN_01_kWH",
+    "DENRYU_02", "DENATSU_02", "HATSUDEN_02_kWH",
+    "DENRYU_03", "DENATSU_03", "HATSUDEN_03_kWH",
+    "DENRYU_04", "DENATSU_04", "HATSUDEN_04_kWH",
+    "DENRYU_05", "DENATSU_05", "HATSUDEN_05_kWH",
+    "DENRYU_06", "DENATSU_06", "HATSUDEN_06_kWH",
+    "DENRYU_07", "DENATSU_07", "HATSUDEN_07_kWH",
+    "NISSYA_AVG", "TEMP_AVG", "BAIDEN_HOURLY", "BAIDEN",
+    "KANSOKU_DATETIME", "UPDATE_DATETIME"
+]
+HOURLY_COLUMNS = HOURLY_KEY_COLUMNS + HOURLY_VALUE_COLUMNS
+
+# 使用中のストレージ（初回接続時に DB_BACKEND から作成する）
+_backend = None
+
+def set_backend(backend_name,sqlite_path=SQLITE_PATH):
+
+    """
+    set_backend 関数
+
+    概要:
+        以降の登録・集計処理で使用するストレージを設定する。
+
+    引数:
+        backend_name (str): ストレージ名（"mysql" または "sqlite"）
+        sqlite_path (str): SQLiteファイルのパス（"sqlite" の場合のみ使用する）
+
+    戻り値:
+        backend (storage_ops.StorageBackend): 設定したストレージ
+
+    例外処理:
+        ストレージ名が不正な場合は ValueError を送出する。
+    """
+
+    global _backend
+
+    if backend_name == "mysql":
+        _backend = storage_ops.MysqlBackend(DB_HOST,DB_USER,DB_PASSWORD,DB_DATABASE,DB_POOL_NAME,DB_POOL_SIZE)
+    elif backend_name == "sqlite":
+        _backend = storage_ops.SqliteBackend(sqlite_path)
+    else:
+        raise ValueError(f"Unknown storage backend: {backend_name}")
+
+    return _backend
+
+def get_backend():
+
+    """
+    get_backend 関数
+
+    概要:
+        使用中のストレージを取得する。設定されていない場合は DB_BACKEND のストレージを作成する。
+
+    引数:
+        なし
+
+    戻り値:
+        backend (storage_ops.StorageBackend): 使用中のストレージ
+
+    例外処理:
+        なし
+    """
+
+    if _backend is None:
+        return set_backend(DB_BACKEND)
+    return _backend
+
 def db_init():
     
     """
     db_init 関数
 
     概要:
-        MySQLデータベースに接続し、コネクションとカーソルを取得する。
+        コネクションプールからMySQLデータベースのコネクションを借り、コネクションとカーソルを取得する。
+        SQLiteのストレージを使用する場合は、SQLiteファイルに接続する。
 
     引数:
         なし
@@ -42,16 +144,41 @@ def db_init():
         MySQLデータベースへの接続に失敗した場合は例外が発生する可能性がある。
     """
 
-    # MySQLに接続
-    conn = mysql.connector.connect(
-        host=DB_HOST,
-        user=DB_USER,
-        password=DB_PASSWORD,
-        database=DB_DATABASE
-    )
+    # ストレージの接続を取得（MySQLの場合はコネクションプールから借りる）
+    conn = get_backend().connect()
 
-    # カーソルを取得
-    cursor = conn.cursor()
+    # カーソルを取得（SQLごとの処理時間とDBとの往復回数を記録する）
+    cursor = metrics_ops.MetricsCursor(conn.cursor())
+
+    # コネクタとカーソルを返す
+    return conn,cursor
+
+def db_init_local_infile():
+
+    """
+    db_init_local_infile 関数
+
+    概要:
+        LOAD DATA LOCAL INFILE を使用できるMySQLデータベースのコネクションを作成し、コネクションとカーソルを取得する。
+        コネクションプールの接続では LOCAL INFILE を許可しないため、プールを使わずに接続する（一括取り込み専用）。
+        LOAD DATA LOCAL INFILE を使用できないストレージ（SQLite）の場合は、通常の接続を取得する。
+
+    引数:
+        なし
+
+    戻り値:
+        conn (mysql.connector.connection.MySQLConnection): MySQLデータベース接続オブジェクト。
+        cursor (mysql.connector.cursor.MySQLCursor): MySQLデータベースカーソルオブジェクト。
+
+    例外処理:
+        MySQLデータベースへの接続に失敗した場合は例外が発生する可能性がある。
+    """
+
+    # LOCAL INFILE を許可して接続
+    conn = get_backend().connect_bulk()
+
+    # カーソルを取得（SQLごとの処理時間とDBとの往復回数を記録する）
+    cursor = metrics_ops.MetricsCursor(conn.cursor())
 
     # コネクタとカーソルを返す
     return conn,cursor
@@ -63,6 +190,7 @@ def db_close(conn,cursor):
 
     概要:
         MySQLデータベースのコネクションとカーソルを閉じる。
+        コネクションはコネクションプールに返却される。
 
     引数:
         conn (mysql.connector.connection.MySQLConnection): MySQLデータベース接続オブジェクト。
@@ -82,13 +210,191 @@ def db_close(conn,cursor):
     # コネクタを閉じる
     conn.close()
 
-def db_UpdateInsertOriginTable(csv_df,oha_yymmddhh):
+class DbSession:
+
+    """
+    DbSession クラス
+
+    概要:
+        1回の実行単位で1つのコネクションと1つのトランザクションを共有するセッション。
+        元データ・時間別・日別・月別の各テーブルへの登録をまとめて1回でCOMMITする。
+
+    使用方法:
+        with DbSession() as session:
+            db_UpdateInsertOriginTableBatch(csv_df,oha_yymmddhh,session)
+            db_UpdateInsertHourlyTable(insert_data_list,session)
+
+    引数:
+        local_infile (bool): LOAD DATA LOCAL INFILE を使用する場合は True（プールを使わずに接続する）
+
+    例外処理:
+        with ブロック内で例外が発生した場合はロールバックし、例外をそのまま送出する。
+    """
+
+    def __init__(self,local_infile=False):
+        # コネクションプールから接続を取得（LOCAL INFILE を使用する場合は専用に接続する）
+        if local_infile == True:
+            self.conn,self.cursor = db_init_local_infile()
+        else:
+            self.conn,self.cursor = db_init()
+
+    def commit(self):
+        # トランザクションをCOMMITする
+        with metrics_ops.stage("db_commit"):
+            self.conn.commit()
+        metrics_ops.count("db_round_trips")
+
+    def rollback(self):
+        # トランザクションをロールバックする
+        self.conn.rollback()
+
+    def close(self):
+        # 接続をコネクションプールに返却する
+        db_close(self.conn,self.cursor)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self,exc_type,exc_value,traceback):
+        try:
+            if exc_type is None:
+                self.commit()
+            else:
+                self.rollback()
+        finally:
+            self.close()
+        return False
+
+def db_acquire(session):
+
+    """
+    db_acquire 関数
+
+    概要:
+        セッションが指定されている場合はセッションのコネクションとカーソルを、
+        指定されていない場合は新しく借りたコネクションとカーソルを返す。
+
+    引数:
+        session (DbSession): 実行単位のセッション。None の場合は単独で接続する。
+
+    戻り値:
+        conn (mysql.connector.connection.MySQLConnection): MySQLデータベース接続オブジェクト。
+        cursor (mysql.connector.cursor.MySQLCursor): MySQLデータベースカーソルオブジェクト。
+
+    例外処理:
+        なし
+    """
+
+    if session is None:
+        return db_init()
+    return session.conn,session.cursor
+
+def db_commit(conn,session):
+
+    """
+    db_commit 関数
+
+    概要:
+        セッションが指定されていない場合のみCOMMITする。
+        セッションが指定されている場合のCOMMITはセッション側でまとめて行う。
+
+    引数:
+        conn (mysql.connector.connection.MySQLConnection): MySQLデータベース接続オブジェクト。
+        session (DbSession): 実行単位のセッション。
+
+    戻り値:
+        なし
+
+    例外処理:
+        なし
+    """
+
+    if session is None:
+        conn.commit()
+
+def db_release(conn,cursor,session):
+
+    """
+    db_release 関数
+
+    概要:
+        セッションが指定されていない場合のみコネクションとカーソルを閉じる。
+
+    引数:
+        conn (mysql.connector.connection.MySQLConnection): MySQLデータベース接続オブジェクト。
+        cursor (mysql.connector.cursor.MySQLCursor): MySQLデータベースカーソルオブジェクト。
+        session (DbSession): 実行単位のセッション。
+
+    戻り値:
+        なし
+
+    例外処理:
+        なし
+    """
+
+    if session is None and conn is not None:
+        db_close(conn,cursor)
+
+def get_kansoku_datetime(oha_yymmddhh,kansoku_time_int):
+
+    """
+    get_kansoku_datetime 関数
+
+    概要:
+        ファイルの観測日時と行の観測時間から、元データテーブルの観測日時を作成する。
+
+    引数:
+        oha_yymmddhh (str): YYMMddhh形式の観測日時
+        kansoku_time_int (int): hhmm形式の観測時間
+
+    戻り値:
+        kansoku_datetime (str): 観測日時の文字列 (YYYY-MM-DD HH:MM)
+
+    例外処理:
+        なし
+    """
+
+    year = int('20' + oha_yymmddhh[:2])  # 年を取得（YYを補完して年とする）
+    month = int(oha_yymmddhh[2:4])  # 月を取得
+    day = int(oha_yymmddhh[4:6])    # 日を取得
+    hour = int(oha_yymmddhh[6:8])   # 時を取得
+    minute = int(str(kansoku_time_int)[-2:])  # 分を取得（最後の2桁を整数に変換）
+    return dt.datetime(year, month, day,hour,minute).strftime('%Y-%m-%d %H:%M')  # 日時型で出力
+
+def get_upsert_sql(table_name,key_columns,columns):
+
+    """
+    get_upsert_sql 関数
+
+    概要:
+        主キーを指定した UPDATE-INSERT（MySQL: INSERT ... ON DUPLICATE KEY UPDATE、SQLite: INSERT ... ON CONFLICT）のSQLを作成する。
+        キーが既に存在する行はキー以外の列を置き換え、存在しない行はINSERTする（件数の確認は不要）。
+
+    引数:
+        table_name (str): テーブル名
+        key_columns (list): 主キーの列名のリスト
+        columns (list): 登録する列名のリスト（パラメータの順）
+
+    戻り値:
+        sql (str): executemany で実行するSQL
+
+    例外処理:
+        なし
+    """
+
+    backend = get_backend()
+    upsert_clause = backend.get_upsert_clause(key_columns,[column for column in columns if column not in key_columns])
+    return f"INSERT INTO {table_name} ({', '.join(columns)}) VALUES ({backend.get_placeholders(len(columns))}) {upsert_clause}"
+
+def db_UpdateInsertOriginTable(csv_df,oha_yymmddhh,session=None):
     
     """
     db_UpdateInsertOriginTable 関数
 
     概要:
-        元データテーブルにデータをUPDATEまたはINSERTする。
+        元データテーブルにデータを1行ずつUPDATEまたはINSERTする。
+        行ごとに既存レコードの件数を確認し、1行ごとに接続・COMMITする従来の登録方法。
+        通常は db_UpdateInsertOriginTableBatch を使用し、この関数は一括登録との比較（ベンチマーク）に使用する。
 
     引数:
         csv_df: CSVファイルを格納したDataframe
@@ -102,165 +408,107 @@ def db_UpdateInsertOriginTable(csv_df,oha_yymmddhh):
             - 温度
             - エラーコード
             - 売電量
+        oha_yymmddhh (str): YYMMddhh形式の観測日時
+        session (DbSession): 実行単位のセッション。指定した場合はセッションの接続を使い、COMMITしない。
 
     戻り値:
-        なし
+        tuple - (INSERTした行数, UPDATEした行数)
 
     例外処理:
-        データベース操作中にエラーが発生した場合は、エラーログを出力する。
+        データベース操作中にエラーが発生した場合は、ロールバックしてエラーログを出力し、それまでの件数を返す。
+        セッションが指定されている場合は、エラーログを出力した後に例外を送出する。
     """
 
-    # CSVファイルの行数分ループする
-    for index,row in csv_df.iterrows():
-
-        # DBに接続
-        my_conn,my_cursor = db_init()
+    inserted_count = 0
+    updated_count = 0
+    p = get_backend().placeholder
 
-        # 現場コード、観測日、観測時間を取得
-        genba_cd = int(row[0])
-        kansoku_date_int = int(row[1])
-        kansoku_time_int = int(row[2])
+    # CSVファイルの行数分ループする
+    for row in csv_df.itertuples(index=False,name=None):
 
-        # 観測日時を取得する
-        year = int('20' + oha_yymmddhh[:2])  # 年を取得（YYを補完して年とする）
-        month = int(oha_yymmddhh[2:4])  # 月を取得
-        day = int(oha_yymmddhh[4:6])    # 日を取得
-        hour = int(oha_yymmddhh[6:8])   # 時を取得
-        minute = int(str(kansoku_time_int)[-2:])  # 分を取得（最後の2桁を整数に変換）
-        kansoku_datetime = dt.datetime(year, month, day,hour,minute).strftime('%Y-%m-%d %H:%M')  # 日時型で出力
+        my_conn = None
+        my_cursor = None
 
-        # 更新日時を取得する
-        update_datetime = str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))
+        try:
+            # DBに接続
+            my_conn,my_cursor = db_acquire(session)
 
-        # 日別テーブルに対して該当日の件数を取得
-        sql = ""
-        sql = f"""
-        SELECT
-            COUNT(*) 
-        FROM
-            {ORIGIN_TABLE_NAME}
-        WHERE
-            GENBA_CD = {genba_cd}
-            AND KANSOKU_DATE_INT = {kansoku_date_int} 
-            AND KANSOKU_TIME_INT = {kansoku_time_int} 
-        """
+            # 現場コード、観測日、観測時間を取得
+            genba_cd = int(row[0])
+            kansoku_date_int = int(row[1])
+            kansoku_time_int = int(row[2])
 
-        # SQLクエリを実行し、結果を取得
-        my_cursor.execute(sql)
-        results = my_cursor.fetchall()
+            # 観測日時、更新日時を取得する
+            kansoku_datetime = get_kansoku_datetime(oha_yymmddhh,kansoku_time_int)
+            update_datetime = str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))
 
-        # 既存レコード件数を取得
-        record_count = results[0][0]
-
-        # 既存レコード件数が0の場合、INSERTする
-        if record_count == 0:
-            
-            # INSERT文を作成する
-            sql = 'INSERT INTO ' + ORIGIN_TABLE_NAME + ' VALUES('
-            for value in row:
-                sql = sql + str(value)
-                sql += ','
-
-            # 観測日時をINSERT文に追加する
-            sql = sql + "'" + kansoku_datetime + "'"
-            sql += ','
-
-            # 更新日時をINSERT文に追加する
-            sql = sql  + "'" + update_datetime + "'"
-            sql += ')'
-
-            # SQLを実行する
-            my_cursor.execute(sql)
-            my_conn.commit()
-
-            # ログを出力する
-            file_util.write_log(f"Inserted into {ORIGIN_TABLE_NAME} : {row}")
-
-        # 既存レコード件数が1の場合、UPDATEする
-        elif record_count == 1 :
-
-            # UPDATEするデータ項目を取得
-            denryu_1 = row[3]
-            denatsu_1 = row[4]
-            hatsuden_1 = row[5]
-            denryu_2 = row[6]
-            denatsu_2 = row[7]
-            hatsuden_2 = row[8]
-            denryu_3 = row[9]
-            denatsu_3 = row[10]
-            hatsuden_3 = row[11]
-            denryu_4 = row[12]
-            denatsu_4 = row[13]
-            hatsuden_4 = row[14]
-            denryu_5 = row[15]
-            denatsu_5 = row[16]
-            hatsuden_5 = row[17]
-            denryu_6 = row[18]
-            denatsu_6 = row[19]
-            hatsuden_6 = row[20]
-            denryu_7 = row[21]
-            denatsu_7 = row[22]
-            hatsuden_7 = row[23]
-            denryu_8 = row[24]
-            denatsu_8 = row[25]
-            hatsuden_8 = row[26]
-            nissya = row[27]
-            temp = row[28]
-            error_cd = row[29]
-            baiden = row[30]
-
-            # UPDATE文を作成する
-            sql = ""
+            # 元データテーブルに対して該当行の件数を取得
             sql = f"""
-                    UPDATE {ORIGIN_TABLE_NAME}
-                    SET
-                        DENRYU_01 = {denryu_1}
-                        , DENATSU_01 = {denatsu_1}
-                        , HATSUDEN_01_kWH = {hatsuden_1}
-                        , DENRYU_02 = {denryu_2}
-                        , DENATSU_02 = {denatsu_2}
-                        , HATSUDEN_02_kWH = {hatsuden_2}
-                        , DENRYU_03 = {denryu_3}
-                        , DENATSU_03 = {denatsu_3}
-                        , HATSUDEN_03_kWH = {hatsuden_3}
-                        , DENRYU_04 = {denryu_4}
-                        , DENATSU_04 = {denatsu_4}
-                        , HATSUDEN_04_kWH = {hatsuden_4}
-                        , DENRYU_05 = {denryu_5}
-                        , DENATSU_05 = {denatsu_5}
-                        , HATSUDEN_05_kWH = {hatsuden_5}
-                        , DENRYU_06 = {denryu_6}
-                        , DENATSU_06 = {denatsu_6}
-                        , HATSUDEN_06_kWH = {hatsuden_6}
-                        , DENRYU_07 = {denryu_7}
-                        , DENATSU_07 = {denatsu_7}
-                        , HATSUDEN_07_kWH = {hatsuden_7}
-                        , DENRYU_08 = {denryu_8}
-                        , DENATSU_08 = {denatsu_8}
-                        , HATSUDEN_08_kWH = {hatsuden_8}
-                        , NISSYA = {nissya}
-                        , TEMP = {temp}
-                        , ERROR_CD = {error_cd}
-                        , BAIDEN = {baiden}
-                        , KANSOKU_DATETIME = '{kansoku_datetime}'
-                        , UPDATE_DATETIME  = '{update_datetime}'
+            SELECT
+                COUNT(*) 
+            FROM
+                {ORIGIN_TABLE_NAME}
+            WHERE
+                GENBA_CD = {p}
+                AND KANSOKU_DATE_INT = {p}
+                AND KANSOKU_TIME_INT = {p}
             """
-            
-            # SQLを実行する
-            my_cursor.execute(sql)
-            my_conn.commit()
-
-            # ログを出力する
-            file_util.write_log(f"{str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))} Update {ORIGIN_TABLE_NAME} : {row}")
-
-
-def db_UpdateInsertHourlyTable(insert_list):
+            my_cursor.execute(sql,(genba_cd,kansoku_date_int,kansoku_time_int))
+            record_count = my_cursor.fetchall()[0][0]
+
+            # 既存レコード件数が0の場合はINSERT、それ以外の場合は主キーを指定してUPDATEする
+            values = tuple(row[3:31]) + (kansoku_datetime,update_datetime)
+            if record_count == 0:
+                sql = f"INSERT INTO {ORIGIN_TABLE_NAME} ({', '.join(ORIGIN_COLUMNS)}) VALUES ({get_backend().get_placeholders(len(ORIGIN_COLUMNS))})"
+                my_cursor.execute(sql,(genba_cd,kansoku_date_int,kansoku_time_int) + values)
+                inserted_count += 1
+            else:
+                sql = f"""
+                UPDATE {ORIGIN_TABLE_NAME}
+                SET
+                    {', '.join(f"{column} = {p}" for column in ORIGIN_VALUE_COLUMNS)}
+                WHERE
+                    GENBA_CD = {p}
+                    AND KANSOKU_DATE_INT = {p}
+                    AND KANSOKU_TIME_INT = {p}
+                """
+                my_cursor.execute(sql,values + (genba_cd,kansoku_date_int,kansoku_time_int))
+                updated_count += 1
+
+            # 1行ごとにCOMMITする
+            db_commit(my_conn,session)
+
+        except Exception as e:
+            # エラーログを出力する
+            error_message = f"{str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))} Error in db_UpdateInsertOriginTable: {str(e)}"
+            file_util.write_log(error_message,"error")
+
+            # セッション使用時は呼び出し元でロールバックさせる
+            if session is not None:
+                raise
+
+            # ロールバックする
+            if my_conn is not None:
+                my_conn.rollback()
+            break
+
+        finally:
+            # DBの接続を閉じる
+            db_release(my_conn,my_cursor,session)
+
+    # ログを出力する
+    file_util.write_log(f"{str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))} Upsert {ORIGIN_TABLE_NAME} : {inserted_count} inserted, {updated_count} updated","debug")
+
+    return inserted_count,updated_count
+
+def db_UpdateInsertHourlyTable(insert_list,session=None):
     
     """
     db_UpdateInsertHourlyTable 関数
 
     概要:
         時間別テーブルにデータをUPDATEまたはINSERTする。
+        1時間分の db_UpdateInsertHourlyTableBatch を実行する。
 
     引数:
         insert_list (list): INSERTまたはUPDATEするデータを含むリスト。
@@ -275,419 +523,974 @@ def db_UpdateInsertHourlyTable(insert_list):
             - バイデン
             - 観測日時
             - 更新日時
+        session (DbSession): 実行単位のセッション。指定した場合はセッションの接続を使い、COMMITしない。
+
+    戻り値:
+        なし
+
+    例外処理:
+        データベース操作中にエラーが発生した場合は、エラーログを出力する。
+        セッションが指定されている場合は、エラーログを出力した後に例外を送出する。
+    """
+
+    db_UpdateInsertHourlyTableBatch([insert_list],session)
+
+def db_UpdateInsertDailyTable(oha_yyyymmdd,session=None):
+    
+    """
+    db_UpdateInsertDailyTable 関数
+
+    概要:
+        日別テーブルにデータをUPDATEまたはINSERTする。
+        1日分の db_UpdateInsertDailyTableBatch を実行する。
+
+    引数:
+        oha_yyyymmdd (int): 観測日を表すYYYYMMDD形式の整数。
+        session (DbSession): 実行単位のセッション。指定した場合はセッションの接続を使い、COMMITしない。
 
     戻り値:
         なし
 
     例外処理:
         データベース操作中にエラーが発生した場合は、エラーログを出力する。
+        セッションが指定されている場合は、エラーログを出力した後に例外を送出する。
+    """
+
+    db_UpdateInsertDailyTableBatch([oha_yyyymmdd],session)
+
+def db_UpdateInsertDailyTableBatch(oha_yyyymmdd_list,session=None):
+
+    """
+    db_UpdateInsertDailyTableBatch 関数
+
+    概要:
+        指定した日（複数可）の日別テーブルの行を、時間別テーブルから1回のSQLで集計し直してUPDATE-INSERTする。
+
+    処理内容:
+        1. 時間別テーブルの対象日の行をウィンドウ関数で1回だけ走査し、日ごとに最初の時間（BAIDEN_00）と
+           最後の時間（BAIDEN_23）の累積売電量を求める（日ごとの相関サブクエリは使わない）。
+        2. INSERT ... SELECT ... ON DUPLICATE KEY UPDATE で、件数を確認せずに1回でUPDATE-INSERTする。
+           日別テーブルは KANSOKU_DATE_INT が一意であること（主キー）を前提とする。
+
+    引数:
+        oha_yyyymmdd_list (list): 観測日を表すYYYYMMDD形式の整数のリスト。1年分でも1回のSQLで処理する。
+        session (DbSession): 実行単位のセッション。指定した場合はセッションの接続を使い、COMMITしない。
+
+    戻り値:
+        int - 集計の対象とした日数（時間別テーブルに行の無い日は登録しない）
+
+    例外処理:
+        データベース操作中にエラーが発生した場合は、エラーログを出力し、0 を返す。
+        セッションが指定されている場合は、エラーログを出力した後に例外を送出する。
     """
 
-    try :
-        kansoku_date_int = insert_list[0]
-        kansoku_time_int = insert_list[1]
+    my_conn = None
+    my_cursor = None
+    day_count = 0
+
+    try:
+        date_list = sorted(set(int(oha_yyyymmdd) for oha_yyyymmdd in oha_yyyymmdd_list))
+        if len(date_list) == 0:
+            return day_count
 
         # DBに接続
-        my_conn,my_cursor = db_init()
+        my_conn,my_cursor = db_acquire(session)
 
-        # 時間別テーブルに対して該当日時の件数を取得
-        sql = ''
+        # 時間別テーブルの対象日の行を1回だけ走査し、日ごとの最初と最後の時間の累積売電量からUPDATE-INSERTする
+        backend = get_backend()
         sql = f"""
+        INSERT INTO {DAILY_TABLE_NAME} (
+            KANSOKU_DATE_INT, BAIDEN_DAILY, BAIDEN_00, BAIDEN_23, KANSOKU_DATE, UPDATE_DATETIME
+        )
         SELECT
-            COUNT(*) 
-        FROM
-            {HOURLY_TABLE_NAME}
-        WHERE
-            KANSOKU_DATE_INT = '{kansoku_date_int}' 
-            And KANSOKU_TIME_INT = '{kansoku_time_int}'
+            KANSOKU_DATE_INT,
+            BAIDEN_23 - BAIDEN_00,
+            BAIDEN_00,
+            BAIDEN_23,
+            CAST(KANSOKU_DATE_INT AS CHAR),
+            {backend.placeholder}
+        FROM (
+            SELECT DISTINCT
+                KANSOKU_DATE_INT,
+                FIRST_VALUE(BAIDEN) OVER w AS BAIDEN_00,
+                LAST_VALUE(BAIDEN) OVER w AS BAIDEN_23
+            FROM
+                {HOURLY_TABLE_NAME}
+            WHERE
+                KANSOKU_DATE_INT IN ({backend.get_placeholders(len(date_list))})
+            WINDOW w AS (
+                PARTITION BY KANSOKU_DATE_INT
+                ORDER BY KANSOKU_TIME_INT
+                ROWS BETWEEN UNBOUNDED PRECEDING AND UNBOUNDED FOLLOWING
+            )
+        ) AS DAILY_ROLLUP
+        {backend.get_upsert_clause(["KANSOKU_DATE_INT"],["BAIDEN_DAILY","BAIDEN_00","BAIDEN_23"],select=True)}
         """
 
-        # SQLクエリを実行し、結果を取得
-        my_cursor.execute(sql)
-        results = my_cursor.fetchall()
+        # SQLを実行する
+        my_cursor.execute(sql,[str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))] + date_list)
+        db_commit(my_conn,session)
+        day_count = len(date_list)
 
-        # 既存レコード件数を取得
-        record_count = results[0][0]
-        
-        # 既存レコード件数が0の場合、INSERTする
-        if record_count == 0:
-            
-            # INSERT文を作成する
-            sql = 'INSERT INTO ' + HOURLY_TABLE_NAME + ' VALUES('
-            for value in insert_list:
-                sql = sql + str(value)
-                sql += ','
-
-            # 最後のカンマを削除して)で閉じる
-            sql = sql[:-1] + ')'
-
-            # SQLを実行する
-            my_cursor.execute(sql)
-            my_conn.commit()
-
-            # ログを出力する
-            file_util.write_log(f"Inserted into {HOURLY_TABLE_NAME} : {insert_list}")
-
-        # 既存レコード件数が1の場合、UPDATEする
-        elif record_count == 1 :
-
-            kansoku_date_int = insert_list[0]
-            kansoku_time_int = insert_list[1]
-            denryu_1 = insert_list[2]
-            denatsu_1 = insert_list[3]
-            hatsuden_1 = insert_list[4]
-            denryu_2 = insert_list[5]
-            denatsu_2 = insert_list[6]
-            hatsuden_2 = insert_list[7]
-            denryu_3 = insert_list[8]
-            denatsu_3 = insert_list[9]
-            hatsuden_3 = insert_list[10]
-            denryu_4 = insert_list[11]
-            denatsu_4 = insert_list[12]
-            hatsuden_4 = insert_list[13]
-            denryu_5 = insert_list[14]
-            denatsu_5 = insert_list[15]
-            hatsuden_5 = insert_list[16]
-            denryu_6 = insert_list[17]
-            denatsu_6 = insert_list[18]
-            hatsuden_6 = insert_list[19]
-            denryu_7 = insert_list[20]
-            denatsu_7 = insert_list[21]
-            hatsuden_7 = insert_list[22]
-            nissya = insert_list[23]
-            temp = insert_list[24]
-            baiden_hourly = insert_list[25]
-            baiden = insert_list[26]
-            kansoku_datetime = insert_list[27]
-            update_datetime = insert_list[28]
-
-            # UPDATE文を作成する
-            sql = ""
-            sql = f"""
-            UPDATE {HOURLY_TABLE_NAME}
-            SET
-                DENRYU_01 = {denryu_1}
-                , DENATSU_01 = {denatsu_1}
-                , HATSUDEN_01_kWH = {hatsuden_1}
-                , DENRYU_02 = {denryu_2}
-                , DENATSU_02 = {denatsu_2}
-                , HATSUDEN_02_kWH = {hatsuden_2}
-                , DENRYU_03 = {denryu_3}
-                , DENATSU_03 = {denatsu_3}
-                , HATSUDEN_03_kWH = {hatsuden_3}
-                , DENRYU_04 = {denryu_4}
-                , DENATSU_04 = {denatsu_4}
-                , HATSUDEN_04_kWH = {hatsuden_4}
-                , DENRYU_05 = {denryu_5}
-                , DENATSU_05 = {denatsu_5}
-                , HATSUDEN_05_kWH = {hatsuden_5}
-                , DENRYU_06 = {denryu_6}
-                , DENATSU_06 = {denatsu_6}
-                , HATSUDEN_06_kWH = {hatsuden_6}
-                , DENRYU_07 = {denryu_7}
-                , DENATSU_07 = {denatsu_7}
-                , HATSUDEN_07_kWH = {hatsuden_7}
-                , NISSYA_AVG = {nissya}
-                , TEMP_AVG = {temp}
-                , BAIDEN_HOURLY = {baiden_hourly}
-                , BAIDEN = {baiden}
-                , KANSOKU_DATETIME = {kansoku_datetime}
-                , UPDATE_DATETIME = {update_datetime}
-            WHERE
-                KANSOKU_DATE_INT = {kansoku_date_int}
-                And KANSOKU_TIME_INT = {kansoku_time_int}
-            """
-            # SQLを実行する
-            my_cursor.execute(sql)
-            my_conn.commit()
+        # ログを出力する
+        file_util.write_log(f"{str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))} Upsert {DAILY_TABLE_NAME} : {day_count} days ({date_list[0]}-{date_list[-1]})","debug")
+
+    except Exception as e:
+        # エラーログを出力する
+        error_message = f"{str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))} Error in db_UpdateInsertDailyTableBatch: {str(e)}"
+        file_util.write_log(error_message,"error")
 
-            # ログを出力する
-            file_util.write_log(f"{str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))} Update {HOURLY_TABLE_NAME} : {insert_list}")
+        # セッション使用時は呼び出し元でロールバックさせる
+        if session is not None:
+            raise
 
+        # ロールバックする
+        if my_conn is not None:
+            my_conn.rollback()
+        day_count = 0
+
+    finally:
         # DBの接続を閉じる
-        db_close(my_cursor,my_conn)
+        db_release(my_conn,my_cursor,session)
 
-    except Exception as e:
-        # エラーログを出力する
-        error_message = f"{str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))} Error in db_UpdateInsertHourlyTable: {str(e)}"
-        file_util.write_log(error_message)
+    return day_count
+
+def get_month_date_range(oha_yyyymm):
+    # 観測月（YYYYMM）の観測日（YYYYMMdd）の半開区間 [月初, 翌月初) を取得する
+    # （日は31以下のため、翌月を YYYYMM + 1 としても12月の範囲は翌年1月1日より前になる）
+    oha_yyyymm = int(oha_yyyymm)
+    return oha_yyyymm * 100,(oha_yyyymm + 1) * 100
+
+def get_month_runs(oha_yyyymm_list):
+    # 観測月（YYYYMM）を連続した月ごとにまとめ、(最初の月, 最後の月) のリストを取得する
+    runs = []
+    for oha_yyyymm in sorted(set(int(oha_yyyymm) for oha_yyyymm in oha_yyyymm_list)):
+        month_index = oha_yyyymm // 100 * 12 + oha_yyyymm % 100
+        if len(runs) > 0 and runs[-1][2] + 1 == month_index:
+            runs[-1] = (runs[-1][0],oha_yyyymm,month_index)
+        else:
+            runs.append((oha_yyyymm,oha_yyyymm,month_index))
+    return [(first_month,last_month) for first_month,last_month,_ in runs]
+
+def db_UpdateInsertMonthlyTable(oha_yyyymm,session=None):
 
-def db_UpdateInsertDailyTable(oha_yyyymmdd):
-    
     """
-    db_UpdateInsertDailyTable 関数
+    db_UpdateInsertMonthlyTable 関数
 
     概要:
-        日別テーブルにデータをUPDATEまたはINSERTする。
+        月別テーブルにデータをUPDATEまたはINSERTする。
+        1か月あたりの売電量は、月の最後の日の BAIDEN_23 と最初の日の BAIDEN_00 の差のため、
+        日別テーブルの行が変わるたびに月の全ての日を集計し直さず、最初と最後の日の2行だけを読んで更新する。
+
+    処理内容:
+        1. 日別テーブルの観測日（KANSOKU_DATE_INT）の半開区間 [月初, 翌月初) で、最初と最後の日の行を
+           ORDER BY ... LIMIT 1 で取得する（主キーの範囲検索で1行ずつ読むだけで、月の日数によらない）。
+        2. INSERT ... SELECT ... ON DUPLICATE KEY UPDATE で、件数を確認せずに1回でUPDATE-INSERTする。
+           月別テーブルは KANSOKU_MONTH_INT が一意であること（主キー）を前提とする。
 
     引数:
-        oha_yyyymmdd (int): 観測日を表すYYYYMMDD形式の整数。
+        oha_yyyymm (int): 観測月を表すYYYYMM形式の整数。
+        session (DbSession): 実行単位のセッション。指定した場合はセッションの接続を使い、COMMITしない。
 
     戻り値:
         なし
 
     例外処理:
         データベース操作中にエラーが発生した場合は、エラーログを出力する。
+        セッションが指定されている場合は、エラーログを出力した後に例外を送出する。
     """
 
+    my_conn = None
+    my_cursor = None
+
     try:
         # DBに接続
-        my_conn,my_cursor = db_init()
+        my_conn,my_cursor = db_acquire(session)
 
-        # 日別テーブルに対して該当日の件数を取得
-        sql = ""
+        # 月の最初と最後の日の行だけを読み、UPDATE-INSERTする
+        first_date,next_date = get_month_date_range(oha_yyyymm)
+        backend = get_backend()
+        p = backend.placeholder
         sql = f"""
+        INSERT INTO {MONTHLY_TABLE_NAME} (
+            KANSOKU_MONTH_INT, BAIDEN_MONTHLY, UPDATE_DATETIME
+        )
         SELECT
-            COUNT(*) 
-        FROM
-            {DAILY_TABLE_NAME}
-        WHERE
-            KANSOKU_DATE_INT = {oha_yyyymmdd}
+            {p},
+            LAST_DAY.BAIDEN_23 - FIRST_DAY.BAIDEN_00,
+            {p}
+        FROM (
+            SELECT BAIDEN_00
+            FROM {DAILY_TABLE_NAME}
+            WHERE KANSOKU_DATE_INT >= {p} AND KANSOKU_DATE_INT < {p}
+            ORDER BY KANSOKU_DATE_INT ASC
+            LIMIT 1
+        ) AS FIRST_DAY, (
+            SELECT BAIDEN_23
+            FROM {DAILY_TABLE_NAME}
+            WHERE KANSOKU_DATE_INT >= {p} AND KANSOKU_DATE_INT < {p}
+            ORDER BY KANSOKU_DATE_INT DESC
+            LIMIT 1
+        ) AS LAST_DAY
+        {backend.get_upsert_clause(["KANSOKU_MONTH_INT"],["BAIDEN_MONTHLY"],select=True)}
         """
 
-        # SQLクエリを実行し、結果を取得
-        my_cursor.execute(sql)
-        results = my_cursor.fetchall()
+        # SQLを実行する
+        update_datetime = str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))
+        my_cursor.execute(sql,(int(oha_yyyymm),update_datetime,first_date,next_date,first_date,next_date))
+        db_commit(my_conn,session)
+
+        # ログを出力する
+        file_util.write_log(f"{str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))} Upsert {MONTHLY_TABLE_NAME} : {oha_yyyymm}","debug")
+
+    except Exception as e:
+        # エラーログを出力する
+        error_message = f"{str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))} Error in db_UpdateInsertMonthlyTable: {str(e)}"
+        file_util.write_log(error_message,"error")
+
+        # セッション使用時は呼び出し元でロールバックさせる
+        if session is not None:
+            raise
+
+        # ロールバックする
+        if my_conn is not None:
+            my_conn.rollback()
+
+    finally:
+        # DBの接続を閉じる
+        db_release(my_conn,my_cursor,session)
+
+def db_UpdateInsertMonthlyTableBatch(oha_yyyymm_list,session=None):
+
+    """
+    db_UpdateInsertMonthlyTableBatch 関数
+
+    概要:
+        指定した月（複数可）の月別テーブルの行を、日別テーブルから1回のSQLで集計し直してUPDATE-INSERTする。
+        バックフィルなどで多くの月をまとめて集計し直す場合に使用する。
+
+    処理内容:
+        1. 月ごとの観測日の半開区間 [月初, 翌月初) を OR でつなぎ、主キーの範囲検索で対象の日の行だけを読む。
+        2. ウィンドウ関数で月ごとに最初の日の BAIDEN_00 と最後の日の BAIDEN_23 を求める。
+        3. INSERT ... SELECT ... ON DUPLICATE KEY UPDATE で1回でUPDATE-INSERTする。
+
+    引数:
+        oha_yyyymm_list (list): 観測月を表すYYYYMM形式の整数のリスト。
+        session (DbSession): 実行単位のセッション。指定した場合はセッションの接続を使い、COMMITしない。
+
+    戻り値:
+        int - 集計の対象とした月数（日別テーブルに行の無い月は登録しない）
+
+    例外処理:
+        データベース操作中にエラーが発生した場合は、エラーログを出力し、0 を返す。
+        セッションが指定されている場合は、エラーログを出力した後に例外を送出する。
+    """
+
+    my_conn = None
+    my_cursor = None
+    month_count = 0
+
+    try:
+        month_list = sorted(set(int(oha_yyyymm) for oha_yyyymm in oha_yyyymm_list))
+        if len(month_list) == 0:
+            return month_count
 
-        # 既存レコード件数を取得
-        record_count = results[0][0]
+        # DBに接続
+        my_conn,my_cursor = db_acquire(session)
 
-        # 時間別テーブルのデータを集計するSQLを作成
-        sql = ""
+        # 月ごとの半開区間で対象の日の行だけを読み、月ごとの最初と最後の日の累積売電量からUPDATE-INSERTする
+        backend = get_backend()
+        p = backend.placeholder
+        month_int = backend.get_int_div("KANSOKU_DATE_INT",100)
+        ranges = " OR ".join([f"(KANSOKU_DATE_INT >= {p} AND KANSOKU_DATE_INT < {p})"] * len(month_list))
         sql = f"""
+        INSERT INTO {MONTHLY_TABLE_NAME} (
+            KANSOKU_MONTH_INT, BAIDEN_MONTHLY, UPDATE_DATETIME
+        )
         SELECT
-            KANSOKU_DATE_INT,
-            MAX(
-                CASE
-                    WHEN KANSOKU_TIME_INT = (
-                        SELECT MAX(KANSOKU_TIME_INT)
-                        FROM {HOURLY_TABLE_NAME}
-                        WHERE KANSOKU_DATE_INT = {oha_yyyymmdd}
-                    )
-                    THEN BAIDEN
-                    ELSE 0
-                END
-            ) - MAX(
-                CASE
-                    WHEN KANSOKU_TIME_INT = (
-                        SELECT MIN(KANSOKU_TIME_INT)
-                        FROM {HOURLY_TABLE_NAME}
-                        WHERE KANSOKU_DATE_INT = {oha_yyyymmdd}
-                    )
-                    THEN BAIDEN
-                    ELSE 0
-                END
-            ) AS BAIDEN_DAILY,
-            (
-                SELECT MAX(BAIDEN)
-                FROM {HOURLY_TABLE_NAME}
-                WHERE KANSOKU_TIME_INT = (
-                    SELECT MIN(KANSOKU_TIME_INT)
-                    FROM {HOURLY_TABLE_NAME}
-                    WHERE KANSOKU_DATE_INT = {oha_yyyymmdd}
-                )
-                AND KANSOKU_DATE_INT = {oha_yyyymmdd}
-            ) AS BAIDEN_00,
-            (
-                SELECT MAX(BAIDEN)
-                FROM {HOURLY_TABLE_NAME}
-                WHERE KANSOKU_TIME_INT = (
-                    SELECT MAX(KANSOKU_TIME_INT)
-                    FROM {HOURLY_TABLE_NAME}
-                    WHERE KANSOKU_DATE_INT = {oha_yyyymmdd}
-                )
-                AND KANSOKU_DATE_INT = {oha_yyyymmdd}
-            ) AS BAIDEN_23
-        FROM
-            {HOURLY_TABLE_NAME}
-        WHERE
-            KANSOKU_DATE_INT = {oha_yyyymmdd}
+            KANSOKU_MONTH_INT,
+            BAIDEN_23 - BAIDEN_00,
+            {p}
+        FROM (
+            SELECT DISTINCT
+                {month_int} AS KANSOKU_MONTH_INT,
+                FIRST_VALUE(BAIDEN_00) OVER w AS BAIDEN_00,
+                LAST_VALUE(BAIDEN_23) OVER w AS BAIDEN_23
+            FROM
+                {DAILY_TABLE_NAME}
+            WHERE
+                {ranges}
+            WINDOW w AS (
+                PARTITION BY {month_int}
+                ORDER BY KANSOKU_DATE_INT
+                ROWS BETWEEN UNBOUNDED PRECEDING AND UNBOUNDED FOLLOWING
+            )
+        ) AS MONTHLY_ROLLUP
+        {backend.get_upsert_clause(["KANSOKU_MONTH_INT"],["BAIDEN_MONTHLY"],select=True)}
         """
 
-        # SQLクエリを実行し、結果を取得
-        my_cursor.execute(sql)
-        results = my_cursor.fetchall()
+        # SQLを実行する
+        params = [str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))]
+        for oha_yyyymm in month_list:
+            params += list(get_month_date_range(oha_yyyymm))
+        my_cursor.execute(sql,params)
+        db_commit(my_conn,session)
+        month_count = len(month_list)
 
-        # 結果セットを変数に格納
-        kansoku_date_int = results[0][0] # 観測日
-        baiden_daily = results[0][1] # 1日あたりの売電量
-        baiden_00 = results[0][2] # 該当日の0時時点の売電量
-        baiden_23 = results[0][3] # 該当日の23時時点の売電量
+        # ログを出力する
+        file_util.write_log(f"{str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))} Upsert {MONTHLY_TABLE_NAME} : {month_count} months ({month_list[0]}-{month_list[-1]})","debug")
 
-        # 既存レコード件数が0の場合、INSERTする
-        if record_count == 0 :
+    except Exception as e:
+        # エラーログを出力する
+        error_message = f"{str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))} Error in db_UpdateInsertMonthlyTableBatch: {str(e)}"
+        file_util.write_log(error_message,"error")
 
-            # INSERT文を作成        
-            sql = ""
-            sql = f""" INSERT INTO {DAILY_TABLE_NAME} VALUES(
-                {kansoku_date_int} , {baiden_daily} , {baiden_00} , {baiden_23} ,
-                '{oha_yyyymmdd}' , '{str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))}'
-            )"""
+        # セッション使用時は呼び出し元でロールバックさせる
+        if session is not None:
+            raise
 
-            # SQLを実行する
-            my_cursor.execute(sql)
-            my_conn.commit()
+        # ロールバックする
+        if my_conn is not None:
+            my_conn.rollback()
+        month_count = 0
 
-            # ログを出力する
-            file_util.write_log(f"Inserted into {HOURLY_TABLE_NAME} : {results[0]}")
+    finally:
+        # DBの接続を閉じる
+        db_release(my_conn,my_cursor,session)
 
-        # 既存レコード件数が1の場合、UPDATEする
-        elif record_count == 1 :
+    return month_count
 
-            # UPDATE文を作成        
-            sql = ""
-            sql = f"""
-            UPDATE
-                {DAILY_TABLE_NAME} 
-            SET
-                BAIDEN_DAILY = {baiden_daily}
-                , BAIDEN_00 = {baiden_00}
-                , BAIDEN_23 = {baiden_23}
-            WHERE
-                KANSOKU_DATE_INT = {oha_yyyymmdd};
-            """
+# 既存のキーを数える場合に、1回のSELECTで確認するキーの数（SQLiteのパラメータ数の上限 999 未満にする）
+EXISTING_KEYS_CHUNK_SIZE = 300
+
+def count_existing_origin_keys(cursor,keys):
+
+    """
+    count_existing_origin_keys 関数
+
+    概要:
+        元データテーブルに既に存在する主キー（現場コード, 観測日, 観測時間）の数を取得する。
+        UPDATE-INSERT の影響を受けた行数でINSERTとUPDATEを区別できないDB（SQLite）で、UPDATEする行数を求めるために使用する。
+
+    引数:
+        cursor: 登録と同じトランザクションのカーソル
+        keys (set): (現場コード, 観測日, 観測時間) のタプルの集合
+
+    戻り値:
+        int - 元データテーブルに存在するキーの数
+
+    例外処理:
+        なし（データベース操作中のエラーは呼び出し元に送出する）
+    """
+
+    p = get_backend().placeholder
+    key_list = sorted(keys)
+    existing_count = 0
+    for start in range(0,len(key_list),EXISTING_KEYS_CHUNK_SIZE):
+        chunk = key_list[start:start + EXISTING_KEYS_CHUNK_SIZE]
+        conditions = " OR ".join([f"(GENBA_CD = {p} AND KANSOKU_DATE_INT = {p} AND KANSOKU_TIME_INT = {p})"] * len(chunk))
+        cursor.execute(f"SELECT COUNT(*) FROM {ORIGIN_TABLE_NAME} WHERE {conditions}",[value for key in chunk for value in key])
+        existing_count += cursor.fetchall()[0][0]
+    return existing_count
+
+def db_UpdateInsertOriginTableBatch(csv_df,oha_yymmddhh,session=None):
+
+    """
+    db_UpdateInsertOriginTableBatch 関数
+
+    概要:
+        元データテーブルにCSVファイル1件分のデータを一括でUPDATE-INSERTする。
+        1ファイルにつき1接続・1トランザクションで登録する。
+
+    処理内容:
+        1. CSVファイルの全行を登録用のパラメータに変換する。
+        2. 主キー（現場コード, 観測日, 観測時間）による INSERT ... ON DUPLICATE KEY UPDATE で全行をまとめて登録する
+           （MySQLでは既存レコードのキーを確認するSELECTは行わない）。
+        3. INSERTした行数とUPDATEした行数を求める。
+           MySQLでは影響を受けた行数（INSERTした行が1、値を変更した行が2）から求める。
+           SQLiteでは影響を受けた行数で区別できないため、登録の前に既存のキーを数える。
+           ファイル内で重複するキーの2行目以降は、1行ずつの登録と同じくUPDATEした行として数える。
+           更新日時を毎回置き換えるため値の同じ行も通常はUPDATEした行になるが、MySQLで同じ分に同じ値を登録し直した行は
+           影響を受けた行数が0になり、INSERTした行として数える。
+        4. 最後に1回だけCOMMITし、接続を閉じる（セッション使用時はセッション側でCOMMITする）。
+
+    引数:
+        csv_df: CSVファイルを格納したDataframe
+        oha_yymmddhh (str): YYMMddhh形式の観測日時
+        session (DbSession): 実行単位のセッション。指定した場合はセッションの接続を使い、COMMITしない。
+
+    戻り値:
+        tuple - (INSERTした行数, UPDATEした行数)（db_UpdateInsertOriginTable と同じ）
+
+    例外処理:
+        データベース操作中にエラーが発生した場合は、ロールバックしてエラーログを出力し、(0, 0) を返す。
+        セッションが指定されている場合は、エラーログを出力した後に例外を送出する。
+    """
+
+    inserted_count = 0
+    updated_count = 0
+    my_conn = None
+    my_cursor = None
+
+    try:
+        # 更新日時を取得する
+        update_datetime = str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))
+
+        # CSVファイルの各行を登録用のパラメータに変換する
+        rows = []
+        for row in csv_df.itertuples(index=False,name=None):
+            kansoku_datetime = get_kansoku_datetime(oha_yymmddhh,int(row[2]))
+            rows.append((int(row[0]),int(row[1]),int(row[2])) + tuple(row[3:31]) + (kansoku_datetime,update_datetime))
+
+        if len(rows) == 0:
+            return inserted_count,updated_count
+
+        # DBに接続
+        my_conn,my_cursor = db_acquire(session)
+
+        # 影響を受けた行数でINSERTとUPDATEを区別できない場合は、登録の前に既存のキーを数える
+        # （ファイル内で重複するキーは、2行目以降をUPDATEした行として数える）
+        backend = get_backend()
+        if backend.counts_upsert_updates == False:
+            keys = set(row[:3] for row in rows)
+            existing_count = count_existing_origin_keys(my_cursor,keys) + len(rows) - len(keys)
+
+        # 全ての行を主キーによるUPDATE-INSERTで登録する
+        sql = get_upsert_sql(ORIGIN_TABLE_NAME,ORIGIN_KEY_COLUMNS,ORIGIN_COLUMNS)
+        my_cursor.executemany(sql,rows)
+
+        # INSERTした行数とUPDATEした行数を求める（MySQLの影響を受けた行数は、INSERTした行が1、値を変更した行が2）
+        if backend.counts_upsert_updates == True:
+            updated_count = min(max(my_cursor.rowcount - len(rows),0),len(rows))
+        else:
+            updated_count = existing_count
+        inserted_count = len(rows) - updated_count
 
-            # SQLを実行する
-            my_cursor.execute(sql)
-            my_conn.commit()
+        # 1ファイル分をまとめてCOMMITする
+        db_commit(my_conn,session)
 
-            # ログを出力する
-            file_util.write_log(f"{str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))} Update {DAILY_TABLE_NAME} : {results[0]}")
+        # ログを出力する
+        file_util.write_log(f"{str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))} Upsert {ORIGIN_TABLE_NAME} : {inserted_count} inserted, {updated_count} updated","debug")
 
+    except Exception as e:
+        # エラーログを出力する
+        error_message = f"{str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))} Error in db_UpdateInsertOriginTableBatch: {str(e)}"
+        file_util.write_log(error_message,"error")
+
+        # セッション使用時は呼び出し元でロールバックさせる
+        if session is not None:
+            raise
+
+        # ロールバックする
+        if my_conn is not None:
+            my_conn.rollback()
+        inserted_count = 0
+        updated_count = 0
+
+    finally:
         # DBの接続を閉じる
-        db_close(my_cursor,my_conn)
-    
+        db_release(my_conn,my_cursor,session)
+
+    return inserted_count,updated_count
+
+def db_UpdateInsertHourlyTableBatch(insert_lists,session=None):
+
+    """
+    db_UpdateInsertHourlyTableBatch 関数
+
+    概要:
+        時間別テーブルに複数時間分のデータを一括でUPDATE-INSERTする。
+        バックフィルなど複数ファイルをまとめて登録する場合に使用する。
+
+    処理内容:
+        1. 各行を登録用のパラメータに変換する（HourlyRecord はそのまま使用する）。
+        2. 主キー（観測日, 観測時間）による INSERT ... ON DUPLICATE KEY UPDATE で全行をまとめて登録する。
+
+    引数:
+        insert_lists (list): aggregate_ops.aggregate_hours で作成した HourlyRecord のリスト、
+                             または file_util.getInsertDataListForDailyTable で作成したリストのリスト。
+        session (DbSession): 実行単位のセッション。指定した場合はセッションの接続を使い、COMMITしない。
+
+    戻り値:
+        row_count (int): 登録した行数
+
+    例外処理:
+        データベース操作中にエラーが発生した場合は、エラーログを出力し、0 を返す。
+        セッションが指定されている場合は、エラーログを出力した後に例外を送出する。
+    """
+
+    row_count = 0
+    my_conn = None
+    my_cursor = None
+
+    try:
+        # 各リストを登録用のパラメータに変換する
+        # （観測日時と更新日時はSQL文字列用に引用符で囲まれているため外す）
+        rows = []
+        for insert_list in insert_lists:
+            if isinstance(insert_list,aggregate_ops.HourlyRecord):
+                rows.append(tuple(insert_list))
+                continue
+            values = [value.item() if hasattr(value,'item') else value for value in insert_list]
+            values[27] = str(values[27]).strip("'")
+            values[28] = str(values[28]).strip("'")
+            rows.append((int(values[0]),int(values[1])) + tuple(values[2:]))
+
+        if len(rows) == 0:
+            return row_count
+
+        # DBに接続
+        my_conn,my_cursor = db_acquire(session)
+
+        # 全ての行を主キーによるUPDATE-INSERTで登録する
+        sql = get_upsert_sql(HOURLY_TABLE_NAME,HOURLY_KEY_COLUMNS,HOURLY_COLUMNS)
+        my_cursor.executemany(sql,rows)
+        row_count = len(rows)
+
+        # COMMITする
+        db_commit(my_conn,session)
+
+        # ログを出力する
+        file_util.write_log(f"{str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))} Upsert {HOURLY_TABLE_NAME} : {row_count} rows","debug")
+
     except Exception as e:
         # エラーログを出力する
-        error_message = f"{str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))} Error in db_UpdateInsertDailyTable: {str(e)}"
-        file_util.write_log(error_message)
+        error_message = f"{str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))} Error in db_UpdateInsertHourlyTableBatch: {str(e)}"
+        file_util.write_log(error_message,"error")
+
+        # セッション使用時は呼び出し元でロールバックさせる
+        if session is not None:
+            raise
+
+        # ロールバックする
+        if my_conn is not None:
+            my_conn.rollback()
+        row_count = 0
+
+    finally:
+        # DBの接続を閉じる
+        db_release(my_conn,my_cursor,session)
+
+    return row_count
 
-def db_UpdateInsertMonthlyTable(oha_yyyymm):
+def db_ClearOriginStaging(session=None):
 
     """
-    db_UpdateInsertMonthlyTable 関数
+    db_ClearOriginStaging 関数
 
     概要:
-        月別テーブルにデータをUPDATEまたはINSERTする。
+        ステージングテーブルを空にする（MySQL: TRUNCATE TABLE、SQLite: DELETE）。
+        MySQLでは TRUNCATE TABLE が暗黙にCOMMITするため、セッションの登録の前か、COMMITした後に実行する。
 
     引数:
-        oha_yyyymm (int): 観測月を表すYYYYMM形式の整数。
+        session (DbSession): 実行単位のセッション。指定した場合はセッションの接続を使う。
 
     戻り値:
         なし
 
     例外処理:
-        データベース操作中にエラーが発生した場合は、エラーログを出力する。
+        データベース操作中にエラーが発生した場合は、エラーログを出力し、例外を送出する。
     """
 
+    my_conn = None
+    my_cursor = None
     try:
-        # DBに接続
-        my_conn,my_cursor = db_init()
+        my_conn,my_cursor = db_acquire(session)
+        my_cursor.execute(get_backend().get_truncate_sql(ORIGIN_STAGING_TABLE_NAME))
+        db_commit(my_conn,session)
+
+    except Exception as e:
+        # エラーログを出力する
+        error_message = f"{str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))} Error in db_ClearOriginStaging: {str(e)}"
+        file_util.write_log(error_message,"error")
+        raise
+
+    finally:
+        # DBの接続を閉じる
+        db_release(my_conn,my_cursor,session)
+
+def db_LoadOriginStaging(csv_path,session):
+
+    """
+    db_LoadOriginStaging 関数
+
+    概要:
+        元データテーブルの列順のCSVファイルを、LOAD DATA LOCAL INFILE でステージングテーブルに読み込む。
+        ステージングテーブル内でキーが重複する行は、後の行で置き換える（REPLACE）。
+
+    引数:
+        csv_path (str): 読み込むCSVファイルのパス（ORIGIN_COLUMNS の列順、ヘッダー無し、NULL は \\N）
+        session (DbSession): DbSession(local_infile=True) で作成したセッション
+
+    戻り値:
+        row_count (int): 読み込んだ行数
+
+    例外処理:
+        データベース操作中にエラーが発生した場合は、例外をそのまま送出する
+        （サーバーで local_infile が無効な場合など。呼び出し元で db_InsertOriginStaging に切り替える）。
+    """
+
+    if get_backend().supports_load_data == False:
+        raise NotImplementedError(f"LOAD DATA LOCAL INFILE is not supported by {get_backend().name}")
+
+    sql = f"""
+    LOAD DATA LOCAL INFILE %s
+    REPLACE INTO TABLE {ORIGIN_STAGING_TABLE_NAME}
+    FIELDS TERMINATED BY ','
+    LINES TERMINATED BY '\\n'
+    ({', '.join(ORIGIN_COLUMNS)})
+    """
+    session.cursor.execute(sql,(csv_path,))
+    return session.cursor.rowcount
+
+def db_InsertOriginStaging(rows,batch_rows,session):
+
+    """
+    db_InsertOriginStaging 関数
+
+    概要:
+        元データテーブルの列順の行を、複数行の REPLACE で batch_rows 行ずつステージングテーブルに登録する。
+        LOAD DATA LOCAL INFILE を使用できない場合に使用する。
+
+    引数:
+        rows (list): ORIGIN_COLUMNS の列順のタプルのリスト
+        batch_rows (int): 1回の REPLACE で登録する行数
+        session (DbSession): 実行単位のセッション
+
+    戻り値:
+        row_count (int): 登録した行数
+
+    例外処理:
+        データベース操作中にエラーが発生した場合は、エラーログを出力し、例外を送出する。
+    """
+
+    try:
+        placeholders = get_backend().get_placeholders(len(ORIGIN_COLUMNS))
+        sql = f"REPLACE INTO {ORIGIN_STAGING_TABLE_NAME} ({', '.join(ORIGIN_COLUMNS)}) VALUES ({placeholders})"
+        for start in range(0,len(rows),batch_rows):
+            session.cursor.executemany(sql,rows[start:start + batch_rows])
+
+    except Exception as e:
+        # エラーログを出力する
+        error_message = f"{str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))} Error in db_InsertOriginStaging: {str(e)}"
+        file_util.write_log(error_message,"error")
+        raise
+
+    return len(rows)
+
+def db_MergeOriginStaging(session):
+
+    """
+    db_MergeOriginStaging 関数
 
-        # 月別テーブルに対して該当月の件数を取得
-        sql = ""
+    概要:
+        ステージングテーブルの全行を、1回の INSERT ... SELECT ... ON DUPLICATE KEY UPDATE で元データテーブルにマージする。
+
+    引数:
+        session (DbSession): 実行単位のセッション（COMMITはセッション側で行う）
+
+    戻り値:
+        affected_count (int): MySQLの影響行数（新規の行は1、更新した行は2、変更の無い行は0として数える）
+
+    例外処理:
+        データベース操作中にエラーが発生した場合は、エラーログを出力し、例外を送出する。
+    """
+
+    try:
+        columns = ", ".join(ORIGIN_COLUMNS)
+        upsert_clause = get_backend().get_upsert_clause(ORIGIN_KEY_COLUMNS,ORIGIN_VALUE_COLUMNS,select=True)
+        sql = f"""
+        INSERT INTO {ORIGIN_TABLE_NAME} ({columns})
+        SELECT {columns} FROM {ORIGIN_STAGING_TABLE_NAME}
+        {upsert_clause}
+        """
+        session.cursor.execute(sql)
+        affected_count = session.cursor.rowcount
+
+    except Exception as e:
+        # エラーログを出力する
+        error_message = f"{str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))} Error in db_MergeOriginStaging: {str(e)}"
+        file_util.write_log(error_message,"error")
+        raise
+
+    return affected_count
+
+def db_StreamOriginRows(oha_yyyymmdd_list,fetch_rows,session):
+
+    """
+    db_StreamOriginRows 関数
+
+    概要:
+        元データテーブルの指定した日の行を、CSVファイルの列順（31列）の配列で fetch_rows 行ずつ返すジェネレーター。
+        サーバー側のカーソル（バッファリングしないカーソル）で読み込むため、全行をメモリ上に保持しない。
+        全行を読み込むまで、セッションの接続では他のSQLを実行できない。
+
+    引数:
+        oha_yyyymmdd_list (list): 観測日を表すYYYYMMDD形式の整数のリスト
+        fetch_rows (int): 1回に取得する行数
+        session (DbSession): 実行単位のセッション
+
+    戻り値:
+        numpy.ndarray - 行数 × 31 の float64 の配列（観測日・観測時間の順。NULL は NaN）を順に返す
+
+    例外処理:
+        データベース操作中にエラーが発生した場合は、エラーログを出力し、例外を送出する。
+    """
+
+    if len(oha_yyyymmdd_list) == 0:
+        return
+
+    stream_cursor = None
+    try:
+        stream_cursor = metrics_ops.MetricsCursor(get_backend().get_stream_cursor(session.conn))
+        placeholders = get_backend().get_placeholders(len(oha_yyyymmdd_list))
         sql = f"""
         SELECT
-            COUNT(*) 
+            {', '.join(ORIGIN_COLUMNS[:31])}
         FROM
-            {MONTHLY_TABLE_NAME}
-        WHERE KANSOKU_MONTH_INT = {oha_yyyymm}
+            {ORIGIN_TABLE_NAME}
+        WHERE
+            KANSOKU_DATE_INT IN ({placeholders})
+        ORDER BY
+            KANSOKU_DATE_INT, KANSOKU_TIME_INT
         """
+        stream_cursor.execute(sql,tuple(int(oha_yyyymmdd) for oha_yyyymmdd in oha_yyyymmdd_list))
+        while True:
+            rows = stream_cursor.fetchmany(fetch_rows)
+            if len(rows) == 0:
+                break
+            yield np.array(rows,dtype=np.float64)
 
-        # SQLクエリを実行し、結果を取得
-        my_cursor.execute(sql)
-        results = my_cursor.fetchall()
+    except Exception as e:
+        # エラーログを出力する
+        error_message = f"{str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))} Error in db_StreamOriginRows: {str(e)}"
+        file_util.write_log(error_message,"error")
+        raise
+
+    finally:
+        # カーソルを閉じる
+        if stream_cursor is not None:
+            stream_cursor.close()
+
+def db_DeleteRollupRange(start_date_int,end_date_int,oha_yyyymm_list,session):
+
+    """
+    db_DeleteRollupRange 関数
+
+    概要:
+        集計し直す期間の時間別・日別テーブルと時間別・日別の統計テーブルの行を削除する。
+        月別テーブルと月別の統計テーブルは、期間が月の全ての日を含む月（oha_yyyymm_list）の行だけを削除する。
+        元データテーブルから行が無くなった時間・日の集計結果を残さないために、集計し直す前に実行する。
+
+    引数:
+        start_date_int (int): 開始日（YYYYMMDD、この日を含む）
+        end_date_int (int): 終了日（YYYYMMDD、この日を含む）
+        oha_yyyymm_list (list): 行を削除する月（YYYYMM）のリスト
+        session (DbSession): 実行単位のセッション（COMMITはセッション側で行う）
+
+    戻り値:
+        なし
+
+    例外処理:
+        データベース操作中にエラーが発生した場合は、エラーログを出力し、例外を送出する。
+    """
+
+    try:
+        p = get_backend().placeholder
+        date_tables = [HOURLY_TABLE_NAME,DAILY_TABLE_NAME] + [rollup_ops.ROLLUP_TABLES[level][0] for level in ("hourly","daily")]
+        for table_name in date_tables:
+            session.cursor.execute(f"DELETE FROM {table_name} WHERE KANSOKU_DATE_INT BETWEEN {p} AND {p}",(start_date_int,end_date_int))
+
+        if len(oha_yyyymm_list) > 0:
+            placeholders = get_backend().get_placeholders(len(oha_yyyymm_list))
+            for table_name in [MONTHLY_TABLE_NAME,rollup_ops.ROLLUP_TABLES["monthly"][0]]:
+                session.cursor.execute(f"DELETE FROM {table_name} WHERE KANSOKU_MONTH_INT IN ({placeholders})",tuple(oha_yyyymm_list))
+
+    except Exception as e:
+        # エラーログを出力する
+        error_message = f"{str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))} Error in db_DeleteRollupRange: {str(e)}"
+        file_util.write_log(error_message,"error")
+        raise
+
+def db_UpsertRollupTable(level,keys,states,session=None):
+
+    """
+    db_UpsertRollupTable 関数
+
+    概要:
+        統計テーブルに、集計した状態の列と、状態の列から求めた列を一括でUPDATE-INSERTする。
+        キーが既に存在する行は ON DUPLICATE KEY UPDATE で置き換える。
+
+    引数:
+        level (str): 集計の単位（"hourly", "daily", "monthly"）
+        keys (numpy.ndarray): キーの配列（時間別: YYYYMMddhh、日別: YYYYMMdd、月別: YYYYMM）
+        states (numpy.ndarray): キー数 × len(rollup_ops.ROLLUP_STATE_COLUMNS) の状態の列
+        session (DbSession): 実行単位のセッション。指定した場合はセッションの接続を使い、COMMITしない。
+
+    戻り値:
+        int - 登録した行数
+
+    例外処理:
+        データベース操作中にエラーが発生した場合は、エラーログを出力し、0 を返す。
+        セッションが指定されている場合は、エラーログを出力した後に例外を送出する。
+    """
+
+    my_conn = None
+    my_cursor = None
+    row_count = 0
+
+    try:
+        rows = rollup_ops.get_table_rows(level,keys,states)
+        if len(rows) == 0:
+            return row_count
+
+        # DBに接続
+        my_conn,my_cursor = db_acquire(session)
+
+        # 全ての行を1回のUPDATE-INSERTで登録する
+        table_name,key_columns = rollup_ops.ROLLUP_TABLES[level]
+        sql = get_upsert_sql(table_name,key_columns,key_columns + rollup_ops.ROLLUP_COLUMNS + ["UPDATE_DATETIME"])
+        my_cursor.executemany(sql,rows)
+        row_count = len(rows)
+
+        # COMMITする
+        db_commit(my_conn,session)
+
+        # ログを出力する
+        file_util.write_log(f"{str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))} Upsert {table_name} : {row_count} rows","debug")
+
+    except Exception as e:
+        # エラーログを出力する
+        error_message = f"{str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))} Error in db_UpsertRollupTable: {str(e)}"
+        file_util.write_log(error_message,"error")
+
+        # セッション使用時は呼び出し元でロールバックさせる
+        if session is not None:
+            raise
+
+        # ロールバックする
+        if my_conn is not None:
+            my_conn.rollback()
+        row_count = 0
+
+    finally:
+        # DBの接続を閉じる
+        db_release(my_conn,my_cursor,session)
+
+    return row_count
+
+def db_SelectRollupStates(level,parent_keys,session=None):
+
+    """
+    db_SelectRollupStates 関数
+
+    概要:
+        統計テーブルから、指定した上位の単位（日・月）に含まれる行の状態の列を1回のSELECTで取得する。
+
+    引数:
+        level (str): 取得する統計テーブルの単位（"hourly" または "daily"）
+        parent_keys (numpy.ndarray): 上位の単位のキーの配列（"hourly" の場合は YYYYMMdd、"daily" の場合は YYYYMM）
+        session (DbSession): 実行単位のセッション。
+
+    戻り値:
+        tuple - (キーの配列, 行数 × len(rollup_ops.ROLLUP_STATE_COLUMNS) の状態の列)
+
+    例外処理:
+        データベース操作中にエラーが発生した場合は、エラーログを出力し、例外を送出する。
+    """
 
-        # 既存レコード件数を取得
-        record_count = results[0][0]
+    my_conn = None
+    my_cursor = None
 
-        # 時間別テーブルのデータを集計するSQLを作成
-        sql = ""
+    try:
+        # DBに接続
+        my_conn,my_cursor = db_acquire(session)
+
+        # 上位の単位に含まれる行だけを取得する（どちらのテーブルも観測日で絞り込む）
+        # 日の場合は観測日の IN、月の場合は連続した月ごとに観測日の半開区間 [月初, 翌月初) の OR で検索する
+        table_name,key_columns = rollup_ops.ROLLUP_TABLES[level]
+        p = get_backend().placeholder
+        if level == "hourly":
+            params = tuple(int(key) for key in np.unique(parent_keys))
+            condition = f"KANSOKU_DATE_INT IN ({get_backend().get_placeholders(len(params))})"
+        else:
+            params = ()
+            for first_month,last_month in get_month_runs(parent_keys):
+                params += (get_month_date_range(first_month)[0],get_month_date_range(last_month)[1])
+            condition = " OR ".join([f"(KANSOKU_DATE_INT >= {p} AND KANSOKU_DATE_INT < {p})"] * (len(params) // 2))
         sql = f"""
         SELECT
-            {oha_yyyymm} AS KANSOKU_MONTH_INT
-            ,MAX(( 
-            SELECT
-                BAIDEN_23 
-            FROM
-                {DAILY_TABLE_NAME}
-            WHERE
-                YEAR (KANSOKU_DATE) = {int(str(oha_yyyymm)[0:4])} 
-                AND MONTH (KANSOKU_DATE) = {int(str(oha_yyyymm)[5:6])}
-            ORDER BY
-                KANSOKU_DATE_INT DESC 
-            LIMIT
-                1
-            ) - ( 
-            SELECT
-                BAIDEN_00 
-            FROM
-                {DAILY_TABLE_NAME} 
-            WHERE
-                YEAR (KANSOKU_DATE) = {int(str(oha_yyyymm)[0:4])} 
-                AND MONTH (KANSOKU_DATE) = {int(str(oha_yyyymm)[5:6])} 
-            ORDER BY
-                KANSOKU_DATE_INT ASC 
-            LIMIT
-                1
-        )) AS BAIDEN_MONTHLY 
+            {', '.join(key_columns + rollup_ops.ROLLUP_STATE_NAMES)}
         FROM
-            {DAILY_TABLE_NAME}
+            {table_name}
         WHERE
-            YEAR (KANSOKU_DATE) = {int(str(oha_yyyymm)[0:4])}
-            AND MONTH (KANSOKU_DATE) = {int(str(oha_yyyymm)[5:6])}
+            {condition}
         """
-
-        # SQLクエリを実行し、結果を取得
-        my_cursor.execute(sql)
+        my_cursor.execute(sql,params)
         results = my_cursor.fetchall()
 
-        # 結果セットを変数に格納
-        kansoku_month_int = results[0][0] # 観測月
-        baiden_monthly = results[0][1] # 1か月あたりの売電量
+    except Exception as e:
+        # エラーログを出力する
+        error_message = f"{str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))} Error in db_SelectRollupStates: {str(e)}"
+        file_util.write_log(error_message,"error")
+        raise
+
+    finally:
+        # DBの接続を閉じる
+        db_release(my_conn,my_cursor,session)
 
-        # 既存レコード件数が0の場合、INSERTする
-        if record_count == 0 :
+    # 状態の列を配列に変換する
+    key_count = len(key_columns)
+    table = np.array([[np.nan if value is None else float(value) for value in row] for row in results],dtype=np.float64).reshape(-1,key_count + len(rollup_ops.ROLLUP_STATE_NAMES))
+    keys = table[:,0].astype(np.int64)
+    if level == "hourly":
+        keys = keys * 100 + table[:,1].astype(np.int64)
+    return keys,table[:,key_count:]
 
-            # INSERT文を作成        
-            sql = ""
-            sql = f"""
-            INSERT
-            INTO {MONTHLY_TABLE_NAME}
-            VALUES ({kansoku_month_int}, {baiden_monthly} ,'{str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))}')
-            """
+def db_UpdateRollupTables(hour_keys,hour_states,session=None):
 
-            # SQLを実行する
-            my_cursor.execute(sql)
-            my_conn.commit()
+    """
+    db_UpdateRollupTables 関数
 
-            # ログを出力する
-            file_util.write_log(f"Inserted into {MONTHLY_TABLE_NAME} : {results[0]}")
+    概要:
+        時間ごとに集計した状態の列（rollup_ops.rollup_rows の結果）を時間別の統計テーブルに登録し、
+        対象となった日・月の統計を集計し直して日別・月別の統計テーブルに登録する。
+        集計の単位ごとに、SELECT 1回、NumPy での集計1回、UPDATE-INSERT 1回で処理する（日数・月数によらない）。
 
-        # 既存レコード件数が1の場合、UPDATEする
-        elif record_count == 1 :
+    引数:
+        hour_keys (numpy.ndarray): 時間のキー（YYYYMMddhh）の配列
+        hour_states (numpy.ndarray): 時間数 × len(rollup_ops.ROLLUP_STATE_COLUMNS) の状態の列
+        session (DbSession): 実行単位のセッション。指定した場合はセッションの接続を使い、COMMITしない。
 
-            # UPDATE文を作成        
-            sql = ""
-            sql = f"""
-            UPDATE {MONTHLY_TABLE_NAME} 
-            SET
-                BAIDEN_MONTHLY = {baiden_monthly}
-            WHERE
-            KANSOKU_MONTH_INT = {oha_yyyymm}
-            """
+    戻り値:
+        dict - 単位ごとの登録した行数
+
+    例外処理:
+        データベース操作中にエラーが発生した場合は、エラーログを出力する。
+        セッションが指定されている場合は、エラーログを出力した後に例外を送出する。
+    """
 
-            # SQLを実行する
-            my_cursor.execute(sql)
-            my_conn.commit()
+    counts = {level: 0 for level in rollup_ops.ROLLUP_LEVELS}
+    if len(hour_keys) == 0:
+        return counts
 
-            # ログを出力する
-            file_util.write_log(f"{str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))} Update {MONTHLY_TABLE_NAME} : {results[0]}") 
+    try:
+        counts["hourly"] = db_UpsertRollupTable("hourly",hour_keys,hour_states,session)
 
-        # DBの接続を閉じる
-        db_close(my_cursor,my_conn)
+        # 下位の単位の統計テーブルから、対象となった上位の単位の行を集計し直す
+        keys = hour_keys
+        for child_level,level in zip(rollup_ops.ROLLUP_LEVELS[:-1],rollup_ops.ROLLUP_LEVELS[1:]):
+            child_keys,child_states = db_SelectRollupStates(child_level,np.unique(keys // 100),session)
+            keys,states = rollup_ops.rollup_parent(child_keys,child_states)
+            counts[level] = db_UpsertRollupTable(level,keys,states,session)
 
     except Exception as e:
         # エラーログを出力する
-        error_message = f"{str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))} Error in db_UpdateInsertMonthlyTable: {str(e)}"
-        file_util.write_log(error_message)
\ No newline at end of file
+        error_message = f"{str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))} Error in db_UpdateRollupTables: {str(e)}"
+        file_util.write_log(error_message,"error")
+
+        # セッション使用時は呼び出し元でロールバックさせる
+        if session is not None:
+            raise
+
+    return counts
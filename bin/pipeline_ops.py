@@ -0,0 +1,288 @@
+# -----------------------------------------------------------------------------
+# 会社名: 湘南技術センター株式会社
+# 名前: 塩見 和則
+# 作成日: 2026/10/18
+# -----------------------------------------------------------------------------
+
+# 標準ライブラリ
+import queue
+import threading
+import time
+import datetime as dt
+
+# 外部ライブラリ
+import file_util
+
+# 各ステージの入力キューの最大件数
+PIPELINE_QUEUE_SIZE = 4
+
+# 処理中の統計情報をログに出力する間隔（秒、0の場合は出力しない）
+PIPELINE_REPORT_INTERVAL = 0
+
+# ステージの終了を通知する目印
+_STOP = object()
+
+class PipelineStage:
+
+    """
+    PipelineStage クラス
+
+    概要:
+        パイプラインの1ステージ。入力キューから取り出したデータを処理関数に渡し、
+        結果を次のステージのキューに渡す。キューの深さと処理時間の統計情報を保持する。
+
+    属性:
+        name (str): ステージ名
+        func (callable): 処理関数。None を返した場合は次のステージに渡さない。
+        workers (int): ステージのワーカースレッド数
+        in_queue (queue.Queue): 入力キュー（件数に上限あり）
+    """
+
+    def __init__(self,name,func,workers,queue_size):
+        self.name = name
+        self.func = func
+        self.workers = workers
+        self.in_queue = queue.Queue(maxsize=queue_size)
+        self.lock = threading.Lock()
+        self.running_workers = workers
+        self.processed = 0
+        self.failed = 0
+        self.dropped = 0
+        self.cancelled = 0
+        self.max_queue_depth = 0
+        self.total_wait_sec = 0.0
+        self.max_wait_sec = 0.0
+        self.total_work_sec = 0.0
+        self.max_work_sec = 0.0
+
+    def put(self,item):
+        # 入力キューに追加する（キューが満杯の場合は空くまで待つ）
+        self.in_queue.put((time.perf_counter(),item))
+        with self.lock:
+            self.max_queue_depth = max(self.max_queue_depth,self.in_queue.qsize())
+
+    def get_stats(self):
+
+        """
+        get_stats メソッド
+
+        概要:
+            ステージの統計情報を取得する。
+
+        戻り値:
+            dict - キューの深さ、処理件数（中止により処理しなかった件数を含む）、待ち時間と処理時間（平均・最大）
+        """
+
+        with self.lock:
+            count = max(self.processed + self.failed,1)
+            return {
+                "workers": self.workers,
+                "queue_depth": self.in_queue.qsize(),
+                "max_queue_depth": self.max_queue_depth,
+                "processed": self.processed,
+                "failed": self.failed,
+                "dropped": self.dropped,
+                "cancelled": self.cancelled,
+                "avg_wait_sec": round(self.total_wait_sec / count,4),
+                "max_wait_sec": round(self.max_wait_sec,4),
+                "avg_work_sec": round(self.total_work_sec / count,4),
+                "max_work_sec": round(self.max_work_sec,4),
+                "busy_sec": round(self.total_work_sec,4),
+            }
+
+class Pipeline:
+
+    """
+    Pipeline クラス
+
+    概要:
+        件数に上限のあるキューでつないだステージを、それぞれのワーカースレッドで並行に処理するパイプライン。
+        例えば「ダウンロード → 読み込み・集計 → DB登録」とつなぐと、
+        N時間目をDBに登録している間にN+1時間目をダウンロードできる。
+
+    使用方法:
+        pipeline = Pipeline()
+        pipeline.add_stage("download",download_func,workers=3)
+        pipeline.add_stage("parse",parse_func,workers=2)
+        pipeline.add_stage("write",write_func,workers=1)
+        results = pipeline.run(items)
+        stats = pipeline.get_stats()
+
+    例外処理:
+        処理関数で例外が発生した場合は、エラーログを出力してそのデータを破棄し、処理を継続する。
+        処理を継続できない場合は、処理関数から cancel を呼び出すと、以降のデータは全てのステージで処理せずに破棄する。
+    """
+
+    def __init__(self,queue_size=PIPELINE_QUEUE_SIZE,report_interval=PIPELINE_REPORT_INTERVAL):
+        self.queue_size = queue_size
+        self.report_interval = report_interval
+        self.stages = []
+        self.results = []
+        self.results_lock = threading.Lock()
+        self.cancel_event = threading.Event()
+        self.elapsed_sec = 0.0
+
+    def add_stage(self,name,func,workers=1):
+
+        """
+        add_stage メソッド
+
+        概要:
+            パイプラインの末尾にステージを追加する。
+
+        引数:
+            name (str): ステージ名
+            func (callable): 処理関数（1件のデータを受け取り、次のステージに渡すデータを返す）
+            workers (int): ステージのワーカースレッド数
+
+        戻り値:
+            なし
+        """
+
+        self.stages.append(PipelineStage(name,func,max(1,workers),self.queue_size))
+
+    def run(self,items):
+
+        """
+        run メソッド
+
+        概要:
+            データをパイプラインに流し、全ステージの処理が終わるまで待つ。
+
+        処理内容:
+            1. 各ステージのワーカースレッドを起動する。
+            2. データを先頭ステージのキューに順番に追加する。
+            3. 全データを追加したら終了の目印を流し、全ワーカーの終了を待つ。
+
+        引数:
+            items (iterable): 先頭ステージに渡すデータ
+
+        戻り値:
+            list - 最終ステージの処理結果（None 以外）のリスト
+        """
+
+        start_time = time.perf_counter()
+
+        # 各ステージのワーカースレッドを起動する
+        threads = []
+        for index,stage in enumerate(self.stages):
+            for worker_no in range(stage.workers):
+                thread = threading.Thread(target=self._worker,args=(index,),name=f"{stage.name}-{worker_no}",daemon=True)
+                thread.start()
+                threads.append(thread)
+
+        # 統計情報を定期的に出力するスレッドを起動する
+        reporter_stop = threading.Event()
+        if self.report_interval > 0:
+            reporter = threading.Thread(target=self._reporter,args=(reporter_stop,),daemon=True)
+            reporter.start()
+
+        # データを先頭ステージに流す（中止された場合は以降のデータを流さない）
+        first_stage = self.stages[0]
+        for item in items:
+            if self.cancel_event.is_set():
+                break
+            first_stage.put(item)
+
+        # 先頭ステージのワーカー数分の終了の目印を流す
+        for i in range(first_stage.workers):
+            first_stage.in_queue.put((time.perf_counter(),_STOP))
+
+        # 全ワーカーの終了を待つ
+        for thread in threads:
+            thread.join()
+        reporter_stop.set()
+
+        self.elapsed_sec = time.perf_counter() - start_time
+        return self.results
+
+    def cancel(self):
+        # パイプラインを中止する（キューに残っているデータと以降のデータは処理せずに破棄する）
+        self.cancel_event.set()
+
+    def is_cancelled(self):
+        # 中止されたかどうか
+        return self.cancel_event.is_set()
+
+    def get_stats(self):
+
+        """
+        get_stats メソッド
+
+        概要:
+            全ステージの統計情報を取得する。処理中に呼び出すこともできる。
+
+        戻り値:
+            dict - ステージ名をキーとした統計情報
+        """
+
+        stats = {stage.name: stage.get_stats() for stage in self.stages}
+        stats["elapsed_sec"] = round(self.elapsed_sec,4)
+        return stats
+
+    def _worker(self,index):
+        # ステージのワーカースレッドの処理
+        stage = self.stages[index]
+        next_stage = self.stages[index + 1] if index + 1 < len(self.stages) else None
+
+        while True:
+            queued_time,item = stage.in_queue.get()
+
+            # 終了の目印を受け取った場合
+            if item is _STOP:
+                with stage.lock:
+                    stage.running_workers -= 1
+                    last_worker = stage.running_workers == 0
+
+                # ステージの最後のワーカーが次のステージに終了の目印を流す
+                if last_worker and next_stage is not None:
+                    for i in range(next_stage.workers):
+                        next_stage.in_queue.put((time.perf_counter(),_STOP))
+                break
+
+            # 中止された場合は処理せずに破棄する（上流のステージが待たずに終了できるように、キューからは取り出し続ける）
+            if self.cancel_event.is_set():
+                with stage.lock:
+                    stage.cancelled += 1
+                continue
+
+            # データを処理する
+            start_time = time.perf_counter()
+            wait_sec = start_time - queued_time
+            try:
+                result = stage.func(item)
+                failed = False
+            except Exception as e:
+                result = None
+                failed = True
+                error_message = f"{str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))} Error in pipeline stage {stage.name}: {str(e)}"
+                file_util.write_log(error_message,"error")
+            work_sec = time.perf_counter() - start_time
+
+            # 統計情報を更新する
+            with stage.lock:
+                if failed:
+                    stage.failed += 1
+                else:
+                    stage.processed += 1
+                    if result is None:
+                        stage.dropped += 1
+                stage.total_wait_sec += wait_sec
+                stage.max_wait_sec = max(stage.max_wait_sec,wait_sec)
+                stage.total_work_sec += work_sec
+                stage.max_work_sec = max(stage.max_work_sec,work_sec)
+
+            # 結果を次のステージに渡す
+            if result is None:
+                continue
+            if next_stage is not None:
+                next_stage.put(result)
+            else:
+                with self.results_lock:
+                    self.results.append(result)
+
+    def _reporter(self,stop_event):
+        # 統計情報を定期的にログに出力する
+        while not stop_event.wait(self.report_interval):
+            message = f"{str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))} Pipeline stats : {self.get_stats()}"
+            file_util.write_log(message)
@@ -0,0 +1,180 @@
+# -----------------------------------------------------------------------------
+# 会社名: 湘南技術センター株式会社
+# 名前: 塩見 和則
+# 作成日: 2026/10/18
+# -----------------------------------------------------------------------------
+
+# 標準ライブラリ
+import io
+import os
+import pstats
+import cProfile
+import threading
+import tracemalloc
+import datetime as dt
+
+# 外部ライブラリ
+import file_util
+
+# プロファイルの結果を書き出すディレクトリ（実行ごとに 開始日時_実行名 のディレクトリを作成する）
+PROFILE_DIRECTORY = "../log/profile"
+
+# 集計の結果に出力する処理時間の長い関数の数
+PROFILE_TOP_FUNCTIONS = 20
+
+# どのステージにも含まれない処理を記録するステージ名
+PROFILE_RUN_STAGE = "run"
+
+class RunProfiler:
+
+    """
+    RunProfiler クラス
+
+    概要:
+        1回の実行を、metrics_ops のステージ（FTP、CSVの読み込み、集計、DBの各登録・SQLなど）ごとに cProfile で計測する。
+        ステージが入れ子になる場合は、内側のステージの間は外側のステージのプロファイルを止め、関数の処理時間は一番内側のステージに記録する
+        （同時に有効にするプロファイルは常に1つだけにする）。
+        memory が True の場合は tracemalloc でステージごとのメモリ使用量のピークも記録する。
+        実行を開始したスレッドのステージだけを計測する。
+
+    属性:
+        run_name (str): 実行名
+        started (datetime.datetime): 開始日時
+        memory (bool): メモリ使用量のピークも記録するかどうか
+        profiles (dict): ステージ名 -> cProfile.Profile
+        peaks (dict): ステージ名 -> メモリ使用量のピーク（バイト）
+        stack (list): 実行中のステージ名（一番内側が最後）
+
+    使用方法:
+        profiler = RunProfiler("hourly",memory=True)
+        profiler.enter("parse")
+        csv_df = csvparse_ops.read_logger_csv(csv_data)
+        profiler.exit()
+        profiler.finish()
+    """
+
+    def __init__(self,run_name,memory=False):
+        self.run_name = run_name
+        self.started = dt.datetime.now()
+        self.memory = memory
+        self.thread_id = threading.get_ident()
+        self.profiles = {}
+        self.peaks = {}
+        self.stack = []
+        self.started_tracing = False
+        if memory == True:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self.started_tracing = True
+            tracemalloc.reset_peak()
+        self._push(PROFILE_RUN_STAGE)
+
+    def _record_peak(self,name):
+        # 前回リセットしてからのメモリ使用量のピークを記録する
+        if self.memory == True:
+            self.peaks[name] = max(self.peaks.get(name,0),tracemalloc.get_traced_memory()[1])
+
+    def _push(self,name):
+        # 外側のステージのプロファイルを止めて、ステージのプロファイルを開始する
+        if len(self.stack) > 0:
+            self.profiles[self.stack[-1]].disable()
+            self._record_peak(self.stack[-1])
+            if self.memory == True:
+                tracemalloc.reset_peak()
+        self.stack.append(name)
+        self.profiles.setdefault(name,cProfile.Profile()).enable()
+
+    def _pop(self):
+        # ステージのプロファイルを止めて、外側のステージのプロファイルを再開する
+        name = self.stack.pop()
+        self.profiles[name].disable()
+        self._record_peak(name)
+        if len(self.stack) > 0:
+            self.profiles[self.stack[-1]].enable()
+
+    def enter(self,name):
+        # ステージを開始する（実行を開始したスレッド以外では計測しない）
+        if threading.get_ident() != self.thread_id or len(self.stack) == 0:
+            return False
+        self._push(name)
+        return True
+
+    def exit(self):
+        # enter で開始したステージを終了する
+        self._pop()
+
+    def finish(self,profile_directory=PROFILE_DIRECTORY):
+
+        """
+        finish メソッド
+
+        概要:
+            計測を終了し、ステージごとのプロファイルと集計の結果をファイルに書き出す。
+
+        処理内容:
+            1. 実行全体のプロファイルを止め、tracemalloc を開始した場合は止める。
+            2. 開始日時（ミリ秒まで）_実行名 のディレクトリに、ステージごとのプロファイルを <ステージ名>.prof として書き出す
+               （python -m pstats や snakeviz で確認できる）。
+            3. ステージごとの処理時間・メモリ使用量のピークと、全てのステージで処理時間（tottime）の長い関数を summary.txt に書き出す。
+            4. 処理時間の長い関数の上位5件をログに出力する。
+
+        引数:
+            profile_directory (str): プロファイルの結果を書き出すディレクトリ
+
+        戻り値:
+            str - 書き出したディレクトリのパス（書き出しに失敗した場合は None）
+
+        例外処理:
+            書き出しに失敗した場合は、エラーログを出力する（取り込みの結果には影響させない）。
+        """
+
+        while len(self.stack) > 0:
+            self._pop()
+        if self.started_tracing == True:
+            tracemalloc.stop()
+
+        try:
+            run_directory = os.path.join(profile_directory,f"{self.started.strftime('%Y%m%d_%H%M%S_%f')[:-3]}_{self.run_name}")
+            os.makedirs(run_directory,exist_ok=True)
+
+            # ステージごとのプロファイルを書き出す（関数を呼び出さなかったステージは除く）
+            stage_stats = {}
+            stage_profiles = []
+            for name,profile in self.profiles.items():
+                profile.create_stats()
+                if len(profile.stats) == 0:
+                    continue
+                stats = pstats.Stats(profile)
+                stats.dump_stats(os.path.join(run_directory,f"{name}.prof"))
+                stage_stats[name] = stats
+                stage_profiles.append(profile)
+
+            # ステージごとの処理時間と、全体で処理時間の長い関数を集計する
+            lines = [f"run: {self.run_name}  started: {self.started.strftime('%Y-%m-%d %H:%M:%S')}","","stage                                      sec        peak_kb"]
+            for name,stats in sorted(stage_stats.items(),key=lambda item: -item[1].total_tt):
+                peak = f"{self.peaks[name] / 1024:.1f}" if name in self.peaks else "-"
+                lines.append(f"{name:<40} {stats.total_tt:>8.4f} {peak:>14}")
+            total_stats = pstats.Stats(*stage_profiles) if stage_profiles else None
+            stream = io.StringIO()
+            if total_stats is not None:
+                total_stats.stream = stream
+                total_stats.sort_stats("tottime").print_stats(PROFILE_TOP_FUNCTIONS)
+            with open(os.path.join(run_directory,"summary.txt"),'w',encoding='utf-8') as summary_file:
+                summary_file.write("\n".join(lines) + "\n\n" + stream.getvalue())
+
+            # ログを出力する
+            hot_functions = []
+            if total_stats is not None:
+                ranking = sorted(total_stats.stats.items(),key=lambda item: -item[1][2])[:5]
+                hot_functions = [f"{function}({os.path.basename(filename)}:{line_no}) {values[2]:.3f}s" for (filename,line_no,function),values in ranking]
+            message = f"{str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))} Profile {self.run_name} written to {run_directory} : {hot_functions}"
+            file_util.write_log(message)
+
+            return run_directory
+
+        except Exception as e:
+            # エラーログを出力する
+            error_message = f"{str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))} Error in RunProfiler.finish: {str(e)}"
+            file_util.write_log(error_message,"error")
+
+            return None
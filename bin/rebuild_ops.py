@@ -0,0 +1,160 @@
+# -----------------------------------------------------------------------------
+# 会社名: 湘南技術センター株式会社
+# 名前: 塩見 和則
+# 作成日: 2026/10/18
+# -----------------------------------------------------------------------------
+
+# 標準ライブラリ
+import time
+import calendar
+import datetime as dt
+from concurrent.futures import ThreadPoolExecutor
+
+# 外部ライブラリ
+import mysql_ops as mysql
+import file_util
+import dirty_ops
+
+# 並列に集計し直す月数（1か月につき1接続を使用するため、コネクションプールの大きさ以下にする）
+REBUILD_WORKERS = 3
+
+# 元データテーブルから1回に取得する行数（1か月分の処理で保持する行数の上限）
+REBUILD_FETCH_ROWS = 10000
+
+def get_rebuild_months(start_date,end_date):
+
+    """
+    get_rebuild_months 関数
+
+    概要:
+        期間を月ごとに分割する関数。
+
+    引数:
+        start_date: datetime.date - 開始日（この日を含む）
+        end_date: datetime.date - 終了日（この日を含む）
+
+    戻り値:
+        month_list: list - (YYYYMM, 月内の開始日 YYYYMMDD, 月内の終了日 YYYYMMDD, 月の全ての日を含むかどうか) のリスト
+
+    例外処理:
+        なし
+    """
+
+    start_date_int = int(start_date.strftime('%Y%m%d'))
+    end_date_int = int(end_date.strftime('%Y%m%d'))
+
+    month_list = []
+    year,month = start_date.year,start_date.month
+    while year * 100 + month <= end_date.year * 100 + end_date.month:
+        first_day = (year * 100 + month) * 100 + 1
+        last_day = (year * 100 + month) * 100 + calendar.monthrange(year,month)[1]
+        month_start = max(first_day,start_date_int)
+        month_end = min(last_day,end_date_int)
+        month_list.append((year * 100 + month,month_start,month_end,month_start == first_day and month_end == last_day))
+        year,month = (year + 1,1) if month == 12 else (year,month + 1)
+
+    return month_list
+
+def rebuild_month(oha_yyyymm,start_date_int,end_date_int,full_month,fetch_rows=REBUILD_FETCH_ROWS):
+
+    """
+    rebuild_month 関数
+
+    概要:
+        1か月（またはその一部の期間）の時間別・日別・月別テーブルと統計テーブルを、元データテーブルから集計し直す関数。
+
+    処理内容:
+        1. 元データテーブルの期間の行をサーバー側のカーソルで fetch_rows 行ずつ読み込み、
+           時間別テーブルの行と統計の状態の列に集計する（dirty_ops.aggregate_origin）。
+        2. 1つのDBセッションで以下を行い、最後にまとめてCOMMITする:
+            - 期間の時間別・日別テーブルと統計テーブルの行を削除する（月の全ての日を含む場合は月別も）。
+            - 時間別テーブルに集計結果をUPDATE-INSERTする。
+            - 日別・月別テーブルを時間別テーブルから集計し直す。
+            - 時間別・日別・月別の統計テーブルにUPDATE-INSERTする。
+
+    引数:
+        oha_yyyymm: int - 対象の月（YYYYMM）
+        start_date_int: int - 月内の開始日（YYYYMMDD、この日を含む）
+        end_date_int: int - 月内の終了日（YYYYMMDD、この日を含む）
+        full_month: bool - 期間が月の全ての日を含むかどうか
+        fetch_rows: int - 元データテーブルから1回に取得する行数
+
+    戻り値:
+        result: dict - 読み込んだ行数、時間数、日数
+
+    例外処理:
+        データベース操作中にエラーが発生した場合は、ロールバックして例外を送出する（呼び出し元でエラーログを出力する）。
+    """
+
+    result = {"rows": 0,"hours": 0,"days": 0}
+    with mysql.DbSession() as session:
+        # 元データテーブルの行を読み込みながら集計する
+        records,(hour_keys,hour_states),result["rows"] = dirty_ops.aggregate_origin(list(range(start_date_int,end_date_int + 1)),session,None,fetch_rows)
+        day_list = sorted(set(record.kansoku_date_int for record in records))
+        result["hours"] = len(records)
+        result["days"] = len(day_list)
+
+        # 期間の集計結果を削除してから登録し直す
+        mysql.db_DeleteRollupRange(start_date_int,end_date_int,[oha_yyyymm] if full_month else [],session)
+        mysql.db_UpdateInsertHourlyTableBatch(records,session)
+        mysql.db_UpdateInsertDailyTableBatch(day_list,session)
+        mysql.db_UpdateInsertMonthlyTableBatch([oha_yyyymm],session)
+        mysql.db_UpdateRollupTables(hour_keys,hour_states,session)
+
+    return result
+
+def rebuild_rollups(start_date,end_date,workers=REBUILD_WORKERS,fetch_rows=REBUILD_FETCH_ROWS):
+
+    """
+    rebuild_rollups 関数
+
+    概要:
+        指定した期間の時間別・日別・月別テーブルと統計テーブルを、CSVファイルをダウンロードし直さずに元データテーブルから集計し直す関数。
+        集計処理を変更した場合や、元データテーブルのデータを修正した場合に使用する。
+
+    処理内容:
+        1. 期間を月ごとに分割する。
+        2. 月ごとの集計（rebuild_month）を workers 個のスレッドで並列に実行する。月ごとに別のDBセッションでCOMMITする。
+        3. 月ごとの結果と、処理時間・1秒あたりの行数をログに出力する。
+
+    引数:
+        start_date: datetime.date - 開始日（この日を含む）
+        end_date: datetime.date - 終了日（この日を含む）
+        workers: int - 並列に集計し直す月数
+        fetch_rows: int - 元データテーブルから1回に取得する行数
+
+    戻り値:
+        summary: dict - 月ごとの結果、合計の行数、失敗した月、処理時間
+
+    例外処理:
+        月の集計に失敗した場合は、エラーログを出力し、その月だけロールバックして他の月の処理を続ける。
+    """
+
+    start_time = time.perf_counter()
+    summary = {"months": {},"failed": [],"rows": 0}
+    month_list = get_rebuild_months(start_date,end_date)
+
+    def run_month(month):
+        oha_yyyymm,start_date_int,end_date_int,full_month = month
+        try:
+            summary["months"][oha_yyyymm] = rebuild_month(oha_yyyymm,start_date_int,end_date_int,full_month,fetch_rows)
+        except Exception as e:
+            # エラーログを出力する（この月の登録はロールバック済み）
+            error_message = f"{str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))} Failed to rebuild {oha_yyyymm}, rolled back: {str(e)}"
+            file_util.write_log(error_message,"error")
+            summary["failed"].append(oha_yyyymm)
+
+    # 月ごとに並列に集計し直す
+    with ThreadPoolExecutor(max_workers=max(1,min(workers,mysql.DB_POOL_SIZE))) as executor:
+        list(executor.map(run_month,month_list))
+
+    summary["failed"].sort()
+    summary["rows"] = sum(result["rows"] for result in summary["months"].values())
+    summary["elapsed_sec"] = round(time.perf_counter() - start_time,3)
+    summary["rows_per_sec"] = round(summary["rows"] / summary["elapsed_sec"],1) if summary["elapsed_sec"] > 0 else 0.0
+
+    # ログを出力する
+    message = f"{str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))} Rebuild rollups {start_date.strftime('%Y%m%d')}-{end_date.strftime('%Y%m%d')} : {summary}"
+    file_util.write_log(message)
+
+    return summary
@@ -0,0 +1,289 @@
+# -----------------------------------------------------------------------------
+# 会社名: 湘南技術センター株式会社
+# 名前: 塩見 和則
+# 作成日: 2026/10/18
+# -----------------------------------------------------------------------------
+
+# 標準ライブラリ
+import datetime as dt
+
+# 外部ライブラリ
+import numpy as np
+
+# ロガーがCSVファイルに1行を書き込む間隔（分）。発電量[W]から電力量[kWh]を求めるのに使用する
+ROLLUP_SAMPLE_MINUTES = 5
+
+# 集計の定義: (列名の接頭辞, CSVファイルの列番号, 集計方法のリスト)
+# 集計方法は ROLLUP_REDUCERS のキー。ここに追加した集計は、時間別・日別・月別の統計テーブルの列として自動的に作成される
+ROLLUP_SPEC = []
+for _no in range(1,9):
+    ROLLUP_SPEC.append((f"HATSUDEN_{_no:02d}",3 * _no + 2,["min","peak","energy_kwh"]))
+ROLLUP_SPEC += [
+    ("NISSYA",27,["min","max","mean"]),
+    ("TEMP",28,["min","max","mean"]),
+    ("ERROR",29,["share"]),
+]
+
+# 集計方法の定義: 集計方法 → [(列名の接尾辞, 行の値の求め方, 上位の集計での結合方法)]
+#   行の値の求め方: "value" = 値、"energy" = 1行（ROLLUP_SAMPLE_MINUTES 分間）の電力量[kWh]、
+#                   "present" = 値があれば1、"nonzero" = 値が0以外なら1、"time" = 観測日時（YYYYMMddhhmm）
+#   結合方法: "min" = 最小値、"max" = 最大値、"sum" = 合計、"argmax" = 直前の列が最大の行の値
+ROLLUP_REDUCERS = {
+    "min": [("MIN","value","min")],
+    "max": [("MAX","value","max")],
+    "peak": [("PEAK","value","max"),("PEAK_AT","time","argmax")],
+    "sum": [("SUM","value","sum")],
+    "mean": [("SUM","value","sum"),("COUNT","present","sum")],
+    "energy_kwh": [("ENERGY_kWH","energy","sum")],
+    "share": [("COUNT","nonzero","sum"),("SAMPLES","present","sum")],
+}
+
+# 結合した列から求める列の定義: 集計方法 → (列名の接尾辞, 分子の列名の接尾辞, 分母の列名の接尾辞)
+ROLLUP_DERIVED = {
+    "mean": ("AVG","SUM","COUNT"),
+    "share": ("SHARE","COUNT","SAMPLES"),
+}
+
+# 集計の単位ごとの統計テーブル: 単位 → (テーブル名, キーの列名のリスト)
+# キーは整数1つで表す（時間別: YYYYMMddhh、日別: YYYYMMdd、月別: YYYYMM）。上位の単位のキーは 100 で割った商になる
+ROLLUP_TABLES = {
+    "hourly": ("izumi_sola_hourly_stats",["KANSOKU_DATE_INT","KANSOKU_TIME_INT"]),
+    "daily": ("izumi_sola_daily_stats",["KANSOKU_DATE_INT"]),
+    "monthly": ("izumi_sola_monthly_stats",["KANSOKU_MONTH_INT"]),
+}
+ROLLUP_LEVELS = ["hourly","daily","monthly"]
+
+def _build_columns(spec):
+    # 集計の定義から、結合する列（状態の列）と、結合した列から求める列を作成する
+    state_columns = []
+    derived_columns = []
+    references = {}
+    for prefix,csv_column,reducers in spec:
+        for reducer in reducers:
+            for position,(suffix,source,combine) in enumerate(ROLLUP_REDUCERS[reducer]):
+                name = f"{prefix}_{suffix}"
+                if name not in [column[0] for column in state_columns]:
+                    state_columns.append((name,csv_column,source,combine))
+                if combine == "argmax":
+                    references[name] = f"{prefix}_{ROLLUP_REDUCERS[reducer][position - 1][0]}"
+            if reducer in ROLLUP_DERIVED:
+                suffix,numerator,denominator = ROLLUP_DERIVED[reducer]
+                derived_columns.append((f"{prefix}_{suffix}",f"{prefix}_{numerator}",f"{prefix}_{denominator}"))
+    return state_columns,derived_columns,references
+
+# 状態の列: (列名, CSVファイルの列番号, 行の値の求め方, 結合方法)、求める列: (列名, 分子の列名, 分母の列名)、
+# argmax の列が参照する列名の辞書
+ROLLUP_STATE_COLUMNS,ROLLUP_DERIVED_COLUMNS,_ARGMAX_REFERENCE_NAMES = _build_columns(ROLLUP_SPEC)
+ROLLUP_STATE_NAMES = [name for name,csv_column,source,combine in ROLLUP_STATE_COLUMNS]
+
+# 統計テーブルの値の列名（状態の列 + 求める列）
+ROLLUP_COLUMNS = ROLLUP_STATE_NAMES + [name for name,numerator,denominator in ROLLUP_DERIVED_COLUMNS]
+
+def _get_indexes(key,value):
+    # 状態の列のうち、指定した項目が指定した値の列番号を取得する
+    position = {"source": 2,"combine": 3}[key]
+    return np.array([index for index,column in enumerate(ROLLUP_STATE_COLUMNS) if column[position] == value],dtype=np.intp)
+
+# 行の値の求め方・結合方法ごとの状態の列番号（列ごとではなく、まとめて一度に計算するために使用する）
+_SOURCE_INDEXES = {source: _get_indexes("source",source) for source in ["value","energy","present","nonzero","time"]}
+_SOURCE_CSV_COLUMNS = {source: [ROLLUP_STATE_COLUMNS[index][1] for index in indexes] for source,indexes in _SOURCE_INDEXES.items()}
+_COMBINE_INDEXES = {combine: _get_indexes("combine",combine) for combine in ["min","max","sum","argmax"]}
+
+# argmax の列が参照する列番号（同じ集計方法の直前の列）
+_ARGMAX_REFERENCES = np.array([ROLLUP_STATE_NAMES.index(_ARGMAX_REFERENCE_NAMES[ROLLUP_STATE_NAMES[index]]) for index in _COMBINE_INDEXES["argmax"]],dtype=np.intp)
+
+# 求める列の分子と分母の列番号
+_DERIVED_NUMERATORS = np.array([ROLLUP_STATE_NAMES.index(numerator) for name,numerator,denominator in ROLLUP_DERIVED_COLUMNS],dtype=np.intp)
+_DERIVED_DENOMINATORS = np.array([ROLLUP_STATE_NAMES.index(denominator) for name,numerator,denominator in ROLLUP_DERIVED_COLUMNS],dtype=np.intp)
+
+def get_row_states(block):
+
+    """
+    get_row_states 関数
+
+    概要:
+        CSVファイルの行を、1行だけを集計した状態の列（行数 × len(ROLLUP_STATE_COLUMNS)）に変換する関数。
+        同じ求め方の列はまとめて一度に計算する。
+
+    引数:
+        block: numpy.ndarray - CSVファイルの行（行数 × 31 の float64 の配列）
+
+    戻り値:
+        numpy.ndarray - 状態の列の配列
+
+    例外処理:
+        なし
+    """
+
+    states = np.empty((len(block),len(ROLLUP_STATE_COLUMNS)),dtype=np.float64)
+
+    values = block[:,_SOURCE_CSV_COLUMNS["value"]]
+    states[:,_SOURCE_INDEXES["value"]] = values
+
+    # 発電量[W] × 間隔[h] / 1000 = 電力量[kWh]
+    energy = block[:,_SOURCE_CSV_COLUMNS["energy"]]
+    states[:,_SOURCE_INDEXES["energy"]] = energy * (ROLLUP_SAMPLE_MINUTES / 60) / 1000
+
+    present = block[:,_SOURCE_CSV_COLUMNS["present"]]
+    states[:,_SOURCE_INDEXES["present"]] = ~np.isnan(present)
+
+    nonzero = block[:,_SOURCE_CSV_COLUMNS["nonzero"]]
+    states[:,_SOURCE_INDEXES["nonzero"]] = (nonzero != 0) & ~np.isnan(nonzero)
+
+    # 観測日時（YYYYMMddhhmm）
+    if len(_SOURCE_INDEXES["time"]) > 0:
+        states[:,_SOURCE_INDEXES["time"]] = (block[:,1] * 10000 + block[:,2])[:,None]
+
+    return states
+
+def reduce_states(keys,states):
+
+    """
+    reduce_states 関数
+
+    概要:
+        状態の列をキーごとに結合する関数。結合方法ごとに、全てのキーを1回の NumPy の呼び出しでまとめて結合する。
+        行の状態から時間、時間から日、日から月のいずれの集計にも使用する。
+
+    処理内容:
+        1. キーの順に並べ替え、キーの区切り位置を求める。
+        2. 最小値・最大値・合計の列を、それぞれ reduceat で一度に結合する（欠損値は除き、値の無い場合は NaN）。
+        3. argmax の列は、参照する列が最大となる最初の行の値を取得する。
+
+    引数:
+        keys: numpy.ndarray - 行ごとのキー（整数）
+        states: numpy.ndarray - 行数 × len(ROLLUP_STATE_COLUMNS) の状態の列
+
+    戻り値:
+        tuple - (キーの配列, キー数 × len(ROLLUP_STATE_COLUMNS) の状態の列)
+
+    例外処理:
+        なし
+    """
+
+    if len(keys) == 0:
+        return np.empty(0,dtype=np.int64),np.empty((0,len(ROLLUP_STATE_COLUMNS)),dtype=np.float64)
+
+    # キーの順に並べ替える（同じキーの中では元の順番を保つ）
+    order = np.argsort(keys,kind="stable")
+    keys = keys[order]
+    states = states[order]
+    starts = np.flatnonzero(np.concatenate(([True],keys[1:] != keys[:-1])))
+    result = np.empty((len(starts),states.shape[1]),dtype=np.float64)
+
+    # 最小値・最大値（fmin/fmax は欠損値を除いて比較する）
+    index = _COMBINE_INDEXES["min"]
+    result[:,index] = np.fmin.reduceat(states[:,index],starts,axis=0)
+    index = _COMBINE_INDEXES["max"]
+    result[:,index] = np.fmax.reduceat(states[:,index],starts,axis=0)
+
+    # 合計（欠損値は除き、全て欠損値の場合は NaN）
+    index = _COMBINE_INDEXES["sum"]
+    block = states[:,index]
+    valid = ~np.isnan(block)
+    sums = np.add.reduceat(np.where(valid,block,0.0),starts,axis=0)
+    result[:,index] = np.where(np.add.reduceat(valid,starts,axis=0) > 0,sums,np.nan)
+
+    # argmax: 参照する列がキーごとの最大値と等しい最初の行の値
+    index = _COMBINE_INDEXES["argmax"]
+    if len(index) > 0:
+        lengths = np.diff(np.append(starts,len(keys)))
+        maximums = np.repeat(result[:,_ARGMAX_REFERENCES],lengths,axis=0)
+        rows = np.where(states[:,_ARGMAX_REFERENCES] == maximums,np.arange(len(keys))[:,None],len(keys))
+        first = np.minimum.reduceat(rows,starts,axis=0)
+        found = first < len(keys)
+        result[:,index] = np.where(found,states[np.minimum(first,len(keys) - 1),index],np.nan)
+
+    return keys[starts],result
+
+def rollup_rows(frames):
+
+    """
+    rollup_rows 関数
+
+    概要:
+        CSVファイルの行を、時間ごと（観測日と観測時刻から判定する）の状態の列に1回で集計する関数。
+        複数のファイル、複数の時間や日にまたがる行をまとめて渡してもよい。
+
+    引数:
+        frames: list - CSVファイルを読み込んだ DataFrame（または行数 × 31 の配列）のリスト
+
+    戻り値:
+        tuple - (時間のキー YYYYMMddhh の配列, 時間数 × len(ROLLUP_STATE_COLUMNS) の状態の列)
+
+    例外処理:
+        なし（呼び出し元でエラーログを出力する）
+    """
+
+    blocks = [frame if isinstance(frame,np.ndarray) else frame.to_numpy(dtype=np.float64) for frame in frames if len(frame) > 0]
+    if len(blocks) == 0:
+        return reduce_states(np.empty(0,dtype=np.int64),None)
+    block = np.concatenate(blocks).astype(np.float64,copy=False)
+
+    # 観測日・観測時刻が欠損している行は時間を判定できないため除く
+    keys = block[:,1] * 100 + block[:,2] // 100
+    finite = np.isfinite(keys)
+    return reduce_states(keys[finite].astype(np.int64),get_row_states(block[finite]))
+
+def combine_states(results):
+    # 複数回に分けて集計した (キーの配列, 状態の列) のリストを1つにまとめる（同じキーの行は結合する）
+    if len(results) == 0:
+        return reduce_states(np.empty(0,dtype=np.int64),None)
+    keys = np.concatenate([keys for keys,states in results])
+    states = np.vstack([states for keys,states in results])
+    return reduce_states(keys,states)
+
+def rollup_parent(keys,states):
+    # 下位の単位（時間・日）の状態の列を、上位の単位（日・月）に集計する
+    return reduce_states(keys // 100,states)
+
+def get_derived(states):
+    # 状態の列から求める列（平均値・割合）を計算する（分母が0または欠損値の場合は NaN）
+    with np.errstate(invalid="ignore",divide="ignore"):
+        return states[:,_DERIVED_NUMERATORS] / states[:,_DERIVED_DENOMINATORS]
+
+def get_key_values(level,key):
+    # キー（整数）を統計テーブルのキーの列の値に変換する
+    if level == "hourly":
+        return (key // 100,key % 100)
+    return (key,)
+
+def get_table_rows(level,keys,states):
+
+    """
+    get_table_rows 関数
+
+    概要:
+        状態の列を、統計テーブルに登録する行（キーの列 + ROLLUP_COLUMNS + 更新日時）のリストに変換する関数。
+
+    引数:
+        level: str - 集計の単位（"hourly", "daily", "monthly"）
+        keys: numpy.ndarray - キーの配列
+        states: numpy.ndarray - 状態の列
+
+    戻り値:
+        list - 登録する行のタプルのリスト（欠損値は None）
+
+    例外処理:
+        なし
+    """
+
+    update_datetime = str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))
+    values = np.hstack((states,get_derived(states)))
+    integer_columns = [index for index,name in enumerate(ROLLUP_COLUMNS) if get_column_type(name) != "DOUBLE"]
+    rows = []
+    for key,row in zip(keys.tolist(),values.tolist()):
+        row = [None if value != value else value for value in row]
+        for index in integer_columns:
+            if row[index] is not None:
+                row[index] = int(row[index])
+        rows.append(get_key_values(level,key) + tuple(row) + (update_datetime,))
+    return rows
+
+def get_column_type(name):
+    # 統計テーブルの値の列の型を取得する
+    if name.endswith("_PEAK_AT"):
+        return "BIGINT"
+    if name.endswith("_COUNT") or name.endswith("_SAMPLES"):
+        return "INT"
+    return "DOUBLE"
@@ -0,0 +1,281 @@
+# -----------------------------------------------------------------------------
+# 会社名: 湘南技術センター株式会社
+# 名前: 塩見 和則
+# 作成日: 2026/10/18
+# -----------------------------------------------------------------------------
+
+# 標準ライブラリ
+import os
+import json
+import time
+import signal
+import threading
+import datetime as dt
+
+# 外部ライブラリ
+import file_util
+
+# 失敗したジョブを再実行するまでの待ち時間（秒）。失敗するたびに2倍にし、上限で打ち止めにする
+SCHEDULER_RETRY_BASE_SEC = 60
+SCHEDULER_RETRY_MAX_SEC = 3600
+
+# 同じ実行時刻のジョブを再実行する最大回数
+SCHEDULER_RETRY_MAX_COUNT = 8
+
+# 各ジョブの直近の実行結果を書き出すファイル
+SCHEDULER_STATUS_FILE = "../log/scheduler_status.json"
+
+class ScheduledJob:
+
+    """
+    ScheduledJob クラス
+
+    概要:
+        一定間隔で実行するジョブ。実行時刻は間隔の区切り（+ offset 秒）に合わせる。
+        例えば interval=3600, offset=300 の場合は毎時5分に実行する。
+
+    属性:
+        name (str): ジョブ名
+        func (callable): 実行する関数。実行時刻（datetime.datetime）を受け取り、成功/失敗を真偽値で返す。
+        interval (int): 実行間隔（秒）
+        offset (int): 間隔の区切りからずらす秒数
+        retry (bool): 失敗した場合に同じ実行時刻で再実行するかどうか
+        next_run (float): 次の実行時刻（UNIX時間）
+        retries (dict): 再実行待ちの実行時刻をキー、(失敗回数, 再実行時刻) を値とする辞書
+    """
+
+    def __init__(self,name,func,interval,offset=0,retry=True):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.offset = offset
+        self.retry = retry
+        self.next_run = self.get_next_time(time.time())
+        self.retries = {}
+        self.runs = 0
+        self.failures = 0
+        self.gave_up = 0
+        self.last_run = None
+
+    def get_next_time(self,after):
+        # after より後の最初の実行時刻を取得する
+        return (int(after - self.offset) // self.interval + 1) * self.interval + self.offset
+
+    def get_due(self,now):
+        # 実行時刻を過ぎた実行時刻のリスト（再実行待ちを含む、古い順）を取得する
+        due = [scheduled for scheduled,(attempts,retry_at) in self.retries.items() if retry_at <= now]
+        if self.next_run <= now:
+            due.append(self.next_run)
+        return sorted(due)
+
+    def get_wakeup(self):
+        # 次に起きる必要のある時刻を取得する
+        return min([self.next_run] + [retry_at for attempts,retry_at in self.retries.values()])
+
+    def run(self,scheduled):
+
+        """
+        run メソッド
+
+        概要:
+            指定された実行時刻でジョブを実行し、実行時間と結果を記録する。
+            失敗した場合は待ち時間を倍にしながら同じ実行時刻で再実行を予約する。
+
+        引数:
+            scheduled (float): 実行時刻（UNIX時間）
+
+        戻り値:
+            bool - 実行の成功/失敗を示す真偽値
+
+        例外処理:
+            ジョブで例外が発生した場合、エラーログを出力し、失敗として扱う。
+        """
+
+        # 定期実行の場合は次の実行時刻を進める（処理が長引いて過ぎた実行時刻は飛ばす）
+        if scheduled == self.next_run:
+            self.next_run = self.get_next_time(max(time.time(),scheduled))
+
+        start_time = time.perf_counter()
+        error = None
+        try:
+            success = bool(self.func(dt.datetime.fromtimestamp(scheduled)))
+        except Exception as e:
+            success = False
+            error = str(e)
+            error_message = f"{str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))} Error in scheduled job {self.name}: {error}"
+            file_util.write_log(error_message,"error")
+        duration_sec = time.perf_counter() - start_time
+
+        # 実行結果を記録する
+        attempts = self.retries.pop(scheduled,(0,0))[0] + 1
+        self.runs += 1
+        self.last_run = {
+            "scheduled": dt.datetime.fromtimestamp(scheduled).strftime('%Y-%m-%d %H:%M:%S'),
+            "started": dt.datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            "duration_sec": round(duration_sec,3),
+            "success": success,
+            "attempt": attempts,
+            "error": error,
+        }
+
+        # 失敗した場合は再実行を予約する
+        if success == False:
+            self.failures += 1
+            if self.retry == True and attempts <= SCHEDULER_RETRY_MAX_COUNT:
+                wait_sec = min(SCHEDULER_RETRY_BASE_SEC * 2 ** (attempts - 1),SCHEDULER_RETRY_MAX_SEC)
+                self.retries[scheduled] = (attempts,time.time() + wait_sec)
+            elif self.retry == True:
+                self.gave_up += 1
+                error_message = f"{str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))} Gave up scheduled job {self.name} for {self.last_run['scheduled']} after {attempts} attempts"
+                file_util.write_log(error_message,"error")
+
+        # ログを出力する
+        message = f"{str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))} Scheduled job {self.name} : {self.last_run}"
+        file_util.write_log(message)
+
+        return success
+
+    def get_stats(self):
+        # ジョブの実行回数と直近の実行結果を取得する
+        return {
+            "interval_sec": self.interval,
+            "offset_sec": self.offset,
+            "runs": self.runs,
+            "failures": self.failures,
+            "gave_up": self.gave_up,
+            "next_run": dt.datetime.fromtimestamp(self.next_run).strftime('%Y-%m-%d %H:%M:%S'),
+            "pending_retries": sorted(dt.datetime.fromtimestamp(scheduled).strftime('%Y-%m-%d %H:%M:%S') for scheduled in self.retries),
+            "last_run": self.last_run,
+        }
+
+class Scheduler:
+
+    """
+    Scheduler クラス
+
+    概要:
+        常駐して複数のジョブを実行時刻どおりに1件ずつ順番に実行するスケジューラー。
+        プロセスを起動したままにすることで、ライブラリの読み込み、DB・FTPの接続プール、
+        取り込み済みファイルの情報などを実行のたびに作り直さずに済む。
+
+    使用方法:
+        scheduler = Scheduler()
+        scheduler.add_job("hourly",hourly_func,3600,300)
+        scheduler.run_forever()
+
+    例外処理:
+        SIGTERM または Ctrl+C で、実行中のジョブの終了を待ってから停止する。
+    """
+
+    def __init__(self,status_file=SCHEDULER_STATUS_FILE):
+        self.status_file = status_file
+        self.jobs = []
+        self.stop_event = threading.Event()
+        self.started = None
+
+    def add_job(self,name,func,interval,offset=0,retry=True):
+
+        """
+        add_job メソッド
+
+        概要:
+            ジョブを追加する。
+
+        引数:
+            name (str): ジョブ名
+            func (callable): 実行する関数（実行時刻を受け取り、成功/失敗を真偽値で返す）
+            interval (int): 実行間隔（秒）
+            offset (int): 間隔の区切りからずらす秒数
+            retry (bool): 失敗した場合に同じ実行時刻で再実行するかどうか
+
+        戻り値:
+            ScheduledJob - 追加したジョブ
+        """
+
+        job = ScheduledJob(name,func,interval,offset,retry)
+        self.jobs.append(job)
+        return job
+
+    def run_pending(self,now=None):
+        # 実行時刻を過ぎたジョブを全て実行する
+        if now is None:
+            now = time.time()
+        due = sorted((scheduled,index) for index,job in enumerate(self.jobs) for scheduled in job.get_due(now))
+        for scheduled,index in due:
+            if self.stop_event.is_set():
+                break
+            self.jobs[index].run(scheduled)
+            self.write_status()
+        return len(due)
+
+    def run_forever(self):
+
+        """
+        run_forever メソッド
+
+        概要:
+            停止するまで、次の実行時刻まで待ってはジョブを実行することを繰り返す。
+
+        戻り値:
+            なし
+        """
+
+        self.started = dt.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        self.install_signal_handlers()
+
+        message = f"{str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))} Scheduler started : {[job.name for job in self.jobs]}"
+        file_util.write_log(message)
+        self.write_status()
+
+        try:
+            while not self.stop_event.is_set():
+                self.run_pending()
+
+                # 次の実行時刻まで待つ（停止が指示された場合はすぐに起きる）
+                wakeup = min(job.get_wakeup() for job in self.jobs)
+                self.stop_event.wait(max(wakeup - time.time(),0))
+        except KeyboardInterrupt:
+            pass
+
+        message = f"{str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))} Scheduler stopped"
+        file_util.write_log(message)
+
+    def stop(self,*args):
+        # スケジューラーの停止を指示する（シグナルハンドラーとしても使用する）
+        self.stop_event.set()
+
+    def install_signal_handlers(self):
+        # SIGTERM で停止する（メインスレッド以外から呼ばれた場合は設定しない）
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM,self.stop)
+
+    def get_stats(self):
+
+        """
+        get_stats メソッド
+
+        概要:
+            スケジューラーと各ジョブの実行状況を取得する。
+
+        戻り値:
+            dict - 起動日時、更新日時、ジョブ名をキーとした各ジョブの実行状況
+        """
+
+        return {
+            "pid": os.getpid(),
+            "started": self.started,
+            "updated": dt.datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            "jobs": {job.name: job.get_stats() for job in self.jobs},
+        }
+
+    def write_status(self):
+        # 実行状況をJSONファイルに書き出す（外部から直近の実行時間と結果を確認できるようにする）
+        try:
+            tmp_path = f"{self.status_file}.tmp"
+            with open(tmp_path,'w',encoding='utf-8') as status_file:
+                json.dump(self.get_stats(),status_file,ensure_ascii=False,indent=2)
+            os.replace(tmp_path,self.status_file)
+        except Exception as e:
+            # エラーログを出力する
+            error_message = f"{str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))} Error in write_status: {str(e)}"
+            file_util.write_log(error_message,"error")
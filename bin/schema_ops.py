@@ -0,0 +1,612 @@
+# -----------------------------------------------------------------------------
+# 会社名: 湘南技術センター株式会社
+# 名前: 塩見 和則
+# 作成日: 2026/10/18
+# -----------------------------------------------------------------------------
+
+# 標準ライブラリ
+import datetime as dt
+
+# 外部ライブラリ
+import mysql_ops as mysql
+import file_util
+import rollup_ops
+
+# 適用済みのマイグレーションを記録するテーブル名
+SCHEMA_VERSION_TABLE_NAME = "izumi_sola_schema_version"
+
+def get_value_type(name):
+    # 元データ・時間別・日別・月別テーブルの値の列の型を取得する
+    if name in ("KANSOKU_DATETIME","UPDATE_DATETIME"):
+        return "DATETIME"
+    if name == "KANSOKU_DATE":
+        # 本番の日別テーブルの観測日は DATE（従来の月別の集計は YEAR() / MONTH() で月を判定していた）
+        return "DATE"
+    if name == "ERROR_CD":
+        return "INT"
+    if name.startswith("BAIDEN"):
+        return "BIGINT"
+    return "DOUBLE"
+
+def get_table_columns(key_columns,value_columns):
+    # キーの列（INT NOT NULL）と値の列（NULL可）の定義のリストを作成する
+    columns = [(name,"INT NOT NULL") for name in key_columns]
+    columns += [(name,f"{get_value_type(name)} NULL") for name in value_columns]
+    return columns
+
+# テーブル定義: テーブル名 -> (列の定義のリスト, 主キーの列, セカンダリインデックス {インデックス名: 列のリスト})
+# 主キーは UPDATE-INSERT（INSERT ... ON DUPLICATE KEY UPDATE）のキーとなる
+SCHEMA_TABLES = {
+    mysql.ORIGIN_TABLE_NAME: (
+        get_table_columns(mysql.ORIGIN_KEY_COLUMNS,mysql.ORIGIN_VALUE_COLUMNS),
+        mysql.ORIGIN_KEY_COLUMNS,
+        # 観測日の範囲で読み込む処理（集計のやり直しなど）用。主キーは現場コードが先頭のため使えない
+        {"IDX_ORIGIN_KANSOKU": ["KANSOKU_DATE_INT","KANSOKU_TIME_INT"]},
+    ),
+    # 一括取り込み用。元データテーブルと同じ列・主キーで、セカンダリインデックスは無い（読み込みを速くするため）
+    mysql.ORIGIN_STAGING_TABLE_NAME: (
+        get_table_columns(mysql.ORIGIN_KEY_COLUMNS,mysql.ORIGIN_VALUE_COLUMNS),
+        mysql.ORIGIN_KEY_COLUMNS,
+        {},
+    ),
+    mysql.HOURLY_TABLE_NAME: (
+        get_table_columns(mysql.HOURLY_KEY_COLUMNS,mysql.HOURLY_VALUE_COLUMNS),
+        mysql.HOURLY_KEY_COLUMNS,
+        # 日別テーブルの集計（観測日ごとの最初と最後の売電量）を、列の多い行を読まずにインデックスだけで処理する
+        {"IDX_HOURLY_BAIDEN": ["KANSOKU_DATE_INT","KANSOKU_TIME_INT","BAIDEN"]},
+    ),
+    mysql.DAILY_TABLE_NAME: (
+        get_table_columns(["KANSOKU_DATE_INT"],["BAIDEN_DAILY","BAIDEN_00","BAIDEN_23","KANSOKU_DATE","UPDATE_DATETIME"]),
+        ["KANSOKU_DATE_INT"],
+        # 月別テーブルの集計は主キーの範囲検索で処理する（列が少ないためセカンダリインデックスは作成しない）
+        {},
+    ),
+    mysql.MONTHLY_TABLE_NAME: (
+        get_table_columns(["KANSOKU_MONTH_INT"],["BAIDEN_MONTHLY","UPDATE_DATETIME"]),
+        ["KANSOKU_MONTH_INT"],
+        {},
+    ),
+}
+
+# 統計テーブルの定義（rollup_ops.ROLLUP_SPEC から作成する。セカンダリインデックスは無い）
+for _level in rollup_ops.ROLLUP_LEVELS:
+    _table_name,_key_columns = rollup_ops.ROLLUP_TABLES[_level]
+    SCHEMA_TABLES[_table_name] = (
+        [(name,"INT NOT NULL") for name in _key_columns]
+        + [(name,f"{rollup_ops.get_column_type(name)} NULL") for name in rollup_ops.ROLLUP_COLUMNS]
+        + [("UPDATE_DATETIME","DATETIME NULL")],
+        _key_columns,
+        {},
+    )
+
+def get_create_table_sqls(table_name,tables=SCHEMA_TABLES):
+
+    """
+    get_create_table_sqls 関数
+
+    概要:
+        テーブル定義（SCHEMA_TABLES またはマイグレーションのテーブル定義）から、主キーとセカンダリインデックスを含む
+        テーブルを作成するSQLを作成する関数。
+        SQLの書き方は使用中のストレージによって異なる（SQLiteではセカンダリインデックスを別の CREATE INDEX で作成する）。
+
+    引数:
+        table_name: str - テーブル名
+        tables: dict - テーブル定義（SCHEMA_TABLES と同じ形式）
+
+    戻り値:
+        list - 順に実行する CREATE TABLE / CREATE INDEX 文のリスト
+
+    例外処理:
+        なし
+    """
+
+    columns,primary_key,indexes = tables[table_name]
+    return mysql.get_backend().get_create_table_sqls(table_name,columns,primary_key,indexes)
+
+def create_tables(cursor,tables):
+    # テーブル定義のテーブルを作成する（既に存在するテーブルは作成しない）
+    for table_name in tables:
+        for sql in get_create_table_sqls(table_name,tables):
+            cursor.execute(sql)
+
+def add_keys(cursor,tables):
+
+    """
+    add_keys 関数
+
+    概要:
+        主キーの無い既存のテーブル（このモジュールより前に作成したテーブル）に、主キーとセカンダリインデックスを追加する関数。
+        キーが重複している行があると主キーを追加できないため、先に重複を確認する。
+
+    引数:
+        cursor: DBのカーソル
+        tables: dict - 対象のテーブルのテーブル定義（SCHEMA_TABLES と同じ形式）
+
+    戻り値:
+        なし
+
+    例外処理:
+        キーが重複している行がある場合は ValueError を送出する（重複を解消してから再実行する）。
+    """
+
+    backend = mysql.get_backend()
+    schema = backend.get_live_schema(cursor,list(tables))
+    for table_name,(columns,primary_key,indexes) in tables.items():
+        if table_name not in schema:
+            continue
+        live_indexes = schema[table_name]["indexes"]
+
+        add_primary_key = None
+        if "PRIMARY" not in live_indexes:
+            # キーが重複している行が無いか確認する
+            key_clause = ", ".join(primary_key)
+            cursor.execute(f"SELECT COUNT(*) FROM (SELECT {key_clause} FROM {table_name} GROUP BY {key_clause} HAVING COUNT(*) > 1) AS DUPLICATED")
+            duplicated_count = cursor.fetchall()[0][0]
+            if duplicated_count > 0:
+                raise ValueError(f"{table_name} has {duplicated_count} duplicated keys ({key_clause})")
+            add_primary_key = primary_key
+        add_indexes = {index_name: index_columns for index_name,index_columns in indexes.items() if index_name not in live_indexes}
+
+        # MySQLではテーブルの再構築が1回で済むように、まとめて1つの ALTER TABLE で追加する
+        for sql in backend.get_add_keys_sqls(table_name,add_primary_key,add_indexes):
+            cursor.execute(sql)
+
+def add_missing_columns(cursor,tables):
+
+    """
+    add_missing_columns 関数
+
+    概要:
+        既存のテーブルに、テーブル定義にあってテーブルに無い列を追加する関数。
+        既存の列の型は変更しない（本番のテーブルの型と定義の型が異なる場合に、型の変更で値が切り捨てられたり
+        精度が落ちたりして元に戻せなくなるため）。型の違いは check_schema でログに出力する。
+
+    引数:
+        cursor: DBのカーソル
+        tables: dict - 対象のテーブルのテーブル定義（SCHEMA_TABLES と同じ形式）
+
+    戻り値:
+        なし
+
+    例外処理:
+        なし（DBの例外がそのまま送出される）
+    """
+
+    backend = mysql.get_backend()
+    schema = backend.get_live_schema(cursor,list(tables))
+    for table_name,(columns,primary_key,indexes) in tables.items():
+        if table_name not in schema:
+            continue
+        live_columns = schema[table_name]["columns"]
+        add_columns = [(name,column_type) for name,column_type in columns if name not in live_columns]
+
+        for sql in backend.get_add_columns_sqls(table_name,add_columns):
+            cursor.execute(sql)
+
+# マイグレーションで作成するテーブルの定義（SCHEMA_TABLES と同じ形式）
+# 適用した時点の定義を固定したもので、SCHEMA_TABLES・rollup_ops.ROLLUP_SPEC を変更しても変わらない
+# （テーブル定義を変更した場合は、ここを変更せずに新しいバージョンのマイグレーションを追加する）
+
+# バージョン1（元データ・時間別・日別・月別テーブル）
+SCHEMA_V1_TABLES = {
+    "izumi_sola_origin": (
+        [
+            ("GENBA_CD","INT NOT NULL"),
+            ("KANSOKU_DATE_INT","INT NOT NULL"),
+            ("KANSOKU_TIME_INT","INT NOT NULL"),
+            ("DENRYU_01","DOUBLE NULL"), ("DENATSU_01","DOUBLE NULL"), ("HATSUDEN_01_kWH","DOUBLE NULL"),
+            ("DENRYU_02","DOUBLE NULL"), ("DENATSU_02","DOUBLE NULL"), ("HATSUDEN_02_kWH","DOUBLE NULL"),
+            ("DENRYU_03","DOUBLE NULL"), ("DENATSU_03","DOUBLE NULL"), ("HATSUDEN_03_kWH","DOUBLE NULL"),
+            ("DENRYU_04","DOUBLE NULL"), ("DENATSU_04","DOUBLE NULL"), ("HATSUDEN_04_kWH","DOUBLE NULL"),
+            ("DENRYU_05","DOUBLE NULL"), ("DENATSU_05","DOUBLE NULL"), ("HATSUDEN_05_kWH","DOUBLE NULL"),
+            ("DENRYU_06","DOUBLE NULL"), ("DENATSU_06","DOUBLE NULL"), ("HATSUDEN_06_kWH","DOUBLE NULL"),
+            ("DENRYU_07","DOUBLE NULL"), ("DENATSU_07","DOUBLE NULL"), ("HATSUDEN_07_kWH","DOUBLE NULL"),
+            ("DENRYU_08","DOUBLE NULL"), ("DENATSU_08","DOUBLE NULL"), ("HATSUDEN_08_kWH","DOUBLE NULL"),
+            ("NISSYA","DOUBLE NULL"),
+            ("TEMP","DOUBLE NULL"),
+            ("ERROR_CD","INT NULL"),
+            ("BAIDEN","BIGINT NULL"),
+            ("KANSOKU_DATETIME","DATETIME NULL"),
+            ("UPDATE_DATETIME","DATETIME NULL"),
+        ],
+        ["GENBA_CD","KANSOKU_DATE_INT","KANSOKU_TIME_INT"],
+        {"IDX_ORIGIN_KANSOKU": ["KANSOKU_DATE_INT","KANSOKU_TIME_INT"]},
+    ),
+    "izumi_sola_hourly": (
+        [
+            ("KANSOKU_DATE_INT","INT NOT NULL"),
+            ("KANSOKU_TIME_INT","INT NOT NULL"),
+            ("DENRYU_01","DOUBLE NULL"), ("DENATSU_01","DOUBLE NULL"), ("HATSUDEN_01_kWH","DOUBLE NULL"),
+            ("DENRYU_02","DOUBLE NULL"), ("DENATSU_02","DOUBLE NULL"), ("HATSUDEN_02_kWH","DOUBLE NULL"),
+            ("DENRYU_03","DOUBLE NULL"), ("DENATSU_03","DOUBLE NULL"), ("HATSUDEN_03_kWH","DOUBLE NULL"),
+            ("DENRYU_04","DOUBLE NULL"), ("DENATSU_04","DOUBLE NULL"), ("HATSUDEN_04_kWH","DOUBLE NULL"),
+            ("DENRYU_05","DOUBLE NULL"), ("DENATSU_05","DOUBLE NULL"), ("HATSUDEN_05_kWH","DOUBLE NULL"),
+            ("DENRYU_06","DOUBLE NULL"), ("DENATSU_06","DOUBLE NULL"), ("HATSUDEN_06_kWH","DOUBLE NULL"),
+            ("DENRYU_07","DOUBLE NULL"), ("DENATSU_07","DOUBLE NULL"), ("HATSUDEN_07_kWH","DOUBLE NULL"),
+            ("NISSYA_AVG","DOUBLE NULL"),
+            ("TEMP_AVG","DOUBLE NULL"),
+            ("BAIDEN_HOURLY","BIGINT NULL"),
+            ("BAIDEN","BIGINT NULL"),
+            ("KANSOKU_DATETIME","DATETIME NULL"),
+            ("UPDATE_DATETIME","DATETIME NULL"),
+        ],
+        ["KANSOKU_DATE_INT","KANSOKU_TIME_INT"],
+        {"IDX_HOURLY_BAIDEN": ["KANSOKU_DATE_INT","KANSOKU_TIME_INT","BAIDEN"]},
+    ),
+    "izumi_sola_daily": (
+        [
+            ("KANSOKU_DATE_INT","INT NOT NULL"),
+            ("BAIDEN_DAILY","BIGINT NULL"),
+            ("BAIDEN_00","BIGINT NULL"),
+            ("BAIDEN_23","BIGINT NULL"),
+            ("KANSOKU_DATE","DATE NULL"),
+            ("UPDATE_DATETIME","DATETIME NULL"),
+        ],
+        ["KANSOKU_DATE_INT"],
+        {},
+    ),
+    "izumi_sola_monthly": (
+        [
+            ("KANSOKU_MONTH_INT","INT NOT NULL"),
+            ("BAIDEN_MONTHLY","BIGINT NULL"),
+            ("UPDATE_DATETIME","DATETIME NULL"),
+        ],
+        ["KANSOKU_MONTH_INT"],
+        {},
+    ),
+}
+
+# バージョン3（統計テーブル）
+SCHEMA_V3_TABLES = {
+    "izumi_sola_hourly_stats": (
+        [
+            ("KANSOKU_DATE_INT","INT NOT NULL"),
+            ("KANSOKU_TIME_INT","INT NOT NULL"),
+            ("HATSUDEN_01_MIN","DOUBLE NULL"), ("HATSUDEN_01_PEAK","DOUBLE NULL"), ("HATSUDEN_01_PEAK_AT","BIGINT NULL"), ("HATSUDEN_01_ENERGY_kWH","DOUBLE NULL"),
+            ("HATSUDEN_02_MIN","DOUBLE NULL"), ("HATSUDEN_02_PEAK","DOUBLE NULL"), ("HATSUDEN_02_PEAK_AT","BIGINT NULL"), ("HATSUDEN_02_ENERGY_kWH","DOUBLE NULL"),
+            ("HATSUDEN_03_MIN","DOUBLE NULL"), ("HATSUDEN_03_PEAK","DOUBLE NULL"), ("HATSUDEN_03_PEAK_AT","BIGINT NULL"), ("HATSUDEN_03_ENERGY_kWH","DOUBLE NULL"),
+            ("HATSUDEN_04_MIN","DOUBLE NULL"), ("HATSUDEN_04_PEAK","DOUBLE NULL"), ("HATSUDEN_04_PEAK_AT","BIGINT NULL"), ("HATSUDEN_04_ENERGY_kWH","DOUBLE NULL"),
+            ("HATSUDEN_05_MIN","DOUBLE NULL"), ("HATSUDEN_05_PEAK","DOUBLE NULL"), ("HATSUDEN_05_PEAK_AT","BIGINT NULL"), ("HATSUDEN_05_ENERGY_kWH","DOUBLE NULL"),
+            ("HATSUDEN_06_MIN","DOUBLE NULL"), ("HATSUDEN_06_PEAK","DOUBLE NULL"), ("HATSUDEN_06_PEAK_AT","BIGINT NULL"), ("HATSUDEN_06_ENERGY_kWH","DOUBLE NULL"),
+            ("HATSUDEN_07_MIN","DOUBLE NULL"), ("HATSUDEN_07_PEAK","DOUBLE NULL"), ("HATSUDEN_07_PEAK_AT","BIGINT NULL"), ("HATSUDEN_07_ENERGY_kWH","DOUBLE NULL"),
+            ("HATSUDEN_08_MIN","DOUBLE NULL"), ("HATSUDEN_08_PEAK","DOUBLE NULL"), ("HATSUDEN_08_PEAK_AT","BIGINT NULL"), ("HATSUDEN_08_ENERGY_kWH","DOUBLE NULL"),
+            ("NISSYA_MIN","DOUBLE NULL"), ("NISSYA_MAX","DOUBLE NULL"), ("NISSYA_SUM","DOUBLE NULL"), ("NISSYA_COUNT","INT NULL"),
+            ("TEMP_MIN","DOUBLE NULL"), ("TEMP_MAX","DOUBLE NULL"), ("TEMP_SUM","DOUBLE NULL"), ("TEMP_COUNT","INT NULL"),
+            ("ERROR_COUNT","INT NULL"), ("ERROR_SAMPLES","INT NULL"),
+            ("NISSYA_AVG","DOUBLE NULL"),
+            ("TEMP_AVG","DOUBLE NULL"),
+            ("ERROR_SHARE","DOUBLE NULL"),
+            ("UPDATE_DATETIME","DATETIME NULL"),
+        ],
+        ["KANSOKU_DATE_INT","KANSOKU_TIME_INT"],
+        {},
+    ),
+    "izumi_sola_daily_stats": (
+        [
+            ("KANSOKU_DATE_INT","INT NOT NULL"),
+            ("HATSUDEN_01_MIN","DOUBLE NULL"), ("HATSUDEN_01_PEAK","DOUBLE NULL"), ("HATSUDEN_01_PEAK_AT","BIGINT NULL"), ("HATSUDEN_01_ENERGY_kWH","DOUBLE NULL"),
+            ("HATSUDEN_02_MIN","DOUBLE NULL"), ("HATSUDEN_02_PEAK","DOUBLE NULL"), ("HATSUDEN_02_PEAK_AT","BIGINT NULL"), ("HATSUDEN_02_ENERGY_kWH","DOUBLE NULL"),
+            ("HATSUDEN_03_MIN","DOUBLE NULL"), ("HATSUDEN_03_PEAK","DOUBLE NULL"), ("HATSUDEN_03_PEAK_AT","BIGINT NULL"), ("HATSUDEN_03_ENERGY_kWH","DOUBLE NULL"),
+            ("HATSUDEN_04_MIN","DOUBLE NULL"), ("HATSUDEN_04_PEAK","DOUBLE NULL"), ("HATSUDEN_04_PEAK_AT","BIGINT NULL"), ("HATSUDEN_04_ENERGY_kWH","DOUBLE NULL"),
+            ("HATSUDEN_05_MIN","DOUBLE NULL"), ("HATSUDEN_05_PEAK","DOUBLE NULL"), ("HATSUDEN_05_PEAK_AT","BIGINT NULL"), ("HATSUDEN_05_ENERGY_kWH","DOUBLE NULL"),
+            ("HATSUDEN_06_MIN","DOUBLE NULL"), ("HATSUDEN_06_PEAK","DOUBLE NULL"), ("HATSUDEN_06_PEAK_AT","BIGINT NULL"), ("HATSUDEN_06_ENERGY_kWH","DOUBLE NULL"),
+            ("HATSUDEN_07_MIN","DOUBLE NULL"), ("HATSUDEN_07_PEAK","DOUBLE NULL"), ("HATSUDEN_07_PEAK_AT","BIGINT NULL"), ("HATSUDEN_07_ENERGY_kWH","DOUBLE NULL"),
+            ("HATSUDEN_08_MIN","DOUBLE NULL"), ("HATSUDEN_08_PEAK","DOUBLE NULL"), ("HATSUDEN_08_PEAK_AT","BIGINT NULL"), ("HATSUDEN_08_ENERGY_kWH","DOUBLE NULL"),
+            ("NISSYA_MIN","DOUBLE NULL"), ("NISSYA_MAX","DOUBLE NULL"), ("NISSYA_SUM","DOUBLE NULL"), ("NISSYA_COUNT","INT NULL"),
+            ("TEMP_MIN","DOUBLE NULL"), ("TEMP_MAX","DOUBLE NULL"), ("TEMP_SUM","DOUBLE NULL"), ("TEMP_COUNT","INT NULL"),
+            ("ERROR_COUNT","INT NULL"), ("ERROR_SAMPLES","INT NULL"),
+            ("NISSYA_AVG","DOUBLE NULL"),
+            ("TEMP_AVG","DOUBLE NULL"),
+            ("ERROR_SHARE","DOUBLE NULL"),
+            ("UPDATE_DATETIME","DATETIME NULL"),
+        ],
+        ["KANSOKU_DATE_INT"],
+        {},
+    ),
+    "izumi_sola_monthly_stats": (
+        [
+            ("KANSOKU_MONTH_INT","INT NOT NULL"),
+            ("HATSUDEN_01_MIN","DOUBLE NULL"), ("HATSUDEN_01_PEAK","DOUBLE NULL"), ("HATSUDEN_01_PEAK_AT","BIGINT NULL"), ("HATSUDEN_01_ENERGY_kWH","DOUBLE NULL"),
+            ("HATSUDEN_02_MIN","DOUBLE NULL"), ("HATSUDEN_02_PEAK","DOUBLE NULL"), ("HATSUDEN_02_PEAK_AT","BIGINT NULL"), ("HATSUDEN_02_ENERGY_kWH","DOUBLE NULL"),
+            ("HATSUDEN_03_MIN","DOUBLE NULL"), ("HATSUDEN_03_PEAK","DOUBLE NULL"), ("HATSUDEN_03_PEAK_AT","BIGINT NULL"), ("HATSUDEN_03_ENERGY_kWH","DOUBLE NULL"),
+            ("HATSUDEN_04_MIN","DOUBLE NULL"), ("HATSUDEN_04_PEAK","DOUBLE NULL"), ("HATSUDEN_04_PEAK_AT","BIGINT NULL"), ("HATSUDEN_04_ENERGY_kWH","DOUBLE NULL"),
+            ("HATSUDEN_05_MIN","DOUBLE NULL"), ("HATSUDEN_05_PEAK","DOUBLE NULL"), ("HATSUDEN_05_PEAK_AT","BIGINT NULL"), ("HATSUDEN_05_ENERGY_kWH","DOUBLE NULL"),
+            ("HATSUDEN_06_MIN","DOUBLE NULL"), ("HATSUDEN_06_PEAK","DOUBLE NULL"), ("HATSUDEN_06_PEAK_AT","BIGINT NULL"), ("HATSUDEN_06_ENERGY_kWH","DOUBLE NULL"),
+            ("HATSUDEN_07_MIN","DOUBLE NULL"), ("HATSUDEN_07_PEAK","DOUBLE NULL"), ("HATSUDEN_07_PEAK_AT","BIGINT NULL"), ("HATSUDEN_07_ENERGY_kWH","DOUBLE NULL"),
+            ("HATSUDEN_08_MIN","DOUBLE NULL"), ("HATSUDEN_08_PEAK","DOUBLE NULL"), ("HATSUDEN_08_PEAK_AT","BIGINT NULL"), ("HATSUDEN_08_ENERGY_kWH","DOUBLE NULL"),
+            ("NISSYA_MIN","DOUBLE NULL"), ("NISSYA_MAX","DOUBLE NULL"), ("NISSYA_SUM","DOUBLE NULL"), ("NISSYA_COUNT","INT NULL"),
+            ("TEMP_MIN","DOUBLE NULL"), ("TEMP_MAX","DOUBLE NULL"), ("TEMP_SUM","DOUBLE NULL"), ("TEMP_COUNT","INT NULL"),
+            ("ERROR_COUNT","INT NULL"), ("ERROR_SAMPLES","INT NULL"),
+            ("NISSYA_AVG","DOUBLE NULL"),
+            ("TEMP_AVG","DOUBLE NULL"),
+            ("ERROR_SHARE","DOUBLE NULL"),
+            ("UPDATE_DATETIME","DATETIME NULL"),
+        ],
+        ["KANSOKU_MONTH_INT"],
+        {},
+    ),
+}
+
+# バージョン4（一括取り込み用のステージングテーブル）
+SCHEMA_V4_TABLES = {
+    "izumi_sola_origin_staging": (
+        [
+            ("GENBA_CD","INT NOT NULL"),
+            ("KANSOKU_DATE_INT","INT NOT NULL"),
+            ("KANSOKU_TIME_INT","INT NOT NULL"),
+            ("DENRYU_01","DOUBLE NULL"), ("DENATSU_01","DOUBLE NULL"), ("HATSUDEN_01_kWH","DOUBLE NULL"),
+            ("DENRYU_02","DOUBLE NULL"), ("DENATSU_02","DOUBLE NULL"), ("HATSUDEN_02_kWH","DOUBLE NULL"),
+            ("DENRYU_03","DOUBLE NULL"), ("DENATSU_03","DOUBLE NULL"), ("HATSUDEN_03_kWH","DOUBLE NULL"),
+            ("DENRYU_04","DOUBLE NULL"), ("DENATSU_04","DOUBLE NULL"), ("HATSUDEN_04_kWH","DOUBLE NULL"),
+            ("DENRYU_05","DOUBLE NULL"), ("DENATSU_05","DOUBLE NULL"), ("HATSUDEN_05_kWH","DOUBLE NULL"),
+            ("DENRYU_06","DOUBLE NULL"), ("DENATSU_06","DOUBLE NULL"), ("HATSUDEN_06_kWH","DOUBLE NULL"),
+            ("DENRYU_07","DOUBLE NULL"), ("DENATSU_07","DOUBLE NULL"), ("HATSUDEN_07_kWH","DOUBLE NULL"),
+            ("DENRYU_08","DOUBLE NULL"), ("DENATSU_08","DOUBLE NULL"), ("HATSUDEN_08_kWH","DOUBLE NULL"),
+            ("NISSYA","DOUBLE NULL"),
+            ("TEMP","DOUBLE NULL"),
+            ("ERROR_CD","INT NULL"),
+            ("BAIDEN","BIGINT NULL"),
+            ("KANSOKU_DATETIME","DATETIME NULL"),
+            ("UPDATE_DATETIME","DATETIME NULL"),
+        ],
+        ["GENBA_CD","KANSOKU_DATE_INT","KANSOKU_TIME_INT"],
+        {},
+    ),
+}
+
+# バージョン5（全てのテーブル。バージョン1・3・4の定義の列のうち、既存のテーブルに無い列を追加する）
+SCHEMA_V5_TABLES = {**SCHEMA_V1_TABLES,**SCHEMA_V3_TABLES,**SCHEMA_V4_TABLES}
+
+# マイグレーション: (バージョン, 内容, カーソルを受け取って適用する関数)
+# 適用済みのバージョンは SCHEMA_VERSION_TABLE_NAME に記録され、未適用のものだけがバージョン順に適用される。
+# 適用済みのマイグレーションは変更せず、変更が必要な場合は新しいバージョンを追加する
+SCHEMA_MIGRATIONS = [
+    (1,"create origin/hourly/daily/monthly tables",
+     lambda cursor: create_tables(cursor,SCHEMA_V1_TABLES)),
+    (2,"add primary keys and indexes to tables created without them",
+     lambda cursor: add_keys(cursor,SCHEMA_V1_TABLES)),
+    (3,"create rollup statistics tables",
+     lambda cursor: create_tables(cursor,SCHEMA_V3_TABLES)),
+    (4,"create origin staging table for bulk loads",
+     lambda cursor: create_tables(cursor,SCHEMA_V4_TABLES)),
+    (5,"add columns missing from existing tables (column types are never changed)",
+     lambda cursor: add_missing_columns(cursor,SCHEMA_V5_TABLES)),
+]
+
+# 最新のバージョン（起動時は適用済みのバージョンがこれより古い場合のみマイグレーションを実行する）
+SCHEMA_LATEST_VERSION = max(version for version,description,apply in SCHEMA_MIGRATIONS)
+
+# このプロセスで prepare_schema によりテーブルが定義どおりであることを確認したかどうか
+_schema_ready = False
+
+def get_schema_version():
+
+    """
+    get_schema_version 関数
+
+    概要:
+        適用済みのマイグレーションの最新のバージョンを、1回の SELECT MAX(VERSION) で取得する関数。
+
+    引数:
+        なし
+
+    戻り値:
+        int - 適用済みの最新のバージョン（マイグレーションを一度も適用していない場合は 0）
+
+    例外処理:
+        DBに接続できない場合は、エラーログを出力し、例外を送出する。
+    """
+
+    version = None
+    my_conn = None
+    my_cursor = None
+    try:
+        my_conn,my_cursor = mysql.db_init()
+        try:
+            my_cursor.execute(f"SELECT MAX(VERSION) FROM {SCHEMA_VERSION_TABLE_NAME}")
+            version = my_cursor.fetchall()[0][0]
+        except Exception:
+            # バージョンを記録するテーブルが無い（マイグレーションを一度も適用していない）
+            version = None
+
+    except Exception as e:
+        # エラーログを出力する
+        error_message = f"{str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))} Error in get_schema_version: {str(e)}"
+        file_util.write_log(error_message,"error")
+        raise
+
+    finally:
+        # DBの接続を閉じる
+        if my_conn is not None:
+            mysql.db_close(my_conn,my_cursor)
+
+    return 0 if version is None else int(version)
+
+def migrate():
+
+    """
+    migrate 関数
+
+    概要:
+        未適用のマイグレーション（SCHEMA_MIGRATIONS）をバージョン順に適用する関数。
+        MySQLでは CREATE TABLE・ALTER TABLE が暗黙にCOMMITするため、セッションとは別の接続で実行し、
+        1バージョンごとに適用済みとして記録する（途中で失敗した場合は、次回そのバージョンから再開する）。
+
+    引数:
+        なし
+
+    戻り値:
+        list - 今回適用したバージョンのリスト
+
+    例外処理:
+        データベース操作中にエラーが発生した場合は、エラーログを出力し、例外を送出する。
+    """
+
+    applied_list = []
+    my_conn = None
+    my_cursor = None
+    try:
+        my_conn,my_cursor = mysql.db_init()
+
+        # 適用済みのバージョンを取得する
+        my_cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {SCHEMA_VERSION_TABLE_NAME} (
+            VERSION INT NOT NULL,
+            DESCRIPTION VARCHAR(255) NULL,
+            APPLIED_DATETIME DATETIME NULL,
+            PRIMARY KEY (VERSION)
+        )
+        """)
+        my_cursor.execute(f"SELECT VERSION FROM {SCHEMA_VERSION_TABLE_NAME}")
+        applied_versions = set(int(row[0]) for row in my_cursor.fetchall())
+
+        for version,description,apply in SCHEMA_MIGRATIONS:
+            if version in applied_versions:
+                continue
+            apply(my_cursor)
+            my_cursor.execute(f"INSERT INTO {SCHEMA_VERSION_TABLE_NAME} (VERSION, DESCRIPTION, APPLIED_DATETIME) VALUES ({mysql.get_backend().get_placeholders(3)})",
+                              (version,description,dt.datetime.now().strftime('%Y-%m-%d %H:%M')))
+            my_conn.commit()
+            applied_list.append(version)
+
+            # ログを出力する
+            file_util.write_log(f"{str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))} Schema migration {version} applied : {description}")
+
+    except Exception as e:
+        # エラーログを出力する
+        error_message = f"{str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))} Error in migrate: {str(e)}"
+        file_util.write_log(error_message,"error")
+        raise
+
+    finally:
+        # DBの接続を閉じる
+        if my_conn is not None:
+            mysql.db_close(my_conn,my_cursor)
+
+    return applied_list
+
+def check_schema():
+
+    """
+    check_schema 関数
+
+    概要:
+        接続先のDBのテーブルが、テーブル定義（SCHEMA_TABLES）の列・主キー・セカンダリインデックスを持っているか確認する関数。
+        列の型が定義と異なる場合はログに出力するが、問題としては扱わない（既存のテーブルの型は環境によって異なり、
+        自動では変更しないため。変更する場合は、本番のテーブルを確認したうえで明示的なマイグレーションを追加する）。
+
+    引数:
+        なし
+
+    戻り値:
+        list - 定義と異なる点のメッセージのリスト（定義どおりの場合は空のリスト）
+
+    例外処理:
+        データベース操作中にエラーが発生した場合は、エラーログを出力し、例外を送出する。
+    """
+
+    problem_list = []
+    my_conn = None
+    my_cursor = None
+    try:
+        my_conn,my_cursor = mysql.db_init()
+        schema = mysql.get_backend().get_live_schema(my_cursor,list(SCHEMA_TABLES))
+
+        for table_name,(columns,primary_key,indexes) in SCHEMA_TABLES.items():
+            if table_name not in schema:
+                problem_list.append(f"{table_name}: table is missing")
+                continue
+            live_columns = schema[table_name]["columns"]
+            live_indexes = schema[table_name]["indexes"]
+
+            missing_columns = [name for name,column_type in columns if name not in live_columns]
+            if missing_columns:
+                problem_list.append(f"{table_name}: missing columns {missing_columns}")
+            for name,column_type in columns:
+                if name in live_columns and live_columns[name] != column_type:
+                    file_util.write_log(f"{str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))} Schema column type differs {table_name}.{name}: {live_columns[name]}, defined {column_type} (not changed automatically)")
+            if live_indexes.get("PRIMARY") != primary_key:
+                problem_list.append(f"{table_name}: primary key is {live_indexes.get('PRIMARY')}, expected {primary_key}")
+            for index_name,index_columns in indexes.items():
+                if live_indexes.get(index_name) != index_columns:
+                    problem_list.append(f"{table_name}: index {index_name} is {live_indexes.get(index_name)}, expected {index_columns}")
+
+    except Exception as e:
+        # エラーログを出力する
+        error_message = f"{str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))} Error in check_schema: {str(e)}"
+        file_util.write_log(error_message,"error")
+        raise
+
+    finally:
+        # DBの接続を閉じる
+        if my_conn is not None:
+            mysql.db_close(my_conn,my_cursor)
+
+    return problem_list
+
+def prepare_schema(force=False):
+
+    """
+    prepare_schema 関数
+
+    概要:
+        起動時に適用済みのバージョンを確認し、最新のバージョンより古い場合のみ、未適用のマイグレーションを適用して
+        接続先のDBのテーブルが定義どおりか確認する関数。
+        最新のバージョンを適用済みの場合は SELECT MAX(VERSION) の1回だけで終わる（information_schema は確認しない）。
+        登録処理は主キーによる UPDATE-INSERT のため、主キーの無いテーブルには登録しない。
+
+    引数:
+        force: bool - True の場合は、適用済みのバージョンによらずマイグレーションとテーブルの確認を行う（--migrate）
+
+    戻り値:
+        bool - 定義どおりの場合は True、マイグレーションに失敗した場合または定義と異なる場合は False
+
+    例外処理:
+        エラーが発生した場合は、エラーログを出力し、False を返す。
+    """
+
+    global _schema_ready
+
+    try:
+        if force == False and get_schema_version() >= SCHEMA_LATEST_VERSION:
+            _schema_ready = True
+            return True
+        migrate()
+        problem_list = check_schema()
+    except Exception:
+        # エラーログは get_schema_version / migrate / check_schema で出力済み
+        _schema_ready = False
+        return False
+
+    for problem in problem_list:
+        file_util.write_log(f"{str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))} Schema mismatch {problem}")
+    _schema_ready = len(problem_list) == 0
+    return _schema_ready
+
+def is_schema_ready():
+    # このプロセスで、テーブルが定義どおりであることを確認済みかどうか（DBには接続しない）
+    return _schema_ready
+
+def ensure_schema():
+
+    """
+    ensure_schema 関数
+
+    概要:
+        登録の前に、テーブルが定義どおりであることを確認する関数。
+        確認済みの場合はDBに接続せずに True を返し、未確認の場合（起動時にDBに接続できなかった場合など）は
+        prepare_schema を実行し直す。常駐実行・追記分の取り込みで、DBの障害中も起動したまま、復旧後に登録を再開するために使用する。
+
+    引数:
+        なし
+
+    戻り値:
+        bool - テーブルが定義どおりの場合は True
+
+    例外処理:
+        なし（エラーは prepare_schema でログに出力する）
+    """
+
+    if _schema_ready == True:
+        return True
+    return prepare_schema()
@@ -0,0 +1,427 @@
+# -----------------------------------------------------------------------------
+# 会社名: 湘南技術センター株式会社
+# 名前: 塩見 和則
+# 作成日: 2026/10/18
+# -----------------------------------------------------------------------------
+
+# 標準ライブラリ
+import os
+import json
+import time
+import glob
+import threading
+import datetime as dt
+
+# 外部ライブラリ
+import pandas as pd
+import mysql_ops as mysql
+import csvfile_ops as csv
+import file_util
+import dirty_ops
+import metrics_ops
+
+# スプール（DBに登録する前の行を書き込むファイル）のディレクトリ
+# 集計済みの時間別の行や統計ではなく元データテーブルの行を書き込み、登録時に dirty_ops.recompute_dirty で集計し直す
+# （日別・月別テーブルと統計は他の時間の行にもよるため、元データテーブルから集計し直すと登録の順番によらず同じ結果になる）
+SPOOL_DIRECTORY = "../spool"
+
+# 追記中のスプールファイル（登録処理中のファイルは SPOOL_REPLAY_PREFIX + 連番 + .jsonl に名前を変える）
+SPOOL_FILE_NAME = "spool.jsonl"
+SPOOL_REPLAY_PREFIX = "replay_"
+
+# 常駐実行でスプールをDBに登録し直す間隔（秒）
+SPOOL_REPLAY_INTERVAL = 300
+
+# 1回のCOMMITで登録するバッチ数（1バッチはCSVファイル1件分。backfill_ops.BACKFILL_COMMIT_FILES と同じくおおむね1日分）
+SPOOL_REPLAY_COMMIT_BATCHES = 24
+
+# 登録に失敗したバッチを隔離ファイルに移すまでの試行回数（DBに接続できなかった回は数えない）
+SPOOL_MAX_ATTEMPTS = 5
+
+# 試行回数の上限まで登録できなかったバッチを書き込む隔離ファイル（調査して手動で登録し直す）
+SPOOL_QUARANTINE_FILE_NAME = "quarantine.jsonl"
+
+# スプールファイルへの追記と名前の変更を同時に行わないためのロック
+_spool_lock = threading.Lock()
+
+# 登録処理を同時に1つだけ実行するためのロック（毎時の取り込みと常駐実行の登録ジョブが重なった場合）
+_replay_lock = threading.Lock()
+
+def append_batch(oha_yymmddhh,csv_df,manifest_entry,spool_directory=SPOOL_DIRECTORY):
+
+    """
+    append_batch 関数
+
+    概要:
+        元データテーブルに登録する行（CSVファイル1件分の変更のあった行）を、1行のJSONとしてスプールファイルに追記する関数。
+        追記後に fsync するため、この関数が戻った時点で、DBに接続できなくても行は失われない。
+
+    引数:
+        oha_yymmddhh: str - YYMMddhh形式の観測日時
+        csv_df: pandas.DataFrame - 元データテーブルに登録する行（CSVファイルの列順）
+        manifest_entry: tuple - DBに登録した後に取り込み済みファイルの情報に記録する
+                                (ディレクトリ, ファイル名, サイズ, 更新日時, 内容のハッシュ値, 行ごとのハッシュ値)
+        spool_directory: str - スプールのディレクトリ
+
+    戻り値:
+        なし
+
+    例外処理:
+        書き込みに失敗した場合は、エラーログを出力し、例外を送出する（呼び出し元では取り込み済みとして記録しない）。
+    """
+
+    try:
+        # 欠損値は null として書き込む
+        rows = csv_df.astype(object).where(csv_df.notna(),None).values.tolist()
+        batch = {"oha_yymmddhh": oha_yymmddhh,"rows": rows,"manifest": list(manifest_entry),"spooled": dt.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+        line = json.dumps(batch,ensure_ascii=False) + "\n"
+
+        with _spool_lock:
+            os.makedirs(spool_directory,exist_ok=True)
+            spool_path = os.path.join(spool_directory,SPOOL_FILE_NAME)
+            with open(spool_path,'ab') as spool_file:
+                # 前回の書き込みが途中で停止している場合は、その行と混ざらないように改行してから書き込む
+                if spool_file.tell() > 0:
+                    with open(spool_path,'rb') as last_file:
+                        last_file.seek(-1,os.SEEK_END)
+                        if last_file.read(1) != b"\n":
+                            line = "\n" + line
+                spool_file.write(line.encode('utf-8'))
+                spool_file.flush()
+                os.fsync(spool_file.fileno())
+
+    except Exception as e:
+        # エラーログを出力する
+        error_message = f"{str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))} Error in append_batch: {str(e)}"
+        file_util.write_log(error_message,"error")
+        raise
+
+def iter_batches(spool_file,spool_path):
+
+    """
+    iter_batches 関数
+
+    概要:
+        スプールファイルの行（バッチ）を、書き込んだ順に1つずつ読み込むジェネレーター。
+        ファイル全体を読み込まないため、DBに接続できなかった間に溜まった大きなスプールファイルもメモリに載せずに登録できる。
+
+    引数:
+        spool_file: file-like - 読み込み用に開いたスプールファイル
+        spool_path: str - スプールファイルのパス（ログ出力用）
+
+    戻り値:
+        generator - バッチ（dict）を1つずつ返す（途中で止めた場合、spool_file は次の行から読める状態になる）
+
+    例外処理:
+        書き込みの途中で停止した場合などで読み込めない行は、エラーログを出力して読み飛ばす。
+    """
+
+    for line_no,line in enumerate(spool_file,1):
+        if line.strip() == "":
+            continue
+        try:
+            batch = json.loads(line)
+        except ValueError as e:
+            # エラーログを出力する
+            error_message = f"{str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))} Skipped broken spool line {spool_path}:{line_no}: {str(e)}"
+            file_util.write_log(error_message,"error")
+            continue
+        yield batch
+
+def get_pending_files(spool_directory=SPOOL_DIRECTORY):
+    # 登録処理が終わっていないスプールファイルを書き込んだ順に取得する
+    return sorted(glob.glob(os.path.join(spool_directory,f"{SPOOL_REPLAY_PREFIX}*.jsonl")))
+
+def get_pending_status(spool_directory=SPOOL_DIRECTORY):
+
+    """
+    get_pending_status 関数
+
+    概要:
+        DBに登録されずにスプールに残っているバッチの件数と、最も古いバッチを書き込んだ日時を取得する関数。
+        登録できない状態が続いていることをログで知らせるために使用する。
+
+    引数:
+        spool_directory: str - スプールのディレクトリ
+
+    戻り値:
+        batch_count: int - 残っているバッチ数（隔離したバッチは含まない）
+        oldest_spooled: str - 最も古いバッチを書き込んだ日時（残っていない場合は None）
+
+    例外処理:
+        なし（読み込めない行は数えない）
+    """
+
+    batch_count = 0
+    oldest_spooled = None
+    with _spool_lock:
+        spool_paths = get_pending_files(spool_directory) + [os.path.join(spool_directory,SPOOL_FILE_NAME)]
+    for spool_path in spool_paths:
+        if not os.path.exists(spool_path):
+            continue
+        with open(spool_path,'r',encoding='utf-8') as spool_file:
+            for line in spool_file:
+                if line.strip() == "":
+                    continue
+                if oldest_spooled is None:
+                    try:
+                        oldest_spooled = json.loads(line).get("spooled")
+                    except ValueError:
+                        continue
+                batch_count += 1
+    return batch_count,oldest_spooled
+
+def write_batches(path,batches,mode='w',lines=()):
+    # バッチ（と読み込み途中のスプールファイルの残りの行）をJSONの行として書き込み、fsync する
+    with open(path,mode,encoding='utf-8') as spool_file:
+        for batch in batches:
+            spool_file.write(json.dumps(batch,ensure_ascii=False) + "\n")
+        for line in lines:
+            spool_file.write(line)
+        spool_file.flush()
+        os.fsync(spool_file.fileno())
+
+def open_session():
+    # DBのセッションを開始する（接続できない場合はエラーログを出力して None を返す）
+    try:
+        return mysql.DbSession()
+    except Exception as e:
+        # エラーログを出力する
+        error_message = f"{str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))} Error in open_session: {str(e)}"
+        file_util.write_log(error_message,"error")
+        return None
+
+def commit_batches(session,batches,manifest,summary):
+
+    """
+    commit_batches 関数
+
+    概要:
+        バッチを1つのトランザクションで登録し、集計し直してCOMMITする関数。
+
+    処理内容:
+        1. バッチごとに元データテーブルにUPDATE-INSERTする（主キーによるUPDATE-INSERTのため、同じバッチを
+           2回登録しても結果は変わらない。同じ行が複数のバッチにある場合は後のバッチの内容になる）。
+        2. 登録した行の時間・日・月の時間別・日別・月別テーブルと統計テーブルを1回だけ集計し直す（dirty_ops.recompute_dirty）。
+        3. COMMITに成功した場合のみ、バッチのファイルの情報を取り込み済みファイルの情報に保存する。
+
+    引数:
+        session: mysql_ops.DbSession - 登録に使用するセッション（この関数の中で終了する）
+        batches: list - 登録するバッチ（dict）のリスト
+        manifest: csvfile_ops.FtpManifest - 取り込み済みファイルの情報
+        summary: dict - replay の処理件数（COMMITに成功した場合に加算する）
+
+    戻り値:
+        なし
+
+    例外処理:
+        登録・集計・COMMITに失敗した場合はロールバックし、例外を送出する。
+    """
+
+    origin_rows = 0
+    with session:
+        dirty = dirty_ops.DirtySet()
+        for batch in batches:
+            csv_df = pd.DataFrame(batch["rows"],dtype=object)
+            with metrics_ops.stage("db_origin"):
+                inserted_count,updated_count = mysql.db_UpdateInsertOriginTableBatch(csv_df,batch["oha_yymmddhh"],session)
+            origin_rows += inserted_count + updated_count
+            dirty.mark_rows(csv_df)
+        recompute = dirty_ops.recompute_dirty(dirty,session)
+
+    summary["commits"] += 1
+    summary["origin_rows"] += origin_rows
+    for name in ("hours","days","months"):
+        summary["recompute"][name] += recompute[name]
+    for name,row_count in recompute["rollup"].items():
+        summary["recompute"]["rollup"][name] = summary["recompute"]["rollup"].get(name,0) + row_count
+    metrics_ops.count("origin_rows",origin_rows)
+
+    # COMMITに成功したバッチのファイルの情報を保存する
+    with metrics_ops.stage("manifest_save"):
+        for batch in batches:
+            manifest.update(*batch["manifest"])
+        manifest.save()
+
+def quarantine_batch(batch,error,spool_directory=SPOOL_DIRECTORY):
+    # 試行回数の上限まで登録できなかったバッチを隔離ファイルに移し、エラーログを出力する
+    batch["error"] = str(error)
+    quarantine_path = os.path.join(spool_directory,SPOOL_QUARANTINE_FILE_NAME)
+    write_batches(quarantine_path,[batch],'a')
+    error_message = f"{str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))} Quarantined spool batch {batch['oha_yymmddhh']} after {batch['attempts']} attempts to {quarantine_path}: {str(error)}"
+    file_util.write_log(error_message,"error")
+
+def replay_chunk(batches,manifest,summary,spool_directory=SPOOL_DIRECTORY):
+
+    """
+    replay_chunk 関数
+
+    概要:
+        SPOOL_REPLAY_COMMIT_BATCHES 件までのバッチを1回のCOMMITで登録する関数。
+        登録に失敗した場合は、失敗したバッチを特定するため1バッチずつ登録し直す。
+
+    処理内容:
+        1. 全てのバッチを1つのトランザクションで登録してCOMMITする（commit_batches）。
+        2. 失敗した場合は、バッチを書き込んだ順に1バッチずつ登録し直す:
+            - 登録できなかったバッチは試行回数（attempts）を加算し、SPOOL_MAX_ATTEMPTS 回に達した場合は
+              隔離ファイル（SPOOL_QUARANTINE_FILE_NAME）に移して、続くバッチの登録を続ける。
+            - 試行回数が上限に達していない場合は、書き込んだ順を保つため、そのバッチ以降を登録せずに残す
+              （後のバッチの行を、前のバッチの古い行で上書きしないようにする）。
+        3. DBに接続できない場合は、試行回数を加算せずに残りのバッチを全て残す。
+
+    引数:
+        batches: list - 登録するバッチ（dict）のリスト
+        manifest: csvfile_ops.FtpManifest - 取り込み済みファイルの情報
+        summary: dict - replay の処理件数
+        spool_directory: str - スプールのディレクトリ
+
+    戻り値:
+        list - 登録できずにスプールに残すバッチのリスト（全て登録または隔離した場合は空のリスト）
+
+    例外処理:
+        登録に失敗した場合はエラーログを出力し、上記のとおりバッチを残すか隔離する。
+    """
+
+    session = open_session()
+    if session is None:
+        return batches
+    try:
+        commit_batches(session,batches,manifest,summary)
+        return []
+    except Exception as e:
+        # エラーログを出力する（1バッチずつ登録し直して、登録できないバッチを特定する）
+        error_message = f"{str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))} Failed to replay {len(batches)} spool batches, retrying one by one: {str(e)}"
+        file_util.write_log(error_message,"error")
+
+    for i,batch in enumerate(batches):
+        session = open_session()
+        if session is None:
+            return batches[i:]
+        try:
+            commit_batches(session,[batch],manifest,summary)
+        except Exception as e:
+            batch["attempts"] = batch.get("attempts",0) + 1
+            if batch["attempts"] >= SPOOL_MAX_ATTEMPTS:
+                quarantine_batch(batch,e,spool_directory)
+                summary["quarantined"] += 1
+                continue
+            # エラーログを出力する（次回、このバッチから登録し直す）
+            error_message = f"{str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))} Failed to replay spool batch {batch['oha_yymmddhh']} (attempt {batch['attempts']}/{SPOOL_MAX_ATTEMPTS}): {str(e)}"
+            file_util.write_log(error_message,"error")
+            return batches[i:]
+    return []
+
+def replay_file(spool_path,manifest,summary,spool_directory=SPOOL_DIRECTORY):
+
+    """
+    replay_file 関数
+
+    概要:
+        スプールファイル1件のバッチを、1行ずつ読み込みながら SPOOL_REPLAY_COMMIT_BATCHES 件ごとにCOMMITして登録する関数。
+
+    処理内容:
+        1. スプールファイルを先頭から1バッチずつ読み込み、SPOOL_REPLAY_COMMIT_BATCHES 件ごとに登録する（replay_chunk）。
+        2. 全てのバッチを登録（または隔離）した場合は、スプールファイルを削除する。
+        3. 途中で登録できなくなった場合は、残すバッチ（試行回数を更新したもの）とまだ読み込んでいない行だけを
+           一時ファイルに書き込み、スプールファイルと置き換える（COMMIT済みのバッチは次回登録し直さない）。
+
+    引数:
+        spool_path: str - スプールファイルのパス
+        manifest: csvfile_ops.FtpManifest - 取り込み済みファイルの情報
+        summary: dict - replay の処理件数
+        spool_directory: str - スプールのディレクトリ
+
+    戻り値:
+        bool - 全てのバッチを登録（または隔離）した場合は True
+
+    例外処理:
+        なし（登録のエラーは replay_chunk で処理する）
+    """
+
+    kept = []
+    with open(spool_path,'r',encoding='utf-8') as spool_file:
+        batches = []
+        for batch in iter_batches(spool_file,spool_path):
+            summary["batches"] += 1
+            batches.append(batch)
+            if len(batches) >= SPOOL_REPLAY_COMMIT_BATCHES:
+                kept,batches = replay_chunk(batches,manifest,summary,spool_directory),[]
+                if len(kept) > 0:
+                    break
+        if len(kept) == 0 and len(batches) > 0:
+            kept = replay_chunk(batches,manifest,summary,spool_directory)
+
+        if len(kept) > 0:
+            # 残すバッチと、まだ読み込んでいない行を一時ファイルに書き込む
+            write_batches(spool_path + ".tmp",kept,'w',spool_file)
+
+    if len(kept) > 0:
+        os.replace(spool_path + ".tmp",spool_path)
+        summary["kept"] += len(kept)
+        return False
+    os.remove(spool_path)
+    return True
+
+def replay(spool_directory=SPOOL_DIRECTORY):
+
+    """
+    replay 関数
+
+    概要:
+        スプールファイルに溜まったバッチを、書き込んだ順に SPOOL_REPLAY_COMMIT_BATCHES 件ごとにCOMMITして登録する関数。
+        DBに接続できなかった間に溜まった行も、FTPサーバーからダウンロードし直さずに登録する。
+
+    処理内容:
+        1. 追記中のスプールファイルの名前を変え、以降の追記は新しいファイルに書き込む。
+        2. 前回登録できなかったファイルを含め、スプールファイルを書き込んだ順に1件ずつ登録する（replay_file）。
+           ファイルは1行ずつ読み込み、SPOOL_REPLAY_COMMIT_BATCHES 件ごとにCOMMITして、COMMITに成功したバッチの
+           ファイルの情報を取り込み済みファイルの情報に保存する。
+        3. 登録できなくなったファイルがある場合は、書き込んだ順を保つため、以降のファイルは登録せずに次回登録する。
+           SPOOL_MAX_ATTEMPTS 回登録に失敗したバッチは隔離ファイルに移し、以降のバッチの登録を妨げないようにする。
+
+    引数:
+        spool_directory: str - スプールのディレクトリ
+
+    戻り値:
+        summary: dict - 登録したファイル数・バッチ数・行数・COMMIT回数、集計し直した時間数・日数・月数、
+                        登録できずにスプールに残したバッチ数（読み込む前に止めた行を除く）・隔離したバッチ数、全て登録したかどうか
+
+    例外処理:
+        DBへの登録処理が失敗した場合は、エラーログを出力し、前回のCOMMIT以降の登録をロールバックする（残りは次回登録し直す）。
+    """
+
+    summary = {"files": 0,"batches": 0,"origin_rows": 0,"commits": 0,
+               "recompute": {"hours": 0,"days": 0,"months": 0,"rollup": {}},"kept": 0,"quarantined": 0,"committed": False}
+
+    with _replay_lock:
+        # 追記中のファイルの名前を変える（登録中の追記は新しいファイルに書き込まれる）
+        with _spool_lock:
+            spool_path = os.path.join(spool_directory,SPOOL_FILE_NAME)
+            if os.path.exists(spool_path):
+                os.replace(spool_path,os.path.join(spool_directory,f"{SPOOL_REPLAY_PREFIX}{time.time_ns()}.jsonl"))
+        spool_files = get_pending_files(spool_directory)
+        if len(spool_files) == 0:
+            return summary
+
+        start_time = time.perf_counter()
+        manifest = csv.get_ftp_manifest()
+        summary["committed"] = True
+        for spool_file in spool_files:
+            summary["files"] += 1
+            try:
+                if replay_file(spool_file,manifest,summary,spool_directory) == False:
+                    summary["committed"] = False
+                    break
+            except Exception as e:
+                # エラーログを出力する（スプールファイルは残し、次回登録し直す）
+                error_message = f"{str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))} Error in replay: {spool_file}: {str(e)}"
+                file_util.write_log(error_message,"error")
+                summary["committed"] = False
+                break
+
+        # ログを出力する
+        summary["elapsed_sec"] = round(time.perf_counter() - start_time,3)
+        message = f"{str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))} Replay spool : {summary}"
+        file_util.write_log(message)
+
+    return summary
@@ -0,0 +1,296 @@
+# -----------------------------------------------------------------------------
+# 会社名: 湘南技術センター株式会社
+# 名前: 塩見 和則
+# 作成日: 2026/10/18
+# -----------------------------------------------------------------------------
+
+# 標準ライブラリ
+import os
+import re
+import sqlite3
+import datetime as dt
+
+# 外部ライブラリ
+import numpy as np
+
+# SQLiteの接続がロックの解放を待つ秒数（集計のやり直しを並列に実行する場合など）
+SQLITE_TIMEOUT = 30
+
+class StorageBackend:
+
+    """
+    StorageBackend クラス
+
+    概要:
+        元データ・時間別・日別・月別テーブルと統計テーブルを保存するDB（ストレージ）のインターフェース。
+        mysql_ops の各登録・集計処理は、接続の作成と、DBごとに書き方の異なるSQLの部分だけをこのクラスから取得し、
+        SQL本体と値のパラメータ（プレースホルダー）は全てのDBで共通にする。
+
+    属性:
+        name (str): ストレージ名（"mysql", "sqlite"）
+        placeholder (str): パラメータのプレースホルダー（MySQL: %s、SQLite: ?）
+        supports_load_data (bool): LOAD DATA LOCAL INFILE でステージングテーブルに読み込めるかどうか
+        counts_upsert_updates (bool): UPDATE-INSERT の影響を受けた行数で、INSERTした行とUPDATEした行を区別できるかどうか
+
+    使用方法:
+        mysql_ops.set_backend("sqlite","../db/izumi_sola.sqlite3")
+        with mysql_ops.DbSession() as session:
+            mysql_ops.db_UpdateInsertOriginTableBatch(csv_df,oha_yymmddhh,session)
+    """
+
+    name = None
+    placeholder = "%s"
+    supports_load_data = False
+    counts_upsert_updates = False
+
+    def connect(self):
+        # 登録・集計に使用する接続を取得する
+        raise NotImplementedError
+
+    def connect_bulk(self):
+        # 一括取り込みに使用する接続を取得する（LOAD DATA LOCAL INFILE を使用できない場合は通常の接続）
+        return self.connect()
+
+    def get_stream_cursor(self,conn):
+        # 全行をメモリ上に保持せずに読み込むカーソルを取得する
+        return conn.cursor()
+
+    def get_placeholders(self,count):
+        # count 個のプレースホルダーをカンマでつないだ文字列を取得する
+        return ", ".join([self.placeholder] * count)
+
+    def get_upsert_clause(self,key_columns,update_columns,select=False):
+        # INSERT 文の後に付けて、主キーが既に存在する行の update_columns を置き換える句を取得する
+        # （select は INSERT ... SELECT の場合に True）
+        raise NotImplementedError
+
+    def get_int_div(self,expression,divisor):
+        # 整数の割り算（小数点以下切り捨て）の式を取得する
+        raise NotImplementedError
+
+    def get_truncate_sql(self,table_name):
+        # テーブルの全行を削除するSQLを取得する
+        raise NotImplementedError
+
+    def get_create_table_sqls(self,table_name,columns,primary_key,indexes):
+        # 主キーとセカンダリインデックスを含むテーブルを作成するSQLのリストを取得する
+        raise NotImplementedError
+
+    def get_add_keys_sqls(self,table_name,primary_key,indexes):
+        # 既存のテーブルに主キー（None の場合は追加しない）とセカンダリインデックスを追加するSQLのリストを取得する
+        raise NotImplementedError
+
+    def get_add_columns_sqls(self,table_name,add_columns):
+        # 既存のテーブルに列を追加するSQLのリストを取得する（列は (列名, 型) のリスト。既存の列の型は変更しない）
+        raise NotImplementedError
+
+    def get_live_schema(self,cursor,table_names):
+        # 接続先のDBのテーブルの列とインデックスを取得する
+        # （テーブル名 -> {"columns": {列名: 型}, "indexes": {インデックス名: 列のリスト}}。主キーのインデックス名は PRIMARY。
+        #   型はテーブル定義と同じ書き方（例: "BIGINT NULL"）にそろえる）
+        raise NotImplementedError
+
+def get_create_definitions(columns,primary_key):
+    # CREATE TABLE の列と主キーの定義のリストを作成する
+    definitions = [f"{name} {column_type}" for name,column_type in columns]
+    definitions.append(f"PRIMARY KEY ({', '.join(primary_key)})")
+    return definitions
+
+def get_column_type(data_type,nullable):
+    # DBから取得した列の型を、テーブル定義と同じ書き方（大文字、整数型の表示幅なし、NULL / NOT NULL 付き）にする
+    data_type = re.sub(r"^(TINYINT|SMALLINT|MEDIUMINT|INT|INTEGER|BIGINT)\(\d+\)",r"\1",data_type.strip().upper())
+    return f"{data_type} {'NULL' if nullable else 'NOT NULL'}"
+
+class MysqlBackend(StorageBackend):
+
+    """
+    MysqlBackend クラス
+
+    概要:
+        MySQLのストレージ（本番環境）。コネクションプールから接続を借りて使い回す。
+
+    属性:
+        connect_args (dict): mysql.connector.connect に渡す接続情報
+        pool_name (str): コネクションプールの名前
+        pool_size (int): コネクションプールの大きさ
+    """
+
+    name = "mysql"
+    placeholder = "%s"
+    supports_load_data = True
+    # ON DUPLICATE KEY UPDATE の影響を受けた行数は、INSERTした行が1、値を変更した行が2になる
+    counts_upsert_updates = True
+
+    def __init__(self,host,user,password,database,pool_name,pool_size):
+        self.connect_args = {"host": host,"user": user,"password": password,"database": database}
+        self.pool_name = pool_name
+        self.pool_size = pool_size
+        self.pool = None
+
+    def connect(self):
+        # コネクションプールは初回接続時に1つだけ作成し、以降は同じプールを使い回す
+        # （SQLiteだけを使用する環境では mysql-connector が無くても動作するように、使用時に読み込む）
+        import mysql.connector.pooling
+        if self.pool is None:
+            self.pool = mysql.connector.pooling.MySQLConnectionPool(pool_name=self.pool_name,pool_size=self.pool_size,**self.connect_args)
+        return self.pool.get_connection()
+
+    def connect_bulk(self):
+        # コネクションプールの接続では LOCAL INFILE を許可しないため、プールを使わずに接続する
+        import mysql.connector
+        return mysql.connector.connect(allow_local_infile=True,**self.connect_args)
+
+    def get_stream_cursor(self,conn):
+        # サーバー側のカーソル（バッファリングしないカーソル）
+        return conn.cursor(buffered=False)
+
+    def get_upsert_clause(self,key_columns,update_columns,select=False):
+        update_clause = ", ".join(f"{column} = VALUES({column})" for column in update_columns)
+        return f"ON DUPLICATE KEY UPDATE {update_clause}"
+
+    def get_int_div(self,expression,divisor):
+        return f"{expression} DIV {divisor}"
+
+    def get_truncate_sql(self,table_name):
+        # TRUNCATE TABLE は暗黙にCOMMITする
+        return f"TRUNCATE TABLE {table_name}"
+
+    def get_create_table_sqls(self,table_name,columns,primary_key,indexes):
+        definitions = get_create_definitions(columns,primary_key)
+        definitions += [f"INDEX {index_name} ({', '.join(index_columns)})" for index_name,index_columns in indexes.items()]
+        return [f"CREATE TABLE IF NOT EXISTS {table_name} (\n    " + ",\n    ".join(definitions) + "\n)"]
+
+    def get_add_keys_sqls(self,table_name,primary_key,indexes):
+        # テーブルの再構築が1回で済むように、まとめて1つの ALTER TABLE で追加する
+        alter_list = [f"ADD PRIMARY KEY ({', '.join(primary_key)})"] if primary_key is not None else []
+        alter_list += [f"ADD INDEX {index_name} ({', '.join(index_columns)})" for index_name,index_columns in indexes.items()]
+        return [f"ALTER TABLE {table_name} " + ", ".join(alter_list)] if alter_list else []
+
+    def get_add_columns_sqls(self,table_name,add_columns):
+        # テーブルの再構築が1回で済むように、まとめて1つの ALTER TABLE で追加する
+        alter_list = [f"ADD COLUMN {name} {column_type}" for name,column_type in add_columns]
+        return [f"ALTER TABLE {table_name} " + ", ".join(alter_list)] if alter_list else []
+
+    def get_live_schema(self,cursor,table_names):
+        # information_schema から取得する
+        placeholders = self.get_placeholders(len(table_names))
+        schema = {}
+
+        cursor.execute(f"""
+        SELECT
+            TABLE_NAME, COLUMN_NAME, COLUMN_TYPE, IS_NULLABLE
+        FROM
+            information_schema.COLUMNS
+        WHERE
+            TABLE_SCHEMA = DATABASE()
+            AND TABLE_NAME IN ({placeholders})
+        ORDER BY
+            TABLE_NAME, ORDINAL_POSITION
+        """,tuple(table_names))
+        for table_name,column_name,column_type,is_nullable in cursor.fetchall():
+            columns = schema.setdefault(table_name,{"columns": {},"indexes": {}})["columns"]
+            columns[column_name] = get_column_type(column_type,is_nullable == "YES")
+
+        cursor.execute(f"""
+        SELECT
+            TABLE_NAME, INDEX_NAME, COLUMN_NAME
+        FROM
+            information_schema.STATISTICS
+        WHERE
+            TABLE_SCHEMA = DATABASE()
+            AND TABLE_NAME IN ({placeholders})
+        ORDER BY
+            TABLE_NAME, INDEX_NAME, SEQ_IN_INDEX
+        """,tuple(table_names))
+        for table_name,index_name,column_name in cursor.fetchall():
+            schema[table_name]["indexes"].setdefault(index_name,[]).append(column_name)
+
+        return schema
+
+class SqliteBackend(StorageBackend):
+
+    """
+    SqliteBackend クラス
+
+    概要:
+        ローカルのSQLiteファイルのストレージ。MySQLサーバーの無い環境で、取り込みから集計までの処理の動作確認と
+        実データ量でのベンチマークに使用する。セッションごとに接続し、WALモードで読み込みと書き込みを並行できるようにする。
+        LOAD DATA LOCAL INFILE は使用できないため、一括取り込みは複数行の REPLACE で登録する。
+
+    属性:
+        path (str): SQLiteファイルのパス
+    """
+
+    name = "sqlite"
+    placeholder = "?"
+    supports_load_data = False
+    # ON CONFLICT DO UPDATE の変更行数は、INSERTした行もUPDATEした行も1になる
+    counts_upsert_updates = False
+
+    def __init__(self,path):
+        self.path = path
+
+        # NumPy の数値と日時を登録できるようにする
+        sqlite3.register_adapter(np.int64,int)
+        sqlite3.register_adapter(np.int32,int)
+        sqlite3.register_adapter(np.float64,float)
+        sqlite3.register_adapter(dt.datetime,lambda value: value.strftime('%Y-%m-%d %H:%M:%S'))
+
+    def connect(self):
+        # 複数のスレッドのセッションから使用できるように、セッションごとに接続する
+        directory = os.path.dirname(self.path)
+        if directory != "" and not os.path.exists(directory):
+            os.makedirs(directory,exist_ok=True)
+        conn = sqlite3.connect(self.path,timeout=SQLITE_TIMEOUT,check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def get_upsert_clause(self,key_columns,update_columns,select=False):
+        # INSERT ... SELECT の場合は、ON CONFLICT を結合条件と区別するために WHERE 句が必要
+        update_clause = ", ".join(f"{column} = excluded.{column}" for column in update_columns)
+        where_clause = "WHERE true " if select else ""
+        return f"{where_clause}ON CONFLICT ({', '.join(key_columns)}) DO UPDATE SET {update_clause}"
+
+    def get_int_div(self,expression,divisor):
+        # 整数どうしの割り算は小数点以下を切り捨てる
+        return f"CAST({expression} AS INTEGER) / {divisor}"
+
+    def get_truncate_sql(self,table_name):
+        return f"DELETE FROM {table_name}"
+
+    def get_create_table_sqls(self,table_name,columns,primary_key,indexes):
+        definitions = get_create_definitions(columns,primary_key)
+        sql_list = [f"CREATE TABLE IF NOT EXISTS {table_name} (\n    " + ",\n    ".join(definitions) + "\n)"]
+        return sql_list + self.get_add_keys_sqls(table_name,None,indexes)
+
+    def get_add_keys_sqls(self,table_name,primary_key,indexes):
+        # SQLiteでは既存のテーブルに主キーを追加できない（テーブルは主キーを含めて作成する）
+        if primary_key is not None:
+            raise ValueError(f"{table_name} has no primary key and SQLite cannot add one (recreate the table)")
+        return [f"CREATE INDEX IF NOT EXISTS {index_name} ON {table_name} ({', '.join(index_columns)})" for index_name,index_columns in indexes.items()]
+
+    def get_add_columns_sqls(self,table_name,add_columns):
+        # SQLiteの ALTER TABLE は1つの列しか追加できないため、列ごとに追加する
+        return [f"ALTER TABLE {table_name} ADD COLUMN {name} {column_type}" for name,column_type in add_columns]
+
+    def get_live_schema(self,cursor,table_names):
+        # PRAGMA table_info / index_list / index_info から取得する
+        schema = {}
+        for table_name in table_names:
+            cursor.execute(f"PRAGMA table_info({table_name})")
+            table_info = cursor.fetchall()
+            if len(table_info) == 0:
+                continue
+            indexes = {}
+            primary_key = [name for pk,name in sorted((row[5],row[1]) for row in table_info if row[5] > 0)]
+            if primary_key:
+                indexes["PRIMARY"] = primary_key
+            cursor.execute(f"PRAGMA index_list({table_name})")
+            for index_row in cursor.fetchall():
+                # 主キー・UNIQUE制約で自動的に作成されたインデックスは除く
+                if index_row[3] != "c":
+                    continue
+                cursor.execute(f"PRAGMA index_info({index_row[1]})")
+                indexes[index_row[1]] = [name for seqno,cid,name in sorted(cursor.fetchall())]
+            schema[table_name] = {"columns": {row[1]: get_column_type(row[2],row[3] == 0) for row in table_info},"indexes": indexes}
+        return schema
@@ -0,0 +1,252 @@
+# -----------------------------------------------------------------------------
+# 会社名: 湘南技術センター株式会社
+# 名前: 塩見 和則
+# 作成日: 2026/10/18
+# -----------------------------------------------------------------------------
+
+# 標準ライブラリ
+import time
+import datetime as dt
+
+# 外部ライブラリ
+import mysql_ops as mysql
+import csvfile_ops as csv
+import file_util
+import aggregate_ops
+import csvparse_ops
+import rollup_ops
+import dirty_ops
+import schema_ops
+
+# 書き込み中のCSVファイルを確認する間隔（秒）。ロガーは5分ごとに1行追記する
+TAIL_POLL_INTERVAL = 300
+
+class TailIngestor:
+
+    """
+    TailIngestor クラス
+
+    概要:
+        ロガーが書き込み中の現在時刻のCSVファイル（YYMMDDHH.CSV）を定期的に確認し、
+        追記された行だけを取り込む。1時間後の通常実行を待たずにダッシュボードに反映できる。
+
+    処理内容:
+        - SIZE でファイルサイズを確認し、前回取り込んだ位置より大きい場合のみ取得する。
+        - REST で前回取り込んだ位置以降だけを取得し、最後の改行までを取り込む（書き込み途中の行は次回に回す）。
+        - 追記された行を元データテーブルにUPDATE-INSERTし、集計の途中経過（aggregate_ops.HourlyStreamAggregator）に
+          追記された行だけを加えて、時間別・日別・月別テーブルを更新する。
+        - 時間が変わったら前の時間のファイルの残りを取り込み、取り込み済みファイルの情報を記録する
+          （通常実行では変更の無いファイルとしてスキップされる）。
+
+    属性:
+        ftp_directory (str): FTPサーバー上のCSVファイルの保存先ディレクトリ
+        manifest (csvfile_ops.FtpManifest): 取り込み済みファイルの情報
+        hour (datetime.datetime): 取り込み中の時間（None の場合は未開始）
+        offset (int): 取り込み済みの位置（バイト）
+        size (int): 前回確認したファイルサイズ
+        modify (str): 前回確認したファイルの更新日時
+        data (bytearray): 取り込み済みのファイルの内容
+        aggregator (aggregate_ops.HourlyStreamAggregator): 取り込み済みの行の集計の途中経過
+        rollup (tuple): 取り込み済みの行の時間ごとの統計（rollup_ops の (時間のキーの配列, 状態の列)）
+
+    使用方法:
+        ingestor = TailIngestor("/LOG")
+        ingestor.poll()
+    """
+
+    def __init__(self,ftp_directory):
+        self.ftp_directory = ftp_directory
+        self.manifest = csv.get_ftp_manifest()
+        self.directory = None
+        self.filename = None
+        self.hour = None
+        self.start_hour(None)
+
+    def start_hour(self,hour):
+        # 取り込み対象の時間を切り替え、取り込みの状態を初期化する
+        self.hour = hour
+        self.offset = 0
+        self.size = None
+        self.modify = None
+        self.data = bytearray()
+        self.aggregator = aggregate_ops.HourlyStreamAggregator()
+        self.rollup = rollup_ops.combine_states([])
+        if hour is not None:
+            self.oha_date,self.oha_yymmddhh,self.oha_yyyymmdd,self.oha_yyyymm,oha_year,oha_month = file_util.getHourDate(hour)
+            self.directory = f"{self.ftp_directory}/{oha_year}"
+            self.filename = f"{self.oha_yymmddhh}.CSV"
+
+    def poll(self,now=None):
+
+        """
+        poll メソッド
+
+        概要:
+            現在時刻のCSVファイルに追記された行を取り込む。
+            時間が変わっていた場合は、先に前の時間のファイルの残りを取り込んで締める。
+
+        引数:
+            now (datetime.datetime): 現在日時（None の場合は dt.datetime.now()）
+
+        戻り値:
+            int - 取り込んだ行数
+
+        例外処理:
+            取得やDBへの登録でエラーが発生した場合、エラーログを出力し、次回同じ位置から取り込み直す。
+        """
+
+        if now is None:
+            now = dt.datetime.now()
+        hour = now.replace(minute=0,second=0,microsecond=0)
+
+        row_count = 0
+        try:
+            # 時間が変わった場合は、前の時間のファイルの残りを取り込んで締める
+            if self.hour is not None and self.hour != hour:
+                row_count += self.poll_file()
+                self.finish_hour()
+                self.start_hour(None)
+
+            if self.hour is None:
+                self.start_hour(hour)
+            row_count += self.poll_file()
+
+        except Exception as e:
+            # エラーログを出力する（登録はロールバック済み）
+            error_message = f"{str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))} Failed to tail {self.filename}, rolled back: {str(e)}"
+            file_util.write_log(error_message,"error")
+
+        return row_count
+
+    def poll_file(self):
+
+        """
+        poll_file メソッド
+
+        概要:
+            取り込み中のファイルに追記された行を取得し、DBに登録する。
+
+        処理内容:
+            1. SIZE でファイルサイズを確認する（前回から増えていない場合は終了する）。
+            2. REST で前回取り込んだ位置以降を取得し、最後の改行までを追記された行とする。
+            3. 1つのDBセッションで以下の登録を行い、最後にまとめてCOMMITする:
+                - 元データテーブルに追記された行をUPDATE-INSERTする。
+                - 集計の途中経過に追記された行を加え、時間別テーブルの行をUPDATE-INSERTする。
+                - 追記された行を含む日の日別テーブル、その月の月別テーブルを集計しUPDATE-INSERTする。
+                - 追記された行の統計を結合し、時間別・日別・月別の統計テーブルをUPDATE-INSERTする。
+            4. COMMITに成功した場合のみ、取り込み済みの位置を進める。
+
+        戻り値:
+            int - 取り込んだ行数
+
+        例外処理:
+            DBへの登録に失敗した場合は例外を送出する（取り込み済みの位置は進めない）。
+        """
+
+        # ファイルサイズを確認する（まだ作成されていない場合は終了する）
+        size,modify = csv.stat_csv_file(self.directory,self.filename,refresh=True)
+        if size is None:
+            return 0
+
+        # ファイルが小さくなった場合は書き直されたものとして最初から取り込み直す
+        if size < self.offset:
+            message = f"{str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))} Tail {self.filename}: file shrank to {size} bytes, restarting"
+            file_util.write_log(message)
+            self.start_hour(self.hour)
+
+        self.size = size
+        self.modify = modify
+        if size == self.offset:
+            return 0
+
+        # 前回取り込んだ位置以降を取得する
+        new_data = csv.fetch_csv_file(self.directory,self.filename,offset=self.offset)
+        if new_data is None:
+            return 0
+
+        # 最後の改行までを取り込み、書き込み途中の行は次回に回す
+        end = new_data.rfind(b"\n") + 1
+        if end == 0:
+            return 0
+        new_data = new_data[:end]
+
+        # 追記された行を読み込み、集計の途中経過の複製に加える（登録に失敗した場合は元の途中経過のまま取り込み直す）
+        new_df = csvparse_ops.read_logger_csv(new_data)
+        aggregator = self.aggregator.copy()
+        aggregator.add_rows(new_df)
+        hourly_records = aggregator.pop_changed_records()
+
+        # 追記された行の統計を、取り込み済みの行の統計に結合する
+        rollup = rollup_ops.combine_states([self.rollup,rollup_ops.rollup_rows([new_df])])
+
+        # 追記された行の日・月の日別・月別テーブルを集計し直す（時間別・統計テーブルは途中経過から登録する）
+        dirty = dirty_ops.DirtySet()
+        dirty.mark_rows(new_df)
+
+        # 1つのセッションで全テーブルを登録し、最後に1回だけCOMMITする
+        with mysql.DbSession() as session:
+            mysql.db_UpdateInsertOriginTableBatch(new_df,self.oha_yymmddhh,session)
+            mysql.db_UpdateInsertHourlyTableBatch(hourly_records,session)
+            dirty_ops.recompute_dirty(dirty,session,hourly=False)
+            mysql.db_UpdateRollupTables(*rollup,session)
+
+        # COMMITに成功した場合のみ取り込み済みの位置を進める
+        self.offset += end
+        self.data += new_data
+        self.aggregator = aggregator
+        self.rollup = rollup
+
+        # ログを出力する
+        message = f"{str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))} Tail {self.filename}: +{len(new_df)} rows (offset {self.offset})"
+        file_util.write_log(message)
+
+        return len(new_df)
+
+    def finish_hour(self):
+        # ファイルを最後まで取り込めた場合は、通常実行で取り込み直さないよう取り込み済みファイルの情報を記録する
+        if len(self.data) == 0 or self.size != self.offset:
+            return
+        full_df = csvparse_ops.read_logger_csv(bytes(self.data))
+        self.manifest.update(self.directory,self.filename,self.size,self.modify,csv.get_content_hash(bytes(self.data)),csv.get_row_hashes(full_df))
+        self.manifest.save()
+
+def run_tail(ftp_directory,interval=TAIL_POLL_INTERVAL):
+
+    """
+    run_tail 関数
+
+    概要:
+        現在時刻のCSVファイルの追記分の取り込みを、指定された間隔で繰り返す関数。
+        Ctrl+C（KeyboardInterrupt）で終了する。
+
+    引数:
+        ftp_directory: str - FTPサーバー上のCSVファイルの保存先ディレクトリ
+        interval: int - 確認する間隔（秒）
+
+    戻り値:
+        なし
+
+    例外処理:
+        取り込みのエラーは TailIngestor.poll 内でログに出力し、次の確認で取り込み直す。
+        テーブルを確認できない間（DBの障害中など）は取り込まずに、次の確認でテーブルを確認し直す。
+    """
+
+    ingestor = TailIngestor(ftp_directory)
+
+    # 確認の間もバッファに残ったログを定期的にログファイルに書き込む
+    file_util.start_log_flush_thread()
+
+    message = f"{str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))} Tail mode started (interval {interval} sec)"
+    file_util.write_log(message)
+
+    try:
+        while True:
+            # テーブルを確認できていない場合（DBの障害中など）は、確認し直してから取り込む（取り込めない間は次の確認で取り込み直す）
+            if schema_ops.ensure_schema() == True:
+                ingestor.poll()
+
+            # 次の確認時刻まで待つ（間隔の区切りに合わせる）
+            time.sleep(interval - time.time() % interval)
+    except KeyboardInterrupt:
+        message = f"{str(dt.datetime.now().strftime('%Y-%m-%d %H:%M'))} Tail mode stopped"
+        file_util.write_log(message)
@@ -0,0 +1,139 @@
+# -----------------------------------------------------------------------------
+# 会社名: 湘南技術センター株式会社
+# 名前: 塩見 和則
+# 作成日: 2026/10/18
+# -----------------------------------------------------------------------------
+
+"""
+テストの共通設定
+
+- bin と bench のモジュールを読み込めるようにする。
+- bin のモジュールは ../log、../manifest、../spool などの相対パスを使用するため、
+  テストごとに一時ディレクトリの bin に移動して実行する。
+- ftp_server: pyftpdlib のFTPサーバーを起動し、csvfile_ops の接続先を切り替える。
+"""
+
+# 標準ライブラリ
+import os
+import sys
+import ftplib
+import logging
+import threading
+
+# 外部ライブラリ
+import pytest
+
+ROOT_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0,os.path.join(ROOT_DIRECTORY,"bin"))
+sys.path.insert(0,os.path.join(ROOT_DIRECTORY,"bench"))
+
+import file_util
+import csvfile_ops
+import schema_ops
+
+# FTPサーバーのユーザー名・パスワード
+FTP_USER = "test"
+FTP_PASSWORD = "test"
+
+@pytest.fixture(autouse=True)
+def work_dir(tmp_path,monkeypatch):
+    # 一時ディレクトリの bin に移動する（../log などが一時ディレクトリに作成される）
+    os.makedirs(tmp_path / "bin")
+    os.makedirs(tmp_path / "log")
+    monkeypatch.chdir(tmp_path / "bin")
+    # テーブルの確認結果はテストごとにやり直す
+    monkeypatch.setattr(schema_ops,"_schema_ready",False)
+    yield tmp_path
+    # テスト中のログを一時ディレクトリのログファイルに書き込んで閉じる
+    file_util._log_writer.close()
+
+class FtpServerState:
+
+    """
+    FtpServerState クラス
+
+    概要:
+        テスト用のFTPサーバーの状態。受信したコマンドと接続数を記録し、
+        コマンドを受信したときに制御接続を切断したり、MLSD を未対応にしたりする。
+
+    属性:
+        root (str): 公開するディレクトリ
+        port (int): 待ち受けるポート
+        commands (list): 受信したコマンドのリスト
+        connections (int): 接続数
+        drop_commands (set): 受信したときに制御接続を切断するコマンド
+        drop_count (int): drop_commands で切断する回数（0 の場合は切断しない）
+        mlsd_supported (bool): MLSD に対応するかどうか
+    """
+
+    def __init__(self,root):
+        self.root = root
+        self.port = None
+        self.commands = []
+        self.connections = 0
+        self.drop_commands = set()
+        self.drop_count = 0
+        self.mlsd_supported = True
+        self.lock = threading.Lock()
+
+    def count(self,command):
+        # 受信したコマンドの回数
+        with self.lock:
+            return self.commands.count(command)
+
+def make_handler(state):
+    # 受信したコマンドを記録する FTPHandler を作成する
+    from pyftpdlib.handlers import FTPHandler
+    from pyftpdlib.authorizers import DummyAuthorizer
+
+    authorizer = DummyAuthorizer()
+    authorizer.add_user(FTP_USER,FTP_PASSWORD,state.root,perm="elr")
+
+    class RecordingHandler(FTPHandler):
+
+        def on_connect(self):
+            with state.lock:
+                state.connections += 1
+
+        def pre_process_command(self,line,cmd,arg):
+            with state.lock:
+                state.commands.append(cmd)
+                drop = state.drop_count > 0 and cmd in state.drop_commands
+                if drop:
+                    state.drop_count -= 1
+            if drop:
+                # 応答せずに制御接続を切断する
+                self.close()
+                return
+            if cmd == "MLSD" and state.mlsd_supported == False:
+                self.respond("502 Command not implemented.")
+                return
+            super().pre_process_command(line,cmd,arg)
+
+    RecordingHandler.authorizer = authorizer
+    return RecordingHandler
+
+@pytest.fixture
+def ftp_server(tmp_path,monkeypatch):
+    # pyftpdlib のFTPサーバーを別スレッドで起動し、csvfile_ops の接続先にする
+    from pyftpdlib.servers import FTPServer
+    logging.getLogger("pyftpdlib").setLevel(logging.WARNING)
+
+    root = tmp_path / "ftp"
+    os.makedirs(root)
+    state = FtpServerState(str(root))
+    server = FTPServer(("127.0.0.1",0),make_handler(state))
+    state.port = server.socket.getsockname()[1]
+    thread = threading.Thread(target=server.serve_forever,kwargs={"timeout": 0.05},daemon=True)
+    thread.start()
+
+    csvfile_ops.close_ftp_session_pool()
+    monkeypatch.setattr(csvfile_ops,"ftp_server","127.0.0.1")
+    monkeypatch.setattr(csvfile_ops,"username",FTP_USER)
+    monkeypatch.setattr(csvfile_ops,"password",FTP_PASSWORD)
+    monkeypatch.setattr(ftplib.FTP,"port",state.port)
+    yield state
+
+    csvfile_ops.close_ftp_session_pool()
+    server.close_all()
+    thread.join(5)
@@ -0,0 +1,74 @@
+# -----------------------------------------------------------------------------
+# 会社名: 湘南技術センター株式会社
+# 名前: 塩見 和則
+# 作成日: 2026/10/18
+# -----------------------------------------------------------------------------
+
+"""
+aggregate_ops のテスト
+
+1時間分の行を複数回に分けて HourlyAccumulator に追加しても、1回で追加した場合と同じ
+件数・合計・最小値・最大値と時間別テーブルの行になることを確認する（欠損値は最小値・最大値から除く）。
+"""
+
+# 標準ライブラリ
+import datetime as dt
+
+# 外部ライブラリ
+import numpy as np
+import pytest
+
+import aggregate_ops
+import csvparse_ops
+import synth_csv
+
+# 集計する時間
+HOUR = dt.datetime(2024,7,30,10)
+
+def make_hour_block():
+    # 合成したCSVファイル1件分（12行）の集計に使用する列（一部の値を欠損値にする）
+    data = next(synth_csv.generate_files(1,HOUR,1,error_rate=0))[2]
+    block = aggregate_ops.get_aggregate_block(csvparse_ops.read_logger_csv(data)).copy()
+    block[3,2] = np.nan
+    block[[0,5,11],4] = np.nan
+    block[:,5] = np.nan
+    return block
+
+def add_chunks(block,sizes):
+    # 行を sizes の行数ずつに分けて追加した途中経過
+    accumulator = aggregate_ops.HourlyAccumulator(20240730,10)
+    for chunk in np.split(block,np.cumsum(sizes)[:-1]):
+        accumulator.add_block(chunk)
+    return accumulator
+
+@pytest.mark.parametrize("sizes",[[1] * 12,[5,7],[4,0,8]])
+def test_streaming_chunks_match_whole_hour(sizes):
+    # 分けて追加した場合も、1回で追加した場合と同じ最小値・最大値（値が無い列は NaN）と集計結果になる
+    block = make_hour_block()
+    whole = add_chunks(block,[len(block)])
+    streamed = add_chunks(block,sizes)
+
+    with np.errstate(invalid="ignore"):
+        expected_mins = np.fmin.reduce(block[:,2:-1],axis=0) / aggregate_ops.HOURLY_MEAN_DIVISORS
+        expected_maxs = np.fmax.reduce(block[:,2:-1],axis=0) / aggregate_ops.HOURLY_MEAN_DIVISORS
+    np.testing.assert_array_equal(whole.get_mins(),expected_mins)
+    np.testing.assert_array_equal(whole.get_maxs(),expected_maxs)
+    np.testing.assert_array_equal(streamed.get_mins(),whole.get_mins())
+    np.testing.assert_array_equal(streamed.get_maxs(),whole.get_maxs())
+    assert np.isnan(streamed.get_mins()[3]) and np.isnan(streamed.get_maxs()[3])
+
+    np.testing.assert_array_equal(streamed.counts,whole.counts)
+    streamed_record = streamed.get_record(update_datetime="")
+    whole_record = whole.get_record(update_datetime="")
+    np.testing.assert_array_equal(streamed_record[2:-2],whole_record[2:-2])
+    assert streamed_record[:2] + streamed_record[-2:] == whole_record[:2] + whole_record[-2:]
+
+def test_copy_keeps_mins_and_maxs():
+    # 複製に行を追加しても、元の途中経過の最小値・最大値は変わらない
+    block = make_hour_block()
+    accumulator = add_chunks(block[:6],[6])
+    mins = accumulator.get_mins()
+    copied = accumulator.copy()
+    copied.add_block(block[6:])
+    np.testing.assert_array_equal(accumulator.get_mins(),mins)
+    np.testing.assert_array_equal(copied.get_mins(),add_chunks(block,[12]).get_mins())
@@ -0,0 +1,220 @@
+# -----------------------------------------------------------------------------
+# 会社名: 湘南技術センター株式会社
+# 名前: 塩見 和則
+# 作成日: 2026/10/18
+# -----------------------------------------------------------------------------
+
+"""
+csvfile_ops の FtpSession / FtpSessionPool のテスト
+
+pyftpdlib のFTPサーバー（conftest.ftp_server）に接続し、接続の使い回し、切断後の再接続、
+keepalive スレッドのNOOP、MLSD 未対応時の NLST への切り替え、SIZE / MDTM の取得を確認する。
+"""
+
+# 標準ライブラリ
+import os
+import time
+import ftplib
+
+# 外部ライブラリ
+import pytest
+
+import csvfile_ops
+
+# FTPサーバー上のディレクトリとファイル
+FTP_DIRECTORY = "/LOG/2024"
+FTP_FILES = {
+    "24073020.CSV": b"1,20240730,2000\n",
+    "24073021.CSV": b"1,20240730,2100\n1,20240730,2105\n",
+}
+# ファイルの更新日時（UTC 2024/07/30 21:10:05）
+FTP_MTIME = 1722373805
+
+@pytest.fixture
+def ftp_files(ftp_server):
+    # FTPサーバーにテスト用のファイルを作成する
+    directory = os.path.join(ftp_server.root,"LOG","2024")
+    os.makedirs(directory)
+    for filename,data in FTP_FILES.items():
+        path = os.path.join(directory,filename)
+        with open(path,"wb") as f:
+            f.write(data)
+        os.utime(path,(FTP_MTIME,FTP_MTIME))
+    return ftp_server
+
+def wait_for(condition,timeout=5.0):
+    # 条件を満たすまで待つ
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return condition()
+
+def test_session_reuses_connection(ftp_files):
+    # 同じセッションでの取得は、1回の接続・ログインを使い回し、同じディレクトリへの CWD を省略する
+    ftp_session = csvfile_ops.FtpSession()
+    try:
+        assert ftp_session.fetch(FTP_DIRECTORY,"24073020.CSV") == FTP_FILES["24073020.CSV"]
+        assert ftp_session.fetch(FTP_DIRECTORY,"24073021.CSV") == FTP_FILES["24073021.CSV"]
+    finally:
+        ftp_session.close()
+
+    assert ftp_files.connections == 1
+    assert ftp_files.count("USER") == 1
+    assert ftp_files.count("CWD") == 1
+    assert ftp_files.count("RETR") == 2
+    assert ftp_session.reconnect_count == 0
+
+def test_pool_reuses_session(ftp_files):
+    # プールから借りたセッションは、返却後に次の呼び出しで使い回す
+    ftp_pool = csvfile_ops.FtpSessionPool(2)
+    try:
+        with ftp_pool.session() as ftp_session:
+            ftp_session.fetch(FTP_DIRECTORY,"24073020.CSV")
+        with ftp_pool.session() as ftp_session_2:
+            ftp_session_2.fetch(FTP_DIRECTORY,"24073021.CSV")
+    finally:
+        ftp_pool.close()
+
+    assert ftp_session is ftp_session_2
+    assert ftp_files.connections == 1
+    assert ftp_files.count("USER") == 1
+
+def test_call_reconnects_once_after_drop(ftp_files):
+    # 制御接続が切断された場合は、再接続して1回だけ再実行する
+    ftp_session = csvfile_ops.FtpSession()
+    try:
+        ftp_session.fetch(FTP_DIRECTORY,"24073020.CSV")
+        ftp_files.drop_commands = {"RETR"}
+        ftp_files.drop_count = 1
+        assert ftp_session.fetch(FTP_DIRECTORY,"24073021.CSV") == FTP_FILES["24073021.CSV"]
+    finally:
+        ftp_session.close()
+
+    assert ftp_session.reconnect_count == 1
+    assert ftp_files.connections == 2
+    assert ftp_files.count("USER") == 2
+    # 再接続後はディレクトリを移動し直す
+    assert ftp_files.count("CWD") == 2
+
+def test_call_raises_after_second_drop(ftp_files):
+    # 再接続しても切断された場合は例外を送出する
+    ftp_session = csvfile_ops.FtpSession()
+    ftp_files.drop_commands = {"RETR"}
+    ftp_files.drop_count = 2
+    try:
+        with pytest.raises(ftplib.all_errors):
+            ftp_session.fetch(FTP_DIRECTORY,"24073020.CSV")
+    finally:
+        ftp_session.close()
+
+    assert ftp_session.reconnect_count == 1
+    assert ftp_session.ftp is None
+    assert ftp_files.count("RETR") == 2
+
+def test_missing_file_is_not_retried(ftp_files):
+    # ファイルが存在しない場合（550）は再接続せずにそのまま送出する
+    ftp_session = csvfile_ops.FtpSession()
+    try:
+        with pytest.raises(ftplib.error_perm,match="^550"):
+            ftp_session.fetch(FTP_DIRECTORY,"nope.CSV")
+    finally:
+        ftp_session.close()
+
+    assert ftp_session.reconnect_count == 0
+    assert ftp_files.connections == 1
+
+def test_keepalive_thread_sends_noop(ftp_files,monkeypatch):
+    # keepalive スレッドは、空いているセッションに一定間隔でNOOPを送る
+    monkeypatch.setattr(csvfile_ops,"FTP_KEEPALIVE_INTERVAL",0)
+    ftp_pool = csvfile_ops.FtpSessionPool(1)
+    try:
+        with ftp_pool.session() as ftp_session:
+            ftp_session.fetch(FTP_DIRECTORY,"24073020.CSV")
+        assert ftp_files.count("NOOP") == 0
+        ftp_pool.start_keepalive_thread(0.02)
+        assert wait_for(lambda: ftp_files.count("NOOP") >= 2)
+        assert ftp_session.ftp is not None
+    finally:
+        ftp_pool.close()
+
+    assert ftp_files.connections == 1
+
+def test_keepalive_detects_dropped_connection(ftp_files,monkeypatch):
+    # NOOP に応答が無い場合は切断済みとして扱い、次の操作で再接続する
+    monkeypatch.setattr(csvfile_ops,"FTP_KEEPALIVE_INTERVAL",0)
+    ftp_pool = csvfile_ops.FtpSessionPool(1)
+    try:
+        with ftp_pool.session() as ftp_session:
+            ftp_session.fetch(FTP_DIRECTORY,"24073020.CSV")
+        ftp_files.drop_commands = {"NOOP"}
+        ftp_files.drop_count = 1
+        ftp_pool.keepalive()
+        assert ftp_session.ftp is None
+        with ftp_pool.session() as ftp_session:
+            assert ftp_session.fetch(FTP_DIRECTORY,"24073021.CSV") == FTP_FILES["24073021.CSV"]
+    finally:
+        ftp_pool.close()
+
+    assert ftp_files.connections == 2
+    assert ftp_session.reconnect_count == 0
+
+def test_list_directory_uses_mlsd(ftp_files):
+    # MLSD に対応したサーバーでは、サイズと更新日時も取得する
+    ftp_session = csvfile_ops.FtpSession()
+    try:
+        entries = ftp_session.list_directory(FTP_DIRECTORY)
+        # 有効期間内はキャッシュを返す
+        assert ftp_session.list_directory(FTP_DIRECTORY) is entries
+    finally:
+        ftp_session.close()
+
+    assert entries == {
+        filename: {"size": len(data),"modify": time.strftime("%Y%m%d%H%M%S",time.gmtime(FTP_MTIME))}
+        for filename,data in FTP_FILES.items()
+    }
+    assert ftp_files.count("MLSD") == 1
+    assert ftp_files.count("NLST") == 0
+
+def test_list_directory_falls_back_to_nlst(ftp_files):
+    # MLSD に対応していないサーバーでは NLST でファイル名のみ取得する
+    ftp_files.mlsd_supported = False
+    ftp_session = csvfile_ops.FtpSession()
+    try:
+        entries = ftp_session.list_directory(FTP_DIRECTORY)
+    finally:
+        ftp_session.close()
+
+    assert entries == {filename: {} for filename in FTP_FILES}
+    assert ftp_files.count("MLSD") == 1
+    assert ftp_files.count("NLST") == 1
+    assert ftp_session.reconnect_count == 0
+
+def test_stat_uses_size_and_mdtm(ftp_files):
+    # キャッシュが無い場合は SIZE / MDTM でサイズと更新日時を取得する
+    ftp_session = csvfile_ops.FtpSession()
+    try:
+        size,modify = ftp_session.stat(FTP_DIRECTORY,"24073021.CSV",refresh=True)
+        with pytest.raises(ftplib.error_perm,match="^550"):
+            ftp_session.stat(FTP_DIRECTORY,"nope.CSV",refresh=True)
+    finally:
+        ftp_session.close()
+
+    assert size == len(FTP_FILES["24073021.CSV"])
+    assert modify == time.strftime("%Y%m%d%H%M%S",time.gmtime(FTP_MTIME))
+    assert ftp_files.count("SIZE") == 2
+    assert ftp_files.count("MDTM") == 1
+
+def test_stat_uses_listing_cache(ftp_files):
+    # ディレクトリ一覧のキャッシュにある場合は SIZE / MDTM を送らない
+    ftp_session = csvfile_ops.FtpSession()
+    try:
+        entries = ftp_session.list_directory(FTP_DIRECTORY)
+        stat = ftp_session.stat(FTP_DIRECTORY,"24073020.CSV")
+    finally:
+        ftp_session.close()
+
+    assert stat == (entries["24073020.CSV"]["size"],entries["24073020.CSV"]["modify"])
+    assert ftp_files.count("SIZE") == 0
+    assert ftp_files.count("MDTM") == 0
@@ -0,0 +1,52 @@
+# -----------------------------------------------------------------------------
+# 会社名: 湘南技術センター株式会社
+# 名前: 塩見 和則
+# 作成日: 2026/10/18
+# -----------------------------------------------------------------------------
+
+"""
+csvparse_ops のテスト
+
+メモリ上のファイルの内容（bytes、NumPy で読み込む）と、ファイルオブジェクト（pandas.read_csv で読み込む）の
+どちらを読み込んでも、同じ値・同じ型の DataFrame になることを確認する。
+"""
+
+# 標準ライブラリ
+import io
+import datetime as dt
+
+# 外部ライブラリ
+import pytest
+
+import csvparse_ops
+import synth_csv
+
+def make_csv_data(column=None,value=None):
+    # 合成したCSVファイル1件分の内容（column を指定した場合は4行目のその列を value にする）
+    data = next(synth_csv.generate_files(1,dt.datetime(2024,7,30,10),1,error_rate=0))[2]
+    if column is None:
+        return data
+    lines = data.decode().splitlines()
+    fields = lines[3].split(",")
+    fields[column] = value
+    lines[3] = ",".join(fields)
+    return ("\n".join(lines) + "\n").encode()
+
+def test_bytes_and_file_match_with_schema():
+    # 列定義どおりのファイルは、どちらも整数の列を int64 で読み込む
+    data = make_csv_data()
+    from_bytes = csvparse_ops.read_logger_csv(data)
+    from_file = csvparse_ops.read_logger_csv(io.BytesIO(data))
+    assert from_bytes.equals(from_file)
+    assert [str(from_bytes[column].dtype) for column in csvparse_ops.LOGGER_CSV_INT_COLUMNS] == ["int64"] * 4
+
+@pytest.mark.parametrize("column,value",[(30,"2915643.7"),(29,"0.5"),(30,"")])
+def test_bytes_and_file_match_with_non_integer_values(column,value):
+    # 整数の列に小数・欠損値がある場合は、どちらも型を推定して読み込み直し、値を切り捨てない
+    data = make_csv_data(column,value)
+    from_bytes = csvparse_ops.read_logger_csv(data)
+    from_file = csvparse_ops.read_logger_csv(io.BytesIO(data))
+    assert from_bytes.equals(from_file)
+    assert from_bytes[column].dtype == "float64"
+    if value != "":
+        assert from_bytes.loc[3,column] == float(value)
@@ -0,0 +1,121 @@
+# -----------------------------------------------------------------------------
+# 会社名: 湘南技術センター株式会社
+# 名前: 塩見 和則
+# 作成日: 2026/10/18
+# -----------------------------------------------------------------------------
+
+"""
+バックフィルの通しのテスト
+
+bench/standins.py のFTPサーバー（LocalFtpServer）とSQLiteのストレージで、合成したCSVファイル
+（月をまたぐ72時間分）を backfill_ops.backfill で取り込み、時間別・日別・月別テーブルの値が
+従来の処理（CSVファイルごとに pandas.read_csv で読み込み、getInsertDataListForDailyTable で
+時間別の値を求め、日別・月別は最初と最後の時間・日の売電量の差を求める）と同じになることを確認する。
+"""
+
+# 標準ライブラリ
+import os
+import datetime as dt
+
+# 外部ライブラリ
+import pytest
+import pandas as pd
+
+import file_util
+import csvfile_ops
+import mysql_ops
+import backfill_ops
+import standins
+import synth_csv
+
+# 取り込む期間（7/30 0時から 8/1 23時までの72時間。月をまたぐ）
+START_HOUR = dt.datetime(2024,7,30,0)
+HOURS = 72
+
+def get_baseline_insert_list(df,date):
+    # 従来の getInsertDataListForDailyTable（pandas で列ごとに平均を求める）と同じ時間別テーブルのリスト
+    # 時間は、従来の str(時刻)[:-2] では0時が空文字になるため、時刻を100で割った商にする
+    temp_list = [df.loc[0,1],str(df.loc[0,2] // 100)]
+    for column in range(3,24):
+        if column % 3 == 2:
+            # 発電量[kWH]の平均値
+            temp_list.append(round(df.iloc[:,column].mean()/1000,4))
+        else:
+            # 電流・電圧の平均値
+            temp_list.append(round(df.iloc[:,column].mean(),4))
+    temp_list.append(round(df.iloc[:,27].mean(),4)) # 日射量の平均値
+    temp_list.append(round(df.iloc[:,28].mean(),4)) # 温度の平均値
+    temp_list.append(df[30][df.shape[0]-1] - df[30][0]) # 1時間あたりの売電量[kWH]
+    temp_list.append(df[30][df.shape[0]-1]) # 売電量[kWH]
+    temp_list.append("'" + date + "'") # 観測日時
+    temp_list.append("'" + str(dt.datetime.now().strftime('%Y-%m-%d %H:%M')) + "'") # 更新日時
+    return temp_list
+
+def to_hourly_row(insert_list):
+    # 時間別テーブルの行（観測日, 時間, 値..., 観測日時）の形にそろえる（更新日時は除く）
+    values = [int(insert_list[0]),int(insert_list[1])] + [float(value) for value in insert_list[2:-2]]
+    return tuple(values) + (insert_list[-2].strip("'"),)
+
+@pytest.fixture
+def backfilled(work_dir,monkeypatch):
+    # 合成したCSVファイルを LocalFtpServer で公開し、SQLiteのストレージにバックフィルで取り込む
+    ftp_root = str(work_dir / "synth")
+    synth_csv.write_files(ftp_root,1,START_HOUR,HOURS)
+    server = standins.LocalFtpServer(os.path.join(ftp_root,synth_csv.get_sites(1)[0])).start()
+    monkeypatch.setattr(mysql_ops,"_backend",None)
+    for name in ("ftp_server","username","password"):
+        monkeypatch.setattr(csvfile_ops,name,getattr(csvfile_ops,name))
+    monkeypatch.setattr(csvfile_ops.ftplib.FTP,"port",csvfile_ops.ftplib.FTP.port)
+    standins.use_local_ftp(server)
+    standins.use_sqlite_database(str(work_dir / "izumi_sola.sqlite3"))
+
+    summary = backfill_ops.backfill(START_HOUR,START_HOUR + dt.timedelta(hours=HOURS - 1),"/LOG")
+    conn,cursor = mysql_ops.db_init()
+    yield summary,cursor,ftp_root
+
+    mysql_ops.db_close(conn,cursor)
+    csvfile_ops.close_ftp_session_pool()
+    server.close()
+
+def get_baseline_hourly_rows(ftp_root):
+    # CSVファイルごとに従来の方法で読み込み、時間別テーブルの行を求める
+    rows = []
+    for hour_no in range(HOURS):
+        hour = START_HOUR + dt.timedelta(hours=hour_no)
+        csv_df = pd.read_csv(synth_csv.get_file_path(ftp_root,synth_csv.get_sites(1)[0],hour),header=None)
+        date = hour.strftime('%Y-%m-%d %H:%M')
+        baseline_list = get_baseline_insert_list(csv_df,date)
+        # 現在の getInsertDataListForDailyTable も従来と同じ値を返す
+        assert to_hourly_row(file_util.getInsertDataListForDailyTable(csv_df,date)) == to_hourly_row(baseline_list)
+        rows.append(to_hourly_row(baseline_list))
+    return rows
+
+def test_backfill_commits_all_hours(backfilled):
+    summary,cursor,ftp_root = backfilled
+    assert summary["committed"] == True
+    assert summary["committed_files"] == HOURS
+    assert summary["rows_skipped"] == 0
+
+def test_hourly_matches_baseline(backfilled):
+    # 時間別テーブルの全ての行が、CSVファイルごとの従来の集計と同じになる
+    summary,cursor,ftp_root = backfilled
+    cursor.execute(f"SELECT {', '.join(mysql_ops.HOURLY_COLUMNS[:-1])} FROM {mysql_ops.HOURLY_TABLE_NAME} ORDER BY KANSOKU_DATE_INT, KANSOKU_TIME_INT")
+    assert cursor.fetchall() == get_baseline_hourly_rows(ftp_root)
+
+def test_daily_and_monthly_match_baseline(backfilled):
+    # 日別テーブルは日の最初と最後の時間、月別テーブルは月の最初と最後の日の売電量の差になる
+    summary,cursor,ftp_root = backfilled
+    baiden = {}
+    for row in get_baseline_hourly_rows(ftp_root):
+        baiden.setdefault(row[0],[]).append(row[-2])
+    expected_daily = [(date_int,values[-1] - values[0],values[0],values[-1]) for date_int,values in sorted(baiden.items())]
+
+    months = {}
+    for date_int,baiden_daily,baiden_00,baiden_23 in expected_daily:
+        months.setdefault(date_int // 100,[]).append((baiden_00,baiden_23))
+    expected_monthly = [(month_int,days[-1][1] - days[0][0]) for month_int,days in sorted(months.items())]
+
+    cursor.execute(f"SELECT KANSOKU_DATE_INT, BAIDEN_DAILY, BAIDEN_00, BAIDEN_23 FROM {mysql_ops.DAILY_TABLE_NAME} ORDER BY KANSOKU_DATE_INT")
+    assert cursor.fetchall() == expected_daily
+    cursor.execute(f"SELECT KANSOKU_MONTH_INT, BAIDEN_MONTHLY FROM {mysql_ops.MONTHLY_TABLE_NAME} ORDER BY KANSOKU_MONTH_INT")
+    assert cursor.fetchall() == expected_monthly
@@ -0,0 +1,109 @@
+# -----------------------------------------------------------------------------
+# 会社名: 湘南技術センター株式会社
+# 名前: 塩見 和則
+# 作成日: 2026/10/18
+# -----------------------------------------------------------------------------
+
+"""
+main の通常実行のテスト
+
+起動時のテーブルの確認に失敗した場合（replay=False）に、スプールに書き込んだ行を登録の前にテーブルを
+確認し直して登録すること、登録できない間は実行ごとにエラーログを出力することを確認する。
+DBに接続できない場合も常駐実行は起動し、バックフィルなどは終了することを確認する。
+"""
+
+# 標準ライブラリ
+import os
+import sys
+import shutil
+import subprocess
+import datetime as dt
+
+# 外部ライブラリ
+import pytest
+
+import csvfile_ops
+import file_util
+import mysql_ops
+import schema_ops
+import spool_ops
+import synth_csv
+import main
+
+# 取り込む時間
+HOUR = dt.datetime(2024,7,30,10)
+
+@pytest.fixture
+def logs(ftp_server,work_dir,monkeypatch):
+    # FTPサーバーにCSVファイルを置き、SQLiteのストレージ（未作成）を使用して、出力したログを記録する
+    synth_csv.write_files(str(work_dir / "synth"),1,HOUR - dt.timedelta(hours=2),3)
+    shutil.copytree(work_dir / "synth" / synth_csv.get_sites(1)[0] / "LOG",work_dir / "ftp" / "LOG")
+    monkeypatch.setattr(csvfile_ops,"_ftp_manifest",None)
+    monkeypatch.setattr(mysql_ops,"_backend",None)
+    mysql_ops.set_backend("sqlite",str(work_dir / "izumi_sola.sqlite3"))
+
+    logs = []
+    write_log = file_util.write_log
+    def record_log(log_content,level="info"):
+        logs.append((level,log_content))
+        write_log(log_content,level)
+    monkeypatch.setattr(file_util,"write_log",record_log)
+    return logs
+
+def select_hours():
+    # 時間別テーブルの観測日・観測時を取得する
+    conn,cursor = mysql_ops.db_init()
+    cursor.execute(f"SELECT KANSOKU_DATE_INT, KANSOKU_TIME_INT FROM {mysql_ops.HOURLY_TABLE_NAME} ORDER BY 1, 2")
+    rows = cursor.fetchall()
+    mysql_ops.db_close(conn,cursor)
+    return rows
+
+def get_waiting_errors(logs):
+    # スプールに行が残っていることを知らせるエラーログ
+    return [log_content for level,log_content in logs if level == "error" and "batches are waiting for the database" in log_content]
+
+def test_main_rechecks_schema_before_replay(logs):
+    # 起動時の確認に失敗していても、登録の前に確認し直してテーブルを作成できれば登録する
+    assert main.main(hour=HOUR,replay=False) == True
+    assert select_hours() == [(20240730,10)]
+    assert spool_ops.get_pending_status() == (0,None)
+    assert get_waiting_errors(logs) == []
+
+def test_main_alerts_every_run_while_spooled(logs,monkeypatch):
+    # テーブルを確認できない間は行をスプールに残し、実行ごとに残っているバッチ数をエラーログに出力する
+    prepare_schema = schema_ops.prepare_schema
+    schema_ready = [False]
+    monkeypatch.setattr(schema_ops,"prepare_schema",lambda force=False: schema_ready[0] and prepare_schema(force))
+    assert main.main(hour=HOUR - dt.timedelta(hours=2),replay=False) == True
+    assert main.main(hour=HOUR - dt.timedelta(hours=1),replay=False) == True
+
+    errors = get_waiting_errors(logs)
+    assert len(errors) == 2
+    assert "1 batches are waiting" in errors[0] and "(schema is not ready)" in errors[0]
+    assert "2 batches are waiting" in errors[1]
+    batch_count,oldest_spooled = spool_ops.get_pending_status()
+    assert batch_count == 2 and oldest_spooled in errors[1]
+
+    # テーブルを確認できるようになったら、残っていた行もまとめて登録する
+    schema_ready[0] = True
+    assert main.main(hour=HOUR,replay=False) == True
+    assert select_hours() == [(20240730,8),(20240730,9),(20240730,10)]
+    assert spool_ops.get_pending_status() == (0,None)
+    assert len(get_waiting_errors(logs)) == 2
+
+def run_main(work_dir,*args):
+    # DBに接続できない（SQLiteのパスがディレクトリ）状態で main.py を実行し、5秒以内に終了した場合は終了コードを返す
+    main_path = os.path.join(os.path.dirname(os.path.abspath(main.__file__)),"main.py")
+    command = [sys.executable,main_path,*args,"--db-backend","sqlite","--sqlite-path",str(work_dir)]
+    try:
+        return subprocess.run(command,cwd=str(work_dir / "bin"),timeout=5,capture_output=True).returncode
+    except subprocess.TimeoutExpired:
+        return None
+
+def test_daemon_starts_while_database_is_down(work_dir):
+    # 常駐実行はDBの障害中も終了せずに起動する（スプールの登録の前にテーブルを確認し直す）
+    assert run_main(work_dir,"--daemon") is None
+
+def test_backfill_exits_while_database_is_down(work_dir):
+    # バックフィルは登録できないため終了する
+    assert run_main(work_dir,"--backfill","2024070100","2024070101") == 1
@@ -0,0 +1,197 @@
+# -----------------------------------------------------------------------------
+# 会社名: 湘南技術センター株式会社
+# 名前: 塩見 和則
+# 作成日: 2026/10/18
+# -----------------------------------------------------------------------------
+
+"""
+mysql_ops の登録・集計のテスト
+
+SQLiteのストレージ（standins.use_sqlite_database）で、観測日の半開区間 [月初, 翌月初) による
+月別テーブルの集計が、YEAR() / MONTH() で月を判定していた従来の集計と同じ結果になること、
+また観測日の範囲検索が KANSOKU_DATE_INT のインデックスを使用することを確認する。
+元データテーブルの1行ずつの登録（比較用）が、一括登録と同じ行を登録し、同じINSERT・UPDATEの行数を返すことも確認する。
+"""
+
+# 標準ライブラリ
+import types
+
+# 外部ライブラリ
+import pytest
+import pandas as pd
+
+import mysql_ops
+import standins
+import storage_ops
+
+# 日別テーブルの行（観測日, BAIDEN_00, BAIDEN_23）。各月の前後の日を含める
+DAILY_ROWS = [
+    (20240630,1000,1090),
+    (20240701,1100,1190),
+    (20240715,1200,1290),
+    (20240731,1300,1390),
+    (20240801,1400,1490),
+    (20241130,2000,2090),
+    (20241201,2100,2190),
+    (20241231,2200,2290),
+    (20250101,2300,2390),
+]
+
+class RecordingCursor:
+    # 実行したSQLとパラメーターを記録するカーソル
+    def __init__(self,cursor):
+        self.cursor = cursor
+        self.executed = []
+
+    def execute(self,sql,params=()):
+        self.executed.append((sql,params))
+        return self.cursor.execute(sql,params)
+
+    def __getattr__(self,name):
+        return getattr(self.cursor,name)
+
+@pytest.fixture
+def session(tmp_path,monkeypatch):
+    # SQLiteのストレージを使用し、日別テーブルに行を登録したセッションを作成する
+    monkeypatch.setattr(mysql_ops,"_backend",None)
+    standins.use_sqlite_database(str(tmp_path / "izumi_sola.sqlite3"))
+    session = mysql_ops.DbSession()
+    session.cursor.executemany(
+        f"INSERT INTO {mysql_ops.DAILY_TABLE_NAME} (KANSOKU_DATE_INT, BAIDEN_DAILY, BAIDEN_00, BAIDEN_23, KANSOKU_DATE) VALUES (?, ?, ?, ?, ?)",
+        [(date_int,baiden_23 - baiden_00,baiden_00,baiden_23,str(date_int)) for date_int,baiden_00,baiden_23 in DAILY_ROWS],
+    )
+    session.cursor = RecordingCursor(session.cursor)
+    yield session
+    session.close()
+
+def select_baseline_month(session,oha_yyyymm):
+    # 従来の集計（YEAR(KANSOKU_DATE) / MONTH(KANSOKU_DATE) で月を判定する）で、月の最初の日の BAIDEN_00、
+    # 最後の日の BAIDEN_23、月の売電量を取得する（SQLiteには YEAR / MONTH が無いため観測日の文字列から求める）
+    month_condition = "CAST(substr(KANSOKU_DATE,1,4) AS INTEGER) = ? AND CAST(substr(KANSOKU_DATE,5,2) AS INTEGER) = ?"
+    sql = f"""
+    SELECT
+        FIRST_DAY.BAIDEN_00,
+        LAST_DAY.BAIDEN_23,
+        LAST_DAY.BAIDEN_23 - FIRST_DAY.BAIDEN_00
+    FROM (
+        SELECT BAIDEN_00 FROM {mysql_ops.DAILY_TABLE_NAME}
+        WHERE {month_condition}
+        ORDER BY KANSOKU_DATE_INT ASC LIMIT 1
+    ) AS FIRST_DAY, (
+        SELECT BAIDEN_23 FROM {mysql_ops.DAILY_TABLE_NAME}
+        WHERE {month_condition}
+        ORDER BY KANSOKU_DATE_INT DESC LIMIT 1
+    ) AS LAST_DAY
+    """
+    year,month = divmod(oha_yyyymm,100)
+    cursor = session.conn.cursor()
+    cursor.execute(sql,(year,month,year,month))
+    return cursor.fetchone()
+
+def select_monthly(session):
+    # 月別テーブルの月と売電量を取得する
+    cursor = session.conn.cursor()
+    cursor.execute(f"SELECT KANSOKU_MONTH_INT, BAIDEN_MONTHLY FROM {mysql_ops.MONTHLY_TABLE_NAME} ORDER BY KANSOKU_MONTH_INT")
+    return cursor.fetchall()
+
+def explain_daily_table(session,sql,params):
+    # 実行計画のうち、日別テーブルを読む行を取得する
+    cursor = session.conn.cursor()
+    cursor.execute("EXPLAIN QUERY PLAN " + sql,params)
+    return [row[3] for row in cursor.fetchall() if mysql_ops.DAILY_TABLE_NAME in row[3]]
+
+def test_baseline_month_uses_first_and_last_day(session):
+    # 従来の集計は、前月末・翌月初の日を含めずに月の最初と最後の日を読む
+    assert select_baseline_month(session,202407) == (1100,1390,290)
+    assert select_baseline_month(session,202412) == (2100,2290,190)
+
+@pytest.mark.parametrize("oha_yyyymm",[202407,202412])
+def test_monthly_matches_baseline(session,oha_yyyymm):
+    # 1か月ずつの集計は、従来の集計と同じ売電量になる
+    mysql_ops.db_UpdateInsertMonthlyTable(oha_yyyymm,session)
+    assert select_monthly(session) == [(oha_yyyymm,select_baseline_month(session,oha_yyyymm)[2])]
+
+def test_monthly_batch_matches_baseline(session):
+    # 複数月の一括集計も、月ごとに従来の集計と同じ売電量になる
+    assert mysql_ops.db_UpdateInsertMonthlyTableBatch([202412,202406,202407,202501],session) == 4
+    expected = [(oha_yyyymm,select_baseline_month(session,oha_yyyymm)[2]) for oha_yyyymm in (202406,202407,202412,202501)]
+    assert select_monthly(session) == expected
+
+def test_monthly_update_replaces_value(session):
+    # 月末の日の行が変わった場合は、月別テーブルの行を更新する
+    mysql_ops.db_UpdateInsertMonthlyTable(202407,session)
+    session.cursor.execute(f"UPDATE {mysql_ops.DAILY_TABLE_NAME} SET BAIDEN_23 = 1500 WHERE KANSOKU_DATE_INT = 20240731")
+    mysql_ops.db_UpdateInsertMonthlyTable(202407,session)
+    assert select_monthly(session) == [(202407,400)]
+
+@pytest.mark.parametrize("batch",[False,True])
+def test_monthly_range_uses_date_index(session,batch):
+    # 観測日の半開区間の条件は、日別テーブルを全件走査せず KANSOKU_DATE_INT のインデックスで検索する
+    if batch:
+        mysql_ops.db_UpdateInsertMonthlyTableBatch([202407,202412],session)
+    else:
+        mysql_ops.db_UpdateInsertMonthlyTable(202407,session)
+    sql,params = session.cursor.executed[-1]
+    plan = explain_daily_table(session,sql,params)
+
+    assert len(plan) == 2
+    for detail in plan:
+        assert detail.startswith(f"SEARCH {mysql_ops.DAILY_TABLE_NAME} USING ")
+        assert "INDEX" in detail
+        assert "(KANSOKU_DATE_INT>? AND KANSOKU_DATE_INT<?)" in detail
+
+def select_origin(session):
+    # 元データテーブルの全行を主キーの順に取得する（更新日時を除く）
+    cursor = session.conn.cursor()
+    cursor.execute(f"SELECT {', '.join(mysql_ops.ORIGIN_COLUMNS[:-1])} FROM {mysql_ops.ORIGIN_TABLE_NAME} ORDER BY GENBA_CD, KANSOKU_DATE_INT, KANSOKU_TIME_INT")
+    return cursor.fetchall()
+
+def make_origin_df(baiden,minutes=range(0,60,5)):
+    # 元データテーブルに登録するCSVファイル1件分（省略時は12行）のDataFrame
+    rows = [[1,20240731,2300 + minute] + [float(i) for i in range(27)] + [baiden + minute] for minute in minutes]
+    return pd.DataFrame(rows)
+
+def test_origin_rows_matches_batch(session):
+    # 1行ずつの登録は、INSERT・UPDATEした行数を返し、一括登録と同じ行を登録する
+    assert mysql_ops.db_UpdateInsertOriginTable(make_origin_df(1000),"24073123",session) == (12,0)
+    assert mysql_ops.db_UpdateInsertOriginTable(make_origin_df(2000),"24073123",session) == (0,12)
+    rows = select_origin(session)
+
+    session.cursor.execute(f"DELETE FROM {mysql_ops.ORIGIN_TABLE_NAME}")
+    assert mysql_ops.db_UpdateInsertOriginTableBatch(make_origin_df(1000),"24073123",session) == (12,0)
+    assert mysql_ops.db_UpdateInsertOriginTableBatch(make_origin_df(2000),"24073123",session) == (0,12)
+
+    assert select_origin(session) == rows
+    assert [row[30] for row in rows] == [2000 + minute for minute in range(0,60,5)]
+
+def test_origin_batch_counts_mixed_rows(session):
+    # 既存の行と新しい行、ファイル内で重複するキーを含む場合も、1行ずつの登録と同じ行数を返す
+    minutes = [0,5,5,10]
+    assert mysql_ops.db_UpdateInsertOriginTable(make_origin_df(1000,minutes),"24073123",session) == (3,1)
+    assert mysql_ops.db_UpdateInsertOriginTable(make_origin_df(2000,[10,15]),"24073123",session) == (1,1)
+
+    session.cursor.execute(f"DELETE FROM {mysql_ops.ORIGIN_TABLE_NAME}")
+    assert mysql_ops.db_UpdateInsertOriginTableBatch(make_origin_df(1000,minutes),"24073123",session) == (3,1)
+    assert mysql_ops.db_UpdateInsertOriginTableBatch(make_origin_df(2000,[10,15]),"24073123",session) == (1,1)
+
+class AffectedRowsCursor:
+    # ON DUPLICATE KEY UPDATE の影響を受けた行数（INSERTした行が1、UPDATEした行が2）を返すカーソル（MySQLの代わり）
+    def __init__(self):
+        self.keys = set()
+        self.executed = []
+        self.rowcount = -1
+
+    def executemany(self,sql,rows):
+        self.executed.append(sql)
+        self.rowcount = 0
+        for row in rows:
+            self.rowcount += 2 if row[:3] in self.keys else 1
+            self.keys.add(row[:3])
+
+def test_origin_batch_counts_from_affected_rows_on_mysql(monkeypatch):
+    # MySQLでは既存のキーを数えるSELECTを実行せず、影響を受けた行数からINSERT・UPDATEした行数を求める
+    monkeypatch.setattr(mysql_ops,"_backend",storage_ops.MysqlBackend("localhost","user","password","database","pool",1))
+    session = types.SimpleNamespace(conn=None,cursor=AffectedRowsCursor())
+    assert mysql_ops.db_UpdateInsertOriginTableBatch(make_origin_df(1000,[0,5,5,10]),"24073123",session) == (3,1)
+    assert mysql_ops.db_UpdateInsertOriginTableBatch(make_origin_df(2000,[10,15]),"24073123",session) == (1,1)
+    assert all(sql.startswith(f"INSERT INTO {mysql_ops.ORIGIN_TABLE_NAME}") for sql in session.cursor.executed)
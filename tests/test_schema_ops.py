@@ -0,0 +1,153 @@
+# -----------------------------------------------------------------------------
+# 会社名: 湘南技術センター株式会社
+# 名前: 塩見 和則
+# 作成日: 2026/10/18
+# -----------------------------------------------------------------------------
+
+"""
+schema_ops のテスト
+
+SQLiteのストレージで、起動時の prepare_schema が適用済みのバージョンが古い場合のみマイグレーションを
+実行すること、固定したマイグレーションのテーブル定義が現在の定義と同じこと、
+バージョン5で既存のテーブルに無い列だけを追加し、列の型は変更しないことを確認する。
+"""
+
+# 外部ライブラリ
+import pytest
+
+import mysql_ops
+import schema_ops
+import storage_ops
+
+@pytest.fixture
+def sqlite_backend(tmp_path,monkeypatch):
+    # 空のSQLiteファイルをストレージにする
+    monkeypatch.setattr(mysql_ops,"_backend",None)
+    mysql_ops.set_backend("sqlite",str(tmp_path / "izumi_sola.sqlite3"))
+
+def count_calls(monkeypatch,name):
+    # schema_ops の関数の呼び出し回数を記録する
+    calls = []
+    func = getattr(schema_ops,name)
+    def wrapper(*args,**kwargs):
+        calls.append(name)
+        return func(*args,**kwargs)
+    monkeypatch.setattr(schema_ops,name,wrapper)
+    return calls
+
+def test_prepare_schema_migrates_empty_database(sqlite_backend):
+    # マイグレーションを一度も適用していないDBでは、全てのマイグレーションを適用して確認する
+    assert schema_ops.get_schema_version() == 0
+    assert schema_ops.prepare_schema() == True
+    assert schema_ops.get_schema_version() == schema_ops.SCHEMA_LATEST_VERSION
+    assert schema_ops.check_schema() == []
+
+def test_prepare_schema_skips_when_up_to_date(sqlite_backend,monkeypatch):
+    # 最新のバージョンを適用済みの場合は、マイグレーションもテーブルの確認も行わない
+    schema_ops.migrate()
+    migrate_calls = count_calls(monkeypatch,"migrate")
+    check_calls = count_calls(monkeypatch,"check_schema")
+
+    assert schema_ops.prepare_schema() == True
+    assert migrate_calls == [] and check_calls == []
+
+    # --migrate の場合はバージョンによらず実行する
+    assert schema_ops.prepare_schema(force=True) == True
+    assert migrate_calls == ["migrate"] and check_calls == ["check_schema"]
+
+def test_prepare_schema_migrates_when_behind(sqlite_backend,monkeypatch):
+    # 適用済みのバージョンが古い場合は、未適用のマイグレーションだけを適用する
+    schema_ops.migrate()
+    conn,cursor = mysql_ops.db_init()
+    cursor.execute(f"DELETE FROM {schema_ops.SCHEMA_VERSION_TABLE_NAME} WHERE VERSION = ?",(schema_ops.SCHEMA_LATEST_VERSION,))
+    conn.commit()
+    mysql_ops.db_close(conn,cursor)
+    migrate_calls = count_calls(monkeypatch,"migrate")
+
+    assert schema_ops.prepare_schema() == True
+    assert migrate_calls == ["migrate"]
+    assert schema_ops.get_schema_version() == schema_ops.SCHEMA_LATEST_VERSION
+
+def test_migrations_create_current_definitions():
+    # 最新のマイグレーションの固定したテーブル定義は、現在のテーブル定義（SCHEMA_TABLES）と同じ
+    # （SCHEMA_TABLES を変更した場合は、新しいバージョンのマイグレーションを追加する）
+    assert schema_ops.SCHEMA_V5_TABLES == schema_ops.SCHEMA_TABLES
+
+def test_migration_5_adds_missing_columns(sqlite_backend):
+    # バージョン4まで適用済みのDBで、定義に無い列が欠けているテーブルに列を追加する
+    schema_ops.migrate()
+    conn,cursor = mysql_ops.db_init()
+    cursor.execute(f"DROP TABLE {mysql_ops.DAILY_TABLE_NAME}")
+    cursor.execute(f"CREATE TABLE {mysql_ops.DAILY_TABLE_NAME} (KANSOKU_DATE_INT INT NOT NULL, BAIDEN_DAILY BIGINT NULL, BAIDEN_00 BIGINT NULL, BAIDEN_23 BIGINT NULL, PRIMARY KEY (KANSOKU_DATE_INT))")
+    cursor.execute(f"DELETE FROM {schema_ops.SCHEMA_VERSION_TABLE_NAME} WHERE VERSION = 5")
+    conn.commit()
+    mysql_ops.db_close(conn,cursor)
+    assert schema_ops.check_schema() == [f"{mysql_ops.DAILY_TABLE_NAME}: missing columns ['KANSOKU_DATE', 'UPDATE_DATETIME']"]
+
+    assert schema_ops.migrate() == [5]
+    assert schema_ops.check_schema() == []
+
+class InformationSchemaCursor:
+    # information_schema の列とインデックスを返し、実行したSQLを記録するカーソル（MySQLの代わり）
+    def __init__(self,columns):
+        self.columns = columns
+        self.executed = []
+        self.rows = []
+
+    def execute(self,sql,params=()):
+        self.executed.append(sql)
+        if "information_schema.COLUMNS" in sql:
+            self.rows = [row for row in self.columns if row[0] in params]
+        else:
+            self.rows = []
+
+    def fetchall(self):
+        return self.rows
+
+def test_migration_5_never_modifies_columns_on_mysql(monkeypatch):
+    # MySQLでも、無い列を追加するだけで、型の異なる既存の列（本番の DATE・DECIMAL など）は変更しない
+    monkeypatch.setattr(mysql_ops,"_backend",storage_ops.MysqlBackend("localhost","user","password","database","pool",1))
+    cursor = InformationSchemaCursor([
+        (mysql_ops.MONTHLY_TABLE_NAME,"KANSOKU_MONTH_INT","int(11)","NO"),
+        (mysql_ops.MONTHLY_TABLE_NAME,"BAIDEN_MONTHLY","decimal(12,3)","YES"),
+        (mysql_ops.MONTHLY_TABLE_NAME,"UPDATE_DATETIME","datetime","YES"),
+        (mysql_ops.DAILY_TABLE_NAME,"KANSOKU_DATE_INT","int","NO"),
+        (mysql_ops.DAILY_TABLE_NAME,"BAIDEN_DAILY","int(11)","YES"),
+        (mysql_ops.DAILY_TABLE_NAME,"BAIDEN_00","bigint","YES"),
+        (mysql_ops.DAILY_TABLE_NAME,"BAIDEN_23","bigint","YES"),
+        (mysql_ops.DAILY_TABLE_NAME,"KANSOKU_DATE","varchar(10)","YES"),
+    ])
+    schema_ops.add_missing_columns(cursor,schema_ops.SCHEMA_V5_TABLES)
+
+    alter_sqls = [sql for sql in cursor.executed if sql.startswith("ALTER")]
+    assert alter_sqls == [f"ALTER TABLE {mysql_ops.DAILY_TABLE_NAME} ADD COLUMN UPDATE_DATETIME DATETIME NULL"]
+
+def test_check_schema_reports_type_differences(sqlite_backend,monkeypatch):
+    # 列の型が定義と異なる場合はログに出力するが、問題としては扱わない
+    schema_ops.migrate()
+    conn,cursor = mysql_ops.db_init()
+    cursor.execute(f"DROP TABLE {mysql_ops.DAILY_TABLE_NAME}")
+    cursor.execute(f"CREATE TABLE {mysql_ops.DAILY_TABLE_NAME} (KANSOKU_DATE_INT INT NOT NULL, BAIDEN_DAILY BIGINT NULL, BAIDEN_00 BIGINT NULL, BAIDEN_23 BIGINT NULL, KANSOKU_DATE VARCHAR(8) NULL, UPDATE_DATETIME DATETIME NULL, PRIMARY KEY (KANSOKU_DATE_INT))")
+    conn.commit()
+    mysql_ops.db_close(conn,cursor)
+    logs = []
+    monkeypatch.setattr(schema_ops.file_util,"write_log",lambda log_content,level="info": logs.append(log_content))
+
+    assert schema_ops.check_schema() == []
+    assert [log_content.split(" ",2)[2] for log_content in logs] == [
+        f"Schema column type differs {mysql_ops.DAILY_TABLE_NAME}.KANSOKU_DATE: VARCHAR(8) NULL, defined DATE NULL (not changed automatically)"
+    ]
+
+def test_ensure_schema_retries_until_ready(tmp_path,monkeypatch):
+    # DBに接続できない間は呼び出すたびに確認し直し、確認できた後はDBに接続しない
+    monkeypatch.setattr(mysql_ops,"_backend",None)
+    mysql_ops.set_backend("sqlite",str(tmp_path))
+    prepare_calls = count_calls(monkeypatch,"prepare_schema")
+    assert schema_ops.ensure_schema() == False
+    assert schema_ops.ensure_schema() == False
+    assert len(prepare_calls) == 2
+
+    mysql_ops.set_backend("sqlite",str(tmp_path / "izumi_sola.sqlite3"))
+    assert schema_ops.ensure_schema() == True
+    assert schema_ops.ensure_schema() == True
+    assert len(prepare_calls) == 3 and schema_ops.is_schema_ready() == True
@@ -0,0 +1,134 @@
+# -----------------------------------------------------------------------------
+# 会社名: 湘南技術センター株式会社
+# 名前: 塩見 和則
+# 作成日: 2026/10/18
+# -----------------------------------------------------------------------------
+
+"""
+spool_ops のテスト
+
+SQLiteのストレージで、スプールのバッチを SPOOL_REPLAY_COMMIT_BATCHES 件ごとにCOMMITすること、
+DBに接続できなくなった場合はCOMMIT済みのバッチを除いてスプールに残すこと、
+登録に失敗し続けるバッチを SPOOL_MAX_ATTEMPTS 回で隔離ファイルに移し、続くバッチを登録することを確認する。
+"""
+
+# 標準ライブラリ
+import os
+import json
+import datetime as dt
+
+# 外部ライブラリ
+import pytest
+
+import csvfile_ops
+import csvparse_ops
+import mysql_ops
+import spool_ops
+import standins
+import synth_csv
+
+# スプールに書き込む時間（1時間が1バッチ）
+START_HOUR = dt.datetime(2024,7,30,0)
+
+@pytest.fixture
+def spool_directory(work_dir,monkeypatch):
+    # SQLiteのストレージと空の取り込み済みファイルの情報を使用する
+    monkeypatch.setattr(mysql_ops,"_backend",None)
+    monkeypatch.setattr(csvfile_ops,"_ftp_manifest",None)
+    standins.use_sqlite_database(str(work_dir / "izumi_sola.sqlite3"))
+    return str(work_dir / "spool")
+
+def append_hours(spool_directory,hours,start_hour=START_HOUR):
+    # 合成したCSVファイルを、1時間ずつバッチとしてスプールに書き込む
+    filenames = []
+    for genba_cd,hour,data in synth_csv.generate_files(1,start_hour,hours):
+        csv_df = csvparse_ops.read_logger_csv(data)
+        filename = hour.strftime('%y%m%d%H') + ".CSV"
+        manifest_entry = ("/LOG/2024",filename,len(data),"20240801000000",csvfile_ops.get_content_hash(data),csvfile_ops.get_row_hashes(csv_df))
+        spool_ops.append_batch(hour.strftime('%y%m%d%H'),csv_df,manifest_entry,spool_directory)
+        filenames.append(filename)
+    return filenames
+
+def append_broken_batch(spool_directory):
+    # 元データテーブルの列数に合わず、登録に必ず失敗するバッチを書き込む
+    batch = {"oha_yymmddhh": "24073099","rows": [["0001",20240730,9900,1.0]],"manifest": ["/LOG/2024","24073099.CSV",1,"20240801000000","",{}]}
+    with open(os.path.join(spool_directory,spool_ops.SPOOL_FILE_NAME),'a',encoding='utf-8') as spool_file:
+        spool_file.write(json.dumps(batch) + "\n")
+
+def read_spool(spool_directory):
+    # 登録処理が終わっていないスプールファイルのバッチを読み込む
+    batches = []
+    for spool_path in spool_ops.get_pending_files(spool_directory):
+        with open(spool_path,'r',encoding='utf-8') as spool_file:
+            batches += list(spool_ops.iter_batches(spool_file,spool_path))
+    return batches
+
+def select_hours():
+    # 時間別テーブルの観測日・観測時を取得する
+    conn,cursor = mysql_ops.db_init()
+    cursor.execute(f"SELECT KANSOKU_DATE_INT, KANSOKU_TIME_INT FROM {mysql_ops.HOURLY_TABLE_NAME} ORDER BY 1, 2")
+    rows = cursor.fetchall()
+    mysql_ops.db_close(conn,cursor)
+    return rows
+
+def test_replay_commits_every_n_batches(spool_directory,monkeypatch):
+    # 5バッチを2バッチごとにCOMMITし、全て登録したらスプールファイルを削除する
+    monkeypatch.setattr(spool_ops,"SPOOL_REPLAY_COMMIT_BATCHES",2)
+    filenames = append_hours(spool_directory,5)
+
+    summary = spool_ops.replay(spool_directory)
+    assert summary["committed"] == True
+    assert (summary["files"],summary["batches"],summary["commits"],summary["origin_rows"]) == (1,5,3,60)
+    assert summary["recompute"]["hours"] == 5
+    assert read_spool(spool_directory) == []
+    assert select_hours() == [(20240730,hour) for hour in range(5)]
+    assert all(csvfile_ops.get_ftp_manifest().get("/LOG/2024",filename) is not None for filename in filenames)
+
+def test_replay_keeps_uncommitted_batches_when_database_is_down(spool_directory,monkeypatch):
+    # 最初のCOMMIT後にDBに接続できなくなった場合は、COMMIT済みのバッチを除いて試行回数を数えずに残す
+    monkeypatch.setattr(spool_ops,"SPOOL_REPLAY_COMMIT_BATCHES",2)
+    append_hours(spool_directory,5)
+    open_session = spool_ops.open_session
+    sessions = []
+    def open_session_once():
+        sessions.append(1)
+        return open_session() if len(sessions) == 1 else None
+    monkeypatch.setattr(spool_ops,"open_session",open_session_once)
+
+    summary = spool_ops.replay(spool_directory)
+    assert summary["committed"] == False
+    assert (summary["commits"],summary["kept"]) == (1,2)
+    kept = read_spool(spool_directory)
+    assert [batch["oha_yymmddhh"] for batch in kept] == ["24073002","24073003","24073004"]
+    assert all("attempts" not in batch for batch in kept)
+
+    # DBに接続できるようになったら、残したバッチだけを登録する
+    monkeypatch.setattr(spool_ops,"open_session",open_session)
+    summary = spool_ops.replay(spool_directory)
+    assert summary["committed"] == True
+    assert (summary["batches"],summary["commits"]) == (3,2)
+    assert select_hours() == [(20240730,hour) for hour in range(5)]
+
+def test_failing_batch_is_quarantined(spool_directory,monkeypatch):
+    # 登録に失敗するバッチは、試行回数の上限まではそのバッチから次回登録し直し、上限に達したら隔離して続くバッチを登録する
+    monkeypatch.setattr(spool_ops,"SPOOL_MAX_ATTEMPTS",2)
+    append_hours(spool_directory,1)
+    append_broken_batch(spool_directory)
+    append_hours(spool_directory,1,START_HOUR + dt.timedelta(hours=1))
+
+    summary = spool_ops.replay(spool_directory)
+    assert summary["committed"] == False
+    assert (summary["commits"],summary["kept"],summary["quarantined"]) == (1,2,0)
+    assert [(batch["oha_yymmddhh"],batch.get("attempts")) for batch in read_spool(spool_directory)] == [("24073099",1),("24073001",None)]
+    assert select_hours() == [(20240730,0)]
+
+    summary = spool_ops.replay(spool_directory)
+    assert summary["committed"] == True
+    assert (summary["commits"],summary["kept"],summary["quarantined"]) == (1,0,1)
+    assert read_spool(spool_directory) == []
+    assert select_hours() == [(20240730,0),(20240730,1)]
+
+    with open(os.path.join(spool_directory,spool_ops.SPOOL_QUARANTINE_FILE_NAME),'r',encoding='utf-8') as quarantine_file:
+        quarantined = [json.loads(line) for line in quarantine_file]
+    assert [(batch["oha_yymmddhh"],batch["attempts"]) for batch in quarantined] == [("24073099",2)]
+    assert quarantined[0]["error"] != ""